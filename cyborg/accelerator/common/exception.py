@@ -122,3 +122,13 @@ class MissingParameterValue(InvalidParameterValue):
 
 class InvalidAccelerator(InvalidParameterValue):
     _msg_fmt = "%(err)s"
+
+
+class SPDKConnectionError(AcceleratorException):
+    _msg_fmt = _("Unable to communicate with the SPDK server at "
+                 "%(address)s: %(err)s")
+
+
+class SPDKRPCError(AcceleratorException):
+    _msg_fmt = _("SPDK RPC %(method)s failed with code %(rpc_code)s: "
+                 "%(error)s")
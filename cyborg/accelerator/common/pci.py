@@ -0,0 +1,173 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+PCI device enumeration from sysfs, shared by the accelerator drivers.
+
+Devices are described by dicts with the following keys:
+
+* ``address``: the PCI address, e.g. "0000:00:06.0".
+* ``class_id``: class and subclass as 4 hex digits, e.g. "0302".
+* ``vendor_id`` and ``product_id``: 4 lowercase hex digits, without "0x".
+* ``numa_node``: the NUMA node as an int, None if unknown.
+* ``sriov_totalvfs`` and ``sriov_numvfs``: ints, None if the device is not
+  SR-IOV capable.
+* ``physfn``: the address of the PF if the device is a VF, otherwise None.
+* ``virtfns``: the addresses of the VFs of the device, in VF index order.
+"""
+
+import glob
+import io
+import os
+
+from oslo_log import log as logging
+
+
+LOG = logging.getLogger(__name__)
+
+SYS_PCI_DEVICES = "/sys/bus/pci/devices"
+PCI_IDS_PATHS = ["/usr/share/misc/pci.ids", "/usr/share/hwdata/pci.ids"]
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.readline().strip()
+    except (IOError, OSError):
+        return None
+
+
+def _read_int(path):
+    value = _read(path)
+    try:
+        return int(value, 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _read_id(path):
+    value = _read(path)
+    if value is None:
+        return None
+    value = value.lower()
+    return value[2:] if value.startswith("0x") else value
+
+
+def _link_address(path):
+    return os.path.basename(os.path.realpath(path))
+
+
+def _virtfns(path):
+    links = glob.glob(os.path.join(path, "virtfn*"))
+    links.sort(key=lambda p: int(os.path.basename(p)[len("virtfn"):]))
+    return [_link_address(link) for link in links]
+
+
+def read_device(path, class_id=None):
+    """Read the description of the PCI device at a sysfs path.
+
+    :param path: the sysfs directory of the device, or a link to it.
+    :param class_id: the class of the device if it was already read.
+    :returns: the device dict, see the module docstring.
+    """
+    if class_id is None:
+        class_id = (_read_id(os.path.join(path, "class")) or "")[:4]
+    numa_node = _read_int(os.path.join(path, "numa_node"))
+    physfn = os.path.join(path, "physfn")
+    return {
+        "address": _link_address(path),
+        "class_id": class_id,
+        "vendor_id": _read_id(os.path.join(path, "vendor")),
+        "product_id": _read_id(os.path.join(path, "device")),
+        "numa_node": numa_node if numa_node is not None and numa_node >= 0
+        else None,
+        "sriov_totalvfs": _read_int(os.path.join(path, "sriov_totalvfs")),
+        "sriov_numvfs": _read_int(os.path.join(path, "sriov_numvfs")),
+        "physfn": _link_address(physfn) if os.path.exists(physfn)
+        else None,
+        "virtfns": _virtfns(path),
+    }
+
+
+def scan_devices(class_ids=None, vendor_id=None):
+    """Enumerate the PCI devices of the host.
+
+    Only the class (and the vendor, if filtered on) of the devices which are
+    filtered out is read.
+
+    :param class_ids: if set, only return devices of these classes, given
+                      as class and subclass, e.g. ["0300", "0302"].
+    :param vendor_id: if set, only return devices of this vendor.
+    :returns: a list of device dicts ordered by PCI address.
+    """
+    try:
+        addresses = sorted(os.listdir(SYS_PCI_DEVICES))
+    except OSError as e:
+        LOG.warning("Unable to list PCI devices in %(path)s: %(err)s",
+                    {"path": SYS_PCI_DEVICES, "err": e})
+        return []
+    if vendor_id:
+        vendor_id = vendor_id.lower()
+        if vendor_id.startswith("0x"):
+            vendor_id = vendor_id[2:]
+    devices = []
+    for address in addresses:
+        path = os.path.join(SYS_PCI_DEVICES, address)
+        class_id = (_read_id(os.path.join(path, "class")) or "")[:4]
+        if class_ids and class_id not in class_ids:
+            continue
+        if vendor_id and _read_id(os.path.join(path, "vendor")) != vendor_id:
+            continue
+        devices.append(read_device(path, class_id))
+    return devices
+
+
+def lookup_names(ids):
+    """Look up the names of PCI devices in the pci.ids database.
+
+    Names are formatted like lspci does, "<vendor name> <device name>",
+    falling back to "Vendor <vendor_id>" and "Device <product_id>" for ids
+    missing from the database or if no database is installed.
+
+    :param ids: an iterable of (vendor_id, product_id) tuples.
+    :returns: a dict mapping each (vendor_id, product_id) tuple to its name.
+    """
+    wanted = set(ids)
+    vendors = set(vendor for vendor, product in wanted)
+    vendor_names = {}
+    product_names = {}
+    path = next((p for p in PCI_IDS_PATHS if os.path.isfile(p)), None)
+    if path and wanted:
+        with io.open(path, encoding="utf-8", errors="replace") as f:
+            vendor = None
+            for line in f:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                if line.startswith("C "):
+                    # Device classes follow all the vendors.
+                    break
+                if not line.startswith("\t"):
+                    vendor, _sep, name = line.strip().partition("  ")
+                    if vendor in vendors:
+                        vendor_names[vendor] = name
+                    elif len(vendor_names) == len(vendors):
+                        break
+                elif vendor in vendors and not line.startswith("\t\t"):
+                    product, _sep, name = line.strip().partition("  ")
+                    if (vendor, product) in wanted:
+                        product_names[(vendor, product)] = name
+    names = {}
+    for vendor, product in wanted:
+        names[(vendor, product)] = "%s %s" % (
+            vendor_names.get(vendor, "Vendor %s" % vendor),
+            product_names.get((vendor, product), "Device %s" % product))
+    return names
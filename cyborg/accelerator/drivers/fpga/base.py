@@ -45,6 +45,12 @@ class FPGADriver(object):
         raise NotImplementedError()
 
     def program(self, device_path, image):
+        """Program a device with a bitstream.
+
+        :param device_path: The PCI address of the device.
+        :param image: The path of the bitstream file.
+        :returns: The exit status of the programmer, 0 on success.
+        """
         raise NotImplementedError()
 
     @classmethod
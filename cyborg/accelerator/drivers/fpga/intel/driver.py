@@ -19,9 +19,13 @@ Cyborg Intel FPGA driver implementation.
 
 import subprocess
 
+from oslo_log import log as logging
+
 from cyborg.accelerator.drivers.fpga.base import FPGADriver
 from cyborg.accelerator.drivers.fpga.intel import sysinfo
 
+LOG = logging.getLogger(__name__)
+
 
 class IntelFPGADriver(FPGADriver):
     """Base class for FPGA drivers.
@@ -50,7 +54,13 @@ class IntelFPGADriver(FPGADriver):
         for i in zip(["--bus", "--device", "--function"], bdfs):
             cmd.extend(i)
         cmd.append(image)
-        p = subprocess.Popen(cmd, stdout=subprocess.PIPE)
-        # FIXME Should log p.communicate(), p.stderr
-        p.wait()
+        # NOTE: the subprocess module is monkey patched, the other green
+        # threads of the agent run while fpgaconf programs the device.
+        p = subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                             stderr=subprocess.STDOUT)
+        output = p.communicate()[0]
+        if p.returncode:
+            LOG.error("fpgaconf failed to program %(bdf)s with %(image)s: "
+                      "%(output)s", {'bdf': bdf, 'image': image,
+                                     'output': output})
         return p.returncode
@@ -23,6 +23,7 @@ import glob
 import os
 import re
 from cyborg import objects
+from cyborg.accelerator.common import pci
 from cyborg.objects.driver_objects import driver_deployable, driver_device,\
     driver_attach_handle, driver_controlpath_id
 from cyborg.common import constants
@@ -35,60 +36,13 @@ BDF_PATTERN = re.compile(
     "^[a-fA-F\d]{4}:[a-fA-F\d]{2}:[a-fA-F\d]{2}\.[a-fA-F\d]$")
 
 
-DEVICE_FILE_MAP = {"vendor": "vendor",
-                   "device": "model"}
-DEVICE_FILE_HANDLER = {}
-DEVICE_EXPOSED = ["vendor", "device"]
-
-
-def all_fpgas():
-    # glob.glob1("/sys/class/fpga", "*")
-    return glob.glob(os.path.join(SYS_FPGA, "*"))
-
-
-def all_vf_fpgas():
-    return [dev.rsplit("/", 2)[0] for dev in
-            glob.glob(os.path.join(SYS_FPGA, "*/device/physfn"))]
-
-
-def all_pfs_have_vf():
-    return [dev.rsplit("/", 2)[0] for dev in
-            glob.glob(os.path.join(SYS_FPGA, "*/device/virtfn0"))]
-
-
-def target_symbolic_map():
-    maps = {}
-    for f in glob.glob(os.path.join(SYS_FPGA, "*/device")):
-        maps[os.path.realpath(f)] = os.path.dirname(f)
-    return maps
-
-
-def bdf_path_map():
-    maps = {}
-    for f in glob.glob(os.path.join(SYS_FPGA, "*/device")):
-        maps[os.path.basename(os.path.realpath(f))] = os.path.dirname(f)
-    return maps
-
-
-def all_vfs_in_pf_fpgas(pf_path):
-    maps = target_symbolic_map()
-    vfs = glob.glob(os.path.join(pf_path, "device/virtfn*"))
-    return [maps[os.path.realpath(vf)] for vf in vfs]
-
-
-def all_pf_fpgas():
-    return [dev.rsplit("/", 2)[0] for dev in
-            glob.glob(os.path.join(SYS_FPGA, "*/device/sriov_totalvfs"))]
-
-
 def is_vf(path):
     return True if glob.glob(os.path.join(path, "device/physfn")) else False
 
 
 def find_pf_by_vf(path):
-    maps = target_symbolic_map()
-    p = os.path.realpath(os.path.join(path, "device/physfn"))
-    return maps[p]
+    pf = os.path.basename(os.path.realpath(os.path.join(path, DEVICE, PF)))
+    return FPGASnapshot().fpgas[pf]["path"]
 
 
 def is_bdf(bdf):
@@ -104,56 +58,70 @@ def split_bdf(bdf):
 
 
 def get_pf_bdf(bdf):
-    path = bdf_path_map().get(bdf)
-    if path:
-        path = find_pf_by_vf(path) if is_vf(path) else path
-        return get_bdf_by_path(path)
-    return bdf
-
-
-def fpga_device(path):
-    infos = {}
-
-    def read_line(filename):
-        with open(filename) as f:
-            return f.readline().strip()
-
-    # NOTE "In 3.x, os.path.walk is removed in favor of os.walk."
-    for (dirpath, dirnames, filenames) in os.walk(path):
-        for filename in filenames:
-            if filename in DEVICE_EXPOSED:
-                key = DEVICE_FILE_MAP.get(filename) or filename
-                if key in DEVICE_FILE_HANDLER and callable(
-                        DEVICE_FILE_HANDLER(key)):
-                    infos[key] = DEVICE_FILE_HANDLER(key)(
-                        os.path.join(dirpath, filename))
-                else:
-                    infos[key] = read_line(os.path.join(dirpath, filename))
-    return infos
+    return FPGASnapshot().get_pf_bdf(bdf)
+
+
+class FPGASnapshot(object):
+    """The FPGAs of /sys/class/fpga, read in a single pass.
+
+    Each FPGA directory, its device symlink and the PCI files of the device
+    are read once, then the FPGAs are indexed by PCI address so that finding
+    the PF of a VF or the VFs of a PF does not touch sysfs again.
+    """
+
+    def __init__(self):
+        # PCI address -> FPGA infos dict.
+        self.fpgas = {}
+        try:
+            names = sorted(os.listdir(SYS_FPGA))
+        except OSError:
+            names = []
+        for name in names:
+            path = os.path.join(SYS_FPGA, name)
+            dev = pci.read_device(os.path.join(path, DEVICE))
+            self.fpgas[dev["address"]] = {
+                "name": name,
+                "path": path,
+                "devices": dev["address"],
+                "vendor": "0x" + dev["vendor_id"],
+                "model": "0x" + dev["product_id"],
+                "physfn": dev["physfn"],
+                "virtfns": dev["virtfns"],
+                "sriov_totalvfs": dev["sriov_totalvfs"]}
+
+    def pfs(self):
+        """FPGAs with SR-IOV capability, ordered by PCI address."""
+        return [self.fpgas[bdf] for bdf in sorted(self.fpgas)
+                if self.fpgas[bdf]["sriov_totalvfs"] is not None]
+
+    def vfs(self, pf):
+        """FPGAs of the enabled VFs of a PF, in VF index order."""
+        return [self.fpgas[bdf] for bdf in pf["virtfns"]
+                if bdf in self.fpgas]
+
+    def get_pf_bdf(self, bdf):
+        fpga = self.fpgas.get(bdf)
+        if fpga and fpga["physfn"]:
+            return fpga["physfn"]
+        return bdf
 
 
 def fpga_tree():
-    def gen_fpga_infos(path, vf=True):
-        name = os.path.basename(path)
-        dpath = os.path.realpath(os.path.join(path, DEVICE))
-        bdf = os.path.basename(dpath)
-        fpga = {"type": constants.DEVICE_FPGA,
-                "devices": bdf,
-                "name": name}
-        d_info = fpga_device(dpath)
-        fpga.update(d_info)
-        return fpga
+    def gen_fpga_infos(fpga):
+        return {"type": constants.DEVICE_FPGA,
+                "devices": fpga["devices"],
+                "name": fpga["name"],
+                "vendor": fpga["vendor"],
+                "model": fpga["model"]}
     devs = []
-    pf_has_vf = all_pfs_have_vf()
-    for pf in all_pf_fpgas():
-        fpga = gen_fpga_infos(pf, False)
-        if pf in pf_has_vf:
-            fpga["regions"] = []
-            vfs = all_vfs_in_pf_fpgas(pf)
-            for vf in vfs:
-                vf_fpga = gen_fpga_infos(vf, True)
-                fpga["regions"].append(vf_fpga)
-        devs.append(_generate_driver_device(fpga, pf in pf_has_vf))
+    snapshot = FPGASnapshot()
+    for pf in snapshot.pfs():
+        fpga = gen_fpga_infos(pf)
+        pf_has_vf = bool(pf["virtfns"])
+        if pf_has_vf:
+            fpga["regions"] = [gen_fpga_infos(vf)
+                               for vf in snapshot.vfs(pf)]
+        devs.append(_generate_driver_device(fpga, pf_has_vf))
     return devs
 
 
@@ -19,58 +19,39 @@ Utils for GPU driver.
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
 
-import re
-import subprocess
-
+from cyborg.accelerator.common import pci
 from cyborg.objects.driver_objects import driver_deployable, driver_device, \
     driver_attach_handle, driver_controlpath_id
 from cyborg.common import constants
 
 LOG = logging.getLogger(__name__)
 
-GPU_FLAGS = ["VGA compatible controller", "3D controller"]
-GPU_INFO_PATTERN = re.compile("(?P<devices>[0-9]{4}:[0-9]{2}:[0-9]{2}\.[0-9]) "
-                              "(?P<controller>.*) [\[].*]: (?P<name>.*) .*"
-                              "[\[](?P<vendor_id>[0-9a-fA-F]"
-                              "{4}):(?P<product_id>[0-9a-fA-F]{4})].*")
+# PCI class and subclass of the GPUs, mapped to the controller names reported
+# by lspci.
+GPU_CLASSES = {"0300": "VGA compatible controller",
+               "0302": "3D controller"}
 
 # NOTE(wangzhh): The implementation of current release doesn't support virtual
 # GPU.
 
 
 def discover_vendors():
-    cmd = "sudo lspci -nnn -D | grep -E '%s'"
-    cmd = cmd % "|".join(GPU_FLAGS)
-    # FIXME(wangzhh): Use oslo.privsep instead of subprocess here to prevent
-    # shell injection attacks.
-    p = subprocess.Popen(cmd, stdout=subprocess.PIPE, shell=True)
-    p.wait()
-    gpus = p.stdout.readlines()
-    vendors = set()
-    for gpu in gpus:
-        m = GPU_INFO_PATTERN.match(gpu)
-        if m:
-            vendor_id = m.groupdict().get("vendor_id")
-            vendors.add(vendor_id)
-    return vendors
+    return set(dev["vendor_id"]
+               for dev in pci.scan_devices(class_ids=GPU_CLASSES))
 
 
 def discover_gpus(vender_id=None):
-    cmd = "sudo lspci -nnn -D| grep -E '%s'"
-    cmd = cmd % "|".join(GPU_FLAGS)
-    if vender_id:
-        cmd = cmd + "| grep " + vender_id
-    # FIXME(wangzhh): Use oslo.privsep instead of subprocess here to prevent
-    # shell injection attacks.
-    p = subprocess.Popen(cmd, stdout=subprocess.PIPE, shell=True)
-    p.wait()
-    gpus = p.stdout.readlines()
+    devs = pci.scan_devices(class_ids=GPU_CLASSES, vendor_id=vender_id)
+    names = pci.lookup_names(
+        (dev["vendor_id"], dev["product_id"]) for dev in devs)
     gpu_list = []
-    for gpu in gpus:
-        m = GPU_INFO_PATTERN.match(gpu)
-        if m:
-            gpu_dict = m.groupdict()
-            gpu_list.append(_generate_driver_device(gpu_dict))
+    for dev in devs:
+        gpu_dict = {"devices": dev["address"],
+                    "controller": GPU_CLASSES[dev["class_id"]],
+                    "name": names[(dev["vendor_id"], dev["product_id"])],
+                    "vendor_id": dev["vendor_id"],
+                    "product_id": dev["product_id"]}
+        gpu_list.append(_generate_driver_device(gpu_dict))
     return gpu_list
 
 
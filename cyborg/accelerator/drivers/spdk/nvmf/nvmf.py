@@ -6,8 +6,8 @@ from cyborg.accelerator.drivers.spdk.util.pyspdk.nvmf_client import NvmfTgt
 from oslo_log import log as logging
 from cyborg.accelerator.common import exception
 from cyborg.accelerator.drivers.spdk.util import common_fun
+from cyborg.accelerator.drivers.spdk.util import provisioning
 from cyborg.accelerator.drivers.spdk.spdk import SPDKDRIVER
-from cyborg.accelerator.drivers.spdk.util.pyspdk.py_spdk import PySPDK
 
 LOG = logging.getLogger(__name__)
 
@@ -55,7 +55,7 @@ class NVMFDRIVER(SPDKDRIVER):
         accelerators = []
         for accelerator_i in range(len(self.servers)):
             accelerator = self.servers[accelerator_i]
-            py_tmp = PySPDK(accelerator)
+            py_tmp = common_fun.get_py_client(accelerator)
             if py_tmp.is_alive():
                 accelerators.append(self.get_one_accelerator())
         return accelerators
@@ -114,3 +114,21 @@ class NVMFDRIVER(SPDKDRIVER):
                                                 )
         else:
             raise exception.Invalid('Construct nvmf subsystem failed.')
+
+    def provision(self, bdevs=None, subsystems=None, batch=False,
+                  rollback=True):
+        """Create bdevs and nvmf subsystems in bulk
+
+        :param bdevs: list of bdev dicts, e.g. {'type': 'malloc',
+        'name': 'Malloc0', 'total_size': 64, 'block_size': 512}.
+        :param subsystems: list of nvmf subsystem dicts, e.g.
+        {'nqn': 'nqn.2016-06.io.spdk:cnode1', 'serial_number':
+        'SPDK00000000000001', 'listen_addresses': [{'trtype': 'RDMA',
+        'traddr': '192.168.100.8', 'trsvcid': '4420'}], 'hosts': [],
+        'namespaces': ['Malloc0']}.
+        :param batch: send a JSON-RPC batch request.
+        :param rollback: delete what was created if anything failed.
+        :return: the per-item results, see provisioning.provision.
+        """
+        return provisioning.provision(self.py.rpc_client, bdevs, subsystems,
+                                      batch=batch, rollback=rollback)
@@ -37,7 +37,26 @@ accelerator_opts = [
 
     cfg.BoolOpt('remoteable',
                 default=False,
-                help=_('Remoteable is false by default'))
+                help=_('Remoteable is false by default')),
+
+    cfg.StrOpt('spdk_rpc_address',
+               default='/var/tmp/spdk.sock',
+               help=_('Unix socket path, or IP address when spdk_rpc_port '
+                      'is set, of the JSON-RPC server of the SPDK apps')),
+
+    cfg.PortOpt('spdk_rpc_port',
+                help=_('TCP port of the JSON-RPC server of the SPDK apps, '
+                       'unset to use the Unix socket spdk_rpc_address')),
+
+    cfg.FloatOpt('spdk_rpc_timeout',
+                 default=60.0,
+                 help=_('Seconds to wait for a SPDK app to answer a '
+                        'JSON-RPC request')),
+
+    cfg.StrOpt('spdk_pid_dir',
+               help=_('Directory holding the pidfiles of the SPDK apps, '
+                      'named <server>.pid. When unset or when a pidfile is '
+                      'stale, the processes are scanned to find the apps'))
 ]
 
 CONF = cfg.CONF
@@ -49,6 +68,10 @@ SERVERS = config.safe_get('accelerator_servers')
 SERVERS_PATTERN = re.compile("|".join(["(%s)" % s for s in SERVERS]))
 SPDK_SERVER_APP_DIR = os.path.join(config.safe_get('spdk_dir'), 'app/')
 
+# The py_clients by server, reused so that their RPC connection and the
+# process they track are kept between calls.
+_PY_CLIENTS = {}
+
 
 def discover_servers():
     """Discover backend servers according to the CONF
@@ -173,7 +196,16 @@ def get_py_client(server):
     :raise: InvalidAccelerator.
     """
     if server in SERVERS:
-        py = PySPDK(server)
+        py = _PY_CLIENTS.get(server)
+        if py is None:
+            pid_dir = config.safe_get('spdk_pid_dir')
+            py = PySPDK(server,
+                        rpc_address=config.safe_get('spdk_rpc_address'),
+                        rpc_port=config.safe_get('spdk_rpc_port'),
+                        rpc_timeout=config.safe_get('spdk_rpc_timeout'),
+                        pidfile=os.path.join(pid_dir, server + '.pid')
+                        if pid_dir else None)
+            _PY_CLIENTS[server] = py
         return py
     else:
         msg = (_("Could not find %s accelerator") % server)
@@ -0,0 +1,164 @@
+"""
+Bulk provisioning of the bdevs and nvmf subsystems of a SPDK app.
+"""
+
+import copy
+
+import six
+from oslo_log import log as logging
+
+from cyborg.accelerator.common import exception
+from cyborg.common.i18n import _
+
+LOG = logging.getLogger(__name__)
+
+BDEV_TYPES = ('aio', 'error', 'malloc', 'null', 'nvme')
+
+CREATED = 'created'
+FAILED = 'failed'
+ROLLED_BACK = 'rolled_back'
+
+
+def _bdev_call(bdev):
+    """Return the (method, params) constructing a bdev.
+
+    :param bdev: dict of the bdev type and of its construct_<type>_bdev
+                 params. total_size, in MB, may be given in place of
+                 num_blocks, like with rpc.py.
+    """
+    params = copy.deepcopy(bdev)
+    bdev_type = params.pop('type', None)
+    if bdev_type not in BDEV_TYPES:
+        raise exception.InvalidParameterValue(
+            err=_("Unsupported bdev type %(type)s, expected one of "
+                  "%(types)s") % {'type': bdev_type,
+                                  'types': ', '.join(BDEV_TYPES)})
+    total_size = params.pop('total_size', None)
+    if total_size is not None:
+        block_size = params.get('block_size')
+        try:
+            num_blocks = int(total_size) * 1024 * 1024 // int(block_size)
+        except (TypeError, ValueError, ZeroDivisionError):
+            num_blocks = None
+        if not num_blocks or num_blocks < 0:
+            raise exception.InvalidParameterValue(
+                err=_("Invalid total_size %(total_size)s MB of the bdev "
+                      "%(name)s, it requires a positive block_size, got "
+                      "%(block_size)s") % {'total_size': total_size,
+                                           'name': params.get('name'),
+                                           'block_size': block_size})
+        params['num_blocks'] = num_blocks
+    return 'construct_%s_bdev' % bdev_type, params
+
+
+def _subsystem_call(subsystem):
+    """Return the (method, params) constructing a nvmf subsystem.
+
+    :param subsystem: dict of the construct_nvmf_subsystem params. The
+                      namespaces may be given as bdev names.
+    """
+    if not subsystem.get('nqn'):
+        raise exception.MissingParameterValue(
+            err=_("Missing the nqn of a nvmf subsystem"))
+    params = copy.deepcopy(subsystem)
+    params['namespaces'] = [
+        {'bdev_name': ns} if isinstance(ns, six.string_types) else ns
+        for ns in params.get('namespaces', [])]
+    return 'construct_nvmf_subsystem', params
+
+
+def _bdev_names(bdev, result):
+    """Return the names of the bdevs created by a construct call."""
+    if isinstance(result, six.string_types):
+        return [result]
+    if isinstance(result, list):
+        return result
+    if bdev.get('type') == 'error':
+        return ['EE_%s' % bdev['base_name']]
+    return [bdev['name']] if bdev.get('name') else []
+
+
+def _rollback_calls(item):
+    if item['type'] == 'subsystem':
+        return [('delete_nvmf_subsystem', {'nqn': item['name']})]
+    return [('delete_bdev', {'name': name})
+            for name in _bdev_names(item['spec'], item['result'])]
+
+
+def provision(client, bdevs=None, subsystems=None, batch=False,
+              rollback=True):
+    """Create bdevs, then nvmf subsystems, with a single round trip.
+
+    All the requests are sent at once, pipelined or as a JSON-RPC batch,
+    and the app runs them in order. When some of them fail and rollback is
+    set, the objects created by the others are deleted, again at once.
+
+    :param client: JSONRPCClient of the app.
+    :param bdevs: list of the bdevs to create, see _bdev_call.
+    :param subsystems: list of the nvmf subsystems to create, see
+                       _subsystem_call.
+    :param batch: send a JSON-RPC batch request rather than pipelining the
+                  requests, for the apps supporting batches.
+    :param rollback: delete the created objects if any creation failed.
+    :return: the list of the items, in the order of the requests. An item
+             is a dict of its type, bdev or subsystem, its spec, name and
+             status, created, failed or rolled_back, with the result or the
+             error of its creation.
+    :raise: InvalidParameterValue before sending anything if a spec is
+            invalid, SPDKConnectionError if the app could not be reached.
+    """
+    items = []
+    calls = []
+    for bdev in bdevs or []:
+        calls.append(_bdev_call(bdev))
+        items.append({'type': 'bdev', 'spec': bdev, 'name': bdev.get('name')})
+    for subsystem in subsystems or []:
+        calls.append(_subsystem_call(subsystem))
+        items.append({'type': 'subsystem', 'spec': subsystem,
+                      'name': subsystem['nqn']})
+    if not calls:
+        return items
+
+    send = client.batch if batch else client.pipeline
+    results = send(calls, raise_on_error=False)
+    for item, result in zip(items, results):
+        if isinstance(result, exception.SPDKRPCError):
+            item.update(status=FAILED, result=None,
+                        error=six.text_type(result))
+        else:
+            item.update(status=CREATED, result=result, error=None)
+            if item['type'] == 'bdev' and item['name'] is None:
+                names = _bdev_names(item['spec'], result)
+                item['name'] = names[0] if len(names) == 1 else names
+    failed = [item for item in items if item['status'] == FAILED]
+    if failed:
+        LOG.warning("Failed to provision %(failed)d of %(total)d SPDK "
+                    "objects: %(errors)s",
+                    {'failed': len(failed), 'total': len(items),
+                     'errors': '; '.join(item['error'] for item in failed)})
+        if rollback:
+            _rollback(send, [item for item in items
+                             if item['status'] == CREATED])
+    return items
+
+
+def _rollback(send, created):
+    if not created:
+        return
+    # NOTE: delete in reverse order, the subsystems before their bdevs.
+    created = list(reversed(created))
+    calls = [_rollback_calls(item) for item in created]
+    results = iter(send([call for item_calls in calls
+                         for call in item_calls], raise_on_error=False))
+    for item, item_calls in zip(created, calls):
+        errors = [six.text_type(result)
+                  for result in [next(results) for _call in item_calls]
+                  if isinstance(result, exception.SPDKRPCError)]
+        if errors:
+            LOG.error("Failed to roll back the SPDK %(type)s %(name)s: "
+                      "%(errors)s", {'type': item['type'],
+                                     'name': item['name'],
+                                     'errors': '; '.join(errors)})
+            item['error'] = '; '.join(errors)
+        else:
+            item['status'] = ROLLED_BACK
@@ -0,0 +1,226 @@
+import json
+import re
+import select
+import socket
+import threading
+
+from oslo_log import log as logging
+
+from cyborg.accelerator.common import exception
+
+LOG = logging.getLogger(__name__)
+
+RECV_SIZE = 64 * 1024
+
+# The strings, which may contain brackets, and the brackets of the JSON
+# values sent by the app. A lone quote starts a string not received
+# completely yet.
+_TOKENS = re.compile(br'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]]|"', re.DOTALL)
+
+
+class JSONRPCClient(object):
+    """JSON-RPC 2.0 client of a SPDK app.
+
+    The connection to the app is opened on the first call and kept open,
+    then reopened when the app closed it, e.g. after a restart.
+
+    :param address: path of the Unix socket of the app, or its IP address.
+    :param port: TCP port of the app, None for a Unix socket.
+    :param timeout: seconds to wait for the app to answer.
+    """
+
+    def __init__(self, address, port=None, timeout=60.0):
+        self.address = address
+        self.port = port
+        self.timeout = timeout
+        self._sock = None
+        self._reset_buffer()
+        self._request_id = 0
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        if self.port is None:
+            return self.address
+        return '%s:%s' % (self.address, self.port)
+
+    def _connection_error(self, err):
+        self.close()
+        return exception.SPDKConnectionError(address=str(self), err=err)
+
+    def connect(self):
+        try:
+            if self.port is None:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.settimeout(self.timeout)
+                sock.connect(self.address)
+            else:
+                sock = socket.create_connection((self.address, self.port),
+                                                self.timeout)
+        except socket.error as e:
+            raise self._connection_error(e)
+        self._sock = sock
+        self._reset_buffer()
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        self._reset_buffer()
+
+    def _reset_buffer(self):
+        self._buf = bytearray()
+        # How far the buffer was scanned, and the depth of the brackets
+        # there, so that the data received is only scanned once.
+        self._scanned = 0
+        self._depth = 0
+
+    def _connection_lost(self):
+        # NOTE: all the responses are read by each call, so a connection
+        # readable between two calls was closed by the app.
+        try:
+            readable = select.select([self._sock], [], [], 0)[0]
+            return bool(readable) and not self._sock.recv(1, socket.MSG_PEEK)
+        except (socket.error, ValueError):
+            return True
+
+    def _send(self, data):
+        if self._sock is not None and self._connection_lost():
+            LOG.info("Reconnecting to the SPDK server at %s.", self)
+            self.close()
+        if self._sock is None:
+            self.connect()
+        try:
+            self._sock.sendall(data)
+        except socket.error as e:
+            raise self._connection_error(e)
+
+    def _value_end(self):
+        """Return the end of the first JSON value of the buffer, or None."""
+        for match in _TOKENS.finditer(self._buf, self._scanned):
+            token = match.group()
+            if token == b'"':
+                # Scan the string again once the rest of it is received.
+                self._scanned = match.start()
+                return None
+            if token in (b'{', b'['):
+                self._depth += 1
+            elif token in (b'}', b']'):
+                self._depth -= 1
+                if self._depth <= 0:
+                    return match.end()
+        self._scanned = len(self._buf)
+        return None
+
+    def _receive(self):
+        """Read the next JSON value sent by the app."""
+        while True:
+            end = self._value_end()
+            if end is not None:
+                data = bytes(self._buf[:end])
+                del self._buf[:end]
+                self._scanned = self._depth = 0
+                try:
+                    return json.loads(data.decode('utf-8'))
+                except ValueError as e:
+                    raise self._connection_error(e)
+            try:
+                data = self._sock.recv(RECV_SIZE)
+            except socket.error as e:
+                raise self._connection_error(e)
+            if not data:
+                raise self._connection_error('connection closed')
+            self._buf += data
+
+    def _request(self, method, params=None):
+        self._request_id += 1
+        request = {'jsonrpc': '2.0', 'method': method,
+                   'id': self._request_id}
+        if params is not None:
+            request['params'] = params
+        return request
+
+    @staticmethod
+    def _result(request, response):
+        error = response.get('error')
+        if error is not None:
+            raise exception.SPDKRPCError(method=request['method'],
+                                         rpc_code=error.get('code'),
+                                         error=error.get('message'))
+        return response.get('result')
+
+    def _results(self, requests, responses, raise_on_error):
+        results = []
+        for request, response in zip(requests, responses):
+            try:
+                results.append(self._result(request, response))
+            except exception.SPDKRPCError as e:
+                if raise_on_error:
+                    raise
+                results.append(e)
+        return results
+
+    def _responses(self, requests, responses):
+        by_id = {}
+        for response in responses:
+            if not isinstance(response, dict):
+                raise self._connection_error(
+                    'unexpected response %r' % (response,))
+            if response.get('id') is None:
+                # An error about the whole request, e.g. a parse error.
+                self.close()
+                self._result({'method': requests[0]['method']}, response)
+            by_id[response['id']] = response
+        try:
+            return [by_id[request['id']] for request in requests]
+        except KeyError as e:
+            raise self._connection_error('missing response %s' % e)
+
+    def call(self, method, params=None):
+        """Call a method and return its result.
+
+        :raises: SPDKRPCError if the app returned an error,
+                 SPDKConnectionError if it could not be reached.
+        """
+        return self.pipeline([(method, params)])[0]
+
+    def pipeline(self, calls, raise_on_error=True):
+        """Send several calls at once, then read all their responses.
+
+        The app runs the calls of a connection in order, so a call may
+        depend on the previous ones, e.g. use a bdev they created.
+
+        :param calls: a list of (method, params) tuples.
+        :param raise_on_error: when False, the SPDKRPCError of a failed call
+                               is returned in place of its result.
+        :returns: the list of the results, in the order of the calls.
+        :raises: SPDKRPCError for the first call which failed.
+        """
+        with self._lock:
+            requests = [self._request(method, params)
+                        for method, params in calls]
+            self._send(b''.join(json.dumps(request).encode('utf-8')
+                                for request in requests))
+            responses = [self._receive() for _request in requests]
+            responses = self._responses(requests, responses)
+        return self._results(requests, responses, raise_on_error)
+
+    def batch(self, calls, raise_on_error=True):
+        """Send several calls as a single JSON-RPC batch request.
+
+        Only for apps supporting batches, see pipeline otherwise.
+
+        :param calls: a list of (method, params) tuples.
+        :param raise_on_error: when False, the SPDKRPCError of a failed call
+                               is returned in place of its result.
+        :returns: the list of the results, in the order of the calls.
+        :raises: SPDKRPCError for the first call which failed.
+        """
+        with self._lock:
+            requests = [self._request(method, params)
+                        for method, params in calls]
+            self._send(json.dumps(requests).encode('utf-8'))
+            responses = self._receive()
+            if isinstance(responses, dict):
+                responses = [responses]
+            responses = self._responses(requests, responses)
+        return self._results(requests, responses, raise_on_error)
@@ -1,10 +1,13 @@
-import json
-
 from oslo_log import log as logging
 
 LOG = logging.getLogger(__name__)
 
 
+def _num_blocks(total_size, block_size):
+    # NOTE: sizes are given in MB, like with rpc.py.
+    return int(total_size) * 1024 * 1024 // int(block_size)
+
+
 class NvmfTgt(object):
 
     def __init__(self, py):
@@ -12,39 +15,33 @@ class NvmfTgt(object):
         self.py = py
 
     def get_rpc_methods(self):
-        rpc_methods = self._get_json_objs(
-            'get_rpc_methods', '10.0.2.15')
+        rpc_methods = self._get_json_objs('get_rpc_methods')
         return rpc_methods
 
     def get_bdevs(self):
-        block_devices = self._get_json_objs(
-            'get_bdevs', '10.0.2.15')
+        block_devices = self._get_json_objs('get_bdevs')
         return block_devices
 
     def delete_bdev(self, name):
-        sub_args = [name]
-        res = self.py.exec_rpc('delete_bdev', '10.0.2.15', sub_args=sub_args)
+        params = {'name': name}
+        res = self.py.exec_rpc('delete_bdev', params)
         LOG.info(res)
 
     def kill_instance(self, sig_name):
-        sub_args = [sig_name]
-        res = self.py.exec_rpc('kill_instance', '10.0.2.15', sub_args=sub_args)
+        params = {'sig_name': sig_name}
+        res = self.py.exec_rpc('kill_instance', params)
         LOG.info(res)
 
     def construct_aio_bdev(self, filename, name, block_size):
-        sub_args = [filename, name, str(block_size)]
-        res = self.py.exec_rpc(
-            'construct_aio_bdev',
-            '10.0.2.15',
-            sub_args=sub_args)
+        params = {'filename': filename,
+                  'name': name,
+                  'block_size': block_size}
+        res = self.py.exec_rpc('construct_aio_bdev', params)
         LOG.info(res)
 
     def construct_error_bdev(self, basename):
-        sub_args = [basename]
-        res = self.py.exec_rpc(
-            'construct_error_bdev',
-            '10.0.2.15',
-            sub_args=sub_args)
+        params = {'base_name': basename}
+        res = self.py.exec_rpc('construct_error_bdev', params)
         LOG.info(res)
 
     def construct_nvme_bdev(
@@ -55,47 +52,34 @@ class NvmfTgt(object):
             adrfam=None,
             trsvcid=None,
             subnqn=None):
-        sub_args = ["-b", "-t", "-a"]
-        sub_args.insert(1, name)
-        sub_args.insert(2, trtype)
-        sub_args.insert(3, traddr)
+        params = {'name': name,
+                  'trtype': trtype,
+                  'traddr': traddr}
         if adrfam is not None:
-            sub_args.append("-f")
-            sub_args.append(adrfam)
+            params['adrfam'] = adrfam
         if trsvcid is not None:
-            sub_args.append("-s")
-            sub_args.append(trsvcid)
+            params['trsvcid'] = trsvcid
         if subnqn is not None:
-            sub_args.append("-n")
-            sub_args.append(subnqn)
-        res = self.py.exec_rpc(
-            'construct_nvme_bdev',
-            '10.0.2.15',
-            sub_args=sub_args)
+            params['subnqn'] = subnqn
+        res = self.py.exec_rpc('construct_nvme_bdev', params)
         return res
 
     def construct_null_bdev(self, name, total_size, block_size):
-        sub_args = [name, str(total_size), str(block_size)]
-        res = self.py.exec_rpc(
-            'construct_null_bdev',
-            '10.0.2.15',
-            sub_args=sub_args)
+        params = {'name': name,
+                  'num_blocks': _num_blocks(total_size, block_size),
+                  'block_size': block_size}
+        res = self.py.exec_rpc('construct_null_bdev', params)
         return res
 
     def construct_malloc_bdev(self, total_size, block_size):
-        sub_args = [str(total_size), str(block_size)]
-        res = self.py.exec_rpc(
-            'construct_malloc_bdev',
-            '10.0.2.15',
-            sub_args=sub_args)
+        params = {'num_blocks': _num_blocks(total_size, block_size),
+                  'block_size': block_size}
+        res = self.py.exec_rpc('construct_malloc_bdev', params)
         LOG.info(res)
 
     def delete_nvmf_subsystem(self, nqn):
-        sub_args = [nqn]
-        res = self.py.exec_rpc(
-            'delete_nvmf_subsystem',
-            '10.0.2.15',
-            sub_args=sub_args)
+        params = {'nqn': nqn}
+        res = self.py.exec_rpc('delete_nvmf_subsystem', params)
         LOG.info(res)
 
     def construct_nvmf_subsystem(
@@ -105,19 +89,21 @@ class NvmfTgt(object):
             hosts,
             serial_number,
             namespaces):
-        sub_args = [nqn, listen, hosts, serial_number, namespaces]
-        res = self.py.exec_rpc(
-            'construct_nvmf_subsystem',
-            '10.0.2.15',
-            sub_args=sub_args)
+        params = {
+            'nqn': nqn,
+            'listen_addresses': [
+                dict(item.split(':', 1) for item in address.split())
+                for address in listen.split(',') if address.strip()],
+            'hosts': hosts.split(),
+            'serial_number': serial_number,
+            'namespaces': [{'bdev_name': bdev_name}
+                           for bdev_name in namespaces.split()]}
+        res = self.py.exec_rpc('construct_nvmf_subsystem', params)
         LOG.info(res)
 
     def get_nvmf_subsystems(self):
-        subsystems = self._get_json_objs(
-            'get_nvmf_subsystems', '10.0.2.15')
+        subsystems = self._get_json_objs('get_nvmf_subsystems')
         return subsystems
 
-    def _get_json_objs(self, method, server_ip):
-        res = self.py.exec_rpc(method, server_ip)
-        json_obj = json.loads(res)
-        return json_obj
+    def _get_json_objs(self, method):
+        return self.py.exec_rpc(method)
@@ -0,0 +1,117 @@
+import os
+import re
+
+import psutil
+from oslo_log import log as logging
+
+LOG = logging.getLogger(__name__)
+
+PROC = '/proc'
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except (IOError, OSError):
+        return None
+
+
+def _start_time(pid):
+    """Return the start time of a process, None if it does not exist.
+
+    The start time, in clock ticks since boot, is the 22nd field of
+    /proc/<pid>/stat. The fields are counted after the command name, which
+    may contain spaces and parentheses.
+    """
+    stat = _read(os.path.join(PROC, str(pid), 'stat'))
+    if not stat:
+        return None
+    try:
+        return int(stat[stat.rindex(')') + 2:].split()[19])
+    except (ValueError, IndexError):
+        return None
+
+
+def _cmdline(pid):
+    cmdline = _read(os.path.join(PROC, str(pid), 'cmdline'))
+    if cmdline is None:
+        return None
+    return [arg for arg in cmdline.split('\0') if arg]
+
+
+class ProcessTracker(object):
+    """Find the process of a server and check that it is still running.
+
+    The PID and the start time of the process found are remembered, so that
+    checking it is still running only reads /proc/<pid>/stat. A PID reused
+    by another process is detected by its different start time. All the
+    processes are only scanned when the remembered one is gone.
+
+    :param pattern: regex searched in the command line of the processes.
+    :param pidfile: optional file holding the PID of the server, looked at
+                    before scanning the processes.
+    """
+
+    def __init__(self, pattern, pidfile=None):
+        self.pattern = re.compile(pattern)
+        self.pidfile = pidfile
+        self.pid = None
+        self._start_time = None
+
+    def _matches(self, cmdline):
+        return bool(self.pattern.search(str(cmdline)))
+
+    def remember(self, pid):
+        """Track the process with this PID, return False if it is gone."""
+        start_time = _start_time(pid)
+        if start_time is None:
+            return False
+        self.pid = pid
+        self._start_time = start_time
+        return True
+
+    def forget(self):
+        self.pid = None
+        self._start_time = None
+
+    def is_running(self):
+        """Check the remembered process, without scanning the processes."""
+        return (self.pid is not None and
+                _start_time(self.pid) == self._start_time)
+
+    def _pid_from_pidfile(self):
+        if not self.pidfile:
+            return None
+        content = _read(self.pidfile)
+        try:
+            pid = int(content.strip())
+        except (AttributeError, ValueError):
+            return None
+        cmdline = _cmdline(pid)
+        if cmdline is None or not self._matches(cmdline):
+            LOG.info("Ignoring stale pidfile %s.", self.pidfile)
+            return None
+        return pid
+
+    def _scan(self):
+        for proc in psutil.process_iter():
+            try:
+                pinfo = proc.as_dict(attrs=['pid', 'cmdline'])
+            except psutil.NoSuchProcess:
+                continue
+            if self._matches(pinfo.get('cmdline')):
+                return pinfo.get('pid')
+        return None
+
+    def get_pid(self):
+        """Return the PID of the server, None if it is not running."""
+        if self.is_running():
+            return self.pid
+        self.forget()
+        for find_pid in (self._pid_from_pidfile, self._scan):
+            pid = find_pid()
+            if pid is not None and self.remember(pid):
+                return pid
+        LOG.info("NoSuchProcess:%s", self.pattern.pattern)
+        return None
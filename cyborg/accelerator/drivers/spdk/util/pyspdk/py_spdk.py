@@ -1,19 +1,26 @@
-import psutil
-import re
 import os
 import subprocess
 
 from oslo_log import log as logging
 
+from cyborg.accelerator.drivers.spdk.util.pyspdk import jsonrpc_client
+from cyborg.accelerator.drivers.spdk.util.pyspdk import process_tracker
+
 LOG = logging.getLogger(__name__)
 
+DEFAULT_RPC_ADDRESS = '/var/tmp/spdk.sock'
+
 
 class PySPDK(object):
 
-    def __init__(self, pname):
+    def __init__(self, pname, rpc_address=DEFAULT_RPC_ADDRESS, rpc_port=None,
+                 rpc_timeout=60.0, pidfile=None):
         super(PySPDK, self).__init__()
         self.pid = None
         self.pname = pname
+        self.process = process_tracker.ProcessTracker(pname, pidfile)
+        self.rpc_client = jsonrpc_client.JSONRPCClient(
+            rpc_address, rpc_port, rpc_timeout)
 
     def start_server(self, spdk_dir, server_name):
         if not self.is_alive():
@@ -49,38 +56,12 @@ class PySPDK(object):
                     return dirpath
 
     def _get_process_id(self):
-        for proc in psutil.process_iter():
-            try:
-                pinfo = proc.as_dict(attrs=['pid', 'cmdline'])
-                if re.search(self.pname, str(pinfo.get('cmdline'))):
-                    self.pid = pinfo.get('pid')
-                    return self.pid
-            except psutil.NoSuchProcess:
-                LOG.info("NoSuchProcess:%s" % self.pname)
-        LOG.info("NoSuchProcess:%s" % self.pname)
+        self.pid = self.process.get_pid()
         return self.pid
 
     def is_alive(self):
-        self.pid = self._get_process_id()
-        if self.pid:
-            p = psutil.Process(self.pid)
-            if p.is_running():
-                return True
-        return False
+        return self._get_process_id() is not None
 
-    @staticmethod
-    def exec_rpc(method, server='127.0.0.1', port=5260, sub_args=None):
-        exec_cmd = ["./rpc.py", "-s", "-p"]
-        exec_cmd.insert(2, server)
-        exec_cmd.insert(4, str(port))
-        exec_cmd.insert(5, method)
-        if sub_args is None:
-            sub_args = []
-        exec_cmd.extend(sub_args)
-        p = subprocess.Popen(
-            exec_cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-        out, err = p.communicate()
-        return out
+    def exec_rpc(self, method, params=None):
+        """Call a JSON-RPC method of the server and return its result."""
+        return self.rpc_client.call(method, params)
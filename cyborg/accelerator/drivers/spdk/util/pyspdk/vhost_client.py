@@ -1,10 +1,13 @@
-import json
-
 from oslo_log import log as logging
 
 LOG = logging.getLogger(__name__)
 
 
+def _num_blocks(total_size, block_size):
+    # NOTE: sizes are given in MB, like with rpc.py.
+    return int(total_size) * 1024 * 1024 // int(block_size)
+
+
 class VhostTgt(object):
 
     def __init__(self, py):
@@ -12,68 +15,55 @@ class VhostTgt(object):
         self.py = py
 
     def get_rpc_methods(self):
-        rpc_methods = self._get_json_objs('get_rpc_methods', '127.0.0.1')
+        rpc_methods = self._get_json_objs('get_rpc_methods')
         return rpc_methods
 
     def get_scsi_devices(self):
-        scsi_devices = self._get_json_objs(
-            'get_scsi_devices', '127.0.0.1')
+        scsi_devices = self._get_json_objs('get_scsi_devices')
         return scsi_devices
 
     def get_luns(self):
-        luns = self._get_json_objs('get_luns', '127.0.0.1')
+        luns = self._get_json_objs('get_luns')
         return luns
 
     def get_interfaces(self):
-        interfaces = self._get_json_objs(
-            'get_interfaces', '127.0.0.1')
+        interfaces = self._get_json_objs('get_interfaces')
         return interfaces
 
     def add_ip_address(self, ifc_index, ip_addr):
-        sub_args = [ifc_index, ip_addr]
-        res = self.py.exec_rpc(
-            'add_ip_address',
-            '127.0.0.1',
-            sub_args=sub_args)
+        params = {'ifc_index': int(ifc_index), 'ip_address': ip_addr}
+        res = self.py.exec_rpc('add_ip_address', params)
         return res
 
     def delete_ip_address(self, ifc_index, ip_addr):
-        sub_args = [ifc_index, ip_addr]
-        res = self.py.exec_rpc(
-            'delete_ip_address',
-            '127.0.0.1',
-            sub_args=sub_args)
+        params = {'ifc_index': int(ifc_index), 'ip_address': ip_addr}
+        res = self.py.exec_rpc('delete_ip_address', params)
         return res
 
     def get_bdevs(self):
-        block_devices = self._get_json_objs(
-            'get_bdevs', '127.0.0.1')
+        block_devices = self._get_json_objs('get_bdevs')
         return block_devices
 
     def delete_bdev(self, name):
-        sub_args = [name]
-        res = self.py.exec_rpc('delete_bdev', '127.0.0.1', sub_args=sub_args)
+        params = {'name': name}
+        res = self.py.exec_rpc('delete_bdev', params)
         LOG.info(res)
 
     def kill_instance(self, sig_name):
-        sub_args = [sig_name]
-        res = self.py.exec_rpc('kill_instance', '127.0.0.1', sub_args=sub_args)
+        params = {'sig_name': sig_name}
+        res = self.py.exec_rpc('kill_instance', params)
         LOG.info(res)
 
     def construct_aio_bdev(self, filename, name, block_size):
-        sub_args = [filename, name, str(block_size)]
-        res = self.py.exec_rpc(
-            'construct_aio_bdev',
-            '127.0.0.1',
-            sub_args=sub_args)
+        params = {'filename': filename,
+                  'name': name,
+                  'block_size': block_size}
+        res = self.py.exec_rpc('construct_aio_bdev', params)
         LOG.info(res)
 
     def construct_error_bdev(self, basename):
-        sub_args = [basename]
-        res = self.py.exec_rpc(
-            'construct_error_bdev',
-            '127.0.0.1',
-            sub_args=sub_args)
+        params = {'base_name': basename}
+        res = self.py.exec_rpc('construct_error_bdev', params)
         LOG.info(res)
 
     def construct_nvme_bdev(
@@ -84,42 +74,30 @@ class VhostTgt(object):
             adrfam=None,
             trsvcid=None,
             subnqn=None):
-        sub_args = ["-b", "-t", "-a"]
-        sub_args.insert(1, name)
-        sub_args.insert(2, trtype)
-        sub_args.insert(3, traddr)
+        params = {'name': name,
+                  'trtype': trtype,
+                  'traddr': traddr}
         if adrfam is not None:
-            sub_args.append("-f")
-            sub_args.append(adrfam)
+            params['adrfam'] = adrfam
         if trsvcid is not None:
-            sub_args.append("-s")
-            sub_args.append(trsvcid)
+            params['trsvcid'] = trsvcid
         if subnqn is not None:
-            sub_args.append("-n")
-            sub_args.append(subnqn)
-        res = self.py.exec_rpc(
-            'construct_nvme_bdev',
-            '127.0.0.1',
-            sub_args=sub_args)
+            params['subnqn'] = subnqn
+        res = self.py.exec_rpc('construct_nvme_bdev', params)
         return res
 
     def construct_null_bdev(self, name, total_size, block_size):
-        sub_args = [name, str(total_size), str(block_size)]
-        res = self.py.exec_rpc(
-            'construct_null_bdev',
-            '127.0.0.1',
-            sub_args=sub_args)
+        params = {'name': name,
+                  'num_blocks': _num_blocks(total_size, block_size),
+                  'block_size': block_size}
+        res = self.py.exec_rpc('construct_null_bdev', params)
         return res
 
     def construct_malloc_bdev(self, total_size, block_size):
-        sub_args = [str(total_size), str(block_size)]
-        res = self.py.exec_rpc(
-            'construct_malloc_bdev',
-            '10.0.2.15',
-            sub_args=sub_args)
+        params = {'num_blocks': _num_blocks(total_size, block_size),
+                  'block_size': block_size}
+        res = self.py.exec_rpc('construct_malloc_bdev', params)
         LOG.info(res)
 
-    def _get_json_objs(self, method, server_ip):
-        res = self.py.exec_rpc(method, server_ip)
-        json_obj = json.loads(res)
-        return json_obj
+    def _get_json_objs(self, method):
+        return self.py.exec_rpc(method)
@@ -5,8 +5,8 @@ SPDK VHOSTDRIVER module implementation.
 from cyborg.accelerator.drivers.spdk.util.pyspdk.vhost_client import VhostTgt
 from oslo_log import log as logging
 from cyborg.accelerator.drivers.spdk.util import common_fun
+from cyborg.accelerator.drivers.spdk.util import provisioning
 from cyborg.accelerator.drivers.spdk.spdk import SPDKDRIVER
-from cyborg.accelerator.drivers.spdk.util.pyspdk.py_spdk import PySPDK
 
 LOG = logging.getLogger(__name__)
 
@@ -60,7 +60,7 @@ class VHOSTDRIVER(SPDKDRIVER):
         accelerators = []
         for accelerator_i in range(len(self.servers)):
             accelerator = self.servers[accelerator_i]
-            py_tmp = PySPDK(accelerator)
+            py_tmp = common_fun.get_py_client(accelerator)
             if py_tmp.is_alive():
                 accelerators.append(self.get_one_accelerator())
         return accelerators
@@ -93,3 +93,15 @@ class VHOSTDRIVER(SPDKDRIVER):
         """
         acc_client = VhostTgt(self.py)
         return acc_client.delete_ip_address(ifc_index, ip_addr)
+
+    def provision(self, bdevs, batch=False, rollback=True):
+        """Create bdevs in bulk
+
+        :param bdevs: list of bdev dicts, e.g. {'type': 'malloc',
+        'name': 'Malloc0', 'total_size': 64, 'block_size': 512}.
+        :param batch: send a JSON-RPC batch request.
+        :param rollback: delete what was created if anything failed.
+        :return: the per-item results, see provisioning.provision.
+        """
+        return provisioning.provision(self.py.rpc_client, bdevs,
+                                      batch=batch, rollback=rollback)
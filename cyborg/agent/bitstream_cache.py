@@ -0,0 +1,171 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""A local cache of the bitstreams downloaded from Glance.
+
+The bitstreams are stored in the [agent]bitstream_cache_dir directory, in
+files named after the image UUID and checksum, so that a new image data is
+never mistaken for an old one. The least recently used bitstreams are
+evicted once the cache grows beyond [agent]bitstream_cache_size, the last
+use of a bitstream being the modification time of its file.
+"""
+
+import collections
+import contextlib
+import hashlib
+import os
+import tempfile
+
+from eventlet import tpool
+from oslo_concurrency import lockutils
+from oslo_log import log as logging
+from oslo_utils import fileutils
+from oslo_utils import units
+
+from cyborg.common import exception
+from cyborg.conf import CONF
+
+
+LOG = logging.getLogger(__name__)
+
+_SUFFIX = '.bin'
+_PART_SUFFIX = '.part'
+_CHUNK_SIZE = units.Mi
+
+
+def _md5sum(path):
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+class BitstreamCache(object):
+    """The bitstreams of the images, downloaded once per agent.
+
+    :param image_api: The cyborg.image.api.API downloading the images.
+    :param path: The directory of the cache, [agent]bitstream_cache_dir by
+                 default.
+    :param max_size: The maximum size of the cache in bytes,
+                     [agent]bitstream_cache_size MiB by default.
+    """
+
+    def __init__(self, image_api, path=None, max_size=None):
+        self.image_api = image_api
+        self.path = path or CONF.agent.bitstream_cache_dir
+        if max_size is None:
+            max_size = CONF.agent.bitstream_cache_size * units.Mi
+        self.max_size = max_size
+        # NOTE: the number of users of each bitstream, which is not evicted
+        # while it is programmed.
+        self._in_use = collections.Counter()
+        self._initialized = False
+
+    def _init_cache(self):
+        # NOTE: the partial downloads left when the agent died are removed.
+        fileutils.ensure_tree(self.path)
+        for name in os.listdir(self.path):
+            if name.endswith(_PART_SUFFIX):
+                fileutils.delete_if_exists(os.path.join(self.path, name))
+        self._initialized = True
+
+    def _entry(self, image_uuid, checksum):
+        return os.path.join(self.path, '%s-%s%s' % (
+            image_uuid, checksum or 'none', _SUFFIX))
+
+    @contextlib.contextmanager
+    def get(self, context, image_uuid):
+        """Return the path of the bitstream of an image, downloading it once.
+
+        Concurrent calls for the same image wait for a single download.
+        The bitstream is not evicted until the context exits.
+
+        :param context: The security context.
+        :param image_uuid: The UUID of the Glance image of the bitstream.
+        """
+        if not self._initialized:
+            self._init_cache()
+        image = self.image_api.get(context, image_uuid)
+        entry = self._entry(image_uuid, image.get('checksum'))
+        self._in_use[entry] += 1
+        try:
+            with lockutils.lock('bitstream-%s' % os.path.basename(entry)):
+                if os.path.exists(entry):
+                    LOG.debug("Using the cached bitstream of the image %s.",
+                              image_uuid)
+                    os.utime(entry, None)
+                else:
+                    self._download(context, image_uuid, entry)
+            yield entry
+        finally:
+            self._in_use[entry] -= 1
+            if not self._in_use[entry]:
+                del self._in_use[entry]
+            self._evict()
+
+    def _download(self, context, image_uuid, entry):
+        fd, part = tempfile.mkstemp(prefix=os.path.basename(entry),
+                                    suffix=_PART_SUFFIX, dir=self.path)
+        os.close(fd)
+        try:
+            LOG.info("Downloading the bitstream of the image %s.", image_uuid)
+            self.image_api.download(context, image_uuid, dest_path=part)
+            # NOTE: the bitstream only appears once complete, even if the
+            # agent dies while downloading it.
+            os.rename(part, entry)
+        finally:
+            fileutils.delete_if_exists(part)
+
+    def verify(self, entry):
+        """Check the bitstream of an entry against the checksum of its image.
+
+        The bitstream is checked before each use, so that a file corrupted
+        while in the cache is never programmed. A corrupted bitstream is
+        removed from the cache.
+
+        :param entry: The path of the bitstream returned by get().
+        :raises: ImageChecksumMismatch
+        """
+        name = os.path.basename(entry)[:-len(_SUFFIX)]
+        image_uuid, checksum = name.rsplit('-', 1)
+        if checksum == 'none':
+            return
+        if tpool.execute(_md5sum, entry) != checksum:
+            LOG.error("Removing the corrupted bitstream %s from the cache.",
+                      entry)
+            fileutils.delete_if_exists(entry)
+            raise exception.ImageChecksumMismatch(algorithm='md5',
+                                                  image_id=image_uuid)
+
+    @lockutils.synchronized('bitstream-cache-evict')
+    def _evict(self):
+        entries = []
+        size = 0
+        for name in os.listdir(self.path):
+            if not name.endswith(_SUFFIX):
+                continue
+            entry = os.path.join(self.path, name)
+            try:
+                stat = os.stat(entry)
+            except OSError:
+                continue
+            size += stat.st_size
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        for _mtime, entry_size, entry in sorted(entries):
+            if size <= self.max_size:
+                break
+            if entry in self._in_use:
+                continue
+            LOG.info("Evicting the bitstream %s from the cache.", entry)
+            fileutils.delete_if_exists(entry)
+            size -= entry_size
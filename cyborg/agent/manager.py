@@ -13,21 +13,31 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import time
+
+from oslo_log import log as logging
 import oslo_messaging as messaging
 from oslo_service import periodic_task
 
 from cyborg.accelerator.drivers.fpga.base import FPGADriver
+from cyborg.agent.bitstream_cache import BitstreamCache
+from cyborg.agent.program_jobs import ProgramJobRunner
 from cyborg.agent.resource_tracker import ResourceTracker
+from cyborg.agent import uevent
 from cyborg.agent.rpcapi import AgentAPI
 from cyborg.image.api import API as ImageAPI
 from cyborg.conductor import rpcapi as cond_api
 from cyborg.conf import CONF
+from cyborg.services.client import metrics
+
+
+LOG = logging.getLogger(__name__)
 
 
 class AgentManager(periodic_task.PeriodicTasks):
     """Cyborg Agent manager main class."""
 
-    RPC_API_VERSION = '1.0'
+    RPC_API_VERSION = '1.2'
     target = messaging.Target(version=RPC_API_VERSION)
 
     def __init__(self, topic, host=None):
@@ -38,7 +48,48 @@ class AgentManager(periodic_task.PeriodicTasks):
         self.cond_api = cond_api.ConductorAPI()
         self.agent_api = AgentAPI()
         self.image_api = ImageAPI()
+        self.bitstream_cache = BitstreamCache(self.image_api)
+        self.program_jobs = ProgramJobRunner(self.cond_api, self.fpga_driver,
+                                             self.bitstream_cache)
         self._rt = ResourceTracker(host, self.cond_api)
+        self._uevent_listener = None
+        self._last_full_scan = None
+
+    def init_host(self, context):
+        """Fail the program jobs lost by the previous agent, and start
+        listening to device uevents if enabled.
+        """
+        try:
+            self.cond_api.program_jobs_abort(
+                context, self.host, running=self.program_jobs.running())
+        except messaging.MessagingException as e:
+            LOG.warning("Unable to fail the program jobs interrupted by the "
+                        "restart of the agent: %s", e)
+        if not CONF.agent.event_driven_discovery:
+            return
+        try:
+            source = uevent.NetlinkEventSource()
+        except (AttributeError, EnvironmentError) as e:
+            # NOTE: AF_NETLINK only exists on Linux.
+            LOG.warning("Unable to listen to device uevents, only the "
+                        "periodic device discovery is used: %s", e)
+            return
+        self.start_uevent_listener(context, source)
+
+    def start_uevent_listener(self, context, source):
+        def on_devices_changed(bdfs):
+            LOG.info("Rediscovering accelerators after uevents of the "
+                     "devices %s.", ", ".join(sorted(bdfs)))
+            self._rt.update_usage(context, bdfs=bdfs)
+
+        self._uevent_listener = uevent.UeventListener(
+            source, on_devices_changed, CONF.agent.event_debounce)
+        self._uevent_listener.start()
+
+    def cleanup_host(self):
+        if self._uevent_listener is not None:
+            self._uevent_listener.stop()
+            self._uevent_listener = None
 
     def periodic_tasks(self, context, raise_on_error=False):
         return self.run_periodic_tasks(context, raise_on_error=raise_on_error)
@@ -47,29 +98,34 @@ class AgentManager(periodic_task.PeriodicTasks):
         """List installed hardware."""
         pass
 
+    def placement_stats(self, context):
+        """Return the metrics of the placement requests of the agent."""
+        return metrics.METRICS.stats()
+
     def fpga_program(self, context, deployable_uuid, image_uuid):
         """ Program a FPGA regoin, image can be a url or local file"""
         # TODO (Shaohe Feng) Get image from glance.
         # And add claim and rollback logical.
-        path = self._download_bitstream(context, image_uuid)
         dep = self.cond_api.deployable_get(context, deployable_uuid)
         driver = self.fpga_driver.create(dep.vendor)
-        driver.program(dep.address, path)
-
-    def _download_bitstream(self, context, bitstream_uuid):
-        """download the bistream
+        with self.bitstream_cache.get(context, image_uuid) as path:
+            driver.program(dep.address, path)
 
-        :param context: the context
-        :param bistream_uuid: v4 uuid of the bitstream to reprogram
-        :returns: the path to bitstream downloaded, None if fail to download
+    def fpga_program_job(self, context, job, vendor, address):
+        """Program a FPGA in the background, recording the progress of the
+        program job through the conductor.
         """
-        download_path = "/tmp/" + bitstream_uuid + ".bin"
-        self.image_api.download(context,
-                                bitstream_uuid,
-                                dest_path=download_path)
-        return download_path
+        self.program_jobs.submit(context, job, vendor, address)
 
     @periodic_task.periodic_task(run_immediately=True)
     def update_available_resource(self, context, startup=True):
         """update all kinds of accelerator resources from their drivers."""
+        # NOTE: with uevents the devices are rediscovered when they change,
+        # the full scan is only a slower safety net for missed uevents.
+        if (self._uevent_listener is not None and
+                self._last_full_scan is not None and
+                time.time() - self._last_full_scan <
+                CONF.agent.event_resync_interval):
+            return
         self._rt.update_usage(context)
+        self._last_full_scan = time.time()
@@ -0,0 +1,137 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""The FPGA programming jobs run in the background by the agent.
+
+The API records a ProgramJob and casts it to the agent of the host of the
+deployable, which downloads and programs up to [agent]program_workers
+bitstreams at a time and records each state of the job through the
+conductor:
+
+    Queued -> Downloading -> Verifying -> Programming -> Done
+                                                     \\-> Failed
+
+The bitstreams of several jobs are downloaded concurrently, but the jobs of
+a device are programmed one at a time. The jobs waiting for their device do
+not hold a worker.
+"""
+
+import eventlet
+from eventlet import semaphore
+from oslo_concurrency import lockutils
+from oslo_log import log as logging
+import six
+
+from cyborg.common import constants
+from cyborg.common import exception
+from cyborg.conf import CONF
+
+
+LOG = logging.getLogger(__name__)
+
+
+class ProgramJobRunner(object):
+    """Run the program jobs of an agent.
+
+    :param cond_api: The conductor RPC API recording the states of the jobs.
+    :param fpga_driver: The FPGADriver class creating the vendor drivers.
+    :param bitstream_cache: The BitstreamCache of the agent.
+    :param workers: The number of jobs run concurrently,
+                    [agent]program_workers by default.
+    """
+
+    def __init__(self, cond_api, fpga_driver, bitstream_cache, workers=None):
+        self.cond_api = cond_api
+        self.fpga_driver = fpga_driver
+        self.bitstream_cache = bitstream_cache
+        # NOTE: the jobs waiting for a worker stay queued without blocking
+        # the RPC server thread which submitted them.
+        self._workers = semaphore.Semaphore(
+            workers or CONF.agent.program_workers)
+        # The threads of the jobs submitted and not finished yet.
+        self._jobs = {}
+
+    def running(self):
+        """Return the UUIDs of the jobs submitted and not finished."""
+        return list(self._jobs)
+
+    def submit(self, context, job, vendor, address):
+        """Run a job in the background.
+
+        :param context: The security context.
+        :param job: The ProgramJob, in the Queued state.
+        :param vendor: The vendor of the device of the deployable.
+        :param address: The PCI address of the device of the deployable.
+        """
+        LOG.info("Queuing the program job %(job)s of the deployable "
+                 "%(dep)s with the image %(image)s.",
+                 {'job': job.uuid, 'dep': job.deployable_uuid,
+                  'image': job.image_uuid})
+        self._jobs[job.uuid] = eventlet.spawn(self._run, context, job,
+                                              vendor, address)
+
+    def wait(self):
+        """Wait for all the submitted jobs to finish."""
+        while self._jobs:
+            next(iter(self._jobs.values())).wait()
+
+    def _set_state(self, context, job, state, reason=None):
+        job.state = state
+        if reason is not None:
+            job.reason = reason
+        self.cond_api.program_job_update(context, job)
+        job.obj_reset_changes()
+
+    def _run(self, context, job, vendor, address):
+        try:
+            self._program(context, job, vendor, address)
+        except Exception as e:
+            LOG.exception("The program job %s failed.", job.uuid)
+            try:
+                self._set_state(context, job, constants.PROGRAM_FAILED,
+                                reason=six.text_type(e))
+            except Exception:
+                LOG.exception("Unable to record the failure of the program "
+                              "job %s.", job.uuid)
+        finally:
+            del self._jobs[job.uuid]
+
+    def _program(self, context, job, vendor, address):
+        driver = self.fpga_driver.create(vendor)
+        self._workers.acquire()
+        working = True
+        try:
+            self._set_state(context, job, constants.PROGRAM_DOWNLOADING)
+            with self.bitstream_cache.get(context, job.image_uuid) as path:
+                self._set_state(context, job, constants.PROGRAM_VERIFYING)
+                self.bitstream_cache.verify(path)
+                # NOTE: the job waits for the jobs before it on its device
+                # without holding a worker, for the jobs of the other
+                # devices to run meanwhile.
+                self._workers.release()
+                working = False
+                with lockutils.lock('fpga-program-%s' % job.device_uuid):
+                    with self._workers:
+                        self._set_state(context, job,
+                                        constants.PROGRAM_PROGRAMMING)
+                        returncode = driver.program(address, path)
+        finally:
+            if working:
+                self._workers.release()
+        if returncode:
+            raise exception.FPGAProgramFailed(
+                address=address,
+                reason='the programmer exited with %s' % returncode)
+        self._set_state(context, job, constants.PROGRAM_DONE)
+        LOG.info("Programmed the deployable %(dep)s with the image "
+                 "%(image)s.", {'dep': job.deployable_uuid,
+                                'image': job.image_uuid})
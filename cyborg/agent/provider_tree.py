@@ -19,7 +19,6 @@ no remoteable methods nor is there any interaction with the nova.db modules.
 """
 
 import collections
-import copy
 
 import os_traits
 from oslo_concurrency import lockutils
@@ -32,17 +31,46 @@ LOG = logging.getLogger(__name__)
 _LOCK_NAME = 'provider-tree-lock'
 
 # Point-in-time representation of a resource provider in the tree.
-# Note that, whereas namedtuple enforces read-only-ness of instances as a
-# whole, nothing prevents modification of the internals of attributes of
-# complex types (children/inventory/traits/aggregates).  However, any such
-# modifications still have no effect on the ProviderTree the instance came
-# from.  Like, you can Sharpie a moustache on a Polaroid of my face, but that
-# doesn't make a moustache appear on my actual face.
+# The inventory, traits and aggregates of the providers are stored as
+# read-only structures, replaced rather than modified when they change, so
+# that the ProviderData instances share them with the tree instead of copying
+# them.  Copy them to get modifiable ones.
 ProviderData = collections.namedtuple(
     'ProviderData', ['uuid', 'name', 'generation', 'parent_uuid', 'inventory',
                      'traits', 'aggregates'])
 
 
+class _FrozenDict(dict):
+    """A dict which can not be modified once created.
+
+    It is still a dict, so that it can be serialized to JSON.
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(_("%s is read-only") % type(self).__name__)
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+
+def _freeze_inventory(inventory):
+    """Return a read-only copy of the inventory and of its records."""
+    if isinstance(inventory, _FrozenDict) and all(
+            isinstance(rec, _FrozenDict) for rec in inventory.values()):
+        return inventory
+    return _FrozenDict((rc, _FrozenDict(rec))
+                       for rc, rec in inventory.items())
+
+
 class _Provider(object):
     """Represents a resource provider in the tree.
 
@@ -60,12 +88,12 @@ class _Provider(object):
         # Contains a dict, keyed by uuid of child resource providers having
         # this provider as a parent
         self.children = {}
-        # dict of inventory records, keyed by resource class
-        self.inventory = {}
-        # Set of trait names
-        self.traits = set()
-        # Set of aggregate UUIDs
-        self.aggregates = set()
+        # Read-only dict of inventory records, keyed by resource class
+        self.inventory = _FrozenDict()
+        # Frozenset of trait names
+        self.traits = frozenset()
+        # Frozenset of aggregate UUIDs
+        self.aggregates = frozenset()
 
     @classmethod
     def from_dict(cls, pdict):
@@ -83,16 +111,15 @@ class _Provider(object):
     def data(self):
         """A collection of all informations of a provider.
 
+        Nothing is copied, the inventory, traits and aggregates are read-only.
+
         :Return: a collections.namedtuple
             include inventory, traits, aggregates, uuid, name, generation,
             and parent_uuid.
         """
-        inventory = copy.deepcopy(self.inventory)
-        traits = copy.copy(self.traits)
-        aggregates = copy.copy(self.aggregates)
         return ProviderData(
             self.uuid, self.name, self.generation, self.parent_uuid,
-            inventory, traits, aggregates)
+            self.inventory, self.traits, self.aggregates)
 
     def get_provider_uuids(self):
         """Returns a list, in top-down traversal order, of UUIDs of this
@@ -103,27 +130,6 @@ class _Provider(object):
             ret.extend(child.get_provider_uuids())
         return ret
 
-    def find(self, search):
-        """Find an expect one in the provider tree by match the serach.
-
-        :param search: it can be the either name or uuid of an expect provider.
-        :return: the expect _Provider object or None.
-        """
-        if self.name == search or self.uuid == search:
-            return self
-        if search in self.children:
-            return self.children[search]
-        if self.children:
-            for child in self.children.values():
-                # We already searched for the child by UUID above, so here we
-                # just check for a child name match
-                if child.name == search:
-                    return child
-                subchild = child.find(search)
-                if subchild:
-                    return subchild
-        return None
-
     def add_child(self, provider):
         self.children[provider.uuid] = provider
 
@@ -179,7 +185,7 @@ class _Provider(object):
         """
         self._update_generation(generation)
         if self.has_inventory_changed(inventory):
-            self.inventory = copy.deepcopy(inventory)
+            self.inventory = _freeze_inventory(inventory)
             return True
         return False
 
@@ -194,7 +200,7 @@ class _Provider(object):
         """
         self._update_generation(generation)
         if self.have_traits_changed(new):
-            self.traits = set(new)  # create a copy of the new traits
+            self.traits = frozenset(new)
             return True
         return False
 
@@ -219,7 +225,7 @@ class _Provider(object):
         """
         self._update_generation(generation)
         if self.have_aggregates_changed(new):
-            self.aggregates = set(new)  # create a copy of the new aggregates
+            self.aggregates = frozenset(new)
             return True
         return False
 
@@ -234,12 +240,88 @@ class _Provider(object):
         return not bool(set(aggregates) - self.aggregates)
 
 
+class ProviderTreeSnapshot(object):
+    """A read-only point-in-time view of a ProviderTree.
+
+    The snapshot holds the ProviderData of all the providers, which share
+    their read-only inventory, traits and aggregates with the tree, so it is
+    cheap to take. It is not affected by later changes of the tree and is
+    read without locking it.
+    """
+
+    def __init__(self, version, roots, by_uuid, by_name):
+        # The version of the tree the snapshot was taken at.
+        self.version = version
+        self._roots = tuple(root.uuid for root in roots)
+        self._data = {}
+        self._children = {}
+        for uuid, provider in by_uuid.items():
+            self._data[uuid] = provider.data()
+            self._children[uuid] = tuple(provider.children)
+        self._by_name = {name: providers[0].uuid
+                         for name, providers in by_name.items() if providers}
+
+    def _uuid(self, name_or_uuid):
+        if name_or_uuid in self._data:
+            return name_or_uuid
+        if name_or_uuid in self._by_name:
+            return self._by_name[name_or_uuid]
+        raise ValueError(_("No such provider %s") % name_or_uuid)
+
+    def get_provider_uuids(self, name_or_uuid=None):
+        """Return a list, in top-down traversable order, of the UUIDs of all
+        providers (in a subtree), see ProviderTree.get_provider_uuids.
+        """
+        if name_or_uuid is None:
+            to_visit = list(reversed(self._roots))
+        else:
+            to_visit = [self._uuid(name_or_uuid)]
+        ret = []
+        # Depth-first, like ProviderTree.get_provider_uuids.
+        while to_visit:
+            uuid = to_visit.pop()
+            ret.append(uuid)
+            to_visit.extend(reversed(self._children[uuid]))
+        return ret
+
+    def data(self, name_or_uuid):
+        """Return the ProviderData of the specified provider.
+
+        :raises: ValueError if a provider with name_or_uuid was not found.
+        """
+        return self._data[self._uuid(name_or_uuid)]
+
+    def exists(self, name_or_uuid):
+        try:
+            self._uuid(name_or_uuid)
+            return True
+        except ValueError:
+            return False
+
+    def has_inventory(self, name_or_uuid):
+        return self.data(name_or_uuid).inventory != {}
+
+    def has_traits(self, name_or_uuid, traits):
+        return not bool(set(traits) - self.data(name_or_uuid).traits)
+
+    def in_aggregates(self, name_or_uuid, aggregates):
+        return not bool(set(aggregates) - self.data(name_or_uuid).aggregates)
+
+
 class ProviderTree(object):
 
     def __init__(self):
         """Create an empty provider tree."""
         self.lock = lockutils.internal_lock(_LOCK_NAME)
         self.roots = []
+        # Indexes of all the providers of the tree, so that finding one does
+        # not walk the tree. Names are not required to be unique, the
+        # providers having a name are listed in the order they were added.
+        self._by_uuid = {}
+        self._by_name = collections.defaultdict(list)
+        # Incremented on every change of the tree, see snapshot.
+        self.version = 0
+        self._snapshot = None
 
     def get_provider_uuids(self, name_or_uuid=None):
         """Return a list, in top-down traversable order, of the UUIDs of all
@@ -287,14 +369,12 @@ class ProviderTree(object):
         to_add_by_uuid = {pd['uuid']: pd for pd in provider_dicts}
 
         with self.lock:
+            self.version += 1
             # Sanity check for orphans.  Every parent UUID must either be None
             # (the provider is a root), or be in the tree already, or exist as
             # a key in to_add_by_uuid (we're adding it).
-            all_parents = set([None]) | set(to_add_by_uuid)
-            # NOTE(efried): Can't use get_provider_uuids directly because we're
-            # already under lock.
-            for root in self.roots:
-                all_parents |= set(root.get_provider_uuids())
+            all_parents = (set([None]) | set(to_add_by_uuid) |
+                           set(self._by_uuid))
             missing_parents = set()
             for pd in to_add_by_uuid.values():
                 parent_uuid = pd.get('parent_provider_uuid')
@@ -306,27 +386,20 @@ class ProviderTree(object):
                     ', '.join(missing_parents))
 
             # Ready to do the work.
-            # Use to_add_by_uuid to keep track of which providers are left to
-            # be added.
-            while to_add_by_uuid:
-                # Find a provider that's suitable to inject.
-                for uuid, pd in to_add_by_uuid.items():
-                    # Roots are always okay to inject (None won't be a key in
-                    # to_add_by_uuid).  Otherwise, we have to make sure we
-                    # already added the parent (and, by recursion, all
-                    # ancestors) if present in the input.
-                    parent_uuid = pd.get('parent_provider_uuid')
-                    if parent_uuid not in to_add_by_uuid:
-                        break
-                else:
-                    # This should never happen - we already ensured all parents
-                    # exist in the tree, which means we can't have any branches
-                    # that don't wind up at the root, which means we can't have
-                    # cycles.  But to quell the paranoia...
-                    raise ValueError(
-                        _("Unexpectedly failed to find parents already in the"
-                          "tree for any of the following: %s") %
-                        ','.join(set(to_add_by_uuid)))
+            # Add the providers top-down, so that the parent of a provider,
+            # if present in the input, is added before it.
+            children = collections.defaultdict(list)
+            for uuid, pd in to_add_by_uuid.items():
+                children[pd.get('parent_provider_uuid')].append(pd)
+            # Roots and the children of providers already in the tree are
+            # okay to inject first.
+            to_visit = collections.deque(
+                pd for parent_uuid, pds in children.items()
+                if parent_uuid not in to_add_by_uuid for pd in pds)
+            while to_visit:
+                pd = to_visit.popleft()
+                uuid = pd['uuid']
+                parent_uuid = pd.get('parent_provider_uuid')
 
                 # Add or replace the provider, either as a root or under its
                 # parent
@@ -342,9 +415,54 @@ class ProviderTree(object):
                 else:
                     parent = self._find_with_lock(parent_uuid)
                     parent.add_child(provider)
+                self._index(provider)
 
                 # Remove this entry to signify we're done with it.
                 to_add_by_uuid.pop(uuid)
+                to_visit.extend(children[uuid])
+
+            if to_add_by_uuid:
+                # This should never happen - we already ensured all parents
+                # exist in the tree, which means we can't have any branches
+                # that don't wind up at the root, which means we can't have
+                # cycles.  But to quell the paranoia...
+                raise ValueError(
+                    _("Unexpectedly failed to find parents already in the"
+                      "tree for any of the following: %s") %
+                    ','.join(set(to_add_by_uuid)))
+
+    def snapshot(self):
+        """Return a ProviderTreeSnapshot of the current state of the tree.
+
+        The snapshot is only taken again once the tree changed, so readers
+        of an unchanged tree share the same snapshot.
+        """
+        with self.lock:
+            if self._snapshot is None or (
+                    self._snapshot.version != self.version):
+                self._snapshot = ProviderTreeSnapshot(
+                    self.version, self.roots, self._by_uuid, self._by_name)
+            return self._snapshot
+
+    def _changed_with_lock(self, changed, provider, generation_before):
+        # Take a new snapshot next time if the provider's records or
+        # generation changed.
+        if changed or provider.generation != generation_before:
+            self.version += 1
+
+    def _index(self, provider):
+        self._by_uuid[provider.uuid] = provider
+        self._by_name[provider.name].append(provider)
+
+    def _unindex(self, provider):
+        for child in provider.children.values():
+            self._unindex(child)
+        self._by_uuid.pop(provider.uuid, None)
+        named = self._by_name.get(provider.name, [])
+        if provider in named:
+            named.remove(provider)
+        if not named:
+            self._by_name.pop(provider.name, None)
 
     def _remove_with_lock(self, name_or_uuid):
         found = self._find_with_lock(name_or_uuid)
@@ -353,6 +471,7 @@ class ProviderTree(object):
             parent.remove_child(found)
         else:
             self.roots.remove(found)
+        self._unindex(found)
 
     def remove(self, name_or_uuid):
         """Safely removes the provider identified by the supplied name_or_uuid
@@ -363,6 +482,7 @@ class ProviderTree(object):
                              remove from the tree.
         """
         with self.lock:
+            self.version += 1
             self._remove_with_lock(name_or_uuid)
 
     def new_root(self, name, uuid, generation=None):
@@ -377,6 +497,7 @@ class ProviderTree(object):
         """
 
         with self.lock:
+            self.version += 1
             exists = True
             try:
                 self._find_with_lock(uuid)
@@ -389,17 +510,20 @@ class ProviderTree(object):
 
             p = _Provider(name, uuid=uuid, generation=generation)
             self.roots.append(p)
+            self._index(p)
             return p.uuid
 
     def _find_with_lock(self, name_or_uuid):
-        for root in self.roots:
-            found = root.find(name_or_uuid)
-            if found:
-                return found
+        found = self._by_uuid.get(name_or_uuid)
+        if found is not None:
+            return found
+        named = self._by_name.get(name_or_uuid)
+        if named:
+            return named[0]
         raise ValueError(_("No such provider %s") % name_or_uuid)
 
     def data(self, name_or_uuid):
-        """Return a point-in-time copy of the specified provider's data.
+        """Return a point-in-time view of the specified provider's data.
 
         :param name_or_uuid: Either name or UUID of the resource provider whose
                              data is to be returned.
@@ -436,6 +560,7 @@ class ProviderTree(object):
                 provider.
         """
         with self.lock:
+            self.version += 1
             try:
                 self._find_with_lock(uuid or name)
             except ValueError:
@@ -447,6 +572,7 @@ class ProviderTree(object):
             parent_node = self._find_with_lock(parent)
             p = _Provider(name, uuid, generation, parent_node.uuid)
             parent_node.add_child(p)
+            self._index(p)
             return p.uuid
 
     def has_inventory(self, name_or_uuid):
@@ -496,14 +622,18 @@ class ProviderTree(object):
         """
         with self.lock:
             provider = self._find_with_lock(name_or_uuid)
-            return provider.update_inventory(inventory, generation)
+            generation_before = provider.generation
+            changed = provider.update_inventory(inventory, generation)
+            self._changed_with_lock(changed, provider, generation_before)
+            return changed
 
     def has_sharing_provider(self, resource_class):
         """Returns whether the specified provider_tree contains any sharing
         providers of inventory of the specified resource_class.
         """
-        for rp_uuid in self.get_provider_uuids():
-            pdata = self.data(rp_uuid)
+        snapshot = self.snapshot()
+        for rp_uuid in snapshot.get_provider_uuids():
+            pdata = snapshot.data(rp_uuid)
             has_rc = resource_class in pdata.inventory
             is_sharing = os_traits.MISC_SHARES_VIA_AGGREGATE in pdata.traits
             if has_rc and is_sharing:
@@ -562,7 +692,10 @@ class ProviderTree(object):
         """
         with self.lock:
             provider = self._find_with_lock(name_or_uuid)
-            return provider.update_traits(traits, generation=generation)
+            generation_before = provider.generation
+            changed = provider.update_traits(traits, generation=generation)
+            self._changed_with_lock(changed, provider, generation_before)
+            return changed
 
     def add_traits(self, name_or_uuid, *traits):
         """Set traits on a provider, without affecting existing traits.
@@ -572,6 +705,7 @@ class ProviderTree(object):
         :param traits: String names of traits to be added.
         """
         with self.lock:
+            self.version += 1
             provider = self._find_with_lock(name_or_uuid)
             final_traits = provider.traits | set(traits)
             provider.update_traits(final_traits)
@@ -584,6 +718,7 @@ class ProviderTree(object):
         :param traits: String names of traits to be removed.
         """
         with self.lock:
+            self.version += 1
             provider = self._find_with_lock(name_or_uuid)
             final_traits = provider.traits - set(traits)
             provider.update_traits(final_traits)
@@ -641,8 +776,11 @@ class ProviderTree(object):
         """
         with self.lock:
             provider = self._find_with_lock(name_or_uuid)
-            return provider.update_aggregates(aggregates,
-                                              generation=generation)
+            generation_before = provider.generation
+            changed = provider.update_aggregates(aggregates,
+                                                 generation=generation)
+            self._changed_with_lock(changed, provider, generation_before)
+            return changed
 
     def add_aggregates(self, name_or_uuid, *aggregates):
         """Set aggregates on a provider, without affecting existing aggregates.
@@ -652,6 +790,7 @@ class ProviderTree(object):
         :param aggregates: String UUIDs of aggregates to be added.
         """
         with self.lock:
+            self.version += 1
             provider = self._find_with_lock(name_or_uuid)
             final_aggs = provider.aggregates | set(aggregates)
             provider.update_aggregates(final_aggs)
@@ -665,6 +804,7 @@ class ProviderTree(object):
         :param aggregates: String UUIDs of aggregates to be removed.
         """
         with self.lock:
+            self.version += 1
             provider = self._find_with_lock(name_or_uuid)
             final_aggs = provider.aggregates - set(aggregates)
             provider.update_aggregates(final_aggs)
@@ -19,13 +19,18 @@ conductor with useful information about availability through the accelerator
 model.
 """
 
+import eventlet
+from eventlet import tpool
 from oslo_log import log as logging
+import oslo_messaging as messaging
 from stevedore import driver
 from stevedore.extension import ExtensionManager
 
 from cyborg.common import exception
 from cyborg.common import utils
 from cyborg.conf import CONF
+from cyborg.objects import base
+from cyborg.objects.driver_objects import driver_delta
 
 
 LOG = logging.getLogger(__name__)
@@ -42,6 +47,16 @@ class ResourceTracker(object):
         self.host = host
         self.conductor_api = cond_api
         self.acc_drivers = []
+        # (fingerprint, device list) of the last report accepted by the
+        # conductor, deltas are computed against it.
+        self._last_report = None
+        # The last devices found by each driver, and the discoveries which
+        # did not finish in time.
+        self._discovered = {}
+        self._discoveries = {}
+        # Names of the drivers whose previous devices were reported by the
+        # last update_usage because their discovery timed out or failed.
+        self.stale_drivers = []
         self._initialize_drivers()
 
     def _initialize_drivers(self, enabled_drivers=[]):
@@ -64,13 +79,134 @@ class ResourceTracker(object):
         self.acc_drivers = acc_drivers
 
     @utils.synchronized(AGENT_RESOURCE_SEMAPHORE)
-    def update_usage(self, context):
+    def update_usage(self, context, bdfs=None):
         """Update the resource usage periodically.
+
+        :param bdfs: if set, only the drivers owning one of these PCI
+                     addresses rediscover their devices, the last devices
+                     found by the other drivers are reported again.
         """
         acc_list = []
+        self.stale_drivers = []
+        acc_drivers = self.acc_drivers
+        if bdfs is not None:
+            acc_drivers = self._drivers_owning(bdfs)
+        pool = eventlet.GreenPool(CONF.agent.discovery_workers)
+        found = dict(zip(acc_drivers, pool.imap(self._discover,
+                                                acc_drivers)))
+        # NOTE: keep the order of the drivers so that the fingerprint of
+        # the devices does not depend on which drivers rediscovered them.
+        if any(devices is None for devices in found.values()):
+            LOG.warning("Skipping the report of the accelerator resources of "
+                        "%s until all the drivers discovered their devices.",
+                        self.host)
+            return
         for acc_driver in self.acc_drivers:
-            acc_list.extend(acc_driver.discover())
-        # Call conductor_api here to diff and report acc data. Now, we actually
-        # do not have the method report_data.
+            if acc_driver in found:
+                acc_list.extend(found[acc_driver])
+            else:
+                acc_list.extend(self._discovered[acc_driver])
+        # Call conductor_api here to diff and report acc data. Only the
+        # changes since the last accepted report are sent when possible.
         if acc_list:
-            self.conductor_api.report_data(context, self.host, acc_list)
+            fingerprint = base.obj_fingerprint(acc_list)
+            if not self._report_delta(context, acc_list, fingerprint):
+                changed = self.conductor_api.report_data(
+                    context, self.host, acc_list, fingerprint=fingerprint)
+                if not changed:
+                    LOG.debug("Accelerator resources of %s are unchanged.",
+                              self.host)
+            self._last_report = (fingerprint, acc_list)
+
+    def _drivers_owning(self, bdfs):
+        """Return the drivers which may own devices at these PCI addresses.
+
+        An address not found in the last discovered devices may belong to
+        a new device of any driver, so all the drivers are returned then.
+        Drivers which never discovered their devices are always returned.
+        """
+        owners = []
+        known = set()
+        for acc_driver in self.acc_drivers:
+            if acc_driver not in self._discovered:
+                owners.append(acc_driver)
+                continue
+            addresses = set()
+            for device in self._discovered[acc_driver]:
+                addresses.add(device.controlpath_id.cpid_info)
+                for dep in device.deployable_list:
+                    addresses.update(ah.attach_info
+                                     for ah in dep.attach_handle_list)
+            if addresses & bdfs:
+                owners.append(acc_driver)
+            known |= addresses
+        if not bdfs <= known:
+            return list(self.acc_drivers)
+        return owners
+
+    def _discover(self, acc_driver):
+        """Discover the devices of one driver.
+
+        The discovery runs in a native thread so that a driver blocking
+        without yielding can be timed out. A discovery still running from a
+        previous update is waited for instead of being started again.
+
+        :returns: the devices found, or the devices found by the previous
+                  discovery if it failed, None if there was none.
+        """
+        discovery = self._discoveries.get(acc_driver)
+        if discovery is None:
+            discovery = eventlet.spawn(tpool.execute, acc_driver.discover)
+            self._discoveries[acc_driver] = discovery
+        name = acc_driver.__class__.__name__
+        try:
+            with eventlet.Timeout(CONF.agent.discovery_timeout or None):
+                devices = discovery.wait()
+        except eventlet.Timeout:
+            LOG.warning("Discovery of driver %s timed out.", name)
+            return self._stale_devices(acc_driver, name)
+        except Exception:
+            del self._discoveries[acc_driver]
+            LOG.exception("Discovery of driver %s failed.", name)
+            return self._stale_devices(acc_driver, name)
+        del self._discoveries[acc_driver]
+        self._discovered[acc_driver] = devices
+        return devices
+
+    def _stale_devices(self, acc_driver, name):
+        self.stale_drivers.append(name)
+        if acc_driver not in self._discovered:
+            # NOTE: reporting no devices for the driver would delete the
+            # devices it reported before the agent started.
+            LOG.warning("Driver %s never discovered its devices.", name)
+            return None
+        devices = self._discovered[acc_driver]
+        LOG.warning("Reporting the %(count)d devices previously found by "
+                    "driver %(name)s.", {'count': len(devices), 'name': name})
+        return devices
+
+    def _report_delta(self, context, acc_list, fingerprint):
+        """Report the changes since the last accepted report.
+
+        :returns: True if the conductor applied the delta, False if a full
+        report is needed.
+        """
+        if self._last_report is None:
+            return False
+        base_fingerprint, last_list = self._last_report
+        delta = driver_delta.make_delta(last_list, acc_list,
+                                        base_fingerprint, fingerprint)
+        try:
+            applied = self.conductor_api.report_data_delta(
+                context, self.host, delta)
+        except messaging.RemoteError as e:
+            # NOTE: conductors older than RPC 1.2 are not sent the delta,
+            # see [upgrade_levels]conductor, a full report follows any
+            # other failure to apply it.
+            LOG.warning("Failed to report resource delta of %(host)s: "
+                        "%(err)s", {'host': self.host, 'err': e})
+            return False
+        if not applied:
+            LOG.info("Conductor asked for a full resource report of %s.",
+                     self.host)
+        return applied
@@ -32,10 +32,12 @@ class AgentAPI(object):
     API version history:
 
     |    1.0 - Initial version.
+    |    1.1 - Add placement_stats.
+    |    1.2 - Add fpga_program_job.
 
     """
 
-    RPC_API_VERSION = '1.0'
+    RPC_API_VERSION = '1.2'
 
     def __init__(self, topic=None):
         super(AgentAPI, self).__init__()
@@ -67,3 +69,27 @@ class AgentAPI(object):
         return cctxt.call(context, 'fpga_program',
                           deployable_uuid=deployable_uuid,
                           image_uuid=bitstream_uuid)
+
+    def fpga_program_job(self, context, obj_job, vendor, address):
+        """Signal the agent of the host of a program job to run it in the
+        background.
+
+        :param context: request context.
+        :param obj_job: the created program job object.
+        :param vendor: the vendor of the device to program.
+        :param address: the PCI address of the device to program.
+        """
+        cctxt = self.client.prepare(server=obj_job.hostname, version='1.2')
+        cctxt.cast(context, 'fpga_program_job', job=obj_job, vendor=vendor,
+                   address=address)
+
+    def placement_stats(self, context, host):
+        """Signal the agent of a host to return its placement metrics.
+
+        :param context: request context.
+        :param host: the host of the agent.
+        :returns: a dict of the latency histograms of the placement
+        endpoints and of the connections reused per placement host.
+        """
+        cctxt = self.client.prepare(server=host, version='1.1')
+        return cctxt.call(context, 'placement_stats')
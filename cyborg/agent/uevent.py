@@ -0,0 +1,147 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Listen to the kernel uevents of accelerator devices, so that the agent can
+rediscover them as soon as they are hotplugged, their VFs are changed or they
+are reprogrammed, rather than on the next periodic scan.
+"""
+
+import re
+import socket
+import time
+
+import eventlet
+from oslo_log import log as logging
+import six
+
+
+LOG = logging.getLogger(__name__)
+
+# From linux/netlink.h, the kernel uevents are multicast to group 1.
+NETLINK_KOBJECT_UEVENT = 15
+UEVENT_KERNEL_GROUP = 1
+UEVENT_BUFFER_SIZE = 64 * 1024
+
+SUBSYSTEMS = ("pci", "fpga")
+BDF_PATTERN = re.compile(
+    r"^[a-fA-F\d]{4}:[a-fA-F\d]{2}:[a-fA-F\d]{2}\.[a-fA-F\d]$")
+
+
+def parse_uevent(data):
+    """Parse a kernel uevent message.
+
+    The message is "ACTION@DEVPATH" followed by "KEY=VALUE" lines, all null
+    terminated.
+
+    :returns: a dict of the uevent keys, None if data is not a kernel uevent.
+    """
+    if isinstance(data, six.binary_type):
+        data = data.decode("utf-8", "replace")
+    lines = data.split("\0")
+    if "@" not in lines[0]:
+        return None
+    event = {}
+    for line in lines[1:]:
+        key, sep, value = line.partition("=")
+        if sep:
+            event[key] = value
+    return event
+
+
+def event_bdfs(event):
+    """Return the PCI addresses of the devices affected by a uevent."""
+    if event.get("SUBSYSTEM") not in SUBSYSTEMS:
+        return set()
+    if event.get("PCI_SLOT_NAME"):
+        return set([event["PCI_SLOT_NAME"].lower()])
+    # E.g. /devices/pci0000:5e/0000:5e:00.0/fpga/intel-fpga-dev.0, the
+    # closest PCI device is the one affected.
+    for part in reversed(event.get("DEVPATH", "").split("/")):
+        if BDF_PATTERN.match(part):
+            return set([part.lower()])
+    return set()
+
+
+class NetlinkEventSource(object):
+    """Kernel uevents read from a netlink socket."""
+
+    def __init__(self):
+        self._sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM,
+                                   NETLINK_KOBJECT_UEVENT)
+        self._sock.bind((0, UEVENT_KERNEL_GROUP))
+
+    def receive(self):
+        """Block until the next uevent and return it as a dict."""
+        while True:
+            event = parse_uevent(self._sock.recv(UEVENT_BUFFER_SIZE))
+            if event is not None:
+                return event
+
+    def close(self):
+        self._sock.close()
+
+
+class UeventListener(object):
+    """Call back with the PCI addresses of the devices changed by uevents.
+
+    Events are debounced: the callback is called once no event affecting a
+    device was received for the debounce interval, with the addresses of all
+    the devices affected since the last call.
+    """
+
+    def __init__(self, source, callback, debounce):
+        self.source = source
+        self.callback = callback
+        self.debounce = debounce
+        self._thread = None
+
+    def start(self):
+        self._thread = eventlet.spawn(self._run)
+
+    def stop(self):
+        if self._thread is not None:
+            self._thread.kill()
+            self._thread = None
+        self.source.close()
+
+    def _run(self):
+        while True:
+            try:
+                bdfs = self.wait_for_changes()
+                self.callback(bdfs)
+            except Exception:
+                LOG.exception("Failed to handle the uevents of accelerator "
+                              "devices.")
+
+    def wait_for_changes(self):
+        """Block until devices changed and the events settled.
+
+        :returns: the set of the PCI addresses of the changed devices.
+        """
+        bdfs = set()
+        while not bdfs:
+            bdfs.update(event_bdfs(self.source.receive()))
+        deadline = time.time() + self.debounce
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return bdfs
+            try:
+                with eventlet.Timeout(remaining):
+                    event = self.source.receive()
+            except eventlet.Timeout:
+                return bdfs
+            changed = event_bdfs(event)
+            if changed:
+                bdfs.update(changed)
+                deadline = time.time() + self.debounce
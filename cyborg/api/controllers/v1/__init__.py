@@ -23,6 +23,7 @@ from cyborg.api.controllers import base
 from cyborg.api.controllers import link
 from cyborg.api.controllers.v1 import accelerators
 from cyborg.api.controllers.v1 import deployables
+from cyborg.api.controllers.v1 import program_jobs
 from cyborg.api import expose
 
 
@@ -53,6 +54,7 @@ class Controller(rest.RestController):
 
     accelerators = accelerators.AcceleratorsController()
     deployables = deployables.DeployablesController()
+    program_jobs = program_jobs.ProgramJobsController()
 
     @expose.expose(V1)
     def get(self):
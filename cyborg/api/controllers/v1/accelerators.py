@@ -22,6 +22,7 @@ from wsme import types as wtypes
 from cyborg.api.controllers import base
 from cyborg.api.controllers import link
 from cyborg.api.controllers.v1 import deployables
+from cyborg.api.controllers.v1 import program_jobs
 from cyborg.api.controllers.v1 import types
 from cyborg.api.controllers.v1 import utils as api_utils
 from cyborg.api import expose
@@ -126,6 +127,7 @@ class AcceleratorsController(AcceleratorsControllerBase):
     """REST controller for Accelerators."""
 
     deployables = deployables.DeployablesController()
+    program_jobs = program_jobs.ProgramJobsController()
 
     @policy.authorize_wsgi("cyborg:accelerator", "create", False)
     @expose.expose(Accelerator, body=types.jsontype,
@@ -22,8 +22,10 @@ from wsme import types as wtypes
 from cyborg.agent.rpcapi import AgentAPI
 from cyborg.api.controllers import base
 from cyborg.api.controllers import link
+from cyborg.api.controllers.v1 import program_jobs
 from cyborg.api.controllers.v1 import types
 from cyborg.api import expose
+from cyborg.common import exception
 from cyborg.common import policy
 from cyborg import objects
 
@@ -76,11 +78,9 @@ class Deployable(base.APIBase):
             link.Link.make_link('bookmark', url, 'deployables', api_dep.uuid,
                                 bookmark=True)
             ]
-        query = {"deployable_id": obj_dep.id}
-        attr_get_list = objects.Attribute.get_by_filter(pecan.request.context,
-                                                        query)
+        # NOTE: the attributes are loaded together with the deployable.
         attributes_list = []
-        for exist_attr in attr_get_list:
+        for exist_attr in obj_dep.attributes_list:
             attributes_list.append({exist_attr.key: exist_attr.value})
         api_dep.attributes_list = json.dumps(attributes_list)
         return api_dep
@@ -116,24 +116,38 @@ class DeployablesController(base.CyborgController):
     _custom_actions = {'program': ['PATCH']}
 
     @policy.authorize_wsgi("cyborg:deployable", "program", False)
-    @expose.expose(Deployable, types.uuid, body=[DeployablePatchType])
+    @expose.expose(program_jobs.ProgramJob, types.uuid,
+                   body=[DeployablePatchType],
+                   status_code=http_client.ACCEPTED)
     def program(self, uuid, program_info):
         """Program a new deployable(FPGA).
 
+        The deployable is programmed in the background by the agent of its
+        host. The program job returned records the progress.
+
         :param uuid: The uuid of the target deployable.
         :param program_info: JSON string containing what to program.
         """
-
+        context = pecan.request.context
         image_uuid = program_info[0]['value'][0]['image_uuid']
-        agent_api = AgentAPI()
-        obj_dep = objects.Deployable.get(pecan.request.context, uuid)
+        obj_dep = objects.Deployable.get(context, uuid)
+        obj_dev = objects.Device.get_by_device_id(context, obj_dep.device_id)
+        obj_cpid = objects.ControlpathID.get_by_device_id(context,
+                                                          obj_dep.device_id)
+        if obj_cpid is None:
+            raise exception.ControlpathIDNotFound(uuid=obj_dev.uuid)
         # Set attribute of the new bitstream/image information
-        obj_dep.add_attribute(pecan.request.context, 'image_uuid', image_uuid)
-        # TODO (Li Liu) Trigger the program api in Agnet.
-        agent_api.program_fpga_with_bitstream(pecan.request.context,
-                                              uuid,
-                                              image_uuid)
-        return Deployable.convert_with_links(obj_dep)
+        obj_dep.add_attribute(context, 'image_uuid', image_uuid)
+        obj_job = objects.ProgramJob(context, deployable_uuid=uuid,
+                                     device_uuid=obj_dev.uuid,
+                                     image_uuid=image_uuid,
+                                     hostname=obj_dev.hostname)
+        obj_job.create(context)
+        AgentAPI().fpga_program_job(context, obj_job, obj_dev.vendor,
+                                    obj_cpid.cpid_info)
+        pecan.response.location = link.build_url('program_jobs',
+                                                 obj_job.uuid)
+        return program_jobs.ProgramJob.convert_with_links(obj_job)
 
     @policy.authorize_wsgi("cyborg:deployable", "create", False)
     @expose.expose(Deployable, body=types.jsontype,
@@ -147,6 +161,8 @@ class DeployablesController(base.CyborgController):
         obj_dep = objects.Deployable(context, **dep)
         new_dep = pecan.request.conductor_api.deployable_create(context,
                                                                 obj_dep)
+        # attributes_list is not sent back over RPC.
+        objects.Deployable.load_attributes(context, [new_dep])
         # Set the HTTP Location Header
         pecan.response.location = link.build_url('deployables', new_dep.uuid)
         return Deployable.convert_with_links(new_dep)
@@ -222,6 +238,8 @@ class DeployablesController(base.CyborgController):
 
         new_dep = pecan.request.conductor_api.deployable_update(context,
                                                                 obj_dep)
+        # attributes_list is not sent back over RPC.
+        objects.Deployable.load_attributes(context, [new_dep])
         return Deployable.convert_with_links(new_dep)
 
     @policy.authorize_wsgi("cyborg:deployable", "delete")
@@ -0,0 +1,122 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import pecan
+import wsme
+from wsme import types as wtypes
+
+from cyborg.api.controllers import base
+from cyborg.api.controllers import link
+from cyborg.api.controllers.v1 import types
+from cyborg.api import expose
+from cyborg.common import constants
+from cyborg.common import policy
+from cyborg import objects
+
+
+class ProgramJob(base.APIBase):
+    """API representation of a program job.
+
+    This class enforces type checking and value constraints, and converts
+    between the internal object model and the API representation of
+    a program job.
+    """
+
+    uuid = types.uuid
+    """The UUID of the program job"""
+
+    deployable_uuid = types.uuid
+    """The UUID of the deployable programmed"""
+
+    device_uuid = types.uuid
+    """The UUID of the device of the deployable"""
+
+    image_uuid = types.uuid
+    """The UUID of the image of the bitstream"""
+
+    hostname = wtypes.text
+    """The host of the deployable"""
+
+    state = wtypes.Enum(wtypes.text, *constants.PROGRAM_JOB_STATES)
+    """The state of the program job"""
+
+    reason = wtypes.text
+    """Why the program job failed"""
+
+    links = wsme.wsattr([link.Link], readonly=True)
+    """A list containing a self link"""
+
+    def __init__(self, **kwargs):
+        super(ProgramJob, self).__init__(**kwargs)
+        self.fields = []
+        for field in objects.ProgramJob.fields:
+            self.fields.append(field)
+            setattr(self, field, kwargs.get(field, wtypes.Unset))
+
+    @classmethod
+    def convert_with_links(cls, obj_job):
+        api_job = cls(**obj_job.as_dict())
+        url = pecan.request.public_url
+        api_job.links = [
+            link.Link.make_link('self', url, 'program_jobs', api_job.uuid),
+            link.Link.make_link('bookmark', url, 'program_jobs', api_job.uuid,
+                                bookmark=True)
+            ]
+        return api_job
+
+
+class ProgramJobCollection(base.APIBase):
+    """API representation of a collection of program jobs."""
+
+    program_jobs = [ProgramJob]
+    """A list containing program job objects"""
+
+    @classmethod
+    def convert_with_links(cls, obj_jobs):
+        collection = cls()
+        collection.program_jobs = [ProgramJob.convert_with_links(obj_job)
+                                   for obj_job in obj_jobs]
+        return collection
+
+
+class ProgramJobsController(base.CyborgController):
+    """REST controller for the jobs programming the deployables."""
+
+    @policy.authorize_wsgi("cyborg:program_job", "get_one")
+    @expose.expose(ProgramJob, types.uuid)
+    def get_one(self, uuid):
+        """Retrieve the progress of the given program job.
+
+        :param uuid: UUID of a program job.
+        """
+        obj_job = objects.ProgramJob.get(pecan.request.context, uuid)
+        return ProgramJob.convert_with_links(obj_job)
+
+    @policy.authorize_wsgi("cyborg:program_job", "get_all")
+    @expose.expose(ProgramJobCollection, types.uuid, wtypes.text, int)
+    def get_all(self, deployable_uuid=None, state=None, limit=None):
+        """Retrieve a list of program jobs, the latest first.
+
+        :param deployable_uuid: Only the jobs of this deployable.
+        :param state: Only the jobs in this state.
+        :param limit: The maximum number of jobs returned.
+        """
+        filters = {}
+        if deployable_uuid:
+            filters['deployable_uuid'] = deployable_uuid
+        if state:
+            filters['state'] = state
+        if limit:
+            filters['limit'] = limit
+        obj_jobs = objects.ProgramJob.list(pecan.request.context,
+                                           filters=filters)
+        return ProgramJobCollection.convert_with_links(obj_jobs)
@@ -23,5 +23,12 @@ DEVICE_FPGA = 'FPGA'
 ARQ_STATES = (ARQINITIAL, ARQBOUND, ARQUNBOUND, ARQBINDFAILED) = \
     ('Initial', 'Bound', 'Unbound', 'BindFailed')
 
+PROGRAM_JOB_STATES = (PROGRAM_QUEUED, PROGRAM_DOWNLOADING, PROGRAM_VERIFYING,
+                      PROGRAM_PROGRAMMING, PROGRAM_DONE, PROGRAM_FAILED) = \
+    ('Queued', 'Downloading', 'Verifying', 'Programming', 'Done', 'Failed')
+
+# The states of the programming jobs which are over.
+PROGRAM_JOB_FINAL_STATES = (PROGRAM_DONE, PROGRAM_FAILED)
+
 # Device type
 DEVICE_TYPE = (DEVICE_GPU, DEVICE_FPGA)
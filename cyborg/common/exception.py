@@ -114,6 +114,10 @@ class ExtArqAlreadyExists(CyborgException):
     _msg_fmt = _("ExtArq with uuid %(uuid)s already exists.")
 
 
+class ProgramJobAlreadyExists(CyborgException):
+    _msg_fmt = _("ProgramJob with uuid %(uuid)s already exists.")
+
+
 class Invalid(CyborgException):
     _msg_fmt = _("Invalid parameters.")
     code = http_client.BAD_REQUEST
@@ -188,6 +192,10 @@ class ExtArqNotFound(NotFound):
     _msg_fmt = _("ExtArq %(uuid)s could not be found.")
 
 
+class ProgramJobNotFound(NotFound):
+    _msg_fmt = _("ProgramJob %(uuid)s could not be found.")
+
+
 class InvalidDeployType(CyborgException):
     _msg_fmt = _("Deployable have an invalid type")
 
@@ -209,6 +217,11 @@ class DuplicateDeployableName(Conflict):
     _msg_fmt = _("A deployable with name %(name)s already exists.")
 
 
+class ResourceReportConflict(Conflict):
+    _msg_fmt = _("Resource report of host %(host)s does not apply to the "
+                 "stored resources: %(reason)s")
+
+
 class PlacementEndpointNotFound(NotFound):
     message = _("Placement API endpoint not found")
 
@@ -305,6 +318,15 @@ class ResourceProviderUpdateConflict(PlacementAPIConflict):
                 "provider %(uuid)s (generation %(generation)d): %(error)s")
 
 
+class TraitRetrievalFailed(CyborgException):
+    _msg_fmt = _("Failed to retrieve traits from the placement API: "
+                 "%(error)s")
+
+
+class TraitCreationFailed(CyborgException):
+    _msg_fmt = _("Failed to create trait %(name)s: %(error)s")
+
+
 class InvalidResourceClass(Invalid):
     msg_fmt = _("Resource class '%(resource_class)s' invalid.")
 
@@ -365,5 +387,18 @@ class ImageBadRequest(Invalid):
                 "%(response)s")
 
 
+class ImageDownloadFailed(CyborgException):
+    _msg_fmt = _("Failed to download image %(image_id)s: %(reason)s")
+
+
+class ImageChecksumMismatch(CyborgException):
+    _msg_fmt = _("The %(algorithm)s hash of the data of image %(image_id)s "
+                 "does not match the one recorded by glance.")
+
+
+class FPGAProgramFailed(CyborgException):
+    _msg_fmt = _("Failed to program the FPGA %(address)s: %(reason)s")
+
+
 class InvalidDriver(Invalid):
     _msg_fmt = _("Found an invalid driver: %(name)s")
@@ -109,6 +109,15 @@ deployable_policies = [
                        description='Program deployable(FPGA) records'),
 ]
 
+program_job_policies = [
+    policy.RuleDefault('cyborg:program_job:get_one',
+                       'rule:allow',
+                       description='Show the progress of a program job'),
+    policy.RuleDefault('cyborg:program_job:get_all',
+                       'rule:allow',
+                       description='Retrieve all program job records'),
+]
+
 fpga_policies = [
     policy.RuleDefault('cyborg:fpga:get_one',
                        'rule:allow',
@@ -126,6 +135,7 @@ def list_policies():
     return default_policies \
         + accelerator_policies \
         + deployable_policies \
+        + program_job_policies \
         + fpga_policies
 
 
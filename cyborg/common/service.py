@@ -54,6 +54,8 @@ class RPCService(service.Service):
         self.rpcserver.start()
 
         admin_context = context.get_admin_context()
+        if hasattr(self.manager, 'init_host'):
+            self.manager.init_host(admin_context)
         self.tg.add_dynamic_timer(
             self.manager.periodic_tasks,
             periodic_interval_max=CONF.periodic_interval,
@@ -70,6 +72,8 @@ class RPCService(service.Service):
         except Exception as e:
             LOG.exception('Service error occurred when stopping the '
                           'RPC server. Error: %s', e)
+        if hasattr(self.manager, 'cleanup_host'):
+            self.manager.cleanup_host()
 
         super(RPCService, self).stop(graceful=graceful)
         LOG.info('Stopped RPC server for service %(service)s on host '
@@ -108,7 +108,7 @@ def get_ksa_adapter(service_type, ksa_auth=None, ksa_session=None,
 
     return ks_loading.load_adapter_from_conf_options(
         CONF, confgrp, session=ksa_session, auth=ksa_auth,
-        min_version=min_version, max_version=max_version)
+        min_version=min_version, max_version=max_version, raise_exc=False)
 
 
 def get_endpoint(ksa_adapter):
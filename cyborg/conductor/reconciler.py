@@ -0,0 +1,350 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Set-based reconciliation of the accelerator resources of one host.
+
+The conductor loads everything stored for a host in a constant number of
+queries, diffs it in memory against the driver-side device list reported by
+the agent and writes the result back with bulk statements in a single
+transaction. Agents may also report a delta against their last accepted
+report, which is applied the same way without being diffed.
+"""
+
+from oslo_log import log as logging
+from oslo_utils import uuidutils
+from oslo_utils import versionutils
+
+from cyborg.common import exception
+from cyborg.db import api as dbapi
+from cyborg.objects.driver_objects import driver_delta
+
+
+LOG = logging.getLogger(__name__)
+
+TABLES = ('devices', 'controlpath_ids', 'deployables', 'attributes',
+          'attach_handles')
+
+# Fields copied from the driver-side object when a row is created.
+CREATE_FIELDS = {
+    'devices': ('type', 'vendor', 'model', 'std_board_info',
+                'vendor_board_info'),
+    'controlpath_ids': ('cpid_type', 'cpid_info'),
+    'deployables': ('name', 'num_accelerators'),
+    'attributes': ('key', 'value'),
+    'attach_handles': ('attach_type', 'attach_info', 'in_use'),
+}
+
+
+def _get_field(obj, field, default=None):
+    if obj.obj_attr_is_set(field):
+        return getattr(obj, field)
+    return default
+
+
+def _set_fields(driver_obj, table):
+    """Return the updatable fields reported in a driver object."""
+    return dict((field, getattr(driver_obj, field))
+                for field in driver_delta.MODIFY_FIELDS[table]
+                if driver_obj.obj_attr_is_set(field))
+
+
+class HostSnapshot(object):
+    """Index of the resource rows stored in the DB for one host.
+
+    Rows are keyed by the identity the agent reports: devices by the
+    cpid_info of their controlpath_id, deployables by name, attributes by
+    key and attach handles by attach_info.
+    """
+
+    def __init__(self, rows):
+        self.devices = {}
+        self.cpids = {}
+        self.deployables = {}
+        self.attributes = {}
+        self.attach_handles = {}
+        for cpid in rows.get('controlpath_ids', []):
+            self.cpids.setdefault(cpid.device_id, []).append(cpid)
+        for device in rows.get('devices', []):
+            # NOTE: devices without controlpath_id are not reported.
+            if device.id in self.cpids:
+                cpid = self.cpids[device.id][0]
+                self.devices[cpid.cpid_info] = (device, cpid)
+        for dep in rows.get('deployables', []):
+            self.deployables.setdefault(dep.device_id, {})[dep.name] = dep
+        for attr in rows.get('attributes', []):
+            self.attributes.setdefault(
+                attr.deployable_id, {})[attr.key] = attr
+        for ah in rows.get('attach_handles', []):
+            self.attach_handles.setdefault(
+                ah.deployable_id, {})[ah.attach_info] = ah
+
+
+class HostReconciler(object):
+    """Compute and apply the resource changes of one host."""
+
+    dbapi = dbapi.get_instance()
+
+    def __init__(self, context, hostname):
+        self.context = context
+        self.hostname = hostname
+        self.changes = dict((table, {'create': [], 'update': [],
+                                     'delete': []})
+                            for table in TABLES)
+
+    def reconcile(self, driver_device_list, fingerprint=None):
+        """Make the DB match the driver-side device list of the host.
+
+        :param driver_device_list: a list of driver_device object
+        discovered by agent in the host.
+        :param fingerprint: content hash of driver_device_list computed by
+        the agent. If it equals the one of the last accepted report, the DB
+        is already up to date and is left untouched.
+        :returns: the changes which were applied, None if the report was
+        skipped as unchanged.
+        """
+        if fingerprint is not None and fingerprint == \
+                self.dbapi.host_fingerprint_get(self.context, self.hostname):
+            LOG.debug("Resources of host %s are unchanged.", self.hostname)
+            return None
+        rows = self.dbapi.host_snapshot_get(self.context, self.hostname)
+        self.make_diff(HostSnapshot(rows), driver_device_list)
+        if self.has_changes():
+            LOG.info("Applying resource changes of host %(host)s: "
+                     "%(summary)s",
+                     {'host': self.hostname, 'summary': self.summary()})
+            self.dbapi.host_snapshot_apply(self.context, self.changes)
+        if fingerprint is not None:
+            self.dbapi.host_fingerprint_update(self.context, self.hostname,
+                                               fingerprint)
+        return self.changes
+
+    def reconcile_delta(self, delta):
+        """Apply a delta reported by the agent to the DB.
+
+        The delta is only applied when it was computed against the report
+        last accepted from the host, i.e. when its base fingerprint equals
+        the stored one.
+
+        :param delta: a delta dict built by driver_delta.make_delta.
+        :returns: True if the delta was applied, False if the agent has to
+        send a full report instead.
+        """
+        version = delta.get('version')
+        if not version or not versionutils.is_compatible(
+                version, driver_delta.DELTA_VERSION):
+            LOG.info("Unsupported resource delta version %(version)s from "
+                     "host %(host)s, asking for a full report.",
+                     {'version': version, 'host': self.hostname})
+            return False
+        stored = self.dbapi.host_fingerprint_get(self.context, self.hostname)
+        if stored is None or delta['base'] != stored:
+            LOG.info("Resource delta of host %s is not based on the stored "
+                     "resources, asking for a full report.", self.hostname)
+            return False
+        if delta['ops']:
+            rows = self.dbapi.host_snapshot_get(self.context, self.hostname)
+            try:
+                self.apply_delta(HostSnapshot(rows), delta['ops'])
+            except exception.ResourceReportConflict as e:
+                LOG.warning("%s, asking for a full report.", e)
+                return False
+            if self.has_changes():
+                LOG.info("Applying resource delta of host %(host)s: "
+                         "%(summary)s",
+                         {'host': self.hostname, 'summary': self.summary()})
+                self.dbapi.host_snapshot_apply(self.context, self.changes)
+        if delta['fingerprint'] != stored:
+            self.dbapi.host_fingerprint_update(self.context, self.hostname,
+                                               delta['fingerprint'])
+        return True
+
+    def apply_delta(self, snapshot, ops):
+        """Turn the ops of a delta into changes of the stored snapshot."""
+        for op in ops:
+            if op.get('op') not in ('add', 'remove', 'modify') or \
+                    op.get('type') not in driver_delta.MODIFY_FIELDS:
+                self._conflict(op, 'unknown operation')
+            if op['op'] == 'modify' and not set(op['values']).issubset(
+                    driver_delta.MODIFY_FIELDS[op['type']]):
+                self._conflict(op, 'unknown fields in')
+            if op['type'] == 'devices':
+                self._apply_device_op(snapshot, op)
+            else:
+                self._apply_child_op(snapshot, op)
+
+    def _conflict(self, op, reason):
+        raise exception.ResourceReportConflict(
+            host=self.hostname,
+            reason='%s %s %s' % (reason, op.get('op'), op.get('key')))
+
+    def _lookup(self, rows, key, op):
+        if key not in rows:
+            self._conflict(op, 'no stored element for')
+        return rows[key]
+
+    def _apply_device_op(self, snapshot, op):
+        cpid_info = op['key'][0]
+        if op['op'] == 'add':
+            if cpid_info in snapshot.devices:
+                self._conflict(op, 'element already stored for')
+            self._create_device(op['object'])
+            return
+        device, cpid = self._lookup(snapshot.devices, cpid_info, op)
+        if op['op'] == 'remove':
+            self._delete_device(snapshot, device)
+        else:
+            self._update('devices', device, op['values'])
+
+    def _apply_child_op(self, snapshot, op):
+        table, key = op['type'], op['key']
+        device, cpid = self._lookup(snapshot.devices, key[0], op)
+        deps = snapshot.deployables.get(device.id, {})
+        if table == 'deployables':
+            if op['op'] == 'add':
+                if key[1] in deps:
+                    self._conflict(op, 'element already stored for')
+                self._create_deployable(op['object'], device.id, cpid.id)
+            elif op['op'] == 'remove':
+                self._delete_deployable(snapshot,
+                                        self._lookup(deps, key[1], op))
+            else:
+                self._update(table, self._lookup(deps, key[1], op),
+                             op['values'])
+            return
+        dep = self._lookup(deps, key[1], op)
+        rows = getattr(snapshot, table).get(dep.id, {})
+        if op['op'] == 'add':
+            if key[2] in rows:
+                self._conflict(op, 'element already stored for')
+            parents = {'deployable_id': dep.id}
+            if table == 'attach_handles':
+                parents['cpid_id'] = cpid.id
+            self._create(table, op['object'], **parents)
+        elif op['op'] == 'remove':
+            self.changes[table]['delete'].append(
+                self._lookup(rows, key[2], op).id)
+        else:
+            self._update(table, self._lookup(rows, key[2], op), op['values'])
+
+    def has_changes(self):
+        return any(rows for ops in self.changes.values()
+                   for rows in ops.values())
+
+    def summary(self):
+        return dict((table, dict((op, len(rows)) for op, rows in ops.items()
+                                 if rows))
+                    for table, ops in self.changes.items()
+                    if any(ops.values()))
+
+    def make_diff(self, snapshot, driver_device_list):
+        """Compare the reported devices with the stored snapshot."""
+        new_devices = dict((driver_dev.controlpath_id.cpid_info, driver_dev)
+                           for driver_dev in driver_device_list)
+        for cpid_info, (device, cpid) in snapshot.devices.items():
+            if cpid_info not in new_devices:
+                self._delete_device(snapshot, device)
+        for cpid_info, driver_dev in new_devices.items():
+            if cpid_info not in snapshot.devices:
+                self._create_device(driver_dev)
+                continue
+            device, cpid = snapshot.devices[cpid_info]
+            self._update('devices', device,
+                         _set_fields(driver_dev, 'devices'))
+            self._deployable_diff(snapshot, device.id, cpid.id,
+                                  driver_dev.deployable_list)
+
+    def _deployable_diff(self, snapshot, device_id, cpid_id,
+                         driver_dep_list):
+        old_deps = snapshot.deployables.get(device_id, {})
+        new_deps = dict((driver_dep.name, driver_dep)
+                        for driver_dep in driver_dep_list)
+        for name, dep in old_deps.items():
+            if name not in new_deps:
+                self._delete_deployable(snapshot, dep)
+        for name, driver_dep in new_deps.items():
+            dep = old_deps.get(name)
+            if dep is None:
+                self._create_deployable(driver_dep, device_id, cpid_id)
+                continue
+            self._update('deployables', dep,
+                         _set_fields(driver_dep, 'deployables'))
+            self._leaf_diff('attributes', 'key',
+                            snapshot.attributes.get(dep.id, {}),
+                            _get_field(driver_dep, 'attribute_list', []),
+                            deployable_id=dep.id)
+            self._leaf_diff('attach_handles', 'attach_info',
+                            snapshot.attach_handles.get(dep.id, {}),
+                            _get_field(driver_dep, 'attach_handle_list', []),
+                            deployable_id=dep.id, cpid_id=cpid_id)
+
+    def _leaf_diff(self, table, identity, old_rows, driver_objs, **parents):
+        new_objs = dict((getattr(obj, identity), obj) for obj in driver_objs)
+        for key, row in old_rows.items():
+            if key not in new_objs:
+                self.changes[table]['delete'].append(row.id)
+        for key, obj in new_objs.items():
+            row = old_rows.get(key)
+            if row is None:
+                self._create(table, obj, **parents)
+            else:
+                self._update(table, row, _set_fields(obj, table))
+
+    def _create(self, table, driver_obj, **values):
+        """Queue a new row and return its uuid.
+
+        Foreign keys of the row may hold the uuid of a parent row queued
+        by the same reconciliation.
+        """
+        for field in CREATE_FIELDS[table]:
+            if driver_obj.obj_attr_is_set(field):
+                values[field] = getattr(driver_obj, field)
+        values['uuid'] = uuidutils.generate_uuid()
+        self.changes[table]['create'].append(values)
+        return values['uuid']
+
+    def _update(self, table, row, new_values):
+        values = dict((field, value) for field, value in new_values.items()
+                      if value != row[field])
+        if values:
+            values['id'] = row.id
+            self.changes[table]['update'].append(values)
+
+    def _create_device(self, driver_dev):
+        device_uuid = self._create('devices', driver_dev,
+                                   hostname=self.hostname)
+        cpid_uuid = self._create('controlpath_ids', driver_dev.controlpath_id,
+                                 device_id=device_uuid)
+        for driver_dep in driver_dev.deployable_list:
+            self._create_deployable(driver_dep, device_uuid, cpid_uuid)
+
+    def _create_deployable(self, driver_dep, device_id, cpid_id):
+        dep_uuid = self._create('deployables', driver_dep,
+                                device_id=device_id)
+        for driver_attr in _get_field(driver_dep, 'attribute_list', []):
+            self._create('attributes', driver_attr, deployable_id=dep_uuid)
+        for driver_ah in _get_field(driver_dep, 'attach_handle_list', []):
+            self._create('attach_handles', driver_ah,
+                         deployable_id=dep_uuid, cpid_id=cpid_id)
+
+    def _delete_device(self, snapshot, device):
+        for dep in snapshot.deployables.get(device.id, {}).values():
+            self._delete_deployable(snapshot, dep)
+        self.changes['controlpath_ids']['delete'].extend(
+            cpid.id for cpid in snapshot.cpids.get(device.id, []))
+        self.changes['devices']['delete'].append(device.id)
+
+    def _delete_deployable(self, snapshot, dep):
+        self.changes['attributes']['delete'].extend(
+            attr.id for attr in snapshot.attributes.get(dep.id, {}).values())
+        self.changes['attach_handles']['delete'].extend(
+            ah.id for ah in snapshot.attach_handles.get(dep.id, {}).values())
+        self.changes['deployables']['delete'].append(dep.id)
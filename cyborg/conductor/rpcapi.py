@@ -32,10 +32,14 @@ class ConductorAPI(object):
     API version history:
 
     |    1.0 - Initial version.
+    |    1.1 - Add fingerprint to report_data.
+    |    1.2 - Add report_data_delta.
+    |    1.3 - Add placement_stats.
+    |    1.4 - Add program_job_update and program_jobs_abort.
 
     """
 
-    RPC_API_VERSION = '1.0'
+    RPC_API_VERSION = '1.4'
 
     def __init__(self, topic=None):
         super(ConductorAPI, self).__init__()
@@ -43,8 +47,9 @@ class ConductorAPI(object):
         target = messaging.Target(topic=self.topic,
                                   version='1.0')
         serializer = objects_base.CyborgObjectSerializer()
+        version_cap = CONF.upgrade_levels.conductor or self.RPC_API_VERSION
         self.client = rpc.get_client(target,
-                                     version_cap=self.RPC_API_VERSION,
+                                     version_cap=version_cap,
                                      serializer=serializer)
 
     def accelerator_create(self, context, obj_acc):
@@ -145,10 +150,69 @@ class ConductorAPI(object):
         cctxt = self.client.prepare(topic=self.topic)
         return cctxt.call(context, 'deployable_list')
 
-    def report_data(self, context, hostname, driver_device_list):
+    def report_data(self, context, hostname, driver_device_list,
+                    fingerprint=None):
         """Signal to conductor service to update the cyborg DB
         :parma context: request context.
+        :param hostname: agent's hostname.
+        :param driver_device_list: a list of driver_device object
+        discovered by agent in the host.
+        :param fingerprint: content hash of driver_device_list, not sent
+        to conductors older than 1.1.
+        :returns: False if the conductor skipped the report as unchanged.
         """
-        cctxt = self.client.prepare(topic=self.topic)
-        cctxt.call(context, 'report_data', hostname=hostname,
-                   driver_device_list=driver_device_list)
+        kwargs = {}
+        version = '1.0'
+        if self.client.can_send_version('1.1'):
+            kwargs['fingerprint'] = fingerprint
+            version = '1.1'
+        cctxt = self.client.prepare(topic=self.topic, version=version)
+        return cctxt.call(context, 'report_data', hostname=hostname,
+                          driver_device_list=driver_device_list, **kwargs)
+
+    def report_data_delta(self, context, hostname, delta):
+        """Signal to conductor service to apply the changes of the devices
+        discovered by agent since its last accepted report.
+        :param context: request context.
+        :param hostname: agent's hostname.
+        :param delta: a delta dict built by driver_delta.make_delta.
+        :returns: False if the conductor could not apply the delta, or is
+        older than 1.2, and a full report_data is needed.
+        """
+        if not self.client.can_send_version('1.2'):
+            return False
+        cctxt = self.client.prepare(topic=self.topic, version='1.2')
+        return cctxt.call(context, 'report_data_delta', hostname=hostname,
+                          delta=delta)
+
+    def placement_stats(self, context):
+        """Signal to conductor service to return its placement metrics.
+
+        :param context: request context.
+        :returns: a dict of the latency histograms of the placement
+        endpoints and of the connections reused per placement host.
+        """
+        cctxt = self.client.prepare(topic=self.topic, version='1.3')
+        return cctxt.call(context, 'placement_stats')
+
+    def program_job_update(self, context, obj_job):
+        """Signal to conductor service to update a program job.
+
+        :param context: request context.
+        :param obj_job: a program job object to update.
+        :returns: updated program job object.
+        """
+        cctxt = self.client.prepare(topic=self.topic, version='1.4')
+        return cctxt.call(context, 'program_job_update', obj_job=obj_job)
+
+    def program_jobs_abort(self, context, hostname, running=None):
+        """Signal to conductor service to fail the program jobs a host
+        started before its agent restarted.
+        :param context: request context.
+        :param hostname: agent's hostname.
+        :param running: the UUIDs of the jobs run by the new agent.
+        :returns: the number of failed jobs.
+        """
+        cctxt = self.client.prepare(topic=self.topic, version='1.4')
+        return cctxt.call(context, 'program_jobs_abort', hostname=hostname,
+                          running=running)
@@ -22,6 +22,7 @@ from cyborg.conf import default
 from cyborg.conf import service_token
 from cyborg.conf import glance
 from cyborg.conf import keystone
+from cyborg.conf import upgrade_levels
 
 CONF = cfg.CONF
 
@@ -33,3 +34,4 @@ default.register_placement_opts(CONF)
 service_token.register_opts(CONF)
 glance.register_opts(CONF)
 keystone.register_opts(CONF)
+upgrade_levels.register_opts(CONF)
@@ -22,6 +22,54 @@ opts = [
                 default=[],
                 help=_('The accelerator drivers enabled on this agent. Such '
                        'as intel_fpga_driver, nvidia_gpu_driver, etc.')),
+    cfg.IntOpt('discovery_workers',
+               default=4,
+               min=1,
+               help=_('Maximum number of accelerator drivers discovering '
+                      'their devices concurrently.')),
+    cfg.IntOpt('discovery_timeout',
+               default=60,
+               min=0,
+               help=_('Number of seconds to wait for the device discovery of '
+                      'one accelerator driver. When it times out or fails, '
+                      'the devices found by the previous discovery of the '
+                      'driver are reported instead, or nothing is reported '
+                      'if there was none. 0 means wait forever.')),
+    cfg.BoolOpt('event_driven_discovery',
+                default=False,
+                help=_('Listen to the kernel uevents of the PCI and FPGA '
+                       'devices and rediscover the devices of the drivers '
+                       'they affect as soon as they change, instead of '
+                       'waiting for the next periodic scan. Only supported '
+                       'on Linux.')),
+    cfg.FloatOpt('event_debounce',
+                 default=2.0,
+                 min=0,
+                 help=_('Number of seconds without new device uevent to wait '
+                        'for before rediscovering the changed devices, so '
+                        'that a burst of uevents triggers one discovery.')),
+    cfg.IntOpt('event_resync_interval',
+               default=600,
+               min=0,
+               help=_('When event driven discovery is enabled, minimum '
+                      'number of seconds between two full scans of all the '
+                      'devices, done as a safety net for missed uevents.')),
+    cfg.StrOpt('bitstream_cache_dir',
+               default='$state_path/bitstreams',
+               help=_('Directory where the bitstreams downloaded from Glance '
+                      'to program the FPGAs are cached.')),
+    cfg.IntOpt('bitstream_cache_size',
+               default=10240,
+               min=0,
+               help=_('Maximum size in MiB of the cached bitstreams. The '
+                      'least recently used bitstreams are evicted beyond it, '
+                      '0 means they are removed once programmed.')),
+    cfg.IntOpt('program_workers',
+               default=16,
+               min=1,
+               help=_('Maximum number of FPGA programming jobs run '
+                      'concurrently by the agent. The jobs programming the '
+                      'same device wait for each other.')),
 ]
 
 opt_group = cfg.OptGroup(name='agent',
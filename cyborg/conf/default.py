@@ -90,6 +90,55 @@ placement_opts = [
                'being equal, two requests for allocation candidates will '
                'return the same results in the same order; but no guarantees '
                'are made as to how that order is determined.')),
+    cfg.IntOpt('sync_workers',
+               default=8,
+               min=1,
+               help=_('Maximum number of resource providers flushed '
+                      'concurrently to the placement service. Parents are '
+                      'always created before their children, and children '
+                      'deleted before their parents.')),
+    cfg.IntOpt('response_cache_size',
+               default=1000,
+               min=0,
+               help=_('Maximum number of placement API responses about '
+                      'resource providers, e.g. their inventories, traits '
+                      'and aggregates, kept to avoid fetching them again '
+                      'while the generation of the provider is unchanged. '
+                      '0 disables the cache.')),
+    cfg.IntOpt('response_cache_ttl',
+               default=300,
+               min=0,
+               help=_('Number of seconds a cached placement API response is '
+                      'used for. Providers changed by other services are '
+                      'noticed after this delay at worst, or on the first '
+                      'generation conflict.')),
+    cfg.IntOpt('pool_maxsize',
+               default=10,
+               min=1,
+               help=_('Maximum number of connections to a placement host '
+                      'kept open for reuse. Set it to the number of '
+                      'concurrent requests, e.g. sync_workers, so that they '
+                      'do not open and close connections.')),
+    cfg.BoolOpt('pool_block',
+                default=False,
+                help=_('Wait for a connection of the pool to be free rather '
+                       'than opening a connection which is closed after its '
+                       'request when pool_maxsize connections are in use.')),
+    cfg.IntOpt('tcp_keepidle',
+               default=60,
+               min=1,
+               help=_('Number of seconds a placement connection is idle '
+                      'before TCP keep-alive probes are sent.')),
+    cfg.IntOpt('tcp_keepintvl',
+               default=15,
+               min=1,
+               help=_('Number of seconds between the TCP keep-alive probes '
+                      'of a placement connection.')),
+    cfg.IntOpt('tcp_keepcnt',
+               default=4,
+               min=1,
+               help=_('Number of unanswered TCP keep-alive probes after which '
+                      'a placement connection is dropped.')),
 ]
 
 
@@ -51,6 +51,71 @@ Enable glance operation retries.
 
 Specifies the number of retries when uploading / downloading
 an image to / from glance. 0 means no retries.
+"""),
+    cfg.IntOpt('parallel_download_workers',
+               default=1,
+               min=1,
+               help="""
+Number of byte ranges of an image downloaded concurrently.
+
+When greater than 1, the images larger than parallel_download_range_size
+downloaded to a file are fetched in byte ranges with HTTP Range requests,
+written at their offset in the file. If glance does not serve byte ranges,
+the image is downloaded as a single stream instead.
+
+Related options:
+
+* parallel_download_range_size
+"""),
+    cfg.IntOpt('parallel_download_range_size',
+               default=64,
+               min=1,
+               help="""
+Size in MiB of the byte ranges of the images downloaded in parallel.
+
+Related options:
+
+* parallel_download_workers
+"""),
+    cfg.IntOpt('endpoint_cooldown',
+               default=30,
+               min=0,
+               help="""
+Number of seconds a glance API server which could not be reached is not used.
+
+The calls are retried right away with the other API servers, or after a
+second when all of them failed recently. 0 means the failed API servers are
+used again at their turn.
+
+Related options:
+
+* api_servers
+* num_retries
+"""),
+    cfg.IntOpt('client_pool_size',
+               default=32,
+               min=0,
+               help="""
+Maximum number of idle glance clients kept for reuse.
+
+A glance client is bound to an API server and to the credentials of a
+request. The clients are reused by the following calls with the same API
+server and credentials, instead of being created for each call. 0 disables
+the reuse.
+
+Related options:
+
+* client_ttl
+"""),
+    cfg.IntOpt('client_ttl',
+               default=300,
+               min=0,
+               help="""
+Number of seconds after its creation a glance client is reused for.
+
+Related options:
+
+* client_pool_size
 """),
     cfg.ListOpt('allowed_direct_url_schemes',
                 default=[],
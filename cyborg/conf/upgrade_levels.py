@@ -0,0 +1,40 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_config import cfg
+
+from cyborg.common.i18n import _
+
+
+opts = [
+    cfg.StrOpt('conductor',
+               help=_('Maximum version of the RPC API sent to the '
+                      'cyborg-conductor services, e.g. 1.0 while some of '
+                      'them are not upgraded yet. The calls added in later '
+                      'versions are then sent in their older form or '
+                      'skipped. Unset means the latest version.')),
+]
+
+opt_group = cfg.OptGroup(name='upgrade_levels',
+                         title='Options for the RPC API versions of rolling '
+                               'upgrades')
+
+
+def register_opts(conf):
+    conf.register_group(opt_group)
+    conf.register_opts(opts, group=opt_group)
+
+
+def list_opts():
+    return {
+        opt_group: opts
+    }
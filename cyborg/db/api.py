@@ -69,6 +69,16 @@ class Connection(object):
     def device_delete(self, context, uuid):
         """Delete a device when device is removed from the host."""
 
+    @abc.abstractmethod
+    def device_tree_create(self, context, values, cpid_values, deployables):
+        """Create a device with its controlpath id and deployables in one
+        transaction.
+        """
+
+    @abc.abstractmethod
+    def device_tree_delete(self, context, device_id):
+        """Delete a device and all its children in one transaction."""
+
     # device_profile
     @abc.abstractmethod
     def device_profile_create(self, context, values):
@@ -122,6 +132,17 @@ class Connection(object):
     def deployable_delete(self, context, uuid):
         """Delete a deployable."""
 
+    @abc.abstractmethod
+    def deployable_tree_create(self, context, values, attributes,
+                               attach_handles):
+        """Create a deployable with its attributes and attach_handles in one
+        transaction.
+        """
+
+    @abc.abstractmethod
+    def deployable_tree_delete(self, context, deployable_ids):
+        """Delete deployables with their attributes and attach_handles."""
+
     @abc.abstractmethod
     def deployable_get_by_filters(self, context,
                                   filters, sort_key='created_at',
@@ -138,6 +159,10 @@ class Connection(object):
     def attribute_create(self, context, values):
         """Create a new attribute."""
 
+    @abc.abstractmethod
+    def attribute_create_many(self, context, values_list):
+        """Create many attributes with a bulk insert."""
+
     @abc.abstractmethod
     def attribute_get(self, context, uuid):
         """Get requested attribute."""
@@ -146,6 +171,10 @@ class Connection(object):
     def attribute_get_by_deployable_id(self, context, deployable_id):
         """Get requested attribute by attribute id."""
 
+    @abc.abstractmethod
+    def attribute_get_by_deployable_ids(self, context, deployable_ids):
+        """Get the attributes of many deployables grouped by deployable."""
+
     @abc.abstractmethod
     def attribute_get_by_filter(self, context, filters):
         """Get requested attribute by kv pair and attribute id."""
@@ -158,6 +187,10 @@ class Connection(object):
     def attribute_delete(self, context, uuid):
         """Delete an attribute."""
 
+    @abc.abstractmethod
+    def attribute_delete_by_deployable_ids(self, context, deployable_ids):
+        """Delete all the attributes of some deployables."""
+
     # quota
     @abc.abstractmethod
     def quota_reserve(self, context, resources, deltas, expire,
@@ -195,6 +228,10 @@ class Connection(object):
     def attach_handle_create(self, context, values):
         """Create a new attach_handle"""
 
+    @abc.abstractmethod
+    def attach_handle_create_many(self, context, values_list):
+        """Create many attach_handles with a bulk insert"""
+
     @abc.abstractmethod
     def attach_handle_get_by_uuid(self, context, uuid):
         """Get requested attach_handle"""
@@ -218,6 +255,11 @@ class Connection(object):
     def attach_handle_delete(self, context, uuid):
         """Delete an attach_handle"""
 
+    @abc.abstractmethod
+    def attach_handle_delete_by_deployable_ids(self, context,
+                                               deployable_ids):
+        """Delete all the attach_handles of some deployables"""
+
     @abc.abstractmethod
     def attach_handle_update(self, context, uuid, values):
         """Update an attach_handle"""
@@ -249,3 +291,50 @@ class Connection(object):
     @abc.abstractmethod
     def control_path_update(self, context, uuid, values):
         """Update a control path id"""
+
+    # host snapshot
+    @abc.abstractmethod
+    def host_snapshot_get(self, context, hostname):
+        """Get all the accelerator resources stored for one host."""
+
+    @abc.abstractmethod
+    def host_snapshot_apply(self, context, changes):
+        """Apply bulk changes of one host's resources in one transaction."""
+
+    # host tree
+    @abc.abstractmethod
+    def host_tree_get(self, context, hostname):
+        """Get the devices of one host with all their children loaded."""
+
+    @abc.abstractmethod
+    def deployable_tree_get_by_device_id(self, context, device_id):
+        """Get the deployables of one device with their children loaded."""
+
+    # host fingerprint
+    @abc.abstractmethod
+    def host_fingerprint_get(self, context, hostname):
+        """Get the fingerprint of the last report accepted from a host."""
+
+    @abc.abstractmethod
+    def host_fingerprint_update(self, context, hostname, fingerprint):
+        """Create or update the fingerprint of a host."""
+
+    # program job
+    @abc.abstractmethod
+    def program_job_create(self, context, values):
+        """Create a new program job."""
+
+    @abc.abstractmethod
+    def program_job_get(self, context, uuid):
+        """Get requested program job."""
+
+    @abc.abstractmethod
+    def program_job_list_by_filters(self, context,
+                                    filters, sort_key='created_at',
+                                    sort_dir='desc', limit=None,
+                                    marker=None):
+        """Get requested list of program jobs by filters."""
+
+    @abc.abstractmethod
+    def program_job_update(self, context, uuid, values):
+        """Update a program job."""
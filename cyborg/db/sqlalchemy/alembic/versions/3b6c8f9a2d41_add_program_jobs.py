@@ -0,0 +1,50 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""add_program_jobs
+
+Revision ID: 3b6c8f9a2d41
+Revises: 87f09d088d65
+Create Date: 2019-07-02 14:05:12.730519
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3b6c8f9a2d41'
+down_revision = '87f09d088d65'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    state = sa.Enum('Queued', 'Downloading', 'Verifying', 'Programming',
+                    'Done', 'Failed', name='program_job_state')
+    op.create_table(
+        'program_jobs',
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('uuid', sa.String(length=36), nullable=False),
+        sa.Column('deployable_uuid', sa.String(length=36), nullable=False),
+        sa.Column('device_uuid', sa.String(length=36), nullable=False),
+        sa.Column('image_uuid', sa.String(length=36), nullable=False),
+        sa.Column('hostname', sa.String(length=255), nullable=False),
+        sa.Column('state', state, nullable=False),
+        sa.Column('reason', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('uuid', name='uniq_program_jobs0uuid'),
+        sa.Index('program_jobs_deployable_uuid_idx', 'deployable_uuid'),
+        sa.Index('program_jobs_hostname_state_idx', 'hostname', 'state'),
+        mysql_ENGINE='InnoDB',
+        mysql_DEFAULT_CHARSET='UTF8'
+    )
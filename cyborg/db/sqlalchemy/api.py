@@ -28,6 +28,7 @@ from oslo_utils import strutils
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
 from sqlalchemy.orm import load_only
+from sqlalchemy.orm import selectinload
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.sql import func
 
@@ -44,6 +45,17 @@ LOG = log.getLogger(__name__)
 
 main_context_manager = enginefacade.transaction_context()
 
+# The tables holding the resources an agent reports for its host, in the
+# order their rows have to be created. Rows are deleted in reverse order.
+HOST_SNAPSHOT_MODELS = (models.Device, models.ControlpathID,
+                        models.Deployable, models.Attribute,
+                        models.AttachHandle)
+# Foreign keys which may refer to a row created in the same bulk apply.
+HOST_SNAPSHOT_FKS = ('device_id', 'deployable_id', 'cpid_id')
+# Maximum number of values bound in one IN clause, kept below the SQLite
+# limit of 999 host parameters.
+MAX_IN_CLAUSE_SIZE = 500
+
 
 def get_backend():
     """The backend is this module itself."""
@@ -88,6 +100,13 @@ def model_query(context, model, *args, **kwargs):
         return query
 
 
+def _in_chunks(values):
+    """Split values in lists of at most MAX_IN_CLAUSE_SIZE items."""
+    values = list(values)
+    for i in range(0, len(values), MAX_IN_CLAUSE_SIZE):
+        yield values[i:i + MAX_IN_CLAUSE_SIZE]
+
+
 def add_identity_filter(query, value):
     """Adds an identity filter to a query.
 
@@ -142,6 +161,13 @@ class Connection(api.Connection):
                 raise exception.AttachHandleAlreadyExists(uuid=values['uuid'])
             return attach_handle
 
+    def attach_handle_create_many(self, context, values_list):
+        """Create many attach_handles with one bulk INSERT.
+
+        :returns: the list of inserted values, carrying generated uuids.
+        """
+        return self._bulk_create(models.AttachHandle, values_list)
+
     def attach_handle_get_by_uuid(self, context, uuid):
         query = model_query(
             context,
@@ -254,6 +280,11 @@ class Connection(api.Connection):
             if count != 1:
                 raise exception.AttachHandleNotFound(uuid=uuid)
 
+    def attach_handle_delete_by_deployable_ids(self, context,
+                                               deployable_ids):
+        return self._delete_by_deployable_ids(context, models.AttachHandle,
+                                              deployable_ids)
+
     def control_path_create(self, context, values):
         if not values.get('uuid'):
             values['uuid'] = uuidutils.generate_uuid()
@@ -335,6 +366,148 @@ class Connection(api.Connection):
             if count != 1:
                 raise exception.ControlpathNotFound(uuid=uuid)
 
+    def host_tree_get(self, context, hostname):
+        """Return the devices of one host with their children loaded.
+
+        Controlpath ids, deployables and the attributes and attach handles
+        of the deployables are eagerly loaded with one SELECT ... IN query
+        per table, so the whole tree takes five queries whatever the number
+        of devices.
+        """
+        device = models.Device
+        deployables = selectinload(device.deployables)
+        with _session_for_read():
+            query = model_query(context, device).filter(
+                device.hostname == hostname).options(
+                selectinload(device.controlpath_ids),
+                deployables.selectinload(models.Deployable.attributes),
+                deployables.selectinload(models.Deployable.attach_handles))
+            return query.order_by(device.id).all()
+
+    def deployable_tree_get_by_device_id(self, context, device_id):
+        """Return the deployables of one device with their attributes and
+        attach handles loaded, in three queries.
+        """
+        deployable = models.Deployable
+        with _session_for_read():
+            query = model_query(context, deployable).filter(
+                deployable.device_id == device_id).options(
+                selectinload(deployable.attributes),
+                selectinload(deployable.attach_handles))
+            return query.order_by(deployable.id).all()
+
+    def host_snapshot_get(self, context, hostname):
+        """Return the rows of every resource table stored for one host.
+
+        Each table is loaded by a single query joined on the hostname of the
+        owning device, so the number of queries does not depend on how many
+        devices, deployables or attach handles the host has.
+
+        :returns: a dict mapping table names to lists of rows.
+        """
+        device = models.Device
+        deployable = models.Deployable
+        snapshot = {}
+        with _session_for_read():
+            query = model_query(context, device).filter(
+                device.hostname == hostname)
+            snapshot[device.__tablename__] = query.order_by(device.id).all()
+            for model in (models.ControlpathID, models.Deployable):
+                query = model_query(context, model).join(
+                    device, model.device_id == device.id).filter(
+                    device.hostname == hostname)
+                snapshot[model.__tablename__] = query.order_by(
+                    model.id).all()
+            for model in (models.Attribute, models.AttachHandle):
+                query = model_query(context, model).join(
+                    deployable, model.deployable_id == deployable.id).join(
+                    device, deployable.device_id == device.id).filter(
+                    device.hostname == hostname)
+                snapshot[model.__tablename__] = query.order_by(
+                    model.id).all()
+        return snapshot
+
+    @oslo_db_api.retry_on_deadlock
+    def host_snapshot_apply(self, context, changes):
+        """Apply the changes computed for one host in a single transaction.
+
+        :param changes: a dict mapping table names to dicts with optional
+                        'delete' (list of ids), 'update' (list of value dicts
+                        carrying the row id) and 'create' (list of value
+                        dicts carrying a generated uuid) keys. The foreign
+                        keys of created rows may hold the uuid of a parent
+                        row created by the same call.
+        """
+        with _session_for_write() as session:
+            for model in reversed(HOST_SNAPSHOT_MODELS):
+                ids = changes.get(model.__tablename__, {}).get('delete')
+                if not ids:
+                    continue
+                queries = [model_query(context, model).filter(
+                    model.id.in_(chunk)) for chunk in _in_chunks(ids)]
+                if model is models.Deployable:
+                    # NOTE: a deployable may be the root of deployables
+                    # deleted with another chunk.
+                    for query in queries:
+                        query.update({'root_id': None},
+                                     synchronize_session=False)
+                for query in queries:
+                    query.delete(synchronize_session=False)
+
+            for model in HOST_SNAPSHOT_MODELS:
+                rows = changes.get(model.__tablename__, {}).get('update')
+                if rows:
+                    session.bulk_update_mappings(model, rows)
+
+            created_ids = {}
+            for model in HOST_SNAPSHOT_MODELS:
+                rows = changes.get(model.__tablename__, {}).get('create')
+                if not rows:
+                    continue
+                rows = [self._resolve_created_ids(row, created_ids)
+                        for row in rows]
+                session.bulk_insert_mappings(model, rows)
+                if model in (models.Attribute, models.AttachHandle):
+                    # Nothing refers to these rows, no need to fetch ids.
+                    continue
+                for chunk in _in_chunks(row['uuid'] for row in rows):
+                    query = model_query(context, model, model.uuid, model.id)
+                    query = query.filter(model.uuid.in_(chunk))
+                    created_ids.update(query.all())
+
+    def host_fingerprint_get(self, context, hostname):
+        """Return the stored fingerprint of a host, None if there is none."""
+        query = model_query(context, models.HostFingerprint).filter_by(
+            hostname=hostname)
+        ref = query.first()
+        return ref.fingerprint if ref is not None else None
+
+    @oslo_db_api.retry_on_deadlock
+    def host_fingerprint_update(self, context, hostname, fingerprint):
+        with _session_for_write() as session:
+            query = model_query(context, models.HostFingerprint).filter_by(
+                hostname=hostname)
+            ref = query.with_lockmode('update').first()
+            if ref is None:
+                ref = models.HostFingerprint(hostname=hostname)
+                session.add(ref)
+            ref.fingerprint = fingerprint
+            session.flush()
+
+    @staticmethod
+    def _resolve_created_ids(values, created_ids):
+        values = dict(values)
+        for key in HOST_SNAPSHOT_FKS:
+            value = values.get(key)
+            if uuidutils.is_uuid_like(value):
+                try:
+                    values[key] = created_ids[value]
+                except KeyError:
+                    raise exception.InvalidParameterValue(
+                        _('%(key)s refers to unknown uuid %(uuid)s') %
+                        {'key': key, 'uuid': value})
+        return values
+
     def device_create(self, context, values):
         if not values.get('uuid'):
             values['uuid'] = uuidutils.generate_uuid()
@@ -419,6 +592,42 @@ class Connection(api.Connection):
             if count != 1:
                 raise exception.DeviceNotFound(uuid=uuid)
 
+    def device_tree_create(self, context, values, cpid_values, deployables):
+        """Create a device and its children in a single transaction.
+
+        :param values: the values of the device.
+        :param cpid_values: the values of its controlpath_id.
+        :param deployables: a list of (values, attributes, attach_handles)
+                            tuples, as taken by deployable_tree_create.
+        :returns: the created device.
+        """
+        with _session_for_write():
+            device = self.device_create(context, values)
+            cpid = self.control_path_create(
+                context, dict(cpid_values, device_id=device.id))
+            for dep_values, attributes, attach_handles in deployables:
+                self.deployable_tree_create(
+                    context, dict(dep_values, device_id=device.id),
+                    attributes,
+                    [dict(ah, cpid_id=cpid.id) for ah in attach_handles])
+            return device
+
+    def device_tree_delete(self, context, device_id):
+        """Delete a device and its children with bulk DELETEs in a single
+        transaction.
+        """
+        with _session_for_write():
+            dep_ids = [dep_id for dep_id, in model_query(
+                context, models.Deployable, models.Deployable.id).filter_by(
+                device_id=device_id)]
+            self.deployable_tree_delete(context, dep_ids)
+            model_query(context, models.ControlpathID).filter_by(
+                device_id=device_id).delete(synchronize_session=False)
+            count = model_query(context, models.Device).filter_by(
+                id=device_id).delete(synchronize_session=False)
+            if count != 1:
+                raise exception.DeviceNotFound(uuid=device_id)
+
     def device_profile_create(self, context, values):
         if not values.get('uuid'):
             values['uuid'] = uuidutils.generate_uuid()
@@ -572,6 +781,43 @@ class Connection(api.Connection):
             if count != 1:
                 raise exception.DeployableNotFound(uuid=uuid)
 
+    def deployable_tree_create(self, context, values, attributes,
+                               attach_handles):
+        """Create a deployable and its children in a single transaction.
+
+        The attributes and attach_handles are inserted with one bulk INSERT
+        each, their deployable_id is set to the created deployable.
+
+        :returns: the created deployable.
+        """
+        with _session_for_write():
+            deployable = self.deployable_create(context, values)
+            self.attribute_create_many(
+                context, [dict(attr, deployable_id=deployable.id)
+                          for attr in attributes])
+            self.attach_handle_create_many(
+                context, [dict(ah, deployable_id=deployable.id)
+                          for ah in attach_handles])
+            return deployable
+
+    def deployable_tree_delete(self, context, deployable_ids):
+        """Delete deployables and their children with bulk DELETEs in a
+        single transaction.
+        """
+        if not deployable_ids:
+            return
+        with _session_for_write():
+            self.attribute_delete_by_deployable_ids(context, deployable_ids)
+            self.attach_handle_delete_by_deployable_ids(context,
+                                                        deployable_ids)
+            queries = [model_query(context, models.Deployable).filter(
+                models.Deployable.id.in_(chunk))
+                for chunk in _in_chunks(deployable_ids)]
+            for query in queries:
+                query.update({'root_id': None}, synchronize_session=False)
+            for query in queries:
+                query.delete(synchronize_session=False)
+
     def deployable_get_by_filters_with_attributes(self, context,
                                                   filters):
 
@@ -705,6 +951,13 @@ class Connection(api.Connection):
                     uuid=values['uuid'])
             return attribute
 
+    def attribute_create_many(self, context, values_list):
+        """Create many attributes with one bulk INSERT.
+
+        :returns: the list of inserted values, carrying generated uuids.
+        """
+        return self._bulk_create(models.Attribute, values_list)
+
     def attribute_get(self, context, uuid):
         query = model_query(
             context,
@@ -720,6 +973,27 @@ class Connection(api.Connection):
             models.Attribute).filter_by(deployable_id=deployable_id)
         return query.all()
 
+    def attribute_get_by_deployable_ids(self, context, deployable_ids):
+        """Return the attributes of many deployables.
+
+        The attributes are fetched with one ``deployable_id IN (...)`` query
+        per chunk of MAX_IN_CLAUSE_SIZE ids instead of one query per
+        deployable.
+
+        :returns: a dict mapping each deployable id to its attributes.
+        """
+        deployable_ids = sorted(set(deployable_ids))
+        attributes = dict((dep_id, []) for dep_id in deployable_ids)
+        model = models.Attribute
+        with _session_for_read():
+            for i in range(0, len(deployable_ids), MAX_IN_CLAUSE_SIZE):
+                chunk = deployable_ids[i:i + MAX_IN_CLAUSE_SIZE]
+                query = model_query(context, model).filter(
+                    model.deployable_id.in_(chunk)).order_by(model.id)
+                for attr in query.all():
+                    attributes[attr.deployable_id].append(attr)
+        return attributes
+
     def attribute_get_by_filter(self, context, filters):
         """Return attributes that matches the filters
         """
@@ -772,6 +1046,39 @@ class Connection(api.Connection):
             if count != 1:
                 raise exception.AttributeNotFound(uuid=uuid)
 
+    def attribute_delete_by_deployable_ids(self, context, deployable_ids):
+        return self._delete_by_deployable_ids(context, models.Attribute,
+                                              deployable_ids)
+
+    @staticmethod
+    def _bulk_create(model, values_list):
+        values_list = [dict(values) for values in values_list]
+        if not values_list:
+            return values_list
+        for values in values_list:
+            values.pop('id', None)
+            if not values.get('uuid'):
+                values['uuid'] = uuidutils.generate_uuid()
+        with _session_for_write() as session:
+            session.bulk_insert_mappings(model, values_list)
+        return values_list
+
+    @staticmethod
+    def _delete_by_deployable_ids(context, model, deployable_ids):
+        """Delete the rows of model belonging to some deployables.
+
+        :returns: the number of deleted rows.
+        """
+        if not deployable_ids:
+            return 0
+        deleted = 0
+        with _session_for_write():
+            for chunk in _in_chunks(deployable_ids):
+                query = model_query(context, model).filter(
+                    model.deployable_id.in_(chunk))
+                deleted += query.delete(synchronize_session=False)
+        return deleted
+
     def extarq_create(self, context, values):
         if not values.get('uuid'):
             values['uuid'] = uuidutils.generate_uuid()
@@ -829,6 +1136,67 @@ class Connection(api.Connection):
         except NoResultFound:
             raise exception.ExtArqNotFound(uuid=uuid)
 
+    def program_job_create(self, context, values):
+        if not values.get('uuid'):
+            values['uuid'] = uuidutils.generate_uuid()
+        program_job = models.ProgramJob()
+        program_job.update(values)
+
+        with _session_for_write() as session:
+            try:
+                session.add(program_job)
+                session.flush()
+            except db_exc.DBDuplicateEntry:
+                raise exception.ProgramJobAlreadyExists(uuid=values['uuid'])
+            return program_job
+
+    def program_job_get(self, context, uuid):
+        query = model_query(
+            context,
+            models.ProgramJob).filter_by(uuid=uuid)
+        try:
+            return query.one()
+        except NoResultFound:
+            raise exception.ProgramJobNotFound(uuid=uuid)
+
+    def program_job_list_by_filters(
+            self, context, filters, sort_key='created_at', sort_dir='desc',
+            limit=None, marker=None):
+        if limit == 0:
+            return []
+
+        query_prefix = model_query(context, models.ProgramJob)
+        filters = copy.deepcopy(filters)
+
+        exact_match_filter_names = ['uuid', 'deployable_uuid', 'device_uuid',
+                                    'image_uuid', 'hostname', 'state']
+
+        # Filter the query
+        query_prefix = self._exact_filter(models.ProgramJob, query_prefix,
+                                          filters, exact_match_filter_names)
+        if query_prefix is None:
+            return []
+        return _paginate_query(context, models.ProgramJob, limit, marker,
+                               sort_key, sort_dir, query_prefix)
+
+    def program_job_update(self, context, uuid, values):
+        if 'uuid' in values:
+            msg = _("Cannot overwrite UUID for an existing ProgramJob.")
+            raise exception.InvalidParameterValue(err=msg)
+        return self._do_update_program_job(context, uuid, values)
+
+    @oslo_db_api.retry_on_deadlock
+    def _do_update_program_job(self, context, uuid, values):
+        with _session_for_write():
+            query = model_query(context, models.ProgramJob)
+            query = query.filter_by(uuid=uuid)
+            try:
+                ref = query.with_lockmode('update').one()
+            except NoResultFound:
+                raise exception.ProgramJobNotFound(uuid=uuid)
+            ref.update(values)
+        return ref
+
     def _get_quota_usages(self, context, project_id, resources=None):
         # Broken out for testability
         query = model_query(context, models.QuotaUsage,).filter_by(
@@ -81,6 +81,10 @@ class Device(Base):
     std_board_info = Column(Text, nullable=True)
     vendor_board_info = Column(Text, nullable=True)
     hostname = Column(String(255), nullable=False)
+    controlpath_ids = orm.relationship('ControlpathID', backref='device',
+                                       order_by='ControlpathID.id')
+    deployables = orm.relationship('Deployable', backref='device',
+                                   order_by='Deployable.id')
 
 
 class Deployable(Base):
@@ -102,6 +106,10 @@ class Deployable(Base):
     num_accelerators = Column(Integer, nullable=False)
     device_id = Column(Integer, ForeignKey('devices.id', ondelete="RESTRICT"),
                        nullable=False)
+    attributes = orm.relationship('Attribute', backref='deployable',
+                                  order_by='Attribute.id')
+    attach_handles = orm.relationship('AttachHandle', backref='deployable',
+                                      order_by='AttachHandle.id')
 
 
 class Attribute(Base):
@@ -129,6 +137,9 @@ class ControlpathID(Base):
                        nullable=False, index=True)
     cpid_type = Column(Enum('PCI', name='cpid_type'), nullable=False)
     cpid_info = Column(String(255), nullable=False)
+    attach_handles = orm.relationship('AttachHandle',
+                                      backref='controlpath_id',
+                                      order_by='AttachHandle.id')
 
 
 class AttachHandle(Base):
@@ -155,6 +166,44 @@ class AttachHandle(Base):
     attach_info = Column(String(255), nullable=False)
 
 
+class HostFingerprint(Base):
+    """Content hash of the last resource report accepted from a host."""
+
+    __tablename__ = 'host_fingerprints'
+    __table_args__ = (
+        schema.UniqueConstraint('hostname',
+                                name='uniq_host_fingerprints0hostname'),
+        table_args()
+    )
+
+    id = Column(Integer, primary_key=True)
+    hostname = Column(String(255), nullable=False)
+    fingerprint = Column(String(64), nullable=False)
+
+
+class ProgramJob(Base):
+    """A request to program a deployable with the bitstream of an image."""
+
+    __tablename__ = 'program_jobs'
+    __table_args__ = (
+        schema.UniqueConstraint('uuid', name='uniq_program_jobs0uuid'),
+        Index('program_jobs_deployable_uuid_idx', 'deployable_uuid'),
+        Index('program_jobs_hostname_state_idx', 'hostname', 'state'),
+        table_args()
+    )
+
+    id = Column(Integer, primary_key=True)
+    uuid = Column(String(36), nullable=False)
+    deployable_uuid = Column(String(36), nullable=False)
+    device_uuid = Column(String(36), nullable=False)
+    image_uuid = Column(String(36), nullable=False)
+    hostname = Column(String(255), nullable=False)
+    state = Column(Enum('Queued', 'Downloading', 'Verifying', 'Programming',
+                        'Done', 'Failed', name='program_job_state'),
+                   nullable=False, default='Queued')
+    reason = Column(Text, nullable=True)
+
+
 class DeviceProfile(Base):
     """Represents users' specific requirements."""
 
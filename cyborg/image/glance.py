@@ -17,9 +17,12 @@
 
 from __future__ import absolute_import
 
+import collections
+import contextlib
 import copy
+import errno
+import hashlib
 import inspect
-import itertools
 import os
 import random
 import re
@@ -29,15 +32,20 @@ import time
 
 import cryptography
 from cursive import exception as cursive_exception
+import eventlet
+from eventlet import tpool
 from cursive import signature_utils
 import glanceclient
 import glanceclient.exc
 from glanceclient.v2 import schemas
+from keystoneauth1 import adapter as ks_adapter
+from keystoneauth1 import exceptions as ks_exc
 from keystoneauth1 import loading as ks_loading
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
 from oslo_utils import excutils
 from oslo_utils import timeutils
+from oslo_utils import units
 import six
 from six.moves import range
 import six.moves.urllib.parse as urlparse
@@ -45,7 +53,7 @@ import six.moves.urllib.parse as urlparse
 import cyborg.conf
 from cyborg.common import exception
 import cyborg.image.download as image_xfers
-from cyborg import objects
+from cyborg.image import pool
 from cyborg.objects import fields
 from cyborg import service_auth
 from cyborg.common import utils
@@ -55,6 +63,9 @@ LOG = logging.getLogger(__name__)
 CONF = cyborg.conf.CONF
 
 _SESSION = None
+_CLIENTS = None
+
+_CHUNK_SIZE = 64 * units.Ki
 
 
 def _session_and_auth(context):
@@ -70,6 +81,22 @@ def _session_and_auth(context):
     return _SESSION, auth
 
 
+def _client_pool():
+    global _CLIENTS
+
+    if _CLIENTS is None:
+        _CLIENTS = pool.ClientPool(CONF.glance.client_pool_size,
+                                   CONF.glance.client_ttl)
+    return _CLIENTS
+
+
+def _auth_identity(context):
+    """Return the hashable identity of the credentials of a context."""
+    return (getattr(context, 'auth_token', None),
+            getattr(context, 'user_auth_plugin', None),
+            context.user_id, context.project_id)
+
+
 def _glanceclient_from_endpoint(context, endpoint, version):
     sess, auth = _session_and_auth(context)
 
@@ -78,6 +105,31 @@ def _glanceclient_from_endpoint(context, endpoint, version):
                                global_request_id=context.global_id)
 
 
+def _pwrite(fd, data, offset):
+    """Write all the data at an offset of a file, leaving its position."""
+    view = memoryview(data)
+    while view:
+        if hasattr(os, 'pwrite'):
+            written = os.pwrite(fd, view, offset)
+        else:
+            os.lseek(fd, offset, os.SEEK_SET)
+            written = os.write(fd, view)
+        view = view[written:]
+        offset += written
+
+
+def _preallocate(fd, size):
+    """Allocate the blocks of a file of the given size, if supported."""
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError as e:
+            if e.errno not in (errno.EOPNOTSUPP, errno.EINVAL):
+                raise
+    os.ftruncate(fd, size)
+
+
 def generate_glance_url(context):
     """Return a random glance url from the api servers we know about."""
     return next(get_api_servers(context))
@@ -109,7 +161,8 @@ def generate_identity_headers(context, status='Confirmed'):
 
 def get_api_servers(context):
     """Shuffle a list of service endpoints and return an iterator that will
-    cycle through the list, looping around to the beginning if necessary.
+    cycle through the list, looping around to the beginning if necessary,
+    and skipping the endpoints which recently failed.
     """
     # NOTE(efried): utils.get_ksa_adapter().get_endpoint() is the preferred
     # mechanism for endpoint discovery. Only use `api_servers` if you really
@@ -132,7 +185,88 @@ def get_api_servers(context):
             endpoint = re.sub(r'/v\d+(\.\d+)?/?$', '/', endpoint)
         api_servers = [endpoint]
 
-    return itertools.cycle(api_servers)
+    return pool.EndpointRotation(api_servers, CONF.glance.endpoint_cooldown)
+
+
+class _ImageVerifier(object):
+    """Verify the hash and the signature of the data of an image.
+
+    The data is given once and in order to update(), which hashes it and
+    updates the signature verifier with the same buffer. The hash recorded
+    by glance in os_hash_value, or else in checksum, and the signature when
+    [glance]verify_glance_signatures is enabled, are checked by verify().
+
+    :param image_meta: The image as returned by show().
+    """
+
+    def __init__(self, context, image_id, image_meta):
+        self.image_id = image_id
+        self._hasher = None
+        self._expected = None
+        for algorithm, expected in (
+                (image_meta.get('os_hash_algo'),
+                 image_meta.get('os_hash_value')),
+                ('md5', image_meta.get('checksum'))):
+            if algorithm and expected:
+                try:
+                    self._hasher = hashlib.new(algorithm)
+                except ValueError:
+                    LOG.warning("The %(algorithm)s hash of image %(image_id)s "
+                                "is not supported.",
+                                {'algorithm': algorithm, 'image_id': image_id})
+                    continue
+                self._expected = expected
+                break
+        self._signature = None
+        if CONF.glance.verify_glance_signatures:
+            self._signature = self._get_signature_verifier(
+                context, image_meta.get('properties', {}))
+
+    def _get_signature_verifier(self, context, properties):
+        try:
+            return signature_utils.get_verifier(
+                context=context,
+                img_signature_certificate_uuid=properties.get(
+                    'img_signature_certificate_uuid'),
+                img_signature_hash_method=properties.get(
+                    'img_signature_hash_method'),
+                img_signature=properties.get('img_signature'),
+                img_signature_key_type=properties.get(
+                    'img_signature_key_type'),
+            )
+        except cursive_exception.SignatureVerificationError:
+            with excutils.save_and_reraise_exception():
+                LOG.error('Image signature verification failed '
+                          'for image: %s', self.image_id)
+
+    @property
+    def enabled(self):
+        """Whether there is a hash or a signature to check."""
+        return bool(self._hasher or self._signature)
+
+    def update(self, data):
+        """Hash a bytes-like object, a memoryview is not copied."""
+        if self._hasher:
+            self._hasher.update(data)
+        if self._signature:
+            self._signature.update(data)
+
+    def verify(self):
+        """Raise ImageChecksumMismatch or InvalidSignature if not valid."""
+        if self._hasher and self._hasher.hexdigest() != self._expected:
+            LOG.error('Image hash verification failed for image: %s',
+                      self.image_id)
+            raise exception.ImageChecksumMismatch(
+                image_id=self.image_id, algorithm=self._hasher.name)
+        if self._signature:
+            try:
+                self._signature.verify()
+            except cryptography.exceptions.InvalidSignature:
+                with excutils.save_and_reraise_exception():
+                    LOG.error('Image signature verification failed '
+                              'for image: %s', self.image_id)
+            LOG.info('Image signature verification succeeded '
+                     'for image %s', self.image_id)
 
 
 class GlanceClientWrapper(object):
@@ -153,12 +287,26 @@ class GlanceClientWrapper(object):
         self.api_server = str(endpoint)
         return _glanceclient_from_endpoint(context, endpoint, version)
 
-    def _create_onetime_client(self, context, version):
-        """Create a client that will be used for one call."""
+    @contextlib.contextmanager
+    def _get_client(self, context, version):
+        """Lend the static client, or a client of the next API server.
+
+        The clients of the API servers are reused across calls with the
+        same credentials.
+        """
+        if self.client is not None:
+            yield self.api_server, self.client
+            return
         if self.api_servers is None:
             self.api_servers = get_api_servers(context)
-        self.api_server = next(self.api_servers)
-        return _glanceclient_from_endpoint(context, self.api_server, version)
+        endpoint = self.api_server = next(self.api_servers)
+        key = (endpoint, version, _auth_identity(context))
+        with _client_pool().get(
+                key, lambda: _glanceclient_from_endpoint(
+                    context, endpoint, version)) as client:
+            # NOTE: a reused client sends the request id of its last user.
+            client.http_client.global_request_id = context.global_id
+            yield endpoint, client
 
     def call(self, context, version, method, *args, **kwargs):
         """Call a glance client method.  If we get a connection error,
@@ -169,17 +317,20 @@ class GlanceClientWrapper(object):
                       glanceclient.exc.CommunicationError)
         num_attempts = 1 + CONF.glance.num_retries
 
+        controller_name = kwargs.pop('controller', 'images')
         for attempt in range(1, num_attempts + 1):
-            client = self.client or self._create_onetime_client(context,
-                                                                version)
+            endpoint = None
             try:
-                controller = getattr(client,
-                                     kwargs.pop('controller', 'images'))
-                result = getattr(controller, method)(*args, **kwargs)
-                if inspect.isgenerator(result):
-                    # Convert generator results to a list, so that we can
-                    # catch any potential exceptions now and retry the call.
-                    return list(result)
+                with self._get_client(context, version) as (endpoint, client):
+                    controller = getattr(client, controller_name)
+                    result = getattr(controller, method)(*args, **kwargs)
+                    if inspect.isgenerator(result):
+                        # Convert generator results to a list, so that we can
+                        # catch any potential exceptions now and retry the
+                        # call.
+                        result = list(result)
+                if self.client is None:
+                    self.api_servers.succeeded(endpoint)
                 return result
             except retry_excs as e:
                 if attempt < num_attempts:
@@ -190,12 +341,38 @@ class GlanceClientWrapper(object):
                 LOG.exception("Error contacting glance server "
                               "'%(server)s' for '%(method)s', "
                               "%(extra)s.",
-                              {'server': self.api_server,
+                              {'server': endpoint,
                                'method': method, 'extra': extra})
+                if self.client is None:
+                    self.api_servers.failed(endpoint)
                 if attempt == num_attempts:
                     raise exception.GlanceConnectionFailed(
-                        server=str(self.api_server), reason=six.text_type(e))
-                time.sleep(1)
+                        server=str(endpoint), reason=six.text_type(e))
+                # NOTE: another API server is tried right away, the same
+                # one only after a while.
+                if self.client is not None or not self.api_servers.available():
+                    time.sleep(1)
+
+    def get_byte_range(self, context, url, first, last):
+        """Return the response to a GET of a byte range of a glance URL.
+
+        The Range header is sent with the keystoneauth adapter of the glance
+        client, since glanceclient percent-encodes the values of headers.
+        """
+        with self._get_client(context, 2) as (endpoint, client):
+            try:
+                resp = ks_adapter.Adapter.request(
+                    client.http_client, url, 'GET', stream=True,
+                    raise_exc=False,
+                    headers={'Range': 'bytes=%d-%d' % (first, last)})
+            except ks_exc.ConnectionError as e:
+                if self.client is None:
+                    self.api_servers.failed(endpoint)
+                raise exception.GlanceConnectionFailed(
+                    server=str(endpoint), reason=six.text_type(e))
+        if not resp.ok:
+            raise glanceclient.exc.from_response(resp, resp.content)
+        return resp
 
 
 class GlanceImageServiceV2(object):
@@ -238,10 +415,153 @@ class GlanceImageServiceV2(object):
         if not any(check(mode) for check in (stat.S_ISFIFO, stat.S_ISSOCK)):
             os.fsync(fileno)
 
+    def show(self, context, image_id, include_locations=False,
+             show_deleted=True):
+        """Returns a dict with image data for the given opaque image id.
+
+        :param context: The context object to pass to image client
+        :param image_id: The UUID of the image
+        :param include_locations: (Optional) include locations in the returned
+                                  dict of information if the image service API
+                                  supports it. If the image service API does
+                                  not support the locations attribute, it will
+                                  still be included in the returned dict, as an
+                                  empty list.
+        :param show_deleted: (Optional) show the image even the status of
+                             image is deleted.
+        """
+        try:
+            image = self._client.call(context, 2, 'get', image_id)
+        except Exception:
+            _reraise_translated_image_exception(image_id)
+
+        if not show_deleted and getattr(image, 'deleted', False):
+            raise exception.ImageNotFound(image_id=image_id)
+
+        if not _is_image_available(context, image):
+            raise exception.ImageNotFound(image_id=image_id)
+
+        image = _translate_from_glance(image,
+                                       include_locations=include_locations)
+        if include_locations:
+            locations = image.get('locations', None) or []
+            du = image.get('direct_url', None)
+            if du:
+                locations.append({'url': du, 'metadata': {}})
+            image['locations'] = locations
+
+        return image
+
+    def _fetch_range(self, context, image_id, fd, first, last):
+        """Write a byte range of the data of an image at its offset in fd."""
+        url = '/v2/images/%s/file' % image_id
+        try:
+            resp = self._client.get_byte_range(context, url, first, last)
+        except exception.GlanceConnectionFailed as e:
+            raise exception.ImageDownloadFailed(image_id=image_id,
+                                                reason=six.text_type(e))
+        except Exception:
+            _reraise_translated_image_exception(image_id)
+        with contextlib.closing(resp):
+            if resp.status_code != 206:
+                raise exception.ImageDownloadFailed(
+                    image_id=image_id, reason='byte ranges are not supported')
+            position = first
+            for chunk in resp.iter_content(_CHUNK_SIZE):
+                _pwrite(fd, chunk, position)
+                position += len(chunk)
+        if position != last + 1:
+            raise exception.ImageDownloadFailed(
+                image_id=image_id, reason='got %d bytes of the range %d-%d' % (
+                    position - first, first, last))
+
+    def _download_ranges(self, context, image_id, size, dst_path, verifier):
+        """Download the data of an image in byte ranges fetched in parallel.
+
+        The ranges are written at their offset in dst_path, preallocated to
+        the size of the image. They are read back in order by the verifier,
+        so that it sees the bytes in order, unless it has nothing to check.
+
+        :raises: ImageDownloadFailed if glance does not serve byte ranges.
+        """
+        range_size = CONF.glance.parallel_download_range_size * units.Mi
+        pool = eventlet.GreenPool(CONF.glance.parallel_download_workers)
+        fetching = collections.deque()
+
+        def fetch(first):
+            try:
+                self._fetch_range(context, image_id, fd, first,
+                                  min(first + range_size, size) - 1)
+            except Exception as e:
+                return e
+
+        # NOTE: the ranges are read back into the same buffer, whose views
+        # are given to the verifier without copying them.
+        buf = bytearray(_CHUNK_SIZE)
+        view = memoryview(buf)
+
+        def verify(end):
+            while reader.tell() < end:
+                read = reader.readinto(
+                    view[:min(_CHUNK_SIZE, end - reader.tell())])
+                verifier.update(view[:read])
+
+        def verify_fetched(wait=False):
+            # NOTE: a range is only verified once the ranges before it are,
+            # the verifier reads them back in order from the file. It runs
+            # in a native thread, for the hashing not to hold up the fetches.
+            while fetching and (wait or fetching[0].dead):
+                error = fetching.popleft().wait()
+                if error is not None:
+                    raise error
+                if reader is not None:
+                    tpool.execute(verify,
+                                  min(reader.tell() + range_size, size))
+
+        fd = os.open(dst_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        reader = open(dst_path, 'rb', 0) if verifier.enabled else None
+        try:
+            _preallocate(fd, size)
+            for first in range(0, size, range_size):
+                fetching.append(pool.spawn(fetch, first))
+                verify_fetched()
+            verify_fetched(wait=True)
+            os.fsync(fd)
+            verifier.verify()
+        except (cryptography.exceptions.InvalidSignature,
+                exception.ImageChecksumMismatch):
+            with excutils.save_and_reraise_exception():
+                os.ftruncate(fd, 0)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                for thread in fetching:
+                    thread.kill()
+        finally:
+            os.close(fd)
+            if reader is not None:
+                reader.close()
+
+    def _get_transfer_module(self, scheme):
+        try:
+            return self._download_handlers[scheme]
+        except KeyError:
+            return None
+        except Exception:
+            LOG.error("Failed to instantiate the download handler "
+                      "for %(scheme)s", {'scheme': scheme})
+        return
+
     def download(self, context, image_id, data=None, dst_path=None):
-        """Calls out to Glance for data and writes data."""
+        """Calls out to Glance for data and writes data.
+
+        The image record is fetched once, for the direct URLs, the size and
+        the verification of the hash and signature of the data, which is
+        done while the data is written.
+        """
+        image = self.show(
+            context, image_id,
+            include_locations=bool(CONF.glance.allowed_direct_url_schemes))
         if CONF.glance.allowed_direct_url_schemes and dst_path is not None:
-            image = self.show(context, image_id, include_locations=True)
             for entry in image.get('locations', []):
                 loc_url = entry['url']
                 loc_meta = entry['metadata']
@@ -255,8 +575,26 @@ class GlanceImageServiceV2(object):
                     except Exception:
                         LOG.exception("Download image error")
 
+        verifier = _ImageVerifier(context, image_id, image)
+        range_size = CONF.glance.parallel_download_range_size * units.Mi
+        if (CONF.glance.parallel_download_workers > 1 and
+                dst_path is not None and data is None and
+                (image.get('size') or 0) > range_size):
+            try:
+                self._download_ranges(context, image_id, image['size'],
+                                      dst_path, verifier)
+                return
+            except exception.ImageDownloadFailed as e:
+                LOG.warning("Downloading image %(image_id)s as a single "
+                            "stream: %(reason)s",
+                            {'image_id': image_id, 'reason': e})
+                verifier = _ImageVerifier(context, image_id, image)
+
         try:
-            image_chunks = self._client.call(context, 2, 'data', image_id)
+            # NOTE: the data is verified here, with the image record already
+            # fetched, glanceclient would fetch it again.
+            image_chunks = self._client.call(context, 2, 'data', image_id,
+                                             do_checksum=False)
         except Exception:
             _reraise_translated_image_exception(image_id)
 
@@ -267,85 +605,44 @@ class GlanceImageServiceV2(object):
                                               reason='Image has no \
                                               associated data')
 
-        # Retrieve properties for verification of Glance image signature
-        verifier = None
-        if CONF.glance.verify_glance_signatures:
-            image_meta_dict = self.show(context, image_id,
-                                        include_locations=False)
-            image_meta = objects.ImageMeta.from_dict(image_meta_dict)
-            img_signature = image_meta.properties.get('img_signature')
-            img_sig_hash_method = image_meta.properties.get(
-                'img_signature_hash_method'
-            )
-            img_sig_cert_uuid = image_meta.properties.get(
-                'img_signature_certificate_uuid'
-            )
-            img_sig_key_type = image_meta.properties.get(
-                'img_signature_key_type'
-            )
-            try:
-                verifier = signature_utils.get_verifier(
-                    context=context,
-                    img_signature_certificate_uuid=img_sig_cert_uuid,
-                    img_signature_hash_method=img_sig_hash_method,
-                    img_signature=img_signature,
-                    img_signature_key_type=img_sig_key_type,
-                )
-            except cursive_exception.SignatureVerificationError:
-                with excutils.save_and_reraise_exception():
-                    LOG.error('Image signature verification failed '
-                              'for image: %s', image_id)
-
         close_file = False
         if data is None and dst_path:
             data = open(dst_path, 'wb')
             close_file = True
 
         if data is None:
+            return _verified_chunks(image_chunks, verifier)
 
-            # Perform image signature verification
-            if verifier:
-                try:
-                    for chunk in image_chunks:
-                        verifier.update(chunk)
-                    verifier.verify()
-
-                    LOG.info('Image signature verification succeeded '
-                             'for image: %s', image_id)
-
-                except cryptography.exceptions.InvalidSignature:
-                    with excutils.save_and_reraise_exception():
-                        LOG.error('Image signature verification failed '
-                                  'for image: %s', image_id)
-            return image_chunks
-        else:
-            try:
-                for chunk in image_chunks:
-                    if verifier:
-                        verifier.update(chunk)
-                    data.write(chunk)
-                if verifier:
-                    verifier.verify()
-                    LOG.info('Image signature verification succeeded '
-                             'for image %s', image_id)
-            except cryptography.exceptions.InvalidSignature:
+        try:
+            for chunk in image_chunks:
+                verifier.update(chunk)
+                data.write(chunk)
+            verifier.verify()
+        except (cryptography.exceptions.InvalidSignature,
+                exception.ImageChecksumMismatch):
+            with excutils.save_and_reraise_exception():
                 data.truncate(0)
-                with excutils.save_and_reraise_exception():
-                    LOG.error('Image signature verification failed '
-                              'for image: %s', image_id)
-            except Exception as ex:
-                with excutils.save_and_reraise_exception():
-                    LOG.error("Error writing to %(path)s: %(exception)s",
-                              {'path': dst_path, 'exception': ex})
-            finally:
-                if close_file:
-                    # Ensure that the data is pushed all the way down to
-                    # persistent storage. This ensures that in the event of a
-                    # subsequent host crash we don't have running instances
-                    # using a corrupt backing file.
-                    data.flush()
-                    self._safe_fsync(data)
-                    data.close()
+        except Exception as ex:
+            with excutils.save_and_reraise_exception():
+                LOG.error("Error writing to %(path)s: %(exception)s",
+                          {'path': dst_path, 'exception': ex})
+        finally:
+            if close_file:
+                # Ensure that the data is pushed all the way down to
+                # persistent storage. This ensures that in the event of a
+                # subsequent host crash we don't have running instances
+                # using a corrupt backing file.
+                data.flush()
+                self._safe_fsync(data)
+                data.close()
+
+
+def _verified_chunks(image_chunks, verifier):
+    """Yield the chunks of an image, verified once they are all read."""
+    for chunk in image_chunks:
+        verifier.update(chunk)
+        yield chunk
+    verifier.verify()
 
 
 def _extract_query_params(params):
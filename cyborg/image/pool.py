@@ -0,0 +1,156 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""The glance clients reused across calls, and the glance API servers used.
+
+A glance client is bound to an endpoint and to the credentials of a
+context, and fetches the image schema once. ClientPool keeps the idle
+clients of each endpoint and credentials for a limited time, instead of
+creating a client per call.
+
+EndpointRotation goes round the glance API servers, skipping the ones
+which recently failed for a cool-down period.
+"""
+
+import collections
+import contextlib
+import threading
+import time
+
+from oslo_log import log as logging
+
+LOG = logging.getLogger(__name__)
+
+# The time until which each failed endpoint is skipped, shared by the
+# rotations of all the clients of the process.
+_COOLDOWNS = {}
+
+
+class ClientPool(object):
+    """A LRU pool of the idle clients of each key.
+
+    A client is lent to one caller at a time, and is not reused once ttl
+    seconds passed since its creation.
+
+    :param size: The maximum number of idle clients kept, 0 disables the
+                 pool.
+    :param ttl: The number of seconds a client is reused for.
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        # The idle clients of each key with their expiration time, the
+        # least recently used key first.
+        self._idle = collections.OrderedDict()
+        self._count = 0
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def _checkout(self, key):
+        with self._lock:
+            clients = self._idle.get(key)
+            while clients:
+                expires, client = clients.pop()
+                self._count -= 1
+                if time.time() < expires:
+                    if not clients:
+                        del self._idle[key]
+                    self.reused += 1
+                    return expires, client
+            self._idle.pop(key, None)
+            self.created += 1
+            return None, None
+
+    def _checkin(self, key, expires, client):
+        if time.time() >= expires:
+            return
+        with self._lock:
+            clients = self._idle.pop(key, collections.deque())
+            clients.append((expires, client))
+            self._idle[key] = clients
+            self._count += 1
+            while self._count > self.size:
+                oldest = next(iter(self._idle))
+                self._idle[oldest].popleft()
+                self._count -= 1
+                if not self._idle[oldest]:
+                    del self._idle[oldest]
+
+    @contextlib.contextmanager
+    def get(self, key, create):
+        """Lend an idle client of a key, or a new one.
+
+        The client is not reused if the caller raises, since it may be the
+        cause of the error.
+
+        :param key: The hashable key of the client.
+        :param create: The function returning a new client.
+        """
+        expires, client = self._checkout(key)
+        if client is None:
+            expires, client = time.time() + self.ttl, create()
+        yield client
+        self._checkin(key, expires, client)
+
+    def clear(self):
+        with self._lock:
+            self._idle.clear()
+            self._count = 0
+
+
+class EndpointRotation(object):
+    """An iterator going round endpoints, skipping the ones cooling down.
+
+    When all the endpoints are cooling down, the one whose cool-down ends
+    first is returned.
+
+    :param endpoints: The endpoints, in the order they are used.
+    :param cooldown: The number of seconds a failed endpoint is skipped.
+    """
+
+    def __init__(self, endpoints, cooldown):
+        self.endpoints = list(endpoints)
+        self.cooldown = cooldown
+        self._next = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        now = time.time()
+        for _i in range(len(self.endpoints)):
+            endpoint = self.endpoints[self._next]
+            self._next = (self._next + 1) % len(self.endpoints)
+            if _COOLDOWNS.get(endpoint, 0) <= now:
+                return endpoint
+        return min(self.endpoints, key=lambda e: _COOLDOWNS.get(e, 0))
+
+    next = __next__
+
+    def available(self):
+        """Whether an endpoint is not cooling down."""
+        now = time.time()
+        return any(_COOLDOWNS.get(endpoint, 0) <= now
+                   for endpoint in self.endpoints)
+
+    def failed(self, endpoint):
+        """Skip an endpoint for the cool-down period."""
+        if self.cooldown:
+            LOG.warning("Not using the glance API server %(endpoint)s for "
+                        "%(cooldown)d seconds.",
+                        {'endpoint': endpoint, 'cooldown': self.cooldown})
+            _COOLDOWNS[endpoint] = time.time() + self.cooldown
+
+    def succeeded(self, endpoint):
+        _COOLDOWNS.pop(endpoint, None)
@@ -64,6 +64,17 @@ class Attribute(base.CyborgObject, object_base.VersionedObjectDictCompat):
                                                            deployable_id)
         return cls._from_db_object_list(db_attr, context)
 
+    @classmethod
+    def get_by_deployable_ids(cls, context, deployable_ids):
+        """Get the attributes of many deployables in one go.
+
+        :returns: a dict mapping each deployable id to its attribute list.
+        """
+        db_attrs = cls.dbapi.attribute_get_by_deployable_ids(context,
+                                                             deployable_ids)
+        return dict((dep_id, cls._from_db_object_list(db_attr_list, context))
+                    for dep_id, db_attr_list in db_attrs.items())
+
     @classmethod
     def get_by_filter(cls, context, filters):
         """Get a attribute by specified filters"""
@@ -15,7 +15,10 @@
 
 """Cyborg common internal object model"""
 
+import hashlib
+
 import netaddr
+from oslo_serialization import jsonutils
 from oslo_utils import versionutils
 from oslo_versionedobjects import base as object_base
 
@@ -178,6 +181,32 @@ def obj_equal_prims(obj_1, obj_2, ignore=None):
     return prim_1 == prim_2
 
 
+def obj_fingerprint(objs):
+    """Return a stable content hash of a list of objects.
+
+    The hash only depends on the fields which are set. Lists, at any level,
+    are hashed regardless of their order, so the same devices discovered in
+    a different order give the same fingerprint.
+    :param:objs: A list of objects, such as driver-side devices.
+    :returns: The hex sha256 digest of the objects.
+    """
+
+    def _dumps(prim):
+        return jsonutils.dumps(prim, sort_keys=True)
+
+    def _canonical(prim):
+        if isinstance(prim, CyborgObject):
+            prim = obj_to_primitive(prim)
+        if isinstance(prim, dict):
+            return dict((k, _canonical(v)) for k, v in prim.items())
+        if isinstance(prim, (list, tuple)):
+            return sorted((_canonical(v) for v in prim), key=_dumps)
+        return prim
+
+    prims = _canonical(objs)
+    return hashlib.sha256(_dumps(prims).encode('utf-8')).hexdigest()
+
+
 class DriverObjectBase(CyborgObject):
     @staticmethod
     def _from_db_object(obj, db_obj):
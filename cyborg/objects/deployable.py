@@ -71,10 +71,7 @@ class Deployable(base.CyborgObject, object_base.VersionedObjectDictCompat):
         obj_dep = cls._from_db_object(cls(context), db_dep)
         # retrieve all the attributes for this deployable
         if with_attribute_list:
-            query = {"deployable_id": obj_dep.id}
-            attr_get_list = Attribute.get_by_filter(context,
-                                                    query)
-            obj_dep.attributes_list = attr_get_list
+            cls.load_attributes(context, [obj_dep])
 
         obj_dep.obj_reset_changes()
         return obj_dep
@@ -103,11 +100,7 @@ class Deployable(base.CyborgObject, object_base.VersionedObjectDictCompat):
         else:
             db_deps = cls.dbapi.deployable_list(context)
         obj_dpl_list = cls._from_db_object_list(db_deps, context)
-        for obj_dpl in obj_dpl_list:
-            query = {"deployable_id": obj_dpl.id}
-            attr_get_list = Attribute.get_by_filter(context,
-                                                    query)
-            obj_dpl.attributes_list = attr_get_list
+        cls.load_attributes(context, obj_dpl_list)
         return obj_dpl_list
 
     def save(self, context):
@@ -116,10 +109,7 @@ class Deployable(base.CyborgObject, object_base.VersionedObjectDictCompat):
         db_dep = self.dbapi.deployable_update(context, self.uuid, updates)
         self.obj_reset_changes()
         self._from_db_object(self, db_dep)
-        query = {"deployable_id": self.id}
-        attr_get_list = Attribute.get_by_filter(context,
-                                                query)
-        self.attributes_list = attr_get_list
+        self.load_attributes(context, [self])
 
     def destroy(self, context):
         """Delete a Deployable from the DB."""
@@ -173,16 +163,21 @@ class Deployable(base.CyborgObject, object_base.VersionedObjectDictCompat):
             filters)
 
         if db_dpl_list:
-            for db_dpl in db_dpl_list:
-                obj_dpl = cls._from_db_object(cls(context), db_dpl)
-                query = {"deployable_id": obj_dpl.id}
-                attr_get_list = Attribute.get_by_filter(context,
-                                                        query)
-                obj_dpl.attributes_list = attr_get_list
-                obj_dpl_list.append(obj_dpl)
+            obj_dpl_list = cls._from_db_object_list(db_dpl_list, context)
+            cls.load_attributes(context, obj_dpl_list)
 
         return obj_dpl_list
 
+    @classmethod
+    def load_attributes(cls, context, obj_dpl_list):
+        """Set the attributes_list of many deployables with one query."""
+        if not obj_dpl_list:
+            return
+        attrs = Attribute.get_by_deployable_ids(
+            context, [obj_dpl.id for obj_dpl in obj_dpl_list])
+        for obj_dpl in obj_dpl_list:
+            obj_dpl.attributes_list = attrs[obj_dpl.id]
+
     @staticmethod
     def _from_db_object(obj, db_obj):
         """Converts a deployable to a formal object.
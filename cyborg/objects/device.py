@@ -16,6 +16,7 @@
 from oslo_log import log as logging
 from oslo_versionedobjects import base as object_base
 
+from cyborg.common import exception
 from cyborg.db import api as dbapi
 from cyborg.objects import base
 from cyborg.objects import fields as object_fields
@@ -87,6 +88,14 @@ class Device(base.CyborgObject, object_base.VersionedObjectDictCompat):
         self.dbapi.device_delete(context, self.uuid)
         self.obj_reset_changes()
 
+    @classmethod
+    def get_by_device_id(cls, context, device_id):
+        """Find a DB Device by its ID and return an Obj Device."""
+        device_obj_list = Device.list(context, {'id': device_id})
+        if not device_obj_list:
+            raise exception.DeviceNotFound(uuid=device_id)
+        return device_obj_list[0]
+
     @classmethod
     def get_list_by_hostname(cls, context, hostname):
         """get device object list from the hostname. return [] if not
@@ -54,6 +54,12 @@ class DriverAttachHandle(base.DriverObjectBase,
         if ah_obj is not None:
             ah_obj.destroy(context)
 
+    @classmethod
+    def from_db_model(cls, context, db_ah):
+        """Form a driver-side attach_handle from an attach_handle DB row."""
+        return cls(context=context, attach_type=db_ah.attach_type,
+                   attach_info=db_ah.attach_info, in_use=db_ah.in_use)
+
     @classmethod
     def list(cls, context, deployable_id):
         """Form a driver-side attach_handle list for one deployable."""
@@ -14,6 +14,7 @@
 #    under the License.
 
 from oslo_versionedobjects import base as object_base
+from cyborg.db import api as dbapi
 from cyborg.objects import base
 from cyborg.objects import fields as object_fields
 from cyborg.objects.attribute import Attribute
@@ -25,6 +26,8 @@ class DriverAttribute(base.DriverObjectBase,
     # Version 1.0: Initial version
     VERSION = '1.0'
 
+    dbapi = dbapi.get_instance()
+
     fields = {
         'key': object_fields.StringField(nullable=False),
         'value': object_fields.StringField(nullable=False)
@@ -41,9 +44,12 @@ class DriverAttribute(base.DriverObjectBase,
     @classmethod
     def destroy(cls, context, deployable_id):
         """Delete driver-side attribute list from the DB."""
-        attr_obj_list = Attribute.get_by_deployable_id(context, deployable_id)
-        for attr_obj in attr_obj_list:
-            attr_obj.destroy(context)
+        cls.dbapi.attribute_delete_by_deployable_ids(context, [deployable_id])
+
+    @classmethod
+    def from_db_model(cls, context, db_attr):
+        """Form a driver-side attribute from an attribute DB row."""
+        return cls(context=context, key=db_attr.key, value=db_attr.value)
 
     @classmethod
     def list(cls, context, deployable_id):
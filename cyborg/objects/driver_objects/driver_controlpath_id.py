@@ -48,6 +48,12 @@ class DriverControlPathID(base.DriverObjectBase,
         if cpid_obj is not None:
             cpid_obj.destroy(context)
 
+    @classmethod
+    def from_db_model(cls, context, db_cpid):
+        """Form a driver-side controlpath_id from a controlpath_id DB row."""
+        return cls(context=context, cpid_type=db_cpid.cpid_type,
+                   cpid_info=db_cpid.cpid_info)
+
     @classmethod
     def get(cls, context, device_id):
         # return None when can't found any.
@@ -0,0 +1,103 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Delta encoding of driver-side device lists.
+
+A delta is a dict holding the format ``version``, the fingerprint of the
+device list it applies to (``base``), the fingerprint of the resulting list
+(``fingerprint``) and a list of ``ops``. Each op is a dict with:
+
+* ``op``: one of 'add', 'remove' or 'modify'.
+* ``type``: the table of the element, one of 'devices', 'deployables',
+  'attributes' or 'attach_handles'.
+* ``key``: the identity path of the element, e.g. ``[cpid_info, name,
+  attach_info]`` for an attach handle.
+* ``object``: for 'add', the driver object with its whole subtree.
+* ``values``: for 'modify', the changed fields and their new values.
+"""
+
+DELTA_VERSION = '1.0'
+
+# Fields of a reported element which can change without changing its
+# identity.
+MODIFY_FIELDS = {
+    'devices': ('std_board_info', 'vendor', 'vendor_board_info', 'model',
+                'type'),
+    'deployables': ('num_accelerators',),
+    'attributes': ('value',),
+    'attach_handles': ('in_use', 'attach_type'),
+}
+
+# Child tables of an element: (table, list field, identity field).
+_CHILDREN = {
+    'devices': (('deployables', 'deployable_list', 'name'),),
+    'deployables': (('attributes', 'attribute_list', 'key'),
+                    ('attach_handles', 'attach_handle_list', 'attach_info')),
+}
+
+
+def _get_field(obj, field, default=None):
+    if obj.obj_attr_is_set(field):
+        return getattr(obj, field)
+    return default
+
+
+def _device_identity(driver_dev):
+    return driver_dev.controlpath_id.cpid_info
+
+
+def modified_values(table, old_obj, new_obj):
+    """Return the fields of new_obj which differ from old_obj."""
+    values = {}
+    for field in MODIFY_FIELDS[table]:
+        if not new_obj.obj_attr_is_set(field):
+            continue
+        value = getattr(new_obj, field)
+        if _get_field(old_obj, field) != value:
+            values[field] = value
+    return values
+
+
+def _diff(ops, table, path, old_objs, new_objs, identity):
+    old = dict((identity(obj), obj) for obj in old_objs)
+    new = dict((identity(obj), obj) for obj in new_objs)
+    for key in old:
+        if key not in new:
+            ops.append({'op': 'remove', 'type': table, 'key': path + [key]})
+    for key, obj in new.items():
+        if key not in old:
+            ops.append({'op': 'add', 'type': table, 'key': path + [key],
+                        'object': obj})
+            continue
+        values = modified_values(table, old[key], obj)
+        if values:
+            ops.append({'op': 'modify', 'type': table, 'key': path + [key],
+                        'values': values})
+        for child_table, field, child_identity in _CHILDREN.get(table, ()):
+            _diff(ops, child_table, path + [key],
+                  _get_field(old[key], field, []), _get_field(obj, field, []),
+                  lambda child, f=child_identity: getattr(child, f))
+
+
+def make_delta(old_list, new_list, base, fingerprint):
+    """Compute the delta turning a driver device list into another one.
+
+    :param old_list: the device list last accepted by the conductor.
+    :param new_list: the device list discovered now.
+    :param base: fingerprint of old_list.
+    :param fingerprint: fingerprint of new_list.
+    :returns: a delta dict as described in the module docstring.
+    """
+    ops = []
+    _diff(ops, 'devices', [], old_list, new_list, _device_identity)
+    return {'version': DELTA_VERSION, 'base': base,
+            'fingerprint': fingerprint, 'ops': ops}
@@ -14,6 +14,7 @@
 #    under the License.
 
 from oslo_versionedobjects import base as object_base
+from cyborg.db import api as dbapi
 from cyborg.objects import base
 from cyborg.objects import fields as object_fields
 from cyborg.objects.driver_objects.driver_attribute import DriverAttribute
@@ -29,6 +30,8 @@ class DriverDeployable(base.DriverObjectBase,
     # Version 1.0: Initial version
     VERSION = '1.0'
 
+    dbapi = dbapi.get_instance()
+
     fields = {
         'name': object_fields.StringField(nullable=False),
         'num_accelerators': object_fields.IntegerField(nullable=False),
@@ -45,23 +48,34 @@ class DriverDeployable(base.DriverObjectBase,
         stored in seperate db tables: deployable & attach_handle &
         attribute table."""
 
-        # first store in deployable table through Deployable Object.
-        deployable_obj = Deployable(context=context,
-                                    name=self.name,
-                                    num_accelerators=self.num_accelerators,
-                                    device_id=device_id
-                                    )
-        deployable_obj.create(context)
-        # create attribute_list for this deployable
-        if hasattr(self, 'attribute_list'):
-            for driver_attr in self.attribute_list:
-                driver_attr.create(context, deployable_obj.id)
+        # store the deployable, its attributes and attach handles in one
+        # transaction with bulk inserts.
+        values, attributes, attach_handles = self.tree_values()
+        values['device_id'] = device_id
+        self.dbapi.deployable_tree_create(
+            context, values, attributes,
+            [dict(ah, cpid_id=cpid_id) for ah in attach_handles])
+
+    def tree_values(self):
+        """Return the DB values of this deployable and of its children.
 
-        # create attach_handle_list for this deployable
-        if hasattr(self, 'attach_handle_list'):
-            for driver_attach_handle in self.attach_handle_list:
-                driver_attach_handle.create(context, deployable_obj.id,
-                                            cpid_id)
+        :returns: a (values, attributes, attach_handles) tuple as taken by
+        the deployable_tree_create DB API, without the foreign keys.
+        """
+        values = {'name': self.name,
+                  'num_accelerators': self.num_accelerators}
+        attributes = []
+        if self.obj_attr_is_set('attribute_list'):
+            attributes = [{'key': driver_attr.key,
+                           'value': driver_attr.value}
+                          for driver_attr in self.attribute_list]
+        attach_handles = []
+        if self.obj_attr_is_set('attach_handle_list'):
+            attach_handles = [{'attach_type': driver_ah.attach_type,
+                               'attach_info': driver_ah.attach_info,
+                               'in_use': driver_ah.in_use}
+                              for driver_ah in self.attach_handle_list]
+        return values, attributes, attach_handles
 
     def destroy(self, context, device_id):
         """delete one driver-side deployable by calling existing Deployable
@@ -71,33 +85,29 @@ class DriverDeployable(base.DriverObjectBase,
         # get deployable_id by name, get only one value.
         dep_obj = Deployable.get_by_name_deviceid(context, self.name,
                                                   device_id)
-        # delete attach_handle
-        if hasattr(self, 'attach_handle_list'):
-            for driver_ah_obj in self.attach_handle_list:
-                # get attach_handle_obj, exist and only one.
-                driver_ah_obj.destroy(context, dep_obj.id)
-        # delete attribute_list
-        if hasattr(self, 'attribute_list'):
-            DriverAttribute.destroy(context, dep_obj.id)
-        # delete dep_obj
+        # delete the deployable with its attach handles and attributes
         if dep_obj is not None:
-            dep_obj.destroy(context)
+            self.dbapi.deployable_tree_delete(context, [dep_obj.id])
+
+    @classmethod
+    def from_db_model(cls, context, db_dep):
+        """Form a driver-side Deployable from a deployable DB row whose
+        attributes and attach_handles are loaded."""
+        return cls(context=context,
+                   name=db_dep.name,
+                   num_accelerators=db_dep.num_accelerators,
+                   attribute_list=[
+                       DriverAttribute.from_db_model(context, db_attr)
+                       for db_attr in db_dep.attributes],
+                   attach_handle_list=[
+                       DriverAttachHandle.from_db_model(context, db_ah)
+                       for db_ah in db_dep.attach_handles])
 
     @classmethod
     def list(cls, context, device_id):
         """Form driver-side Deployable object list from DB for one device."""
-        # get deployable_obj_list for one device_id
-        dep_obj_list = Deployable.get_list_by_device_id(context, device_id)
-        driver_dep_obj_list = []
-        for dep_obj in dep_obj_list:
-            # get driver_ah_obj_list for this dep_obj
-            driver_ah_obj_list = DriverAttachHandle.list(context, dep_obj.id)
-            # get driver_attr_obj_list fro this dep_obj
-            driver_attr_obj_list = DriverAttribute.list(context, dep_obj.id)
-            driver_dep_obj = cls(context=context,
-                                 name=dep_obj.name,
-                                 num_accelerators=dep_obj.num_accelerators,
-                                 attribute_list=driver_attr_obj_list,
-                                 attach_handle_list=driver_ah_obj_list)
-            driver_dep_obj_list.append(driver_dep_obj)
-        return driver_dep_obj_list
+        # load the deployables of the device with their attributes and
+        # attach handles in a fixed number of queries.
+        db_deps = cls.dbapi.deployable_tree_get_by_device_id(context,
+                                                             device_id)
+        return [cls.from_db_model(context, db_dep) for db_dep in db_deps]
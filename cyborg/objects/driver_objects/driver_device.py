@@ -14,6 +14,7 @@
 #    under the License.
 
 from oslo_versionedobjects import base as object_base
+from cyborg.db import api as dbapi
 from cyborg.objects import base
 from cyborg.objects import fields as object_fields
 from cyborg.objects.driver_objects.driver_deployable import DriverDeployable
@@ -31,6 +32,8 @@ class DriverDevice(base.DriverObjectBase,
     # Version 1.0: Initial version
     VERSION = '1.0'
 
+    dbapi = dbapi.get_instance()
+
     fields = {
         'vendor': object_fields.StringField(nullable=False),
         'model': object_fields.StringField(nullable=False),
@@ -53,42 +56,31 @@ class DriverDevice(base.DriverObjectBase,
         """Create a driver-side Device Object into DB. This object will be
         stored in many db tables: device, deployable, attach_handle,
         controlpath_id etc. by calling related Object."""
-        # first store in device table through Device Object.
-
-        device_obj = Device(context=context,
-                            type=self.type,
-                            vendor=self.vendor,
-                            model=self.model,
-                            hostname=host
-                            )
-        if hasattr(self, 'std_board_info'):
-            device_obj.std_board_info = self.std_board_info
-        if hasattr(self, 'vendor_board_info'):
-            device_obj.vendor_board_info = self.vendor_board_info
-        device_obj.create(context)
-
-        # for the controlpath_id, call driver_controlpath_id to create.
-        cpid_obj = self.controlpath_id.create(context, device_obj.id)
-        # for deployable_list, call internal layer object: driver_deployable
-        # to create.
-        for driver_deployable in self.deployable_list:
-            driver_deployable.create(context, device_obj.id, cpid_obj.id)
+        # the whole subtree is stored in one transaction, attributes and
+        # attach handles with bulk inserts.
+        values = {'type': self.type,
+                  'vendor': self.vendor,
+                  'model': self.model,
+                  'hostname': host}
+        for field in ('std_board_info', 'vendor_board_info'):
+            if self.obj_attr_is_set(field):
+                values[field] = getattr(self, field)
+        cpid_values = {'cpid_type': self.controlpath_id.cpid_type,
+                       'cpid_info': self.controlpath_id.cpid_info}
+        self.dbapi.device_tree_create(
+            context, values, cpid_values,
+            [driver_deployable.tree_values()
+             for driver_deployable in self.deployable_list])
 
     def destroy(self, context, host):
         """Delete a driver-side Device Object from db. This should
         delete the internal layer objects."""
         # get dev_obj_list from hostname
         device_obj = self.get_device_obj(context, host)
-        # delete deployable_list first.
-        for driver_deployable in self.deployable_list:
-            driver_deployable.destroy(context, device_obj.id)
-        if hasattr(self.controlpath_id, 'cpid_info'):
-            cpid_obj = ControlpathID.get_by_device_id_cpidinfo(
-                context, device_obj.id, self.controlpath_id.cpid_info)
-            # delete controlpath_id
-            cpid_obj.destroy(context)
-        # delete the device
-        device_obj.destroy(context)
+        # delete the device with its controlpath_id and deployables using
+        # bulk deletes in one transaction.
+        if device_obj is not None:
+            self.dbapi.device_tree_delete(context, device_obj.id)
 
     def get_device_obj(self, context, host):
         """
@@ -115,21 +107,23 @@ class DriverDevice(base.DriverObjectBase,
         the case some of controlpath_id can't store successfully but its
         devices stores successfully.
         )"""
-        # get dev_obj_list from hostname
-        dev_obj_list = Device.get_list_by_hostname(context, host)
+        # load the whole tree of the host in a fixed number of queries.
+        db_devs = cls.dbapi.host_tree_get(context, host)
         driver_dev_obj_list = []
-        for dev_obj in dev_obj_list:
-            cpid = DriverControlPathID.get(context, dev_obj.id)
+        for db_dev in db_devs:
             # NOTE: will not return device without controlpath_id.
-            if cpid is not None:
+            if db_dev.controlpath_ids:
+                cpid = DriverControlPathID.from_db_model(
+                    context, db_dev.controlpath_ids[0])
                 driver_dev_obj = \
-                    cls(context=context, vendor=dev_obj.vendor,
-                        model=dev_obj.model, type=dev_obj.type,
-                        std_board_info=dev_obj.std_board_info,
-                        vendor_board_info=dev_obj.vendor_board_info,
+                    cls(context=context, vendor=db_dev.vendor,
+                        model=db_dev.model, type=db_dev.type,
+                        std_board_info=db_dev.std_board_info,
+                        vendor_board_info=db_dev.vendor_board_info,
                         controlpath_id=cpid,
-                        deployable_list=DriverDeployable.list(context,
-                                                              dev_obj.id)
+                        deployable_list=[
+                            DriverDeployable.from_db_model(context, db_dep)
+                            for db_dep in db_dev.deployables]
                         )
                 driver_dev_obj_list.append(driver_dev_obj)
         return driver_dev_obj_list
@@ -44,5 +44,16 @@ class ARQStateField(object_fields.BaseEnumField):
     AUTO_TYPE = ARQState()
 
 
+class ProgramJobState(object_fields.Enum):
+    ALL = constants.PROGRAM_JOB_STATES
+
+    def __init__(self):
+        super(ProgramJobState, self).__init__(valid_values=ProgramJobState.ALL)
+
+
+class ProgramJobStateField(object_fields.BaseEnumField):
+    AUTO_TYPE = ProgramJobState()
+
+
 class DeviceTypeField(object_fields.AutoTypedField):
     AUTO_TYPE = object_fields.Enum(valid_values=constants.DEVICE_TYPE)
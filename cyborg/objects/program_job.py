@@ -0,0 +1,88 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from oslo_log import log as logging
+from oslo_versionedobjects import base as object_base
+
+from cyborg.common import constants
+from cyborg.db import api as dbapi
+from cyborg.objects import base
+from cyborg.objects import fields as object_fields
+
+
+LOG = logging.getLogger(__name__)
+
+
+@base.CyborgObjectRegistry.register
+class ProgramJob(base.CyborgObject, object_base.VersionedObjectDictCompat):
+    """A request to program a deployable with the bitstream of an image.
+
+    The job is created by the API in the Queued state, and the agent of the
+    host of the deployable moves it through the Downloading, Verifying and
+    Programming states until it is Done or Failed.
+    """
+
+    # Version 1.0: Initial version
+    VERSION = '1.0'
+
+    dbapi = dbapi.get_instance()
+
+    fields = {
+        'id': object_fields.IntegerField(nullable=False),
+        'uuid': object_fields.UUIDField(nullable=False),
+        'deployable_uuid': object_fields.UUIDField(nullable=False),
+        # The device of the deployable, whose jobs are run one at a time.
+        'device_uuid': object_fields.UUIDField(nullable=False),
+        'image_uuid': object_fields.UUIDField(nullable=False),
+        'hostname': object_fields.StringField(nullable=False),
+        'state': object_fields.ProgramJobStateField(
+            nullable=False, default=constants.PROGRAM_QUEUED),
+        # Why the job failed.
+        'reason': object_fields.StringField(nullable=True),
+    }
+
+    @property
+    def finished(self):
+        return self.state in constants.PROGRAM_JOB_FINAL_STATES
+
+    def create(self, context):
+        """Create a ProgramJob record in the DB."""
+        values = self.obj_get_changes()
+        values.setdefault('state', constants.PROGRAM_QUEUED)
+        db_program_job = self.dbapi.program_job_create(context, values)
+        self._from_db_object(self, db_program_job)
+
+    @classmethod
+    def get(cls, context, uuid):
+        """Find a DB ProgramJob and return an Obj ProgramJob."""
+        db_program_job = cls.dbapi.program_job_get(context, uuid)
+        return cls._from_db_object(cls(context), db_program_job)
+
+    @classmethod
+    def list(cls, context, filters=None):
+        """Return a list of ProgramJob objects, the latest first."""
+        filters = dict(filters or {})
+        sort_dir = filters.pop('sort_dir', 'desc')
+        sort_key = filters.pop('sort_key', 'created_at')
+        limit = filters.pop('limit', None)
+        marker = filters.pop('marker_obj', None)
+        db_program_jobs = cls.dbapi.program_job_list_by_filters(
+            context, filters, sort_dir=sort_dir, sort_key=sort_key,
+            limit=limit, marker=marker)
+        return cls._from_db_object_list(db_program_jobs, context)
+
+    def save(self, context):
+        """Update a ProgramJob record in the DB."""
+        updates = self.obj_get_changes()
+        db_program_job = self.dbapi.program_job_update(context, self.uuid,
+                                                       updates)
+        self._from_db_object(self, db_program_job)
@@ -0,0 +1,154 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""A cache of the placement API responses about single resource providers.
+
+The responses are about a provider record or its inventories, traits or
+aggregates, and carry the generation of the provider. A cached response is
+only used while the generation of the provider known by the client is the
+same, and for a limited time, since placement may change the provider
+without the client knowing.
+"""
+
+import collections
+import re
+import threading
+import time
+
+from oslo_log import log as logging
+
+LOG = logging.getLogger(__name__)
+
+_PROVIDER_URL = re.compile(
+    r'^/resource_providers/(?P<uuid>[^/?]+)'
+    r'(?:/(?:aggregates|inventories|traits))?$')
+
+
+def provider_uuid(url):
+    """Return the UUID of the provider of a URL, None for other URLs."""
+    match = _PROVIDER_URL.match(url)
+    return match.group('uuid') if match else None
+
+
+def _response_generation(response):
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+    if not isinstance(body, dict):
+        return None
+    return body.get('resource_provider_generation', body.get('generation'))
+
+
+class _Entry(object):
+
+    def __init__(self, rp_uuid, generation, response, expires):
+        self.rp_uuid = rp_uuid
+        self.generation = generation
+        self.response = response
+        self.expires = expires
+
+    def valid_for(self, generation):
+        return (generation is not None and generation == self.generation and
+                time.time() < self.expires)
+
+    def conditional_headers(self):
+        """Headers revalidating the response, if placement sent validators.
+        """
+        headers = {}
+        etag = self.response.headers.get('etag')
+        if etag:
+            headers['If-None-Match'] = etag
+        last_modified = self.response.headers.get('last-modified')
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+
+class ResponseCache(object):
+    """A LRU cache of the GET responses about resource providers.
+
+    :param size: The maximum number of responses cached, 0 disables the
+                 cache.
+    :param ttl: The number of seconds a response is used for.
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    def lookup(self, url, version, generation):
+        """Return the cached response for a GET.
+
+        :param url: The URL of the GET.
+        :param version: The microversion of the GET.
+        :param generation: The generation of the provider known by the
+                           client, None if unknown.
+        :returns: A tuple of the response, None unless it is valid for the
+                  generation, and of the headers making the GET conditional.
+        """
+        with self._lock:
+            entry = self._entries.get((url, version))
+            if entry is None:
+                self.misses += 1
+                return None, {}
+            if entry.valid_for(generation):
+                del self._entries[(url, version)]
+                self._entries[(url, version)] = entry
+                self.hits += 1
+                return entry.response, {}
+            self.misses += 1
+            return None, entry.conditional_headers()
+
+    def store(self, url, version, response):
+        """Cache the response of a GET, or reuse the cached one on a 304.
+
+        :returns: The response to use.
+        """
+        if not self.size:
+            return response
+        with self._lock:
+            if response.status_code == 304:
+                entry = self._entries.get((url, version))
+                if entry is None:
+                    return response
+                self.revalidations += 1
+                entry.expires = time.time() + self.ttl
+                return entry.response
+            if response.status_code != 200:
+                return response
+            rp_uuid = provider_uuid(url)
+            generation = _response_generation(response)
+            if rp_uuid is None or generation is None:
+                return response
+            self._entries.pop((url, version), None)
+            self._entries[(url, version)] = _Entry(
+                rp_uuid, generation, response, time.time() + self.ttl)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+            return response
+
+    def invalidate(self, rp_uuid):
+        """Forget the responses about a resource provider."""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items()
+                        if entry.rp_uuid == rp_uuid]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
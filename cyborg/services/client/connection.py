@@ -0,0 +1,112 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""The HTTP connections of the placement clients.
+
+The requests sessions of keystoneauth keep up to 10 connections per host,
+with fixed TCP keep-alive settings. PlacementHTTPAdapter pools them as
+configured in the [placement] section, and records the metrics of the
+requests in cyborg.services.client.metrics.
+"""
+
+import socket
+import time
+
+import requests
+from requests.packages.urllib3 import poolmanager
+
+from cyborg.services.client import metrics
+import cyborg.conf
+
+CONF = cyborg.conf.CONF
+
+
+def _socket_options():
+    options = [
+        # Keep Nagle's algorithm off, like requests does.
+        (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+        (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+    ]
+    # NOTE: not every platform allows tuning the keep-alive probes.
+    for name, value in (('TCP_KEEPIDLE', CONF.placement.tcp_keepidle),
+                        ('TCP_KEEPINTVL', CONF.placement.tcp_keepintvl),
+                        ('TCP_KEEPCNT', CONF.placement.tcp_keepcnt)):
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name),
+                            value))
+    return options
+
+
+class _CountingPoolManager(poolmanager.PoolManager):
+    """A PoolManager counting the connections opened by its pools."""
+
+    def __init__(self, metrics, *args, **kwargs):
+        self.metrics = metrics
+        super(_CountingPoolManager, self).__init__(*args, **kwargs)
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = super(_CountingPoolManager, self)._new_pool(
+            scheme, host, port, request_context=request_context)
+        new_conn = pool._new_conn
+
+        def _new_conn():
+            self.metrics.connection_opened(host, port)
+            return new_conn()
+
+        pool._new_conn = _new_conn
+        return pool
+
+
+class PlacementHTTPAdapter(requests.adapters.HTTPAdapter):
+    """A requests adapter pooling the keep-alive connections to placement.
+
+    :param metrics: The PlacementMetrics recording the requests.
+    """
+
+    def __init__(self, metrics=metrics.METRICS):
+        self.metrics = metrics
+        super(PlacementHTTPAdapter, self).__init__(
+            pool_maxsize=CONF.placement.pool_maxsize,
+            pool_block=CONF.placement.pool_block)
+
+    def init_poolmanager(self, connections, maxsize,
+                         block=requests.adapters.DEFAULT_POOLBLOCK,
+                         **pool_kwargs):
+        # NOTE: saved like in HTTPAdapter, for pickling.
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        pool_kwargs.setdefault('socket_options', _socket_options())
+        self.poolmanager = _CountingPoolManager(
+            self.metrics, num_pools=connections, maxsize=maxsize,
+            block=block, **pool_kwargs)
+
+    def send(self, request, *args, **kwargs):
+        start = time.time()
+        status = None
+        try:
+            response = super(PlacementHTTPAdapter, self).send(
+                request, *args, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            self.metrics.observe(request.method, request.url,
+                                 time.time() - start, status)
+
+
+def mount(session):
+    """Send the requests of a keystoneauth Session with PlacementHTTPAdapter.
+    """
+    adapter = PlacementHTTPAdapter()
+    for prefix in ('https://', 'http://'):
+        session.session.mount(prefix, adapter)
+    return session
@@ -0,0 +1,136 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Latency and connection metrics of the placement API traffic.
+
+The metrics are kept per process in METRICS, and are reported by the
+placement_stats RPC of the agent and of the conductor.
+"""
+
+import bisect
+import collections
+import re
+import threading
+
+from six.moves.urllib import parse
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_UUID = re.compile(r'^[0-9a-fA-F]{8}-?(?:[0-9a-fA-F]{4}-?){3}[0-9a-fA-F]{12}$')
+_NAME = re.compile(r'^[A-Z][A-Z0-9_]*$')
+
+
+def endpoint(method, url):
+    """Return the endpoint of a request, e.g. GET /resource_providers/{uuid}.
+
+    The UUIDs, resource class and trait names in the path are replaced by
+    placeholders so that the requests about all the providers are counted
+    together.
+    """
+    segments = []
+    for segment in parse.urlsplit(url).path.split('/'):
+        if _UUID.match(segment):
+            segment = '{uuid}'
+        elif _NAME.match(segment):
+            segment = '{name}'
+        segments.append(segment)
+    return '%s %s' % (method.upper(), '/'.join(segments) or '/')
+
+
+def _host(url):
+    parts = parse.urlsplit(url)
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    return '%s:%s' % (parts.hostname, port)
+
+
+class Histogram(object):
+    """A latency histogram with fixed buckets."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self):
+        """Return the histogram with cumulative bucket counts."""
+        buckets = collections.OrderedDict()
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            buckets['+Inf' if bound == float('inf') else str(bound)] = total
+        return {'count': self.count, 'sum': self.sum, 'buckets': buckets}
+
+
+class PlacementMetrics(object):
+    """The request latencies per endpoint and the connections per host."""
+
+    def __init__(self, buckets=BUCKETS):
+        self._buckets = buckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._latencies = collections.defaultdict(
+                lambda: Histogram(self._buckets))
+            self._errors = collections.Counter()
+            self._requests = collections.Counter()
+            self._connections = collections.Counter()
+
+    def observe(self, method, url, seconds, status=None):
+        """Record a request.
+
+        :param status: The HTTP status of the response, None if the request
+                       failed without one. The server errors and the failed
+                       requests are counted as errors of the endpoint.
+        """
+        name = endpoint(method, url)
+        with self._lock:
+            self._latencies[name].observe(seconds)
+            if status is None or status >= 500:
+                self._errors[name] += 1
+            self._requests[_host(url)] += 1
+
+    def connection_opened(self, host, port):
+        with self._lock:
+            self._connections['%s:%s' % (host, port)] += 1
+
+    def stats(self):
+        """Return the metrics as a dict of plain types, for the RPC API.
+
+        The connections reused are the requests which did not open a new
+        connection; a low reuse means that the pool is too small for the
+        concurrency of the requests, or that placement closes the idle
+        connections.
+        """
+        with self._lock:
+            endpoints = {}
+            for name, histogram in self._latencies.items():
+                endpoints[name] = histogram.to_dict()
+                endpoints[name]['errors'] = self._errors[name]
+            hosts = {}
+            for host in set(self._requests) | set(self._connections):
+                requests = self._requests[host]
+                opened = self._connections[host]
+                hosts[host] = {'requests': requests, 'opened': opened,
+                               'reused': max(requests - opened, 0)}
+            return {'endpoints': endpoints, 'connections': hosts}
+
+
+METRICS = PlacementMetrics()
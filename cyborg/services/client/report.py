@@ -14,21 +14,28 @@
 #    under the License.
 """Placement Client to Handle Resource Provider Operation."""
 
+import collections
 import contextlib
 import copy
 import functools
 import random
 import re
+import sys
 import time
 
+import eventlet
 from keystoneauth1 import exceptions as ks_exc
 import os_traits
 from oslo_log import log as logging
 from oslo_middleware import request_id
 from oslo_utils import versionutils
+import six
+from six.moves.urllib import parse
 
 from cyborg.agent import provider_tree
 from cyborg.agent import rc_fields as fields
+from cyborg.services.client import cache
+from cyborg.services.client import connection
 from cyborg.common import exception
 from cyborg.common.i18n import _
 from cyborg.common import utils
@@ -270,6 +277,10 @@ class SchedulerReportClient(object):
         self._provider_tree = provider_tree.ProviderTree()
         # Track the last time we updated providers' aggregates and traits
         self._association_refresh_time = {}
+        # GET responses about the providers, keyed by their generation
+        self._response_cache = cache.ResponseCache(
+            CONF.placement.response_cache_size,
+            CONF.placement.response_cache_ttl)
         self._client = self._create_client()
         # NOTE(danms): Keep track of how naggy we've been
         self._warn_count = 0
@@ -280,16 +291,45 @@ class SchedulerReportClient(object):
         # Flush provider tree and associations so we start from a clean slate.
         self._provider_tree = provider_tree.ProviderTree()
         self._association_refresh_time = {}
-        client = self._adapter or utils.get_ksa_adapter('placement')
+        self._response_cache.clear()
+        client = self._adapter
+        if client is None:
+            # NOTE: the [placement] connect_retries, status_code_retries and
+            # their delays are applied by the adapter.
+            client = utils.get_ksa_adapter('placement')
+            connection.mount(client.session)
         # Set accept header on every request to ensure we notify placement
         # service of our response body media type preferences.
         client.additional_headers = {'accept': 'application/json'}
         return client
 
+    def _cached_generation(self, url):
+        """Return the generation in the cache of the provider of a URL."""
+        rp_uuid = cache.provider_uuid(url)
+        if rp_uuid is None:
+            return None
+        try:
+            return self._provider_tree.data(rp_uuid).generation
+        except ValueError:
+            return None
+
+    def _invalidate_response_cache(self, url):
+        # NOTE: a write succeeding changes the generation of the provider,
+        # and a 409 means that the cached generation is stale.
+        rp_uuid = cache.provider_uuid(url)
+        if rp_uuid is not None:
+            self._response_cache.invalidate(rp_uuid)
+
     def get(self, url, version=None, global_request_id=None):
         headers = ({request_id.INBOUND_HEADER: global_request_id}
                    if global_request_id else {})
-        return self._client.get(url, microversion=version, headers=headers)
+        cached, conditional_headers = self._response_cache.lookup(
+            url, version, self._cached_generation(url))
+        if cached is not None:
+            return cached
+        headers.update(conditional_headers)
+        resp = self._client.get(url, microversion=version, headers=headers)
+        return self._response_cache.store(url, version, resp)
 
     def post(self, url, data, version=None, global_request_id=None):
         headers = ({request_id.INBOUND_HEADER: global_request_id}
@@ -298,6 +338,7 @@ class SchedulerReportClient(object):
         # media type to application/json for us. Placement API is
         # more sensitive to this than other APIs in the OpenStack
         # ecosystem.
+        self._invalidate_response_cache(url)
         return self._client.post(url, json=data, microversion=version,
                                  headers=headers)
 
@@ -311,11 +352,13 @@ class SchedulerReportClient(object):
                               global_request_id} if global_request_id else {}}
         if data is not None:
             kwargs['json'] = data
+        self._invalidate_response_cache(url)
         return self._client.put(url, **kwargs)
 
     def delete(self, url, version=None, global_request_id=None):
         headers = ({request_id.INBOUND_HEADER: global_request_id}
                    if global_request_id else {})
+        self._invalidate_response_cache(url)
         return self._client.delete(url, microversion=version, headers=headers)
 
     @safe_connect
@@ -351,8 +394,50 @@ class SchedulerReportClient(object):
             "Candidates are in either 'foo' or 'bar', but definitely in 'baz'"
 
         """
+        return self._get_allocation_candidates(
+            context, resources.to_querystring(), str(resources))
+
+    @safe_connect
+    def get_allocation_candidates_for_groups(self, context, groups,
+                                             group_policy='isolate',
+                                             limit=None):
+        """Returns the allocation candidates of several request groups, like
+        get_allocation_candidates.
+
+        All the groups, e.g. one per accelerator requested for an instance,
+        are sent as the numbered granular request groups of a single query,
+        rather than querying the candidates of each of them.
+
+        :param context: The security context
+        :param groups: A list of dicts with a 'resources' dict, keyed by
+                       resource class, of amounts, and optionally a list of
+                       'required' traits and a list of 'member_of' aggregate
+                       UUIDs, any of which the provider must be in.
+        :param group_policy: 'isolate' to satisfy each group by a different
+                             provider, 'none' otherwise.
+        :param limit: The maximum number of allocation requests returned.
+        :returns: See get_allocation_candidates.
+        """
+        qparams = []
+        for suffix, group in enumerate(groups, 1):
+            qparams.append(('resources%d' % suffix, ','.join(
+                '%s:%d' % (rc, amount)
+                for rc, amount in sorted(group['resources'].items()))))
+            if group.get('required'):
+                qparams.append(('required%d' % suffix,
+                                ','.join(sorted(group['required']))))
+            if group.get('member_of'):
+                qparams.append(('member_of%d' % suffix,
+                                'in:' + ','.join(sorted(group['member_of']))))
+        if len(groups) > 1:
+            qparams.append(('group_policy', group_policy))
+        if limit is not None:
+            qparams.append(('limit', limit))
+        return self._get_allocation_candidates(
+            context, parse.urlencode(qparams), str(groups))
+
+    def _get_allocation_candidates(self, context, qparams, description):
         version = GRANULAR_AC_VERSION
-        qparams = resources.to_querystring()
         url = "/allocation_candidates?%s" % qparams
         resp = self.get(url, version=version,
                         global_request_id=context.global_id)
@@ -362,7 +447,7 @@ class SchedulerReportClient(object):
                     version)
 
         args = {
-            'resource_request': str(resources),
+            'resource_request': description,
             'status_code': resp.status_code,
             'err_text': resp.text,
         }
@@ -384,8 +469,10 @@ class SchedulerReportClient(object):
                 None or the empty set()) if the specified resource provider
                 does not exist.
         """
+        # NOTE: since 1.19, the generation of the provider is returned too,
+        # so that the response can be cached.
         resp = self.get("/resource_providers/%s/aggregates" % rp_uuid,
-                        version='1.1', global_request_id=context.global_id)
+                        version='1.19', global_request_id=context.global_id)
         if resp.status_code == 200:
             data = resp.json()
             return set(data['aggregates'])
@@ -841,12 +928,16 @@ class SchedulerReportClient(object):
         return ((time.time() - refresh_time) >
                 CONF.compute.resource_provider_association_refresh)
 
-    def _update_inventory_attempt(self, context, rp_uuid, inv_data):
+    def _update_inventory_attempt(self, context, rp_uuid, inv_data,
+                                  conflicts=None):
         """Update the inventory for this resource provider if needed.
 
         :param context: The security context
         :param rp_uuid: The resource provider UUID for the operation
         :param inv_data: The new inventory for the resource provider
+        :param conflicts: If not None, a set the provider is added to on a
+                          generation conflict, for the caller to refresh it,
+                          instead of refreshing it right away.
         :returns: True if the inventory was updated (or did not need to be),
                   False otherwise.
         """
@@ -911,6 +1002,10 @@ class SchedulerReportClient(object):
                     resource_provider=rp_uuid,
                 )
 
+            if conflicts is not None:
+                conflicts.add(rp_uuid)
+                return False
+
             # Invalidate our cache and re-fetch the resource provider
             # to be sure to get the latest generation.
             self._provider_tree.remove(rp_uuid)
@@ -971,6 +1066,79 @@ class SchedulerReportClient(object):
             time.sleep(1)
         return False
 
+    @safe_connect
+    def update_inventories(self, context, inventories):
+        """Update the inventories of several resource providers at once.
+
+        The providers are updated concurrently, up to
+        CONF.placement.sync_workers at once. When some updates fail, e.g. on
+        a generation conflict, only those are attempted again, up to three
+        attempts in all.
+
+        :param context: The security context
+        :param inventories: Dict, keyed by resource provider UUID, of dicts,
+                            keyed by resource class name, of inventory data
+        :returns: A dict, keyed by resource provider UUID, of whether the
+                  inventory of the provider was updated.
+        :raises: InventoryInUse if an update would remove inventory in use.
+        """
+        results = dict.fromkeys(inventories, False)
+        conflicts = set()
+
+        def update(rp_uuid):
+            try:
+                results[rp_uuid] = self._update_inventory_attempt(
+                    context, rp_uuid, inventories[rp_uuid],
+                    conflicts=conflicts)
+            except ValueError:
+                # NOTE: the provider left the cache during the attempt, try
+                # it again once refreshed.
+                LOG.warning('Resource provider %s left the cache while '
+                            'updating its inventory', rp_uuid)
+                results[rp_uuid] = False
+            return results[rp_uuid]
+
+        to_update = list(inventories)
+        for attempt in (1, 2, 3):
+            # NOTE: a provider missing from the cache could not be fetched or
+            # created, or a previous attempt invalidated it and could not
+            # refresh it. Skip it until next time.
+            missing = [rp_uuid for rp_uuid in to_update
+                       if not self._provider_tree.exists(rp_uuid)]
+            if missing:
+                LOG.warning('Unable to refresh my resource provider records '
+                            '%s', ', '.join(missing))
+            to_update = [rp_uuid for rp_uuid in to_update
+                         if rp_uuid not in missing]
+            if not to_update:
+                break
+            if attempt > 1:
+                time.sleep(1)
+            self._flush_in_tree_order(to_update, {}, update)
+            # NOTE: refresh the conflicted providers once no update is in
+            # flight anymore, since removing a provider from the cache
+            # removes its subtree under the other updates.
+            self._refresh_providers(context, conflicts)
+            conflicts.clear()
+            to_update = [rp_uuid for rp_uuid in to_update
+                         if not results[rp_uuid]]
+        return results
+
+    def _refresh_providers(self, context, rp_uuids):
+        """Invalidate the cache of the providers and re-fetch their trees.
+
+        :param context: The security context
+        :param rp_uuids: The UUIDs of the resource providers to refresh
+        """
+        for rp_uuid in rp_uuids:
+            if self._provider_tree.exists(rp_uuid):
+                self._provider_tree.remove(rp_uuid)
+        for rp_uuid in rp_uuids:
+            # NOTE: the provider is back already if it is in the tree of a
+            # provider refreshed before it.
+            if not self._provider_tree.exists(rp_uuid):
+                self._ensure_resource_provider(context, rp_uuid)
+
     def get_provider_tree_and_ensure_root(self, context, rp_uuid, name=None,
                                           parent_provider_uuid=None):
         """Returns a fresh ProviderTree representing all providers which are in
@@ -1275,6 +1443,11 @@ class SchedulerReportClient(object):
                           resource providers.
         :raises: ResourceProviderUpdateFailed on any placement API failure.
         """
+        # If not different from what we've got, short out
+        if use_cache and not self._provider_tree.have_aggregates_changed(
+                rp_uuid, aggregates):
+            return
+
         # TODO(efried): Handle generation conflicts when supported by placement
         url = '/resource_providers/%s/aggregates' % rp_uuid
         aggregates = list(aggregates) if aggregates else []
@@ -1356,6 +1529,67 @@ class SchedulerReportClient(object):
         # when we invoke the DELETE.  See bug #1746374.
         self._update_inventory(context, compute_node.uuid, inv_data)
 
+    def _flush_in_tree_order(self, uuids, parents, flush, top_down=True):
+        """Call flush for each of the providers on a pool of green threads.
+
+        A provider is flushed once its parent is, when top_down, or once all
+        its children are otherwise. Independent subtrees, e.g. the sibling
+        providers of the devices of a host, are thus flushed concurrently,
+        up to CONF.placement.sync_workers at once.
+
+        :param uuids: The UUIDs of the providers to flush
+        :param parents: A dict of the parent UUID of each provider
+        :param flush: A callable taking a provider UUID and returning False
+                      if the flush failed
+        :param top_down: Whether parents are flushed before their children
+        :returns: True if all the flushes succeeded, False otherwise
+        """
+        waits = collections.OrderedDict((uuid, set()) for uuid in uuids)
+        for uuid in uuids:
+            parent = parents.get(uuid)
+            if parent in waits:
+                if top_down:
+                    waits[uuid].add(parent)
+                else:
+                    waits[parent].add(uuid)
+        unblocks = collections.defaultdict(list)
+        for uuid, deps in waits.items():
+            for dep in deps:
+                unblocks[dep].append(uuid)
+
+        pool = eventlet.GreenPool(CONF.placement.sync_workers)
+        done = eventlet.queue.LightQueue()
+
+        def run(uuid):
+            try:
+                done.put((uuid, flush(uuid), None))
+            except Exception:
+                done.put((uuid, False, sys.exc_info()))
+
+        success = True
+        exc_info = None
+        running = 0
+        ready = [uuid for uuid, deps in waits.items() if not deps]
+        while ready or running:
+            # NOTE: stop starting flushes once one raised an unexpected
+            # exception, like the serial loops did.
+            while ready and exc_info is None:
+                pool.spawn_n(run, ready.pop(0))
+                running += 1
+            if not running:
+                break
+            uuid, flushed, flush_exc_info = done.get()
+            running -= 1
+            success = success and flushed
+            exc_info = exc_info or flush_exc_info
+            for blocked in unblocks[uuid]:
+                waits[blocked].discard(uuid)
+                if not waits[blocked]:
+                    ready.append(blocked)
+        if exc_info is not None:
+            six.reraise(*exc_info)
+        return success
+
     def update_from_provider_tree(self, context, new_tree):
         """Flush changes from a specified ProviderTree back to placement.
 
@@ -1414,41 +1648,59 @@ class SchedulerReportClient(object):
                     pass
                 self._association_refresh_time.pop(rp_uuid, None)
 
-        # Overall indicator of success.  Will be set to False on any exception.
-        success = True
-
         # Helper methods herein will be updating the local cache (this is
         # intentional) so we need to grab up front any data we need to operate
         # on in its "original" form.
-        old_tree = self._provider_tree
+        # Snapshots of the trees are taken so that they are read without
+        # locking them, and without copying the data of their providers.
+        old_tree = self._provider_tree.snapshot()
         old_uuids = old_tree.get_provider_uuids()
+        old_parents = {uuid: old_tree.data(uuid).parent_uuid
+                       for uuid in old_uuids}
+        new_tree = new_tree.snapshot()
         new_uuids = new_tree.get_provider_uuids()
+        new_data = {uuid: new_tree.data(uuid) for uuid in new_uuids}
+        new_parents = {uuid: pd.parent_uuid for uuid, pd in new_data.items()}
+
+        def delete(uuid):
+            with catch_all(uuid) as status:
+                self._delete_provider(uuid)
+            return status.success
+
+        def ensure(uuid):
+            provider = new_data[uuid]
+            with catch_all(uuid) as status:
+                self._ensure_resource_provider(
+                    context, uuid, name=provider.name,
+                    parent_provider_uuid=provider.parent_uuid)
+            return status.success
+
+        def flush(uuid):
+            pd = new_data[uuid]
+            with catch_all(pd.uuid) as status:
+                self._set_inventory_for_provider(
+                    context, pd.uuid, pd.inventory)
+                self.set_aggregates_for_provider(
+                    context, pd.uuid, pd.aggregates)
+                self.set_traits_for_provider(context, pd.uuid, pd.traits)
+            return status.success
 
         # Do provider deletion first, since it has the best chance of failing
         # for non-generation-conflict reasons (i.e. allocations).
         uuids_to_remove = set(old_uuids) - set(new_uuids)
         # We have to do deletions in bottom-up order, so we don't error
         # attempting to delete a parent who still has children.
-        for uuid in reversed(old_uuids):
-            if uuid not in uuids_to_remove:
-                continue
-            with catch_all(uuid) as status:
-                self._delete_provider(uuid)
-            success = success and status.success
+        success = self._flush_in_tree_order(
+            [uuid for uuid in old_uuids if uuid in uuids_to_remove],
+            old_parents, delete, top_down=False)
 
         # Now create (or load) any "new" providers
         uuids_to_add = set(new_uuids) - set(old_uuids)
         # We have to do additions in top-down order, so we don't error
         # attempting to create a child before its parent exists.
-        for uuid in new_uuids:
-            if uuid not in uuids_to_add:
-                continue
-            provider = new_tree.data(uuid)
-            with catch_all(uuid) as status:
-                self._ensure_resource_provider(
-                    context, uuid, name=provider.name,
-                    parent_provider_uuid=provider.parent_uuid)
-            success = success and status.success
+        success = self._flush_in_tree_order(
+            [uuid for uuid in new_uuids if uuid in uuids_to_add],
+            new_parents, ensure) and success
 
         # At this point the local cache should have all the same providers as
         # new_tree.  Whether we added them or not, walk through and diff/flush
@@ -1459,15 +1711,8 @@ class SchedulerReportClient(object):
         # its descendants are also removed, and set_*_for_provider methods on
         # it wouldn't be able to get started. Walking the tree in bottom-up
         # order ensures we at least try to process all of the providers.
-        for uuid in reversed(new_uuids):
-            pd = new_tree.data(uuid)
-            with catch_all(pd.uuid) as status:
-                self._set_inventory_for_provider(
-                    context, pd.uuid, pd.inventory)
-                self.set_aggregates_for_provider(
-                    context, pd.uuid, pd.aggregates)
-                self.set_traits_for_provider(context, pd.uuid, pd.traits)
-            success = success and status.success
+        success = self._flush_in_tree_order(
+            new_uuids, new_parents, flush, top_down=False) and success
 
         if not success:
             raise exception.ResourceProviderSyncFailed()
@@ -1774,6 +2019,59 @@ class SchedulerReportClient(object):
                      'text': r.text})
         return r.status_code == 204
 
+    @safe_connect
+    @retries
+    def set_allocations(self, context, allocations, project_id, user_id):
+        """Replace the allocations of several consumers, against any number
+        of resource providers, at once.
+
+        The allocations are written by a single POST /allocations, which
+        placement applies atomically, and which alone is retried if another
+        process concurrently changed one of the providers.
+
+        :param context: The security context
+        :param allocations: Dict, keyed by consumer UUID, of dicts, keyed by
+                            resource provider UUID, of dicts, keyed by
+                            resource class, of amounts to consume. The
+                            allocations of a consumer with an empty dict are
+                            cleared.
+        :param project_id: The project_id associated with the allocations.
+        :param user_id: The user_id associated with the allocations.
+        :returns: True if the allocations were written, False otherwise.
+        :raises: Retry if the operation should be retried due to a concurrent
+                 update.
+        """
+        payload = {
+            consumer_uuid: {
+                'allocations': {
+                    rp_uuid: {'resources': resources}
+                    for rp_uuid, resources in consumer_allocs.items()
+                },
+                'project_id': project_id,
+                'user_id': user_id,
+            }
+            for consumer_uuid, consumer_allocs in allocations.items()
+        }
+        r = self.post('/allocations', payload,
+                      version=POST_ALLOCATIONS_API_VERSION,
+                      global_request_id=context.global_id)
+        if r.status_code != 204:
+            # NOTE(jaypipes): Yes, it sucks doing string comparison like this
+            # but we have no error codes, only error messages.
+            if 'concurrently updated' in r.text:
+                reason = ('another process changed the resource providers '
+                          'involved in our attempt to post allocations for '
+                          'consumers %s' % ', '.join(sorted(allocations)))
+                raise Retry('set_allocations', reason)
+            else:
+                LOG.warning(
+                    'Unable to post allocations for consumers '
+                    '%(uuids)s (%(code)i %(text)s)',
+                    {'uuids': ', '.join(sorted(allocations)),
+                     'code': r.status_code,
+                     'text': r.text})
+        return r.status_code == 204
+
     @safe_connect
     @retries
     def put_allocations(self, context, rp_uuid, consumer_uuid, alloc_data,
@@ -19,6 +19,7 @@ from keystoneauth1 import exceptions as k_exc
 from keystoneauth1 import loading as k_loading
 from oslo_config import cfg
 from cyborg.common import exception as c_exc
+from cyborg.services.client import connection
 
 from oslo_concurrency import lockutils
 
@@ -70,25 +71,31 @@ class SchedulerReportClient(object):
         client = k_loading.load_session_from_conf_options(
             cfg.CONF, 'placement', auth=auth_plugin)
         client.additional_headers = {'accept': 'application/json'}
-        return client
+        return connection.mount(client)
+
+    def _request_kwargs(self, kwargs):
+        """Add the endpoint filter and the configured retries to kwargs."""
+        kwargs.setdefault('endpoint_filter', self.keystone_filter)
+        for opt in ('connect_retries', 'connect_retry_delay',
+                    'status_code_retries', 'status_code_retry_delay'):
+            value = getattr(cfg.CONF.placement, opt, None)
+            if value is not None:
+                kwargs.setdefault(opt, value)
+        return kwargs
 
     def _get(self, url, **kwargs):
-        return self._client.get(url, endpoint_filter=self.keystone_filter,
-                                **kwargs)
+        return self._client.get(url, **self._request_kwargs(kwargs))
 
     def _post(self, url, data, **kwargs):
         return self._client.post(url, json=data,
-                                 endpoint_filter=self.keystone_filter,
-                                 **kwargs)
+                                 **self._request_kwargs(kwargs))
 
     def _put(self, url, data, **kwargs):
         return self._client.put(url, json=data,
-                                endpoint_filter=self.keystone_filter,
-                                **kwargs)
+                                **self._request_kwargs(kwargs))
 
     def _delete(self, url, **kwargs):
-        return self._client.delete(url, endpoint_filter=self.keystone_filter,
-                                   **kwargs)
+        return self._client.delete(url, **self._request_kwargs(kwargs))
 
     @check_placement_api_available
     def create_resource_provider(self, resource_provider):
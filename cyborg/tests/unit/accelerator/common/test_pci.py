@@ -0,0 +1,86 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import fixtures
+
+from cyborg.accelerator.common import pci
+from cyborg.tests import base
+from cyborg.tests.unit import fake_pci_sysfs
+
+
+class TestPciScan(base.TestCase):
+
+    def setUp(self):
+        super(TestPciScan, self).setUp()
+        self.sysfs = self.useFixture(fake_pci_sysfs.FakePciSysfs())
+        self.sysfs.add_device("0000:00:02.0", "0x060400", "0x8086", "0x2030")
+        self.sysfs.add_device("0000:00:06.0", "0x030200", "0x10de", "0x15F7",
+                              numa_node="-1")
+        self.sysfs.add_device("0000:5e:00.0", "0x120000", "0x8086", "0xbcc0",
+                              numa_node="1", sriov_totalvfs=2)
+        self.sysfs.add_device("0000:5e:00.1", "0x120000", "0x8086", "0xbcc1",
+                              numa_node="1", physfn="0000:5e:00.0")
+
+    def test_scan_all(self):
+        devices = pci.scan_devices()
+        self.assertEqual(
+            ["0000:00:02.0", "0000:00:06.0", "0000:5e:00.0", "0000:5e:00.1"],
+            [dev["address"] for dev in devices])
+        self.assertEqual(
+            {"address": "0000:00:06.0", "class_id": "0302",
+             "vendor_id": "10de", "product_id": "15f7", "numa_node": None,
+             "sriov_totalvfs": None, "sriov_numvfs": None, "physfn": None,
+             "virtfns": []},
+            devices[1])
+
+    def test_scan_sriov(self):
+        pf, vf = pci.scan_devices(class_ids=["1200"])
+        self.assertEqual(1, pf["numa_node"])
+        self.assertEqual(2, pf["sriov_totalvfs"])
+        self.assertEqual(1, pf["sriov_numvfs"])
+        self.assertEqual(["0000:5e:00.1"], pf["virtfns"])
+        self.assertIsNone(pf["physfn"])
+        self.assertEqual("0000:5e:00.0", vf["physfn"])
+        self.assertIsNone(vf["sriov_totalvfs"])
+
+    def test_scan_filtered(self):
+        self.assertEqual(
+            ["0000:00:06.0"],
+            [dev["address"] for dev in pci.scan_devices(
+                class_ids=["0300", "0302"])])
+        self.assertEqual(
+            ["0000:00:02.0", "0000:5e:00.0", "0000:5e:00.1"],
+            [dev["address"] for dev in pci.scan_devices(vendor_id="0x8086")])
+        self.assertEqual([], pci.scan_devices(class_ids=["0302"],
+                                              vendor_id="8086"))
+
+    def test_scan_no_sysfs(self):
+        self.useFixture(fixtures.MonkeyPatch(
+            "cyborg.accelerator.common.pci.SYS_PCI_DEVICES",
+            "/nonexistent/sys/bus/pci/devices"))
+        self.assertEqual([], pci.scan_devices())
+
+    def test_lookup_names(self):
+        names = pci.lookup_names(
+            [("10de", "15f7"), ("10de", "1234"), ("1af4", "1000")])
+        self.assertEqual(
+            {("10de", "15f7"): "NVIDIA Corporation GP100GL "
+                               "[Tesla P100 PCIe 12GB]",
+             ("10de", "1234"): "NVIDIA Corporation Device 1234",
+             ("1af4", "1000"): "Vendor 1af4 Device 1000"},
+            names)
+
+    def test_lookup_names_no_database(self):
+        self.useFixture(fixtures.MonkeyPatch(
+            "cyborg.accelerator.common.pci.PCI_IDS_PATHS", []))
+        self.assertEqual({("10de", "15f7"): "Vendor 10de Device 15f7"},
+                         pci.lookup_names([("10de", "15f7")]))
@@ -102,8 +102,8 @@ class TestIntelFPGADriver(base.TestCase):
         class p(object):
             returncode = 0
 
-            def wait(self):
-                pass
+            def communicate(self):
+                return b'', None
 
         b = "0x5e"
         d = "0x00"
@@ -114,8 +114,48 @@ class TestIntelFPGADriver(base.TestCase):
         intel = IntelFPGADriver()
         # program VF
         intel.program("0000:5e:00.1", "/path/image")
-        mock_popen.assert_called_with(expect_cmd, stdout=subprocess.PIPE)
+        mock_popen.assert_called_with(expect_cmd, stdout=subprocess.PIPE,
+                                      stderr=subprocess.STDOUT)
 
         # program PF
         intel.program("0000:5e:00.0", "/path/image")
-        mock_popen.assert_called_with(expect_cmd, stdout=subprocess.PIPE)
+        mock_popen.assert_called_with(expect_cmd, stdout=subprocess.PIPE,
+                                      stderr=subprocess.STDOUT)
+
+        # program VF by its sysfs path
+        intel.program(os.path.join(sysinfo.SYS_FPGA, "intel-fpga-dev.2"),
+                      "/path/image")
+        mock_popen.assert_called_with(expect_cmd, stdout=subprocess.PIPE,
+                                      stderr=subprocess.STDOUT)
+
+    def test_snapshot(self):
+        snapshot = sysinfo.FPGASnapshot()
+        self.assertEqual(
+            ['0000:5e:00.0', '0000:5e:00.1', '0000:be:00.0'],
+            sorted(snapshot.fpgas))
+        pfs = snapshot.pfs()
+        self.assertEqual(['intel-fpga-dev.0', 'intel-fpga-dev.1'],
+                         [pf['name'] for pf in pfs])
+        self.assertEqual(['intel-fpga-dev.2'],
+                         [vf['name'] for vf in snapshot.vfs(pfs[0])])
+        self.assertEqual([], snapshot.vfs(pfs[1]))
+        self.assertEqual('0x8086', pfs[0]['vendor'])
+        self.assertEqual('0xbcc0', pfs[0]['model'])
+        self.assertEqual('0000:5e:00.0', snapshot.get_pf_bdf('0000:5e:00.1'))
+        self.assertEqual('0000:be:00.0', snapshot.get_pf_bdf('0000:be:00.0'))
+
+    def test_fpga_tree_single_pass(self):
+        with mock.patch.object(sysinfo.pci, 'read_device',
+                               wraps=sysinfo.pci.read_device) as read:
+            fpgas = sysinfo.fpga_tree()
+            self.assertEqual(3, read.call_count)
+        self.assertEqual(
+            ['0000:5e:00.0', '0000:be:00.0'],
+            [fpga.controlpath_id.cpid_info for fpga in fpgas])
+        dep = fpgas[0].deployable_list[0]
+        self.assertEqual('intel-fpga-dev.2', dep.name)
+        self.assertEqual(1, dep.num_accelerators)
+        self.assertEqual(['0000:5e:00.1'],
+                         [ah.attach_info for ah in dep.attach_handle_list])
+        self.assertEqual('intel-fpga-dev.1',
+                         fpgas[1].deployable_list[0].name)
@@ -14,46 +14,24 @@
 
 from oslo_serialization import jsonutils
 
-import mock
-import copy
-import subprocess
-
 from cyborg.accelerator.drivers.gpu import utils
-from cyborg import objects
 from cyborg.tests import base
-
-NVIDIA_GPU_INFO = "0000:00:06.0 3D controller [0302]: NVIDIA Corporation GP100GL " \
-                  "[Tesla P100 PCIe 12GB] [10de:15f7] (rev a1)"
-
-
-class stdout(object):
-    def readlines(self):
-        return [NVIDIA_GPU_INFO]
-
-
-class p(object):
-    def __init__(self):
-        self.stdout = stdout()
-
-    def wait(self):
-        pass
+from cyborg.tests.unit import fake_pci_sysfs
 
 
 class TestGPUDriverUtils(base.TestCase):
 
     def setUp(self):
         super(TestGPUDriverUtils, self).setUp()
-        self.p = p()
+        self.sysfs = self.useFixture(fake_pci_sysfs.FakePciSysfs())
+        self.sysfs.add_device("0000:00:02.0", "0x060400", "0x8086", "0x2030")
+        self.sysfs.add_device("0000:00:06.0", "0x030200", "0x10de", "0x15f7")
 
-    @mock.patch.object(subprocess, 'Popen', autospec=True)
-    def test_discover_vendors(self, mock_popen):
-        mock_popen.return_value = self.p
+    def test_discover_vendors(self):
         gpu_venders = utils.discover_vendors()
-        self.assertEqual(1, len(gpu_venders))
+        self.assertEqual(set(["10de"]), gpu_venders)
 
-    @mock.patch.object(subprocess, 'Popen', autospec=True)
-    def test_discover_gpus(self, mock_popen):
-        mock_popen.return_value = self.p
+    def test_discover_gpus(self):
         vender_id = '10de'
         gpu_list = utils.discover_gpus(vender_id)
         self.assertEqual(1, len(gpu_list))
@@ -94,3 +72,6 @@ class TestGPUDriverUtils(base.TestCase):
                          gpu_dep_list[0].as_dict()['name'])
         self.assertEqual(attach_handle_list[0],
                          gpu_attach_handle_list[0].as_dict())
+
+    def test_discover_gpus_other_vendor(self):
+        self.assertEqual([], utils.discover_gpus('102b'))
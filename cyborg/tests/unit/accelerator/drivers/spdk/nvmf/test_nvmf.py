@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import fixtures
 from cyborg.tests import base
 import mock
 from cyborg.accelerator.drivers.spdk.nvmf.nvmf import NVMFDRIVER
@@ -24,6 +25,8 @@ class TestNVMFDRIVER(base.TestCase):
 
     def setUp(self,):
         super(TestNVMFDRIVER, self).setUp()
+        self.useFixture(fixtures.MockPatchObject(
+            common_fun, '_PY_CLIENTS', {}))
         self.nvmf_driver = NVMFDRIVER()
 
     def tearDown(self):
@@ -0,0 +1,115 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""A stub SPDK JSON-RPC server listening on a Unix socket."""
+
+import json
+import os
+import socket
+
+import eventlet
+import fixtures
+
+
+class RPCError(Exception):
+    def __init__(self, code, message):
+        super(RPCError, self).__init__(message)
+        self.code = code
+        self.message = message
+
+
+class FakeSPDKServer(fixtures.Fixture):
+    """Serve JSON-RPC requests with the given method handlers.
+
+    :param methods: dict of method name to a callable taking the params of
+                    the request, returning its result or raising RPCError.
+    :param batches: whether JSON-RPC batch requests are supported.
+    """
+
+    def __init__(self, methods, batches=False):
+        super(FakeSPDKServer, self).__init__()
+        self.methods = methods
+        self.batches = batches
+        # The requests received, and the number of connections accepted.
+        self.requests = []
+        self.connections = 0
+        self._handlers = []
+
+    def setUp(self):
+        super(FakeSPDKServer, self).setUp()
+        tmp_dir = self.useFixture(fixtures.TempDir()).path
+        self.path = os.path.join(tmp_dir, 'spdk.sock')
+        self._server = eventlet.listen(self.path, family=socket.AF_UNIX)
+        self._thread = eventlet.spawn(self._serve)
+        self.addCleanup(self._stop)
+
+    def _stop(self):
+        self._thread.kill()
+        self.drop_connections()
+        self._server.close()
+
+    def drop_connections(self):
+        """Close the open connections, like a restarted server would."""
+        for handler, conn in self._handlers:
+            # NOTE: stop the handler before closing the connection it waits
+            # on, eventlet would wake up the next user of the fd otherwise.
+            handler.kill()
+            conn.close()
+        self._handlers = []
+
+    def _serve(self):
+        while True:
+            conn, _addr = self._server.accept()
+            self.connections += 1
+            self._handlers.append((eventlet.spawn(self._handle, conn), conn))
+
+    def _handle(self, conn):
+        decoder = json.JSONDecoder()
+        buf = b''
+        while True:
+            try:
+                data = conn.recv(4096)
+            except socket.error:
+                return
+            if not data:
+                return
+            buf += data
+            while buf.strip():
+                try:
+                    text = buf.decode('utf-8').strip()
+                    request, end = decoder.raw_decode(text)
+                except ValueError:
+                    break
+                buf = text[end:].encode('utf-8')
+                if isinstance(request, list) and self.batches:
+                    response = [self._response(r) for r in request]
+                elif isinstance(request, list):
+                    response = {'jsonrpc': '2.0', 'id': None,
+                                'error': {'code': -32600,
+                                          'message': 'Invalid request'}}
+                else:
+                    response = self._response(request)
+                conn.sendall(json.dumps(response).encode('utf-8'))
+
+    def _response(self, request):
+        self.requests.append(request)
+        response = {'jsonrpc': '2.0', 'id': request['id']}
+        handler = self.methods.get(request['method'])
+        if handler is None:
+            response['error'] = {'code': -32601,
+                                 'message': 'Method not found'}
+            return response
+        try:
+            response['result'] = handler(request.get('params'))
+        except RPCError as e:
+            response['error'] = {'code': e.code, 'message': e.message}
+        return response
@@ -0,0 +1,125 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+
+import mock
+
+from cyborg.accelerator.common import exception
+from cyborg.accelerator.drivers.spdk.util.pyspdk import jsonrpc_client
+from cyborg.accelerator.drivers.spdk.util.pyspdk.nvmf_client import NvmfTgt
+from cyborg.accelerator.drivers.spdk.util.pyspdk.py_spdk import PySPDK
+from cyborg.tests import base
+from cyborg.tests.unit.accelerator.drivers.spdk.util import fake_spdk_server
+
+
+BDEVS = [{"num_blocks": 131072, "name": "nvme1", "block_size": 512}]
+
+
+class TestJSONRPCClient(base.TestCase):
+
+    def setUp(self):
+        super(TestJSONRPCClient, self).setUp()
+        self.bdevs = list(BDEVS)
+        self.server = self.useFixture(fake_spdk_server.FakeSPDKServer({
+            'get_bdevs': lambda params: self.bdevs,
+            'construct_malloc_bdev': self._construct_malloc_bdev,
+            'echo': lambda params: params,
+        }))
+        self.client = jsonrpc_client.JSONRPCClient(self.server.path,
+                                                   timeout=5)
+        self.addCleanup(self.client.close)
+
+    def _construct_malloc_bdev(self, params):
+        if params['block_size'] % 512:
+            raise fake_spdk_server.RPCError(-32602, 'Invalid parameters')
+        name = 'Malloc%d' % len(self.bdevs)
+        self.bdevs.append({'name': name,
+                           'num_blocks': params['num_blocks'],
+                           'block_size': params['block_size']})
+        return name
+
+    def test_call_persistent_connection(self):
+        self.assertEqual(BDEVS, self.client.call('get_bdevs'))
+        self.assertEqual({'a': u'é' * 40000},
+                         self.client.call('echo', {'a': u'é' * 40000}))
+        self.assertEqual(1, self.server.connections)
+        self.assertEqual(
+            {'jsonrpc': '2.0', 'method': 'get_bdevs', 'id': 1},
+            self.server.requests[0])
+
+    @mock.patch.object(jsonrpc_client, 'RECV_SIZE', 7)
+    def test_call_brackets_in_strings(self):
+        # Strings with brackets, quotes and escapes split between reads.
+        params = {'a': [u'}]"\\', u'{"[é\\"', {'b': u'\\'}], 'c': 1}
+        results = self.client.pipeline([('echo', params)] * 3)
+        self.assertEqual([params] * 3, results)
+        self.assertEqual(BDEVS, self.client.call('get_bdevs'))
+
+    def test_call_error(self):
+        exc = self.assertRaises(
+            exception.SPDKRPCError, self.client.call,
+            'construct_malloc_bdev', {'num_blocks': 8, 'block_size': 100})
+        self.assertIn('-32602', str(exc))
+        self.assertRaises(exception.SPDKRPCError, self.client.call,
+                          'unknown_method')
+        # The connection is still usable after errors.
+        self.assertEqual(BDEVS, self.client.call('get_bdevs'))
+        self.assertEqual(1, self.server.connections)
+
+    def test_pipeline(self):
+        calls = [('construct_malloc_bdev',
+                  {'num_blocks': 8, 'block_size': 512})] * 3
+        calls.append(('get_bdevs', None))
+        results = self.client.pipeline(calls)
+        self.assertEqual(['Malloc1', 'Malloc2', 'Malloc3'], results[:3])
+        self.assertEqual(4, len(results[3]))
+        self.assertEqual(1, self.server.connections)
+
+    def test_batch(self):
+        self.server.batches = True
+        results = self.client.batch([('echo', [1]), ('get_bdevs', None)])
+        self.assertEqual([[1], BDEVS], results)
+
+    def test_batch_not_supported(self):
+        self.assertRaises(exception.SPDKRPCError, self.client.batch,
+                          [('echo', [1]), ('get_bdevs', None)])
+        self.assertEqual(BDEVS, self.client.call('get_bdevs'))
+
+    def test_reconnect(self):
+        self.assertEqual(BDEVS, self.client.call('get_bdevs'))
+        self.server.drop_connections()
+        self.assertEqual(BDEVS, self.client.call('get_bdevs'))
+        self.assertEqual(2, self.server.connections)
+
+    def test_server_down(self):
+        client = jsonrpc_client.JSONRPCClient(
+            os.path.join(os.path.dirname(self.server.path), 'missing.sock'))
+        self.assertRaises(exception.SPDKConnectionError, client.call,
+                          'get_bdevs')
+
+    def test_nvmf_client(self):
+        py = PySPDK('nvmf', rpc_address=self.server.path, rpc_timeout=5)
+        self.addCleanup(py.rpc_client.close)
+        acc_client = NvmfTgt(py)
+        self.assertEqual(BDEVS, acc_client.get_bdevs())
+        acc_client.construct_malloc_bdev(64, 4096)
+        self.assertEqual({'num_blocks': 16384, 'block_size': 4096},
+                         self.server.requests[-1]['params'])
+
+    def test_pipeline_errors_as_results(self):
+        results = self.client.pipeline(
+            [('echo', [1]), ('unknown_method', None), ('echo', [2])],
+            raise_on_error=False)
+        self.assertEqual([1], results[0])
+        self.assertIsInstance(results[1], exception.SPDKRPCError)
+        self.assertEqual([2], results[2])
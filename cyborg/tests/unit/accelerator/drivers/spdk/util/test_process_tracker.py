@@ -0,0 +1,102 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import subprocess
+import sys
+import time
+
+import fixtures
+import mock
+from oslo_utils import uuidutils
+import psutil
+import testtools
+
+from cyborg.accelerator.drivers.spdk.util.pyspdk import process_tracker
+from cyborg.accelerator.drivers.spdk.util.pyspdk.py_spdk import PySPDK
+from cyborg.tests import base
+
+
+@testtools.skipUnless(os.path.isdir(process_tracker.PROC), 'requires /proc')
+class TestProcessTracker(base.TestCase):
+
+    def setUp(self):
+        super(TestProcessTracker, self).setUp()
+        # A fake server, found by the unique name in its command line.
+        self.name = 'fake_tgt_' + uuidutils.generate_uuid().replace('-', '')
+        self.server = subprocess.Popen(
+            [sys.executable, '-c', 'import time; time.sleep(60)',
+             self.name])
+        self.addCleanup(self._stop_server)
+        # NOTE: the green Popen may return before the child exec'ed.
+        for _i in range(500):
+            if self.name in (process_tracker._cmdline(self.server.pid) or []):
+                break
+            time.sleep(0.01)
+        self.tmp_dir = self.useFixture(fixtures.TempDir()).path
+        self.process_iter = self.useFixture(fixtures.MockPatchObject(
+            psutil, 'process_iter', wraps=psutil.process_iter)).mock
+
+    def _stop_server(self):
+        if self.server.poll() is None:
+            self.server.kill()
+            self.server.wait()
+
+    def test_scan_once(self):
+        tracker = process_tracker.ProcessTracker(self.name)
+        self.assertEqual(self.server.pid, tracker.get_pid())
+        self.assertEqual(self.server.pid, tracker.get_pid())
+        self.assertEqual(1, self.process_iter.call_count)
+
+    def test_server_exited(self):
+        tracker = process_tracker.ProcessTracker(self.name)
+        self.assertEqual(self.server.pid, tracker.get_pid())
+        self._stop_server()
+        self.assertFalse(tracker.is_running())
+        self.assertIsNone(tracker.get_pid())
+        self.assertEqual(2, self.process_iter.call_count)
+
+    def test_pid_reused(self):
+        tracker = process_tracker.ProcessTracker(self.name)
+        tracker.remember(os.getpid())
+        self.assertTrue(tracker.is_running())
+        # Another process with the same PID has another start time.
+        tracker._start_time -= 1
+        self.assertEqual(self.server.pid, tracker.get_pid())
+        self.assertEqual(1, self.process_iter.call_count)
+
+    def _pidfile(self, pid):
+        pidfile = os.path.join(self.tmp_dir, 'fake_tgt.pid')
+        with open(pidfile, 'w') as f:
+            f.write('%d\n' % pid)
+        return pidfile
+
+    def test_pidfile(self):
+        tracker = process_tracker.ProcessTracker(
+            self.name, pidfile=self._pidfile(self.server.pid))
+        self.assertEqual(self.server.pid, tracker.get_pid())
+        self.assertFalse(self.process_iter.called)
+
+    def test_stale_pidfile(self):
+        tracker = process_tracker.ProcessTracker(
+            self.name, pidfile=self._pidfile(os.getpid()))
+        self.assertEqual(self.server.pid, tracker.get_pid())
+        self.assertEqual(1, self.process_iter.call_count)
+
+    def test_pyspdk_is_alive(self):
+        py = PySPDK(self.name)
+        self.assertTrue(py.is_alive())
+        self.assertEqual(self.server.pid, py.pid)
+        self._stop_server()
+        with mock.patch.object(process_tracker.ProcessTracker, '_scan',
+                               return_value=None):
+            self.assertFalse(py.is_alive())
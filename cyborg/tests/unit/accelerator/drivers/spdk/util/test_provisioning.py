@@ -0,0 +1,163 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import fixtures
+
+from cyborg.accelerator.common import exception
+from cyborg.accelerator.drivers.spdk.nvmf.nvmf import NVMFDRIVER
+from cyborg.accelerator.drivers.spdk.util import common_fun
+from cyborg.accelerator.drivers.spdk.util import provisioning
+from cyborg.accelerator.drivers.spdk.util.pyspdk import jsonrpc_client
+from cyborg.accelerator.drivers.spdk.util.pyspdk.py_spdk import PySPDK
+from cyborg.accelerator.drivers.spdk.vhost.vhost import VHOSTDRIVER
+from cyborg.tests import base
+from cyborg.tests.unit.accelerator.drivers.spdk.util import fake_spdk_server
+
+
+def _malloc(name, total_size=8):
+    return {'type': 'malloc', 'name': name, 'total_size': total_size,
+            'block_size': 512}
+
+
+def _subsystem(nqn, namespaces):
+    return {'nqn': nqn, 'serial_number': 'SPDK00000000000001',
+            'listen_addresses': [{'trtype': 'RDMA',
+                                  'traddr': '192.168.100.8',
+                                  'trsvcid': '4420'}],
+            'hosts': [], 'namespaces': namespaces}
+
+
+class TestProvisioning(base.TestCase):
+
+    def setUp(self):
+        super(TestProvisioning, self).setUp()
+        self.bdevs = {}
+        self.subsystems = {}
+        self.server = self.useFixture(fake_spdk_server.FakeSPDKServer({
+            'construct_malloc_bdev': self._construct_malloc_bdev,
+            'construct_nvmf_subsystem': self._construct_nvmf_subsystem,
+            'delete_bdev': self._delete_bdev,
+            'delete_nvmf_subsystem': self._delete_nvmf_subsystem,
+        }))
+        self.client = jsonrpc_client.JSONRPCClient(self.server.path,
+                                                   timeout=5)
+        self.addCleanup(self.client.close)
+
+    def _construct_malloc_bdev(self, params):
+        if params['name'] in self.bdevs:
+            raise fake_spdk_server.RPCError(-32602, 'File exists')
+        self.bdevs[params['name']] = params
+        return params['name']
+
+    def _construct_nvmf_subsystem(self, params):
+        for ns in params['namespaces']:
+            if ns['bdev_name'] not in self.bdevs:
+                raise fake_spdk_server.RPCError(-32602, 'Invalid parameters')
+        self.subsystems[params['nqn']] = params
+        return True
+
+    def _delete_bdev(self, params):
+        del self.bdevs[params['name']]
+        return True
+
+    def _delete_nvmf_subsystem(self, params):
+        del self.subsystems[params['nqn']]
+        return True
+
+    def test_provision(self):
+        bdevs = [_malloc('Malloc%d' % i) for i in range(64)]
+        subsystems = [_subsystem('nqn.2016-06.io.spdk:cnode%d' % i,
+                                 ['Malloc%d' % i]) for i in range(64)]
+        items = provisioning.provision(self.client, bdevs, subsystems)
+        self.assertEqual([provisioning.CREATED] * 128,
+                         [item['status'] for item in items])
+        self.assertEqual('Malloc0', items[0]['name'])
+        self.assertEqual(64, len(self.subsystems))
+        self.assertEqual(16384, self.bdevs['Malloc0']['num_blocks'])
+        self.assertNotIn('total_size', self.bdevs['Malloc0'])
+        self.assertEqual([{'bdev_name': 'Malloc0'}],
+                         self.subsystems['nqn.2016-06.io.spdk:cnode0']
+                         ['namespaces'])
+        self.assertEqual(1, self.server.connections)
+
+    def test_provision_batch(self):
+        self.server.batches = True
+        items = provisioning.provision(
+            self.client, [_malloc('Malloc0')],
+            [_subsystem('nqn.2016-06.io.spdk:cnode0', ['Malloc0'])],
+            batch=True)
+        self.assertEqual([provisioning.CREATED] * 2,
+                         [item['status'] for item in items])
+
+    def test_provision_rollback(self):
+        self.bdevs['Malloc1'] = {}
+        bdevs = [_malloc('Malloc0'), _malloc('Malloc1'), _malloc('Malloc2')]
+        subsystems = [_subsystem('nqn.2016-06.io.spdk:cnode0', ['Malloc0']),
+                      _subsystem('nqn.2016-06.io.spdk:cnode1', ['Malloc3'])]
+        items = provisioning.provision(self.client, bdevs, subsystems)
+        self.assertEqual([provisioning.ROLLED_BACK, provisioning.FAILED,
+                          provisioning.ROLLED_BACK, provisioning.ROLLED_BACK,
+                          provisioning.FAILED],
+                         [item['status'] for item in items])
+        self.assertIn('File exists', items[1]['error'])
+        # Only what existed before is left.
+        self.assertEqual(['Malloc1'], list(self.bdevs))
+        self.assertEqual({}, self.subsystems)
+        self.assertEqual(['delete_nvmf_subsystem', 'delete_bdev',
+                          'delete_bdev'],
+                         [r['method'] for r in self.server.requests[-3:]])
+
+    def test_provision_no_rollback(self):
+        items = provisioning.provision(
+            self.client, [_malloc('Malloc0')],
+            [_subsystem('nqn.2016-06.io.spdk:cnode0', ['Malloc1'])],
+            rollback=False)
+        self.assertEqual([provisioning.CREATED, provisioning.FAILED],
+                         [item['status'] for item in items])
+        self.assertEqual(['Malloc0'], list(self.bdevs))
+
+    def test_provision_invalid(self):
+        self.assertRaises(exception.InvalidParameterValue,
+                          provisioning.provision, self.client,
+                          [_malloc('Malloc0'), {'type': 'unknown'}])
+        self.assertRaises(exception.MissingParameterValue,
+                          provisioning.provision, self.client,
+                          subsystems=[{'namespaces': ['Malloc0']}])
+        for block_size in (None, 0, -512, 'abc'):
+            bdev = _malloc('Malloc0')
+            bdev['block_size'] = block_size
+            exc = self.assertRaises(exception.InvalidParameterValue,
+                                    provisioning.provision, self.client,
+                                    [bdev])
+            self.assertIn('block_size', str(exc))
+        bdev = _malloc('Malloc0')
+        del bdev['block_size']
+        self.assertRaises(exception.InvalidParameterValue,
+                          provisioning.provision, self.client, [bdev])
+        self.assertEqual([], self.server.requests)
+
+    def _py(self):
+        py = PySPDK('nvmf', rpc_address=self.server.path, rpc_timeout=5)
+        self.addCleanup(py.rpc_client.close)
+        return py
+
+    def test_drivers(self):
+        self.useFixture(fixtures.MockPatchObject(
+            common_fun, 'get_py_client', lambda server: self._py()))
+        nvmf_items = NVMFDRIVER().provision(
+            [_malloc('Malloc0')],
+            [_subsystem('nqn.2016-06.io.spdk:cnode0', ['Malloc0'])])
+        vhost_items = VHOSTDRIVER().provision([_malloc('Malloc1')])
+        self.assertEqual([provisioning.CREATED] * 3,
+                         [item['status']
+                          for item in nvmf_items + vhost_items])
+        self.assertEqual(['Malloc0', 'Malloc1'], sorted(self.bdevs))
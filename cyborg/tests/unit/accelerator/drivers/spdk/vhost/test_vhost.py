@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import fixtures
 from cyborg.tests import base
 import mock
 from cyborg.accelerator.drivers.spdk.vhost.vhost import VHOSTDRIVER
@@ -24,6 +25,8 @@ class TestVHOSTDRIVER(base.TestCase):
 
     def setUp(self):
         super(TestVHOSTDRIVER, self).setUp()
+        self.useFixture(fixtures.MockPatchObject(
+            common_fun, '_PY_CLIENTS', {}))
         self.vhost_driver = VHOSTDRIVER()
 
     def tearDown(self):
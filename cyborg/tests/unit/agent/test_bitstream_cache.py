@@ -0,0 +1,129 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import hashlib
+import os
+import time
+
+import eventlet
+import fixtures
+import mock
+
+from cyborg.agent import bitstream_cache
+from cyborg.common import exception
+from cyborg.tests import base
+
+
+class FakeImageAPI(object):
+
+    def __init__(self):
+        self.images = {}
+        self.downloads = []
+
+    def get(self, context, image_uuid):
+        return {'id': image_uuid, 'checksum': self.images[image_uuid][0]}
+
+    def download(self, context, image_uuid, dest_path=None):
+        self.downloads.append(image_uuid)
+        # Let the concurrent calls run.
+        eventlet.sleep(0.01)
+        with open(dest_path, 'wb') as f:
+            f.write(self.images[image_uuid][1])
+
+
+class TestBitstreamCache(base.TestCase):
+
+    def setUp(self):
+        super(TestBitstreamCache, self).setUp()
+        self.path = self.useFixture(fixtures.TempDir()).path
+        self.image_api = FakeImageAPI()
+        self.image_api.images = {'image1': ('sum1', b'1' * 10),
+                                 'image2': ('sum2', b'2' * 10),
+                                 'image3': ('sum3', b'3' * 10)}
+        self.cache = bitstream_cache.BitstreamCache(
+            self.image_api, path=self.path, max_size=25)
+
+    def _get(self, image_uuid):
+        with self.cache.get(self.context, image_uuid) as path:
+            with open(path, 'rb') as f:
+                return path, f.read()
+
+    def _cached(self):
+        return sorted(os.listdir(self.path))
+
+    def test_get_downloads_once(self):
+        path, data = self._get('image1')
+        self.assertEqual(b'1' * 10, data)
+        self.assertEqual(os.path.join(self.path, 'image1-sum1.bin'), path)
+        self.assertEqual((path, data), self._get('image1'))
+        self.assertEqual(['image1'], self.image_api.downloads)
+
+    def test_get_new_checksum(self):
+        self._get('image1')
+        self.image_api.images['image1'] = ('sum4', b'4' * 10)
+        self.assertEqual(b'4' * 10, self._get('image1')[1])
+        self.assertEqual(['image1', 'image1'], self.image_api.downloads)
+
+    def test_get_concurrent(self):
+        threads = [eventlet.spawn(self._get, 'image1') for _ in range(4)]
+        for thread in threads:
+            thread.wait()
+        self.assertEqual(['image1'], self.image_api.downloads)
+
+    def test_evict_least_recently_used(self):
+        self._get('image1')
+        self._get('image2')
+        now = time.time()
+        os.utime(os.path.join(self.path, 'image2-sum2.bin'),
+                 (now - 60, now - 60))
+        self._get('image1')
+        self._get('image3')
+        self.assertEqual(['image1-sum1.bin', 'image3-sum3.bin'],
+                         self._cached())
+
+    def test_evict_not_in_use(self):
+        self.cache.max_size = 0
+        with self.cache.get(self.context, 'image1') as path:
+            self._get('image2')
+            self.assertEqual(['image1-sum1.bin'], self._cached())
+            self.assertTrue(os.path.exists(path))
+        self.assertEqual([], self._cached())
+
+    def test_failed_download(self):
+        with mock.patch.object(self.image_api, 'download',
+                               side_effect=IOError):
+            self.assertRaises(IOError, self._get, 'image1')
+        self.assertEqual([], self._cached())
+        self.assertEqual(b'1' * 10, self._get('image1')[1])
+
+    def test_partial_downloads_removed(self):
+        partial = os.path.join(self.path, 'image1-sum1.binXYZ.part')
+        open(partial, 'wb').close()
+        self._get('image2')
+        self.assertEqual(['image2-sum2.bin'], self._cached())
+
+    def test_verify(self):
+        data = b'5' * 10
+        self.image_api.images['image5'] = (hashlib.md5(data).hexdigest(),
+                                           data)
+        with self.cache.get(self.context, 'image5') as path:
+            self.cache.verify(path)
+            with open(path, 'r+b') as f:
+                f.write(b'6')
+            self.assertRaises(exception.ImageChecksumMismatch,
+                              self.cache.verify, path)
+            self.assertFalse(os.path.exists(path))
+
+    def test_verify_without_checksum(self):
+        self.image_api.images['image5'] = (None, b'5' * 10)
+        with self.cache.get(self.context, 'image5') as path:
+            self.cache.verify(path)
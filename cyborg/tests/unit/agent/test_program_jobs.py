@@ -0,0 +1,175 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import hashlib
+
+import eventlet
+from eventlet import event
+import fixtures
+import mock
+from oslo_utils import uuidutils
+
+from cyborg.agent import bitstream_cache
+from cyborg.agent import program_jobs
+from cyborg.common import constants
+from cyborg import objects
+from cyborg.tests import base
+from cyborg.tests.unit.agent import test_bitstream_cache
+from cyborg.tests.unit.db import utils
+
+IMAGE_UUID = '9a17439a-85d0-4c53-a3d3-0f68a2eac896'
+
+
+class FakeConductorAPI(object):
+
+    def __init__(self):
+        self.states = collections.defaultdict(list)
+
+    def program_job_update(self, context, obj_job):
+        self.states[obj_job.uuid].append(obj_job.state)
+        return obj_job
+
+
+class FakeFPGADriver(object):
+
+    def __init__(self):
+        self.programmed = []
+        self.returncode = 0
+        # The number of devices programmed concurrently.
+        self.current = collections.Counter()
+        self.max_concurrency = collections.Counter()
+
+    def program(self, device_path, image):
+        self.current[device_path] += 1
+        self.max_concurrency[device_path] = max(
+            self.max_concurrency[device_path], self.current[device_path])
+        eventlet.sleep(0.01)
+        self.current[device_path] -= 1
+        self.programmed.append((device_path, image))
+        return self.returncode
+
+
+class TestProgramJobRunner(base.TestCase):
+
+    def setUp(self):
+        super(TestProgramJobRunner, self).setUp()
+        path = self.useFixture(fixtures.TempDir()).path
+        self.image_api = test_bitstream_cache.FakeImageAPI()
+        data = b'1' * 10
+        self.image_api.images = {
+            IMAGE_UUID: (hashlib.md5(data).hexdigest(), data)}
+        self.cache = bitstream_cache.BitstreamCache(self.image_api,
+                                                    path=path)
+        self.cond_api = FakeConductorAPI()
+        self.driver = FakeFPGADriver()
+        fpga_driver = mock.Mock()
+        fpga_driver.create.return_value = self.driver
+        self.runner = program_jobs.ProgramJobRunner(
+            self.cond_api, fpga_driver, self.cache, workers=8)
+
+    def _job(self, **kw):
+        values = utils.get_test_program_job(uuid=uuidutils.generate_uuid(),
+                                            **kw)
+        job = objects.ProgramJob(self.context, **values)
+        job.obj_reset_changes()
+        return job
+
+    def test_program(self):
+        job = self._job()
+        self.runner.submit(self.context, job, '0x8086', '0000:5e:00.0')
+        self.assertEqual([job.uuid], self.runner.running())
+        self.runner.wait()
+        self.assertEqual([constants.PROGRAM_DOWNLOADING,
+                          constants.PROGRAM_VERIFYING,
+                          constants.PROGRAM_PROGRAMMING,
+                          constants.PROGRAM_DONE],
+                         self.cond_api.states[job.uuid])
+        self.assertEqual([('0000:5e:00.0', self.cache._entry(
+            IMAGE_UUID, self.image_api.images[IMAGE_UUID][0]))],
+            self.driver.programmed)
+        self.assertEqual([], self.runner.running())
+
+    def test_programmer_failed(self):
+        self.driver.returncode = 1
+        job = self._job()
+        self.runner.submit(self.context, job, '0x8086', '0000:5e:00.0')
+        self.runner.wait()
+        self.assertEqual(constants.PROGRAM_FAILED,
+                         self.cond_api.states[job.uuid][-1])
+        self.assertIn('exited with 1', job.reason)
+
+    def test_download_failed(self):
+        job = self._job(image_uuid=uuidutils.generate_uuid())
+        self.runner.submit(self.context, job, '0x8086', '0000:5e:00.0')
+        self.runner.wait()
+        self.assertEqual([constants.PROGRAM_DOWNLOADING,
+                          constants.PROGRAM_FAILED],
+                         self.cond_api.states[job.uuid])
+        self.assertEqual([], self.driver.programmed)
+
+    def test_submit_not_blocked_by_busy_workers(self):
+        runner = program_jobs.ProgramJobRunner(
+            self.cond_api, mock.Mock(create=lambda vendor: self.driver),
+            self.cache, workers=1)
+        jobs = [self._job() for _ in range(3)]
+        for job in jobs:
+            runner.submit(self.context, job, '0x8086', '0000:5e:00.0')
+        self.assertEqual(3, len(runner.running()))
+        runner.wait()
+        self.assertEqual([constants.PROGRAM_DONE] * 3,
+                         [self.cond_api.states[job.uuid][-1] for job in jobs])
+
+    def test_other_devices_programmed_while_device_busy(self):
+        busy = event.Event()
+        driver = self.driver
+
+        class BlockingFPGADriver(object):
+
+            def program(self, device_path, image):
+                if device_path == '0000:5e:00.0':
+                    busy.wait()
+                return driver.program(device_path, image)
+
+        runner = program_jobs.ProgramJobRunner(
+            self.cond_api, mock.Mock(create=lambda v: BlockingFPGADriver()),
+            self.cache, workers=2)
+        device_uuid = uuidutils.generate_uuid()
+        busy_jobs = [self._job(device_uuid=device_uuid) for _ in range(4)]
+        for job in busy_jobs:
+            runner.submit(self.context, job, '0x8086', '0000:5e:00.0')
+        job = self._job(device_uuid=uuidutils.generate_uuid())
+        runner.submit(self.context, job, '0x8086', '0000:be:00.0')
+        with eventlet.Timeout(5):
+            while self.cond_api.states[job.uuid][-1:] != [
+                    constants.PROGRAM_DONE]:
+                eventlet.sleep(0.01)
+        self.assertEqual([constants.PROGRAM_PROGRAMMING],
+                         self.cond_api.states[busy_jobs[0].uuid][-1:])
+        busy.send()
+        runner.wait()
+        self.assertEqual(
+            [constants.PROGRAM_DONE] * 4,
+            [self.cond_api.states[j.uuid][-1] for j in busy_jobs])
+
+    def test_devices_programmed_one_job_at_a_time(self):
+        devices = {'0000:5e:00.0': uuidutils.generate_uuid(),
+                   '0000:be:00.0': uuidutils.generate_uuid()}
+        for address, device_uuid in sorted(devices.items()) * 3:
+            self.runner.submit(self.context,
+                               self._job(device_uuid=device_uuid),
+                               '0x8086', address)
+        self.runner.wait()
+        self.assertEqual(6, len(self.driver.programmed))
+        self.assertEqual({'0000:5e:00.0': 1, '0000:be:00.0': 1},
+                         dict(self.driver.max_concurrency))
+        self.assertEqual([IMAGE_UUID], self.image_api.downloads)
@@ -0,0 +1,150 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from cyborg.agent import provider_tree
+from cyborg.tests import base
+
+
+class TestProviderTree(base.TestCase):
+
+    def setUp(self):
+        super(TestProviderTree, self).setUp()
+        self.tree = provider_tree.ProviderTree()
+        self.tree.new_root('host', 'host_uuid')
+        self.tree.new_child('pf0', 'host', uuid='pf0_uuid')
+        self.tree.new_child('vf0', 'pf0_uuid', uuid='vf0_uuid')
+
+    def test_find_by_name_or_uuid(self):
+        self.assertEqual('vf0_uuid', self.tree.data('vf0').uuid)
+        self.assertEqual('vf0', self.tree.data('vf0_uuid').name)
+        self.assertEqual('pf0_uuid', self.tree.data('vf0').parent_uuid)
+        self.assertRaises(ValueError, self.tree.data, 'vf1')
+        self.assertRaises(ValueError, self.tree.new_child, 'vf0', 'pf0')
+        self.assertRaises(ValueError, self.tree.new_root, 'host', 'pf0_uuid')
+
+    def test_remove_subtree(self):
+        self.tree.remove('pf0')
+        self.assertFalse(self.tree.exists('pf0_uuid'))
+        self.assertFalse(self.tree.exists('vf0'))
+        self.assertEqual(['host_uuid'], self.tree.get_provider_uuids())
+        # The names are free again.
+        self.tree.new_child('vf0', 'host', uuid='vf0_new_uuid')
+        self.assertEqual('vf0_new_uuid', self.tree.data('vf0').uuid)
+
+    def test_duplicate_names(self):
+        self.tree.new_child('vf', 'pf0', uuid='vf1_uuid')
+        self.tree.new_child('vf', 'host', uuid='vf2_uuid')
+        self.assertEqual('vf1_uuid', self.tree.data('vf').uuid)
+        self.tree.remove('vf1_uuid')
+        self.assertEqual('vf2_uuid', self.tree.data('vf').uuid)
+
+    def test_populate_from_iterable(self):
+        # Children listed before their parents, and a replaced provider.
+        self.tree.populate_from_iterable([
+            {'uuid': 'vf1_uuid', 'name': 'vf1',
+             'parent_provider_uuid': 'pf1_uuid'},
+            {'uuid': 'pf1_uuid', 'name': 'pf1',
+             'parent_provider_uuid': 'host_uuid'},
+            {'uuid': 'pf0_uuid', 'name': 'pf0_renamed', 'generation': 3,
+             'parent_provider_uuid': 'host_uuid'},
+        ])
+        self.assertEqual('pf1_uuid', self.tree.data('vf1').parent_uuid)
+        self.assertEqual(3, self.tree.data('pf0_renamed').generation)
+        self.assertFalse(self.tree.exists('pf0'))
+        # The descendants of a replaced provider are removed.
+        self.assertFalse(self.tree.exists('vf0_uuid'))
+        self.assertEqual(['host_uuid', 'pf0_uuid', 'pf1_uuid', 'vf1_uuid'],
+                         sorted(self.tree.get_provider_uuids()))
+
+    def test_populate_missing_parent(self):
+        self.assertRaises(ValueError, self.tree.populate_from_iterable, [
+            {'uuid': 'vf1_uuid', 'name': 'vf1',
+             'parent_provider_uuid': 'pf1_uuid'}])
+        self.assertFalse(self.tree.exists('vf1'))
+
+    def test_data_read_only(self):
+        inventory = {'FPGA': {'total': 1}}
+        self.tree.update_inventory('vf0', inventory, generation=1)
+        self.tree.update_traits('vf0', ['CUSTOM_FPGA'])
+        inventory['FPGA']['total'] = 2
+        data = self.tree.data('vf0')
+        self.assertEqual({'FPGA': {'total': 1}}, data.inventory)
+        self.assertRaises(TypeError, data.inventory.update, {})
+        self.assertRaises(TypeError, data.inventory['FPGA'].pop, 'total')
+        self.assertIsInstance(data.traits, frozenset)
+        # Nothing is copied.
+        self.assertIs(data.inventory, self.tree.data('vf0').inventory)
+        # Copies can be modified.
+        inventory = dict(data.inventory)
+        inventory['GPU'] = {'total': 1}
+        self.assertTrue(self.tree.has_inventory_changed('vf0', inventory))
+
+    def test_snapshot(self):
+        snapshot = self.tree.snapshot()
+        self.assertIs(snapshot, self.tree.snapshot())
+        self.assertEqual(self.tree.get_provider_uuids(),
+                         snapshot.get_provider_uuids())
+        self.assertEqual(['pf0_uuid', 'vf0_uuid'],
+                         snapshot.get_provider_uuids('pf0'))
+        self.tree.update_traits('vf0', ['CUSTOM_FPGA'])
+        self.tree.new_child('vf1', 'pf0', uuid='vf1_uuid')
+        # The snapshot is not affected by the changes of the tree.
+        self.assertFalse(snapshot.exists('vf1'))
+        self.assertFalse(snapshot.has_traits('vf0', ['CUSTOM_FPGA']))
+        new_snapshot = self.tree.snapshot()
+        self.assertGreater(new_snapshot.version, snapshot.version)
+        self.assertTrue(new_snapshot.has_traits('vf0_uuid', ['CUSTOM_FPGA']))
+        self.assertEqual('pf0_uuid', new_snapshot.data('vf1').parent_uuid)
+        self.assertRaises(ValueError, new_snapshot.data, 'vf2')
+
+    def test_snapshot_not_taken_again_after_reads(self):
+        snapshot = self.tree.snapshot()
+        self.tree.get_provider_uuids()
+        self.tree.data('vf0')
+        self.tree.has_traits('vf0', ['CUSTOM_FPGA'])
+        self.tree.update_traits('vf0', [])
+        self.assertIs(snapshot, self.tree.snapshot())
+
+    def test_snapshot_after_each_change(self):
+        changes = [
+            (lambda: self.tree.update_inventory(
+                'vf0', {'FPGA': {'total': 1}}, generation=5),
+             lambda data: ({'FPGA': {'total': 1}}, 5) == (
+                 data.inventory, data.generation)),
+            (lambda: self.tree.update_inventory(
+                'vf0', {'FPGA': {'total': 1}}, generation=6),
+             lambda data: data.generation == 6),
+            (lambda: self.tree.update_traits('vf0', ['CUSTOM_A'],
+                                             generation=7),
+             lambda data: (frozenset(['CUSTOM_A']), 7) == (
+                 data.traits, data.generation)),
+            (lambda: self.tree.add_traits('vf0', 'CUSTOM_B'),
+             lambda data: data.traits == frozenset(['CUSTOM_A', 'CUSTOM_B'])),
+            (lambda: self.tree.remove_traits('vf0', 'CUSTOM_A'),
+             lambda data: data.traits == frozenset(['CUSTOM_B'])),
+            (lambda: self.tree.update_aggregates('vf0', ['agg1'],
+                                                 generation=8),
+             lambda data: (frozenset(['agg1']), 8) == (
+                 data.aggregates, data.generation)),
+            (lambda: self.tree.add_aggregates('vf0', 'agg2'),
+             lambda data: data.aggregates == frozenset(['agg1', 'agg2'])),
+            (lambda: self.tree.remove_aggregates('vf0', 'agg1'),
+             lambda data: data.aggregates == frozenset(['agg2'])),
+        ]
+        for change, check in changes:
+            snapshot = self.tree.snapshot()
+            change()
+            new_snapshot = self.tree.snapshot()
+            self.assertIsNot(snapshot, new_snapshot)
+            self.assertTrue(check(new_snapshot.data('vf0')))
+        self.tree.remove('vf0')
+        self.assertFalse(self.tree.snapshot().exists('vf0'))
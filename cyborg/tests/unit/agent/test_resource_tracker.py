@@ -15,11 +15,18 @@
 
 
 """Cyborg agent resource_tracker test cases."""
+from eventlet import patcher
+import mock
+import oslo_messaging as messaging
+
 from cyborg.agent.resource_tracker import ResourceTracker
 from cyborg.common import exception
 from cyborg.conductor import rpcapi as cond_api
 from cyborg.conf import CONF
+from cyborg.objects import base as objects_base
+from cyborg.objects.driver_objects import driver_delta
 from cyborg.tests import base
+from cyborg.tests.unit import fake_driver_device
 
 
 class TestResourceTracker(base.TestCase):
@@ -39,6 +46,151 @@ class TestResourceTracker(base.TestCase):
         # has stored into DB by conductor correctly?
         pass
 
+    @mock.patch.object(cond_api.ConductorAPI, 'report_data')
+    def test_update_usage_reports_fingerprint(self, mock_report):
+        acc_list = [fake_driver_device.fake_driver_device()]
+        fake_driver = mock.Mock()
+        fake_driver.discover.return_value = acc_list
+        self.rt.acc_drivers = [fake_driver]
+        self.rt.update_usage(self.context)
+        mock_report.assert_called_once_with(
+            self.context, self.host, acc_list,
+            fingerprint=objects_base.obj_fingerprint(acc_list))
+
+    def _set_discovered(self, acc_list):
+        fake_driver = mock.Mock()
+        fake_driver.discover.return_value = acc_list
+        self.rt.acc_drivers = [fake_driver]
+
+    @mock.patch.object(cond_api.ConductorAPI, 'report_data_delta')
+    @mock.patch.object(cond_api.ConductorAPI, 'report_data')
+    def test_update_usage_reports_delta(self, mock_report, mock_delta):
+        old_list = [fake_driver_device.fake_driver_device()]
+        new_list = [fake_driver_device.fake_driver_device(model='new')]
+        mock_delta.return_value = True
+        self._set_discovered(old_list)
+        self.rt.update_usage(self.context)
+        self._set_discovered(new_list)
+        self.rt.update_usage(self.context)
+
+        self.assertEqual(1, mock_report.call_count)
+        old_fp = objects_base.obj_fingerprint(old_list)
+        new_fp = objects_base.obj_fingerprint(new_list)
+        mock_delta.assert_called_once_with(
+            self.context, self.host,
+            driver_delta.make_delta(old_list, new_list, old_fp, new_fp))
+        self.assertEqual((new_fp, new_list), self.rt._last_report)
+
+    @mock.patch.object(cond_api.ConductorAPI, 'report_data_delta')
+    @mock.patch.object(cond_api.ConductorAPI, 'report_data')
+    def test_update_usage_delta_resync(self, mock_report, mock_delta):
+        acc_list = [fake_driver_device.fake_driver_device()]
+        self._set_discovered(acc_list)
+        self.rt.update_usage(self.context)
+        for result in (False, messaging.RemoteError('UnsupportedVersion')):
+            mock_delta.side_effect = [result]
+            mock_report.reset_mock()
+            self.rt.update_usage(self.context)
+            mock_report.assert_called_once_with(
+                self.context, self.host, acc_list,
+                fingerprint=objects_base.obj_fingerprint(acc_list))
+
+    @mock.patch.object(cond_api.ConductorAPI, 'report_data')
+    def test_update_usage_discovers_all_drivers(self, mock_report):
+        devices = [fake_driver_device.fake_driver_device('0000:%02x:00.0' % i)
+                   for i in range(0x81, 0x84)]
+        drivers = [mock.Mock(**{'discover.return_value': [device]})
+                   for device in devices]
+        self.rt.acc_drivers = drivers
+        self.rt.update_usage(self.context)
+        mock_report.assert_called_once_with(
+            self.context, self.host, devices,
+            fingerprint=objects_base.obj_fingerprint(devices))
+        self.assertEqual([], self.rt.stale_drivers)
+
+    @mock.patch.object(cond_api.ConductorAPI, 'report_data_delta',
+                       return_value=False)
+    @mock.patch.object(cond_api.ConductorAPI, 'report_data')
+    def test_update_usage_reuses_stale_devices(self, mock_report,
+                                               mock_delta):
+        self.config(discovery_timeout=1, group='agent')
+        old_device = fake_driver_device.fake_driver_device('0000:81:00.0')
+        device = fake_driver_device.fake_driver_device('0000:82:00.0')
+        hung = patcher.original('threading').Event()
+        self.addCleanup(hung.set)
+        results = [[old_device]]
+
+        def _slow_discover():
+            if results:
+                return results.pop()
+            hung.wait()
+
+        slow_driver = mock.Mock(**{'discover.side_effect': _slow_discover})
+        failing_driver = mock.Mock()
+        failing_driver.discover.side_effect = [[], RuntimeError, RuntimeError]
+        fast_driver = mock.Mock(**{'discover.return_value': [device]})
+        self.rt.acc_drivers = [slow_driver, failing_driver, fast_driver]
+        self.rt.update_usage(self.context)
+        self.assertEqual([], self.rt.stale_drivers)
+
+        self.rt.update_usage(self.context)
+        self.assertEqual(2, len(self.rt.stale_drivers))
+        acc_list = [old_device, device]
+        mock_report.assert_called_with(
+            self.context, self.host, acc_list,
+            fingerprint=objects_base.obj_fingerprint(acc_list))
+
+        # The hung discovery is waited for again, not started twice.
+        self.rt.update_usage(self.context)
+        self.assertEqual(2, slow_driver.discover.call_count)
+
+    @mock.patch.object(cond_api.ConductorAPI, 'report_data_delta')
+    @mock.patch.object(cond_api.ConductorAPI, 'report_data')
+    def test_update_usage_first_discovery_failed(self, mock_report,
+                                                 mock_delta):
+        device = fake_driver_device.fake_driver_device('0000:81:00.0')
+        failing_device = fake_driver_device.fake_driver_device('0000:82:00.0')
+        failing_driver = mock.Mock()
+        failing_driver.discover.side_effect = [IOError, [failing_device]]
+        driver = mock.Mock(**{'discover.return_value': [device]})
+        self.rt.acc_drivers = [driver, failing_driver]
+        # Reporting the devices of the other driver only would delete the
+        # devices of the failing driver.
+        self.rt.update_usage(self.context)
+        self.assertEqual(1, len(self.rt.stale_drivers))
+        mock_report.assert_not_called()
+        mock_delta.assert_not_called()
+
+        self.rt.update_usage(self.context)
+        acc_list = [device, failing_device]
+        mock_report.assert_called_once_with(
+            self.context, self.host, acc_list,
+            fingerprint=objects_base.obj_fingerprint(acc_list))
+
+    @mock.patch.object(cond_api.ConductorAPI, 'report_data_delta',
+                       return_value=False)
+    @mock.patch.object(cond_api.ConductorAPI, 'report_data')
+    def test_update_usage_targeted(self, mock_report, mock_delta):
+        devices = [fake_driver_device.fake_driver_device('0000:%02x:00.0' % i)
+                   for i in range(0x81, 0x83)]
+        drivers = [mock.Mock(**{'discover.return_value': [device]})
+                   for device in devices]
+        self.rt.acc_drivers = drivers
+        self.rt.update_usage(self.context)
+
+        # A VF of the second device changed, only its driver rediscovers.
+        self.rt.update_usage(self.context, bdfs=set(['0000:82:00.1']))
+        self.assertEqual(1, drivers[0].discover.call_count)
+        self.assertEqual(2, drivers[1].discover.call_count)
+        mock_report.assert_called_with(
+            self.context, self.host, devices,
+            fingerprint=objects_base.obj_fingerprint(devices))
+
+        # An unknown device may belong to any driver.
+        self.rt.update_usage(self.context, bdfs=set(['0000:83:00.0']))
+        self.assertEqual(2, drivers[0].discover.call_count)
+        self.assertEqual(3, drivers[1].discover.call_count)
+
     def test_initialize_acc_drivers(self):
         enabled_drivers = ['intel_fpga_driver']
         self.rt._initialize_drivers(enabled_drivers=enabled_drivers)
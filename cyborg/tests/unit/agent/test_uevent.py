@@ -0,0 +1,122 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+import mock
+
+from cyborg.agent import manager
+from cyborg.agent import uevent
+from cyborg.tests import base
+from cyborg.tests.unit import fake_uevent
+
+
+class TestUevent(base.TestCase):
+
+    def test_parse_uevent(self):
+        data = (b'add@/devices/pci0000:00/0000:00:06.0\0ACTION=add\0'
+                b'DEVPATH=/devices/pci0000:00/0000:00:06.0\0SUBSYSTEM=pci\0'
+                b'PCI_SLOT_NAME=0000:00:06.0\0SEQNUM=4242\0')
+        self.assertEqual(
+            {'ACTION': 'add',
+             'DEVPATH': '/devices/pci0000:00/0000:00:06.0',
+             'SUBSYSTEM': 'pci',
+             'PCI_SLOT_NAME': '0000:00:06.0',
+             'SEQNUM': '4242'},
+            uevent.parse_uevent(data))
+        self.assertIsNone(uevent.parse_uevent(b'libudev\0\xfe\xed'))
+
+    def test_event_bdfs(self):
+        self.assertEqual(set(['0000:00:06.0']), uevent.event_bdfs(
+            fake_uevent.fake_pci_event('0000:00:06.0')))
+        self.assertEqual(set(['0000:5e:00.0']), uevent.event_bdfs(
+            {'ACTION': 'change', 'SUBSYSTEM': 'fpga',
+             'DEVPATH': '/devices/pci0000:5e/0000:5e:00.0/fpga/'
+                        'intel-fpga-dev.0'}))
+        self.assertEqual(set(), uevent.event_bdfs(
+            {'ACTION': 'add', 'SUBSYSTEM': 'usb',
+             'DEVPATH': '/devices/pci0000:00/0000:00:14.0/usb1'}))
+
+
+class TestUeventListener(base.TestCase):
+
+    def setUp(self):
+        super(TestUeventListener, self).setUp()
+        self.source = fake_uevent.FakeEventSource()
+        self.changes = eventlet.queue.Queue()
+        self.listener = uevent.UeventListener(
+            self.source, self.changes.put, 0.05)
+
+    def test_events_debounced(self):
+        self.source.push(fake_uevent.fake_pci_event('0000:5e:00.1'))
+        self.source.push({'ACTION': 'add', 'SUBSYSTEM': 'usb',
+                          'DEVPATH': '/devices/usb1'})
+        self.source.push(fake_uevent.fake_pci_event('0000:5e:00.2'))
+        self.source.push(fake_uevent.fake_pci_event('0000:5e:00.1',
+                                                    action='bind'))
+        self.listener.start()
+        self.addCleanup(self.listener.stop)
+        self.assertEqual(set(['0000:5e:00.1', '0000:5e:00.2']),
+                         self.changes.get(timeout=5))
+
+        self.source.push(fake_uevent.fake_pci_event('0000:81:00.0'))
+        self.assertEqual(set(['0000:81:00.0']), self.changes.get(timeout=5))
+        self.assertTrue(self.changes.empty())
+
+    def test_callback_failure(self):
+        callback = mock.Mock(side_effect=[Exception('boom'), None])
+        self.listener.callback = callback
+        self.listener.start()
+        self.source.push(fake_uevent.fake_pci_event('0000:5e:00.1'))
+        eventlet.sleep(0.1)
+        self.source.push(fake_uevent.fake_pci_event('0000:5e:00.2'))
+        eventlet.sleep(0.1)
+        self.listener.stop()
+        self.assertTrue(self.source.closed)
+        callback.assert_has_calls([mock.call(set(['0000:5e:00.1'])),
+                                   mock.call(set(['0000:5e:00.2']))])
+
+
+class TestAgentManagerUevents(base.TestCase):
+
+    def setUp(self):
+        super(TestAgentManagerUevents, self).setUp()
+        self.config(event_debounce=0.01, group='agent')
+        self.manager = manager.AgentManager('cyborg-agent', 'fake-host')
+        self.manager._rt = mock.Mock()
+        self.manager.cond_api = mock.Mock()
+
+    def test_init_host_disabled(self):
+        with mock.patch.object(uevent, 'NetlinkEventSource') as source:
+            self.manager.init_host(self.context)
+            self.assertFalse(source.called)
+        self.assertIsNone(self.manager._uevent_listener)
+
+    def test_uevents_trigger_targeted_discovery(self):
+        source = fake_uevent.FakeEventSource()
+        self.manager.start_uevent_listener(self.context, source)
+        self.addCleanup(self.manager.cleanup_host)
+        source.push(fake_uevent.fake_pci_event('0000:5e:00.1'))
+        eventlet.sleep(0.1)
+        self.manager._rt.update_usage.assert_called_once_with(
+            self.context, bdfs=set(['0000:5e:00.1']))
+
+    def test_periodic_full_scan_slowed_down(self):
+        self.manager.start_uevent_listener(self.context,
+                                           fake_uevent.FakeEventSource())
+        self.addCleanup(self.manager.cleanup_host)
+        self.manager.update_available_resource(self.context)
+        self.manager.update_available_resource(self.context)
+        self.manager._rt.update_usage.assert_called_once_with(self.context)
+
+        self.config(event_resync_interval=0, group='agent')
+        self.manager.update_available_resource(self.context)
+        self.assertEqual(2, self.manager._rt.update_usage.call_count)
@@ -16,10 +16,12 @@
 import mock
 from six.moves import http_client
 
-from cyborg.api.controllers.v1.deployables import Deployable
+from cyborg.common import constants
+from cyborg import objects
 from cyborg.tests.unit.api.controllers.v1 import base as v1_test
+from cyborg.tests.unit.db import utils
 from cyborg.tests.unit import fake_deployable
-from cyborg.agent.rpcapi import AgentAPI
+from cyborg.tests.unit import fake_device
 
 
 class TestFPGAProgramController(v1_test.APITestV1):
@@ -29,22 +31,44 @@ class TestFPGAProgramController(v1_test.APITestV1):
         self.headers = self.gen_headers(self.context)
         self.deployable_uuids = ['0acbf8d6-e02a-4394-aae3-57557d209498']
 
+    @mock.patch('cyborg.objects.ControlpathID.get_by_device_id')
+    @mock.patch('cyborg.objects.Device.get_by_device_id')
     @mock.patch('cyborg.objects.Deployable.get')
-    @mock.patch('cyborg.agent.rpcapi.AgentAPI.program_fpga_with_bitstream')
-    def test_program(self, mock_program, mock_get_dep):
+    @mock.patch('cyborg.agent.rpcapi.AgentAPI.fpga_program_job')
+    def test_program(self, mock_program, mock_get_dep, mock_get_dev,
+                     mock_get_cpid):
         self.headers['X-Roles'] = 'admin'
         self.headers['Content-Type'] = 'application/json'
         dep_uuid = self.deployable_uuids[0]
         fake_dep = fake_deployable.fake_deployable_obj(self.context,
                                                        uuid=dep_uuid)
         mock_get_dep.return_value = fake_dep
-        mock_program.return_value = None
+        fake_dev = fake_device.fake_device_obj(self.context)
+        mock_get_dev.return_value = fake_dev
+        mock_get_cpid.return_value = objects.ControlpathID(
+            self.context, **utils.get_test_control_path())
         body = [{"image_uuid": "9a17439a-85d0-4c53-a3d3-0f68a2eac896"}]
         response = self.\
             patch_json('/accelerators/deployables/%s/program' % dep_uuid,
                        [{'path': '/program', 'value': body,
                         'op': 'replace'}],
                        headers=self.headers)
-        self.assertEqual(http_client.OK, response.status_code)
+        self.assertEqual(http_client.ACCEPTED, response.status_code)
         data = response.json_body
-        self.assertEqual(dep_uuid, data['uuid'])
+        self.assertEqual(dep_uuid, data['deployable_uuid'])
+        self.assertEqual(constants.PROGRAM_QUEUED, data['state'])
+        self.assertEqual(fake_dev.hostname, data['hostname'])
+        job = mock_program.call_args[0][1]
+        self.assertEqual(data['uuid'], job.uuid)
+        self.assertIn('/program_jobs/%s' % job.uuid,
+                      response.location)
+
+        response = self.get_json('/accelerators/program_jobs/%s' % job.uuid,
+                                 headers=self.headers)
+        self.assertEqual(constants.PROGRAM_QUEUED, response['state'])
+
+        response = self.get_json(
+            '/accelerators/program_jobs?deployable_uuid=%s' % dep_uuid,
+            headers=self.headers)
+        self.assertEqual([job.uuid], [j['uuid']
+                                      for j in response['program_jobs']])
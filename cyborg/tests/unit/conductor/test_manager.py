@@ -0,0 +1,62 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_utils import uuidutils
+
+from cyborg.common import constants
+from cyborg.conductor import manager
+from cyborg import objects
+from cyborg.tests.unit.db import base
+from cyborg.tests.unit.db import utils
+
+
+class TestConductorProgramJobs(base.DbTestCase):
+
+    def setUp(self):
+        super(TestConductorProgramJobs, self).setUp()
+        self.manager = manager.ConductorManager('cyborg-conductor', 'host')
+
+    def _create(self, **kw):
+        values = utils.get_test_program_job(uuid=uuidutils.generate_uuid(),
+                                            **kw)
+        del values['id']
+        job = objects.ProgramJob(self.context, **values)
+        job.create(self.context)
+        return job
+
+    def test_program_job_update(self):
+        job = self._create()
+        job.state = constants.PROGRAM_DOWNLOADING
+        self.manager.program_job_update(self.context, job)
+        self.assertEqual(constants.PROGRAM_DOWNLOADING,
+                         objects.ProgramJob.get(self.context, job.uuid).state)
+
+    def test_program_jobs_abort(self):
+        queued = self._create()
+        done = self._create(state=constants.PROGRAM_DONE)
+        lost = self._create(state=constants.PROGRAM_PROGRAMMING)
+        running = self._create(state=constants.PROGRAM_DOWNLOADING)
+        other = self._create(state=constants.PROGRAM_VERIFYING,
+                             hostname='host2')
+
+        self.assertEqual(1, self.manager.program_jobs_abort(
+            self.context, 'host1', running=[running.uuid]))
+
+        states = dict((job.uuid, job.state)
+                      for job in objects.ProgramJob.list(self.context))
+        self.assertEqual(
+            [constants.PROGRAM_QUEUED, constants.PROGRAM_DONE,
+             constants.PROGRAM_FAILED, constants.PROGRAM_DOWNLOADING,
+             constants.PROGRAM_VERIFYING],
+            [states[job.uuid] for job in (queued, done, lost, running, other)])
+        self.assertIn('restarted',
+                      objects.ProgramJob.get(self.context, lost.uuid).reason)
@@ -0,0 +1,267 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from cyborg.conductor import manager
+from cyborg.conductor import reconciler
+from cyborg.db.sqlalchemy import api as sqlalchemy_api
+from cyborg.objects.driver_objects import driver_attach_handle
+from cyborg.objects.driver_objects import driver_delta
+from cyborg.tests.unit.db import base
+from cyborg.tests.unit import fake_driver_device
+
+
+class TestHostReconciler(base.DbTestCase):
+
+    def setUp(self):
+        super(TestHostReconciler, self).setUp()
+        self.host = 'fake-host'
+
+    def _reconcile(self, driver_device_list):
+        return reconciler.HostReconciler(
+            self.context, self.host).reconcile(driver_device_list)
+
+    def _snapshot(self):
+        return self.dbapi.host_snapshot_get(self.context, self.host)
+
+    def test_report_new_device(self):
+        self._reconcile([fake_driver_device.fake_driver_device()])
+
+        rows = self._snapshot()
+        self.assertEqual(1, len(rows['devices']))
+        self.assertEqual(1, len(rows['controlpath_ids']))
+        self.assertEqual(1, len(rows['deployables']))
+        self.assertEqual(2, len(rows['attributes']))
+        self.assertEqual(2, len(rows['attach_handles']))
+        device = rows['devices'][0]
+        cpid = rows['controlpath_ids'][0]
+        dep = rows['deployables'][0]
+        self.assertEqual(self.host, device.hostname)
+        self.assertEqual(device.id, cpid.device_id)
+        self.assertEqual(device.id, dep.device_id)
+        for attr in rows['attributes']:
+            self.assertEqual(dep.id, attr.deployable_id)
+        for ah in rows['attach_handles']:
+            self.assertEqual(dep.id, ah.deployable_id)
+            self.assertEqual(cpid.id, ah.cpid_id)
+
+    def test_report_unchanged(self):
+        devices = [fake_driver_device.fake_driver_device()]
+        self._reconcile(devices)
+        with mock.patch.object(self.dbapi, 'host_snapshot_apply') as apply:
+            changes = self._reconcile(devices)
+            self.assertFalse(apply.called)
+        self.assertFalse(any(rows for ops in changes.values()
+                             for rows in ops.values()))
+
+    def test_report_updated_fields(self):
+        self._reconcile([fake_driver_device.fake_driver_device()])
+        before = self._snapshot()
+
+        driver_dev = fake_driver_device.fake_driver_device(model='new')
+        driver_dep = driver_dev.deployable_list[0]
+        driver_dep.num_accelerators = 8
+        driver_dep.attribute_list[0].value = 'CUSTOM_NEW_RC'
+        driver_dep.attach_handle_list[0].in_use = True
+        changes = self._reconcile([driver_dev])
+
+        self.assertEqual(1, len(changes['devices']['update']))
+        self.assertEqual(1, len(changes['deployables']['update']))
+        self.assertEqual(1, len(changes['attributes']['update']))
+        self.assertEqual(1, len(changes['attach_handles']['update']))
+        after = self._snapshot()
+        self.assertEqual('new', after['devices'][0].model)
+        self.assertEqual(before['devices'][0].uuid, after['devices'][0].uuid)
+        self.assertEqual(8, after['deployables'][0].num_accelerators)
+        values = dict((attr.key, attr.value) for attr in after['attributes'])
+        self.assertEqual('CUSTOM_NEW_RC', values['rc'])
+        in_use = dict((ah.attach_info, ah.in_use)
+                      for ah in after['attach_handles'])
+        self.assertEqual({'0000:81:00.1': True, '0000:81:00.2': False},
+                         in_use)
+
+    def test_report_added_and_removed_children(self):
+        self._reconcile([fake_driver_device.fake_driver_device()])
+        cpid_id = self._snapshot()['controlpath_ids'][0].id
+
+        driver_dev = fake_driver_device.fake_driver_device()
+        driver_dep = driver_dev.deployable_list[0]
+        driver_dep.attribute_list = driver_dep.attribute_list[:1]
+        driver_dep.attach_handle_list = [
+            driver_dep.attach_handle_list[0],
+            driver_attach_handle.DriverAttachHandle(
+                attach_type='PCI', attach_info='0000:81:00.3',
+                in_use=False)]
+        self._reconcile([driver_dev])
+
+        rows = self._snapshot()
+        self.assertEqual(['rc'], [attr.key for attr in rows['attributes']])
+        self.assertEqual(['0000:81:00.1', '0000:81:00.3'],
+                         sorted(ah.attach_info
+                                for ah in rows['attach_handles']))
+        for ah in rows['attach_handles']:
+            self.assertEqual(cpid_id, ah.cpid_id)
+
+    def test_report_removed_device(self):
+        self._reconcile([
+            fake_driver_device.fake_driver_device('0000:81:00.0'),
+            fake_driver_device.fake_driver_device('0000:82:00.0')])
+        self._reconcile([
+            fake_driver_device.fake_driver_device('0000:82:00.0')])
+
+        rows = self._snapshot()
+        self.assertEqual(['0000:82:00.0'],
+                         [cpid.cpid_info for cpid in rows['controlpath_ids']])
+        self.assertEqual(1, len(rows['devices']))
+        self.assertEqual(['0000:82:00.0_pf'],
+                         [dep.name for dep in rows['deployables']])
+        self.assertEqual(2, len(rows['attributes']))
+        self.assertEqual(2, len(rows['attach_handles']))
+
+    @mock.patch.object(sqlalchemy_api, 'MAX_IN_CLAUSE_SIZE', 2)
+    def test_report_in_chunks(self):
+        addresses = ['0000:%02x:00.0' % bus for bus in range(0x81, 0x86)]
+        self._reconcile([fake_driver_device.fake_driver_device(address)
+                         for address in addresses])
+        rows = self._snapshot()
+        self.assertEqual(5, len(rows['devices']))
+        self.assertEqual(10, len(rows['attach_handles']))
+        for ah in rows['attach_handles']:
+            self.assertIsNotNone(ah.deployable_id)
+            self.assertIsNotNone(ah.cpid_id)
+
+        self._reconcile([fake_driver_device.fake_driver_device(addresses[0])])
+        rows = self._snapshot()
+        self.assertEqual([addresses[0]],
+                         [cpid.cpid_info for cpid in rows['controlpath_ids']])
+        self.assertEqual(1, len(rows['deployables']))
+        self.assertEqual(2, len(rows['attributes']))
+        self.assertEqual(2, len(rows['attach_handles']))
+
+    def test_other_hosts_untouched(self):
+        reconciler.HostReconciler(self.context, 'other-host').reconcile(
+            [fake_driver_device.fake_driver_device()])
+        self._reconcile([])
+        rows = self.dbapi.host_snapshot_get(self.context, 'other-host')
+        self.assertEqual(1, len(rows['devices']))
+        self.assertEqual(2, len(rows['attach_handles']))
+
+    def test_report_same_fingerprint_skipped(self):
+        devices = [fake_driver_device.fake_driver_device()]
+        self.assertIsNotNone(
+            reconciler.HostReconciler(self.context, self.host).reconcile(
+                devices, fingerprint='fp1'))
+        self.assertEqual('fp1', self.dbapi.host_fingerprint_get(
+            self.context, self.host))
+        with mock.patch.object(self.dbapi, 'host_snapshot_get') as get:
+            self.assertIsNone(
+                reconciler.HostReconciler(self.context, self.host).reconcile(
+                    devices, fingerprint='fp1'))
+            self.assertFalse(get.called)
+
+    def test_report_new_fingerprint_diffed(self):
+        self._reconcile([fake_driver_device.fake_driver_device()])
+        reconciler.HostReconciler(self.context, self.host).reconcile(
+            [], fingerprint='fp1')
+        reconciler.HostReconciler(self.context, self.host).reconcile(
+            [fake_driver_device.fake_driver_device()], fingerprint='fp2')
+        self.assertEqual('fp2', self.dbapi.host_fingerprint_get(
+            self.context, self.host))
+        self.assertEqual(1, len(self._snapshot()['devices']))
+
+    def _reconcile_delta(self, old_list, new_list, base='fp1',
+                         fingerprint='fp2'):
+        delta = driver_delta.make_delta(old_list, new_list, base,
+                                        fingerprint)
+        return reconciler.HostReconciler(
+            self.context, self.host).reconcile_delta(delta)
+
+    def test_report_delta(self):
+        old_list = [fake_driver_device.fake_driver_device()]
+        reconciler.HostReconciler(self.context, self.host).reconcile(
+            old_list, fingerprint='fp1')
+        new_dev = fake_driver_device.fake_driver_device(model='new')
+        new_dep = new_dev.deployable_list[0]
+        new_dep.attribute_list = new_dep.attribute_list[:1]
+        new_dep.attach_handle_list[0].in_use = True
+        new_list = [new_dev,
+                    fake_driver_device.fake_driver_device('0000:82:00.0')]
+
+        self.assertTrue(self._reconcile_delta(old_list, new_list))
+
+        self.assertEqual('fp2', self.dbapi.host_fingerprint_get(
+            self.context, self.host))
+        rows = self._snapshot()
+        self.assertEqual(['bcc0', 'new'],
+                         sorted(dev.model for dev in rows['devices']))
+        self.assertEqual(3, len(rows['attributes']))
+        self.assertEqual(4, len(rows['attach_handles']))
+        in_use = [ah.attach_info for ah in rows['attach_handles']
+                  if ah.in_use]
+        self.assertEqual(['0000:81:00.1'], in_use)
+
+    def test_report_delta_removed_device(self):
+        old_list = [fake_driver_device.fake_driver_device()]
+        reconciler.HostReconciler(self.context, self.host).reconcile(
+            old_list, fingerprint='fp1')
+        self.assertTrue(self._reconcile_delta(old_list, []))
+        rows = self._snapshot()
+        self.assertFalse(any(rows.values()))
+
+    def test_report_delta_base_mismatch(self):
+        old_list = [fake_driver_device.fake_driver_device()]
+        reconciler.HostReconciler(self.context, self.host).reconcile(
+            old_list, fingerprint='fp0')
+        with mock.patch.object(self.dbapi, 'host_snapshot_get') as get:
+            self.assertFalse(self._reconcile_delta(old_list, []))
+            self.assertFalse(get.called)
+        self.assertEqual('fp0', self.dbapi.host_fingerprint_get(
+            self.context, self.host))
+
+    def test_report_delta_unsupported_version(self):
+        reconciler.HostReconciler(self.context, self.host).reconcile(
+            [], fingerprint='fp1')
+        delta = driver_delta.make_delta([], [], 'fp1', 'fp1')
+        delta['version'] = '2.0'
+        self.assertFalse(reconciler.HostReconciler(
+            self.context, self.host).reconcile_delta(delta))
+
+    def test_report_delta_conflict(self):
+        old_list = [fake_driver_device.fake_driver_device()]
+        reconciler.HostReconciler(self.context, self.host).reconcile(
+            old_list, fingerprint='fp1')
+        # The device is already stored, adding it again is a conflict.
+        with mock.patch.object(self.dbapi, 'host_snapshot_apply') as apply:
+            self.assertFalse(self._reconcile_delta([], old_list))
+            self.assertFalse(apply.called)
+        self.assertEqual('fp1', self.dbapi.host_fingerprint_get(
+            self.context, self.host))
+
+    @mock.patch.object(reconciler.HostReconciler, 'reconcile_delta')
+    def test_manager_report_data_delta(self, mock_reconcile):
+        delta = driver_delta.make_delta([], [], 'fp', 'fp')
+        mock_reconcile.return_value = True
+        applied = manager.ConductorManager(
+            'cyborg-conductor').report_data_delta(self.context, self.host,
+                                                  delta)
+        mock_reconcile.assert_called_once_with(delta)
+        self.assertTrue(applied)
+
+    @mock.patch.object(reconciler.HostReconciler, 'reconcile')
+    def test_manager_report_data(self, mock_reconcile):
+        devices = [fake_driver_device.fake_driver_device()]
+        mock_reconcile.return_value = None
+        changed = manager.ConductorManager('cyborg-conductor').report_data(
+            self.context, self.host, devices, fingerprint='fp')
+        mock_reconcile.assert_called_once_with(devices, fingerprint='fp')
+        self.assertFalse(changed)
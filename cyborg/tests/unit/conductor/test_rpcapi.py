@@ -0,0 +1,61 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from oslo_messaging.rpc import client as rpc_client
+
+from cyborg.conductor import rpcapi
+from cyborg.tests import base
+
+
+class TestConductorAPI(base.TestCase):
+
+    def setUp(self):
+        super(TestConductorAPI, self).setUp()
+        patcher = mock.patch.object(rpc_client._BaseCallContext, 'call',
+                                    autospec=True)
+        self.call = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _api(self, version_cap=None):
+        self.config(conductor=version_cap, group='upgrade_levels')
+        return rpcapi.ConductorAPI()
+
+    def _called_version(self):
+        return self.call.call_args[0][0].target.version
+
+    def test_report_data(self):
+        api = self._api()
+        api.report_data(self.context, 'host', [], fingerprint='abc')
+        self.call.assert_called_once_with(
+            mock.ANY, self.context, 'report_data', hostname='host',
+            driver_device_list=[], fingerprint='abc')
+        self.assertEqual('1.1', self._called_version())
+
+    def test_report_data_1_0(self):
+        api = self._api('1.0')
+        api.report_data(self.context, 'host', [], fingerprint='abc')
+        self.call.assert_called_once_with(
+            mock.ANY, self.context, 'report_data', hostname='host',
+            driver_device_list=[])
+        self.assertEqual('1.0', self._called_version())
+
+    def test_report_data_delta(self):
+        api = self._api('1.2')
+        self.call.return_value = True
+        self.assertTrue(api.report_data_delta(self.context, 'host', {}))
+        self.assertEqual('1.2', self._called_version())
+
+    def test_report_data_delta_1_1(self):
+        api = self._api('1.1')
+        self.assertFalse(api.report_data_delta(self.context, 'host', {}))
+        self.call.assert_not_called()
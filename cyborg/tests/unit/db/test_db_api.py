@@ -15,9 +15,21 @@
 """Unit tests for the DB api."""
 
 import datetime
+
+import mock
+from oslo_db.sqlalchemy import enginefacade
+from oslo_utils import uuidutils
+from sqlalchemy import event
+
+from cyborg.common import exception
+from cyborg.conductor import reconciler
+from cyborg.objects import base as objects_base
+from cyborg.objects.driver_objects import driver_device
 from cyborg.tests.unit.db import base
+from cyborg.tests.unit.db import utils
 from cyborg.db import api as dbapi
 from cyborg.db.sqlalchemy import api as sqlalchemyapi
+from cyborg.tests.unit import fake_driver_device
 
 
 def _quota_reserve(context, project_id):
@@ -127,3 +139,171 @@ class DBAPIReservationTestCase(base.DbTestCase):
             result[v.resource] = dict(in_use=v.in_use,
                                       reserved=v.reserved)
         self.assertEqual(expected, result)
+
+
+class DBAPIHostTreeTestCase(base.DbTestCase):
+
+    """Tests for db.api.host_tree_get."""
+
+    def setUp(self):
+        super(DBAPIHostTreeTestCase, self).setUp()
+        self.devices = [
+            fake_driver_device.fake_driver_device('0000:%02x:00.0' % bus)
+            for bus in range(0x81, 0x85)]
+        reconciler.HostReconciler(self.context, 'host1').reconcile(
+            self.devices)
+        reconciler.HostReconciler(self.context, 'host2').reconcile(
+            [fake_driver_device.fake_driver_device()])
+
+    def _count_queries(self):
+        statements = []
+        engine = enginefacade.get_legacy_facade().get_engine()
+
+        def _count(conn, cursor, statement, *args):
+            # NOTE: skip the connection ping and transaction statements.
+            if statement.startswith('SELECT') and 'FROM' in statement:
+                statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', _count)
+        self.addCleanup(event.remove, engine, 'before_cursor_execute',
+                        _count)
+        return statements
+
+    def test_host_tree_get(self):
+        statements = self._count_queries()
+        db_devs = self.dbapi.host_tree_get(self.context, 'host1')
+        self.assertEqual(5, len(statements))
+        self.assertEqual(4, len(db_devs))
+        for db_dev in db_devs:
+            self.assertEqual(1, len(db_dev.controlpath_ids))
+            self.assertEqual(1, len(db_dev.deployables))
+            db_dep = db_dev.deployables[0]
+            self.assertEqual(['rc', 'trait0'],
+                             [attr.key for attr in db_dep.attributes])
+            self.assertEqual(2, len(db_dep.attach_handles))
+            for db_ah in db_dep.attach_handles:
+                self.assertEqual(db_dev.controlpath_ids[0].id, db_ah.cpid_id)
+
+    def test_driver_device_list(self):
+        statements = self._count_queries()
+        driver_devs = driver_device.DriverDevice.list(self.context, 'host1')
+        self.assertEqual(5, len(statements))
+        self.assertEqual(objects_base.obj_fingerprint(self.devices),
+                         objects_base.obj_fingerprint(driver_devs))
+
+
+class DBAPIAttributeTestCase(base.DbTestCase):
+
+    """Tests for db.api.attribute_get_by_deployable_ids."""
+
+    @mock.patch.object(sqlalchemyapi, 'MAX_IN_CLAUSE_SIZE', 1)
+    def test_attribute_get_by_deployable_ids(self):
+        reconciler.HostReconciler(self.context, 'host1').reconcile(
+            [fake_driver_device.fake_driver_device('0000:81:00.0'),
+             fake_driver_device.fake_driver_device('0000:82:00.0')])
+        dep_ids = [dep.id for dep in self.dbapi.host_snapshot_get(
+            self.context, 'host1')['deployables']]
+        attrs = self.dbapi.attribute_get_by_deployable_ids(
+            self.context, dep_ids + [0])
+        self.assertEqual(sorted(dep_ids + [0]), sorted(attrs))
+        self.assertEqual([], attrs[0])
+        for dep_id in dep_ids:
+            self.assertEqual(['rc', 'trait0'],
+                             [attr.key for attr in attrs[dep_id]])
+            for attr in attrs[dep_id]:
+                self.assertEqual(dep_id, attr.deployable_id)
+
+
+class DBAPIDeviceTreeTestCase(base.DbTestCase):
+
+    """Tests for db.api.device_tree_create and device_tree_delete."""
+
+    def _snapshot(self):
+        return self.dbapi.host_snapshot_get(self.context, 'host1')
+
+    def test_driver_device_create_and_destroy(self):
+        driver_devs = [
+            fake_driver_device.fake_driver_device('0000:81:00.0'),
+            fake_driver_device.fake_driver_device('0000:82:00.0', num_vfs=16)]
+        for driver_dev in driver_devs:
+            driver_dev.create(self.context, 'host1')
+        self.assertEqual(
+            objects_base.obj_fingerprint(driver_devs),
+            objects_base.obj_fingerprint(
+                driver_device.DriverDevice.list(self.context, 'host1')))
+        rows = self._snapshot()
+        self.assertEqual(18, len(rows['attach_handles']))
+        for row in rows['attach_handles'] + rows['attributes']:
+            self.assertTrue(row.uuid)
+
+        driver_devs[0].destroy(self.context, 'host1')
+        rows = self._snapshot()
+        self.assertEqual(['0000:82:00.0'],
+                         [cpid.cpid_info for cpid in rows['controlpath_ids']])
+        self.assertEqual(1, len(rows['devices']))
+        self.assertEqual(1, len(rows['deployables']))
+        self.assertEqual(2, len(rows['attributes']))
+        self.assertEqual(16, len(rows['attach_handles']))
+
+    @mock.patch.object(sqlalchemyapi, 'MAX_IN_CLAUSE_SIZE', 1)
+    def test_deployable_tree_delete_in_chunks(self):
+        for address in ('0000:81:00.0', '0000:82:00.0', '0000:83:00.0'):
+            fake_driver_device.fake_driver_device(address).create(
+                self.context, 'host1')
+        rows = self._snapshot()
+        self.dbapi.deployable_tree_delete(
+            self.context, [dep.id for dep in rows['deployables']])
+        rows = self._snapshot()
+        self.assertEqual(3, len(rows['devices']))
+        self.assertEqual([], rows['deployables'])
+        self.assertEqual([], rows['attributes'])
+        self.assertEqual([], rows['attach_handles'])
+
+    def test_device_tree_create_rolls_back(self):
+        driver_dev = fake_driver_device.fake_driver_device()
+        with mock.patch.object(sqlalchemyapi.Connection,
+                               'attach_handle_create_many',
+                               side_effect=ValueError):
+            self.assertRaises(ValueError, driver_dev.create, self.context,
+                              'host1')
+        self.assertFalse(any(self._snapshot().values()))
+
+
+class DBAPIProgramJobTestCase(base.DbTestCase):
+
+    """Tests for db.api.program_job_* methods."""
+
+    def _create(self, **kw):
+        values = utils.get_test_program_job(**kw)
+        del values['id']
+        return self.dbapi.program_job_create(self.context, values)
+
+    def test_create_and_get(self):
+        self._create()
+        job = self.dbapi.program_job_get(
+            self.context, '3e53b8a6-a0ac-4d9c-9d94-2b34bf1ee6b3')
+        self.assertEqual('Queued', job.state)
+        self.assertEqual('host1', job.hostname)
+        self.assertRaises(exception.ProgramJobNotFound,
+                          self.dbapi.program_job_get, self.context,
+                          uuidutils.generate_uuid())
+
+    def test_update(self):
+        job = self._create()
+        job = self.dbapi.program_job_update(
+            self.context, job.uuid, {'state': 'Failed', 'reason': 'why'})
+        self.assertEqual(('Failed', 'why'), (job.state, job.reason))
+        self.assertRaises(exception.InvalidParameterValue,
+                          self.dbapi.program_job_update, self.context,
+                          job.uuid, {'uuid': uuidutils.generate_uuid()})
+
+    def test_list_by_filters(self):
+        self._create(uuid=uuidutils.generate_uuid(), state='Done')
+        self._create(uuid=uuidutils.generate_uuid(), state='Programming')
+        self._create(uuid=uuidutils.generate_uuid(), hostname='host2')
+        jobs = self.dbapi.program_job_list_by_filters(
+            self.context, {'hostname': 'host1',
+                           'state': ['Queued', 'Programming']})
+        self.assertEqual(['Programming'], [job.state for job in jobs])
+        self.assertEqual(3, len(self.dbapi.program_job_list_by_filters(
+            self.context, {})))
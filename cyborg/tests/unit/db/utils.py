@@ -141,3 +141,21 @@ def get_test_device_profile(**kw):
         'created_at': kw.get('create_at', None),
         'updated_at': kw.get('updated_at', None),
     }
+
+
+def get_test_program_job(**kw):
+    return {
+        'id': kw.get('id', 1),
+        'uuid': kw.get('uuid', '3e53b8a6-a0ac-4d9c-9d94-2b34bf1ee6b3'),
+        'deployable_uuid': kw.get('deployable_uuid',
+                                  '0acbf8d6-e02a-4394-aae3-57557d209498'),
+        'device_uuid': kw.get('device_uuid',
+                              '5f4ce1fb-7a1f-4b6c-9d2a-2c5d1b9d6a52'),
+        'image_uuid': kw.get('image_uuid',
+                             '9a17439a-85d0-4c53-a3d3-0f68a2eac896'),
+        'hostname': kw.get('hostname', 'host1'),
+        'state': kw.get('state', 'Queued'),
+        'reason': kw.get('reason', None),
+        'created_at': kw.get('created_at', None),
+        'updated_at': kw.get('updated_at', None),
+    }
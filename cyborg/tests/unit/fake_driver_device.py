@@ -0,0 +1,48 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from cyborg.objects.driver_objects import driver_attach_handle
+from cyborg.objects.driver_objects import driver_attribute
+from cyborg.objects.driver_objects import driver_controlpath_id
+from cyborg.objects.driver_objects import driver_deployable
+from cyborg.objects.driver_objects import driver_device
+
+
+def fake_driver_device(cpid_info='0000:81:00.0', num_vfs=2, **updates):
+    """Build a driver-side FPGA device with one PF and num_vfs VFs."""
+    bus = cpid_info.rsplit('.', 1)[0]
+    attach_handles = [
+        driver_attach_handle.DriverAttachHandle(
+            attach_type='PCI', attach_info='%s.%d' % (bus, i + 1),
+            in_use=False)
+        for i in range(num_vfs)]
+    deployable = driver_deployable.DriverDeployable(
+        name='%s_pf' % cpid_info,
+        num_accelerators=num_vfs,
+        attribute_list=[
+            driver_attribute.DriverAttribute(key='rc',
+                                             value='CUSTOM_ACCELERATOR_FPGA'),
+            driver_attribute.DriverAttribute(key='trait0',
+                                             value='CUSTOM_FPGA_INTEL')],
+        attach_handle_list=attach_handles)
+    values = {
+        'vendor': '8086',
+        'model': 'bcc0',
+        'type': 'FPGA',
+        'std_board_info': '{"device_id": "bcc0"}',
+        'vendor_board_info': '{}',
+        'controlpath_id': driver_controlpath_id.DriverControlPathID(
+            cpid_type='PCI', cpid_info=cpid_info),
+        'deployable_list': [deployable],
+    }
+    values.update(updates)
+    return driver_device.DriverDevice(**values)
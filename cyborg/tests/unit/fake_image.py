@@ -0,0 +1,203 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""An in-process stand-in of the Glance image service.
+
+FakeGlance is a WSGI app serving, from memory, the part of the Glance v2
+API used by cyborg.image.glance to download images: the image records, the
+image schema and the image data, with HTTP byte ranges. A latency can be
+added to every request, and the data of every response can be throttled to
+a bandwidth, like the throughput of a single TCP stream over a long link.
+
+GlanceFixture serves it on a local port, for the glance client to use it
+over HTTP.
+"""
+
+import collections
+import hashlib
+import json
+import re
+
+import eventlet
+from eventlet import wsgi
+import fixtures
+from oslo_log import log as logging
+from oslo_utils import units
+from oslo_utils import uuidutils
+import webob
+
+from cyborg.image import glance
+
+LOG = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 64 * units.Ki
+
+SCHEMA = {
+    'name': 'image',
+    'additionalProperties': {'type': 'string'},
+    'properties': {
+        'id': {'type': 'string'},
+        'name': {'type': ['null', 'string']},
+        'status': {'type': 'string'},
+        'visibility': {'type': 'string'},
+        'protected': {'type': 'boolean'},
+        'checksum': {'type': ['null', 'string']},
+        'os_hash_algo': {'type': ['null', 'string']},
+        'os_hash_value': {'type': ['null', 'string']},
+        'size': {'type': ['null', 'integer']},
+        'virtual_size': {'type': ['null', 'integer']},
+        'container_format': {'type': ['null', 'string']},
+        'disk_format': {'type': ['null', 'string']},
+        'owner': {'type': ['null', 'string']},
+        'created_at': {'type': 'string'},
+        'updated_at': {'type': 'string'},
+        'tags': {'type': 'array', 'items': {'type': 'string'}},
+        'direct_url': {'type': 'string'},
+        'locations': {'type': 'array'},
+        'self': {'type': 'string'},
+        'file': {'type': 'string'},
+        'schema': {'type': 'string'},
+    },
+}
+
+
+class FakeGlance(object):
+    """A WSGI app serving the images of the Glance v2 API from memory.
+
+    :param latency: Number of seconds every request is delayed by.
+    :param bandwidth: Maximum number of bytes per second of the data sent
+                      in each response, unlimited if 0.
+    :param ranges: Whether the byte ranges of the image data are served.
+    """
+
+    def __init__(self, latency=0, bandwidth=0, ranges=True):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.ranges = ranges
+        self.images = {}
+        self.data = {}
+        # The number of requests per (method, route), e.g.
+        # ('GET', '/v2/images/{image_id}/file').
+        self.requests = collections.Counter()
+        self._routes = [
+            (route, re.compile(re.sub(r'{(\w+)}', r'(?P<\1>[^/]+)', route) +
+                               '$'), handler)
+            for route, handler in (
+                ('/v2/schemas/image', self._get_schema),
+                ('/v2/images/{image_id}', self._get_image),
+                ('/v2/images/{image_id}/file', self._get_data),
+            )]
+
+    def create_image(self, data, image_id=None, **properties):
+        """Add an active image of the given data, return its record."""
+        image_id = image_id or uuidutils.generate_uuid()
+        image = {
+            'id': image_id, 'name': image_id, 'status': 'active',
+            'visibility': 'private', 'protected': False,
+            'checksum': hashlib.md5(data).hexdigest(),
+            'os_hash_algo': 'sha512',
+            'os_hash_value': hashlib.sha512(data).hexdigest(),
+            'size': len(data), 'virtual_size': None,
+            'container_format': 'bare', 'disk_format': 'raw',
+            'created_at': '2019-01-01T00:00:00Z',
+            'updated_at': '2019-01-01T00:00:00Z', 'tags': [],
+            'self': '/v2/images/%s' % image_id,
+            'file': '/v2/images/%s/file' % image_id,
+            'schema': '/v2/schemas/image'}
+        image.update(properties)
+        self.images[image_id] = image
+        self.data[image_id] = data
+        return image
+
+    def __call__(self, environ, start_response):
+        request = webob.Request(environ)
+        if self.latency:
+            eventlet.sleep(self.latency)
+        for route, pattern, handler in self._routes:
+            match = pattern.match(request.path_info)
+            if match and request.method == 'GET':
+                self.requests[(request.method, route)] += 1
+                response = handler(request, **match.groupdict())
+                break
+        else:
+            response = webob.Response(status=404)
+        return response(environ, start_response)
+
+    @staticmethod
+    def _json(body):
+        response = webob.Response(content_type='application/json')
+        response.body = json.dumps(body).encode('utf-8')
+        return response
+
+    def _get_schema(self, request):
+        return self._json(SCHEMA)
+
+    def _get_image(self, request, image_id):
+        if image_id not in self.images:
+            return webob.Response(status=404)
+        return self._json(self.images[image_id])
+
+    def _get_data(self, request, image_id):
+        if image_id not in self.data:
+            return webob.Response(status=404)
+        data = self.data[image_id]
+        start, end = 0, len(data)
+        response = webob.Response(content_type='application/octet-stream')
+        match = re.match(r'bytes=(\d+)-(\d*)$',
+                         request.headers.get('Range', ''))
+        if self.ranges and match:
+            start = int(match.group(1))
+            if match.group(2):
+                end = min(int(match.group(2)) + 1, end)
+            if start >= end:
+                return webob.Response(status=416)
+            response.status = 206
+            response.headers['Content-Range'] = 'bytes %d-%d/%d' % (
+                start, end - 1, len(data))
+        response.content_length = end - start
+        response.app_iter = self._stream(data, start, end)
+        return response
+
+    def _stream(self, data, start, end):
+        view = memoryview(data)
+        for offset in range(start, end, _CHUNK_SIZE):
+            chunk = view[offset:min(offset + _CHUNK_SIZE, end)]
+            if self.bandwidth:
+                eventlet.sleep(float(len(chunk)) / self.bandwidth)
+            yield chunk.tobytes()
+
+
+class GlanceFixture(fixtures.Fixture):
+    """Serve a FakeGlance on a local port.
+
+    The keyword arguments are the ones of FakeGlance.
+    """
+
+    def __init__(self, **kwargs):
+        super(GlanceFixture, self).__init__()
+        self._kwargs = kwargs
+
+    def _setUp(self):
+        self.glance = FakeGlance(**self._kwargs)
+        sock = eventlet.listen(('127.0.0.1', 0))
+        self.endpoint = 'http://127.0.0.1:%d' % sock.getsockname()[1]
+        server = eventlet.spawn(wsgi.server, sock, self.glance,
+                                log=LOG, log_output=False)
+        self.addCleanup(server.kill)
+
+    def image_service(self, context):
+        """Return a GlanceImageServiceV2 of the fake glance.
+
+        :param context: A context with an auth_token.
+        """
+        return glance.GlanceImageServiceV2(client=glance.GlanceClientWrapper(
+            context=context, endpoint=self.endpoint))
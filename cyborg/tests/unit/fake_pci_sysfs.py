@@ -0,0 +1,77 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Build a fake /sys/bus/pci tree for the PCI enumeration tests."""
+
+import os
+
+import fixtures
+
+from cyborg.accelerator.common import pci
+
+
+PCI_IDS = u"""\
+# Fake PCI ids database
+10de  NVIDIA Corporation
+\t15f7  GP100GL [Tesla P100 PCIe 12GB]
+\t\t10de 118f  Tesla P100 PCIe 12GB
+8086  Intel Corporation
+\tbcc0  Fake FPGA
+C 03  Display controller
+"""
+
+
+class FakePciSysfs(fixtures.Fixture):
+    """Point the PCI enumeration at a fake sysfs tree in a temp directory."""
+
+    def setUp(self):
+        super(FakePciSysfs, self).setUp()
+        root = self.useFixture(fixtures.TempDir()).path
+        self.devices_path = os.path.join(root, "sys", "devices",
+                                         "pci0000:00")
+        self.bus_path = os.path.join(root, "sys", "bus", "pci", "devices")
+        os.makedirs(self.devices_path)
+        os.makedirs(self.bus_path)
+        pci_ids = os.path.join(root, "pci.ids")
+        with open(pci_ids, "w") as f:
+            f.write(PCI_IDS)
+        self.useFixture(fixtures.MonkeyPatch(
+            "cyborg.accelerator.common.pci.SYS_PCI_DEVICES", self.bus_path))
+        self.useFixture(fixtures.MonkeyPatch(
+            "cyborg.accelerator.common.pci.PCI_IDS_PATHS", [pci_ids]))
+
+    def add_device(self, address, class_code, vendor, device, numa_node="0",
+                   sriov_totalvfs=None, physfn=None):
+        """Add a device, its files being written as the kernel does."""
+        path = os.path.join(self.devices_path, address)
+        os.makedirs(path)
+        files = {"class": class_code, "vendor": vendor, "device": device,
+                 "numa_node": numa_node}
+        if sriov_totalvfs is not None:
+            files["sriov_totalvfs"] = str(sriov_totalvfs)
+            files["sriov_numvfs"] = "0"
+        for name, value in files.items():
+            with open(os.path.join(path, name), "w") as f:
+                f.write(value + "\n")
+        os.symlink(os.path.join("..", "..", "..", "devices", "pci0000:00",
+                                address),
+                   os.path.join(self.bus_path, address))
+        if physfn:
+            pf_path = os.path.join(self.devices_path, physfn)
+            os.symlink(os.path.join("..", physfn),
+                       os.path.join(path, "physfn"))
+            index = len(pci.read_device(pf_path)["virtfns"])
+            os.symlink(os.path.join("..", address),
+                       os.path.join(pf_path, "virtfn%d" % index))
+            with open(os.path.join(pf_path, "sriov_numvfs"), "w") as f:
+                f.write("%d\n" % (index + 1))
+        return path
@@ -0,0 +1,748 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""An in-process stand-in of the placement service.
+
+FakePlacement is a WSGI app implementing, in memory, the part of the
+placement API used by cyborg.services.client.report: resource providers
+and their inventories, traits and aggregates, resource classes, traits,
+allocations and allocation candidates. The generations of the providers
+are checked and bumped like placement does. A latency can be added to
+every request, and a fraction of the writes can be made to fail with a
+generation conflict, like when another service changes the providers.
+
+PlacementFixture serves it on a local port, for the report client to use
+it over HTTP.
+
+Known simplifications: the resources of the unnumbered group of an
+allocation candidates request are only spread over the providers of the
+same tree, and its traits and aggregates are checked on each of these
+providers; sharing providers are not supported.
+"""
+
+import collections
+import itertools
+import json
+import random
+import re
+
+import eventlet
+from eventlet import wsgi
+import fixtures
+from keystoneauth1 import adapter as ks_adapter
+from keystoneauth1 import session as ks_session
+import os_traits
+from oslo_log import log as logging
+from oslo_utils import uuidutils
+from six.moves import http_client
+from six.moves.urllib import parse
+import webob
+
+from cyborg.agent import rc_fields as fields
+from cyborg.services.client import connection
+from cyborg.services.client import report
+
+LOG = logging.getLogger(__name__)
+
+INVENTORY_DEFAULTS = {'reserved': 0, 'min_unit': 1, 'step_size': 1,
+                      'allocation_ratio': 1.0}
+
+_CONCURRENT_UPDATE = ('Inventory and/or allocations changed while attempting '
+                      'to allocate: Another thread concurrently updated the '
+                      'data. Please retry your update')
+_GENERATION_CONFLICT = 'resource provider generation conflict'
+
+
+class _HTTPError(Exception):
+
+    def __init__(self, status, detail, code='placement.undefined_code'):
+        super(_HTTPError, self).__init__(detail)
+        self.status = status
+        self.detail = detail
+        self.code = code
+
+
+def _conflict(detail, code='placement.undefined_code'):
+    return _HTTPError(409, detail, code)
+
+
+def _microversion(request):
+    header = request.headers.get('OpenStack-API-Version', '')
+    match = re.match(r'placement\s+(\d+)\.(\d+)', header)
+    return (int(match.group(1)), int(match.group(2))) if match else (1, 0)
+
+
+def _in_list(value):
+    """Return the items of a 'in:a,b' or 'a' query parameter."""
+    if value.startswith('in:'):
+        value = value[3:]
+    return set(value.split(','))
+
+
+def _resources(value):
+    """Return the amounts of a 'RC:amount,RC:amount' query parameter."""
+    resources = {}
+    for item in value.split(','):
+        rc, _sep, amount = item.partition(':')
+        try:
+            resources[rc] = int(amount)
+        except ValueError:
+            raise _HTTPError(400, 'Invalid resources %s' % value)
+    return resources
+
+
+class _Provider(object):
+
+    def __init__(self, uuid, name, parent_uuid=None, root_uuid=None):
+        self.uuid = uuid
+        self.name = name
+        self.parent_uuid = parent_uuid
+        self.root_uuid = root_uuid or uuid
+        self.generation = 0
+        self.inventories = {}
+        self.traits = set()
+        self.aggregates = set()
+        self.children = set()
+        # The amounts allocated per resource class.
+        self.used = collections.Counter()
+        # The consumers having allocations against the provider.
+        self.consumers = set()
+
+    def to_dict(self):
+        return {'uuid': self.uuid, 'name': self.name,
+                'generation': self.generation,
+                'parent_provider_uuid': self.parent_uuid,
+                'root_provider_uuid': self.root_uuid,
+                'links': []}
+
+    def capacity(self, rc):
+        inv = self.inventories[rc]
+        return int((inv['total'] - inv['reserved']) * inv['allocation_ratio'])
+
+    def can_allocate(self, rc, amount, used=0):
+        inv = self.inventories.get(rc)
+        if inv is None:
+            return False
+        return (inv['min_unit'] <= amount <= inv['max_unit'] and
+                amount % inv['step_size'] == 0 and
+                self.used[rc] + used + amount <= self.capacity(rc))
+
+
+class FakePlacement(object):
+    """A WSGI app emulating the placement API in memory.
+
+    :param latency: Number of seconds every request is delayed by.
+    :param jitter: Maximum number of seconds randomly added to the latency.
+    :param conflict_rate: Fraction of the writes to the providers and to
+                          the allocations failing with a conflict, as if
+                          another service had changed the providers.
+    :param seed: Seed of the randomness of the jitter and the conflicts.
+    """
+
+    def __init__(self, latency=0, jitter=0, conflict_rate=0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.conflict_rate = conflict_rate
+        self._random = random.Random(seed)
+        self.providers = {}
+        self._names = {}
+        # The providers per resource class of their inventories, and per
+        # root provider, so that the queries do not scan all the providers.
+        self._by_rc = collections.defaultdict(set)
+        self._by_root = collections.defaultdict(set)
+        self.traits = set(os_traits.get_traits())
+        self.resource_classes = set(fields.ResourceClass.STANDARD)
+        # The allocations, keyed by consumer, of dicts of the project, the
+        # user and the amounts per resource class per provider.
+        self.allocations = {}
+        # The number of requests per (method, route), e.g.
+        # ('GET', '/resource_providers/{rp_uuid}').
+        self.requests = collections.Counter()
+        self._routes = [
+            (route, re.compile(re.sub(r'{(\w+)}', r'(?P<\1>[^/]+)', route) +
+                               '$'), methods)
+            for route, methods in (
+                ('/resource_providers', {
+                    'GET': self._list_providers,
+                    'POST': self._create_provider}),
+                ('/resource_providers/{rp_uuid}', {
+                    'GET': self._get_provider,
+                    'DELETE': self._delete_provider}),
+                ('/resource_providers/{rp_uuid}/inventories', {
+                    'GET': self._get_inventories,
+                    'PUT': self._put_inventories}),
+                ('/resource_providers/{rp_uuid}/traits', {
+                    'GET': self._get_provider_traits,
+                    'PUT': self._put_provider_traits}),
+                ('/resource_providers/{rp_uuid}/aggregates', {
+                    'GET': self._get_aggregates,
+                    'PUT': self._put_aggregates}),
+                ('/resource_providers/{rp_uuid}/allocations', {
+                    'GET': self._get_provider_allocations}),
+                ('/traits', {'GET': self._list_traits}),
+                ('/traits/{name}', {'PUT': self._put_trait}),
+                ('/resource_classes/{name}', {
+                    'PUT': self._put_resource_class}),
+                ('/allocations', {'POST': self._post_allocations}),
+                ('/allocations/{consumer}', {
+                    'GET': self._get_allocations,
+                    'PUT': self._put_allocations,
+                    'DELETE': self._delete_allocations}),
+                ('/allocation_candidates', {
+                    'GET': self._allocation_candidates}),
+            )]
+
+    def __call__(self, environ, start_response):
+        request = webob.Request(environ)
+        if self.latency or self.jitter:
+            eventlet.sleep(self.latency + self._random.uniform(0, self.jitter))
+        try:
+            handler, kwargs = self._route(request)
+            status, body = handler(request, **kwargs)
+        except _HTTPError as e:
+            status = e.status
+            body = {'errors': [{'status': e.status,
+                                'title': http_client.responses[e.status],
+                                'detail': e.detail, 'code': e.code}]}
+        response = webob.Response(status=status)
+        if body is not None:
+            response.content_type = 'application/json'
+            response.body = json.dumps(body).encode('utf-8')
+        return response(environ, start_response)
+
+    def _route(self, request):
+        for route, pattern, methods in self._routes:
+            match = pattern.match(request.path_info)
+            if match:
+                if request.method not in methods:
+                    raise _HTTPError(405, 'Method not allowed')
+                self.requests[(request.method, route)] += 1
+                return methods[request.method], match.groupdict()
+        raise _HTTPError(404, 'Not found: %s' % request.path_info)
+
+    @staticmethod
+    def _json(request):
+        try:
+            return json.loads(request.body.decode('utf-8'))
+        except ValueError:
+            raise _HTTPError(400, 'Malformed JSON')
+
+    def _provider(self, rp_uuid):
+        try:
+            return self.providers[rp_uuid]
+        except KeyError:
+            raise _HTTPError(404, 'No resource provider with uuid %s found'
+                                  % rp_uuid)
+
+    def _check_generation(self, rp, generation):
+        if generation != rp.generation or (
+                self.conflict_rate and
+                self._random.random() < self.conflict_rate):
+            raise _conflict(_GENERATION_CONFLICT,
+                            'placement.concurrent_update')
+
+    def _bump(self, rp):
+        rp.generation += 1
+
+    # Resource providers
+
+    def new_provider(self, name, rp_uuid=None, parent_uuid=None):
+        """Add a provider, like POST /resource_providers does."""
+        rp_uuid = rp_uuid or uuidutils.generate_uuid()
+        if rp_uuid in self.providers:
+            raise _conflict('Conflicting resource provider uuid: %s already '
+                            'exists.' % rp_uuid, 'placement.duplicate_uuid')
+        if name in self._names:
+            raise _conflict('Conflicting resource provider name: %s already '
+                            'exists.' % name, 'placement.duplicate_name')
+        root_uuid = None
+        if parent_uuid is not None:
+            parent = self.providers.get(parent_uuid)
+            if parent is None:
+                raise _HTTPError(400, 'parent provider UUID cannot be found')
+            parent.children.add(rp_uuid)
+            root_uuid = parent.root_uuid
+        rp = _Provider(rp_uuid, name, parent_uuid, root_uuid)
+        self.providers[rp_uuid] = rp
+        self._by_root[rp.root_uuid].add(rp_uuid)
+        self._names[name] = rp_uuid
+        return rp
+
+    def _list_providers(self, request):
+        params = request.GET
+        uuids = None
+        if 'uuid' in params:
+            uuids = {params['uuid']} if params['uuid'] in self.providers else (
+                set())
+        if 'name' in params:
+            rp_uuid = self._names.get(params['name'])
+            named = {rp_uuid} if rp_uuid else set()
+            uuids = named if uuids is None else uuids & named
+        if 'in_tree' in params:
+            tree = self.providers.get(params['in_tree'])
+            in_tree = self._by_root[tree.root_uuid] if tree else set()
+            uuids = in_tree if uuids is None else uuids & in_tree
+        if uuids is None:
+            rps = list(self.providers.values())
+        else:
+            rps = [self.providers[rp_uuid] for rp_uuid in sorted(uuids)]
+        if 'member_of' in params:
+            aggs = _in_list(params['member_of'])
+            rps = [rp for rp in rps if rp.aggregates & aggs]
+        if 'required' in params:
+            traits = set(params['required'].split(','))
+            rps = [rp for rp in rps if traits <= rp.traits]
+        return 200, {'resource_providers': [rp.to_dict() for rp in rps]}
+
+    def _create_provider(self, request):
+        body = self._json(request)
+        rp = self.new_provider(body['name'], body.get('uuid'),
+                               body.get('parent_provider_uuid'))
+        if _microversion(request) >= (1, 20):
+            return 200, rp.to_dict()
+        return 201, None
+
+    def _get_provider(self, request, rp_uuid):
+        return 200, self._provider(rp_uuid).to_dict()
+
+    def _delete_provider(self, request, rp_uuid):
+        rp = self._provider(rp_uuid)
+        if rp.consumers:
+            raise _conflict('Unable to delete resource provider %s: Resource '
+                            'provider has allocations.' % rp_uuid)
+        if rp.children:
+            raise _conflict('Unable to delete parent resource provider %s: '
+                            'It has child resource providers.' % rp_uuid,
+                            'placement.resource_provider.cannot_delete_parent')
+        for rc in rp.inventories:
+            self._by_rc[rc].discard(rp_uuid)
+        if rp.parent_uuid is not None:
+            self.providers[rp.parent_uuid].children.discard(rp_uuid)
+        del self.providers[rp_uuid]
+        self._by_root[rp.root_uuid].discard(rp_uuid)
+        if not self._by_root[rp.root_uuid]:
+            del self._by_root[rp.root_uuid]
+        del self._names[rp.name]
+        return 204, None
+
+    # Inventories
+
+    def _inventories(self, rp):
+        return {'resource_provider_generation': rp.generation,
+                'inventories': rp.inventories}
+
+    def _get_inventories(self, request, rp_uuid):
+        return 200, self._inventories(self._provider(rp_uuid))
+
+    def set_inventories(self, rp, inventories):
+        """Replace the inventories of a provider, like PUT does."""
+        for rc, inv in inventories.items():
+            if rc not in self.resource_classes:
+                raise _HTTPError(400, 'Unknown resource class in inventory '
+                                      'for resource provider %s: %s'
+                                      % (rp.uuid, rc))
+            if 'total' not in inv:
+                raise _HTTPError(400, "'total' is a required property")
+        in_use = sorted(rc for rc in set(rp.inventories) - set(inventories)
+                        if rp.used[rc])
+        if in_use:
+            raise _conflict("update conflict: Inventory for '%s' on "
+                            "resource provider '%s' in use."
+                            % (', '.join(in_use), rp.uuid),
+                            'placement.inventory.inuse')
+        for rc in rp.inventories:
+            self._by_rc[rc].discard(rp.uuid)
+        rp.inventories = {}
+        for rc, inv in inventories.items():
+            full = dict(INVENTORY_DEFAULTS, max_unit=inv['total'])
+            full.update(inv)
+            rp.inventories[rc] = full
+            self._by_rc[rc].add(rp.uuid)
+        self._bump(rp)
+
+    def _put_inventories(self, request, rp_uuid):
+        rp = self._provider(rp_uuid)
+        body = self._json(request)
+        self._check_generation(rp, body.get('resource_provider_generation'))
+        self.set_inventories(rp, body.get('inventories', {}))
+        return 200, self._inventories(rp)
+
+    # Traits and resource classes
+
+    def _provider_traits(self, rp):
+        return {'resource_provider_generation': rp.generation,
+                'traits': sorted(rp.traits)}
+
+    def _get_provider_traits(self, request, rp_uuid):
+        return 200, self._provider_traits(self._provider(rp_uuid))
+
+    def _put_provider_traits(self, request, rp_uuid):
+        rp = self._provider(rp_uuid)
+        body = self._json(request)
+        self._check_generation(rp, body.get('resource_provider_generation'))
+        unknown = set(body['traits']) - self.traits
+        if unknown:
+            raise _HTTPError(400, 'No such trait(s): %s'
+                                  % ', '.join(sorted(unknown)))
+        rp.traits = set(body['traits'])
+        self._bump(rp)
+        return 200, self._provider_traits(rp)
+
+    def _list_traits(self, request):
+        traits = self.traits
+        if 'name' in request.GET:
+            names = request.GET['name']
+            if names.startswith('startswith:'):
+                traits = [t for t in traits if t.startswith(names[11:])]
+            else:
+                traits = _in_list(names) & traits
+        return 200, {'traits': sorted(traits)}
+
+    def _put_trait(self, request, name):
+        if not name.startswith(os_traits.CUSTOM_NAMESPACE):
+            raise _HTTPError(400, 'The trait %s does not start with '
+                                  'CUSTOM_' % name)
+        if name in self.traits:
+            return 204, None
+        self.traits.add(name)
+        return 201, None
+
+    def _put_resource_class(self, request, name):
+        if not name.startswith(fields.ResourceClass.CUSTOM_NAMESPACE):
+            raise _HTTPError(400, 'Cannot update standard resource class %s'
+                                  % name)
+        if name in self.resource_classes:
+            return 204, None
+        self.resource_classes.add(name)
+        return 201, None
+
+    # Aggregates
+
+    def _provider_aggregates(self, request, rp):
+        body = {'aggregates': sorted(rp.aggregates)}
+        if _microversion(request) >= (1, 19):
+            body['resource_provider_generation'] = rp.generation
+        return body
+
+    def _get_aggregates(self, request, rp_uuid):
+        return 200, self._provider_aggregates(request,
+                                              self._provider(rp_uuid))
+
+    def _put_aggregates(self, request, rp_uuid):
+        rp = self._provider(rp_uuid)
+        body = self._json(request)
+        if _microversion(request) >= (1, 19):
+            self._check_generation(
+                rp, body.get('resource_provider_generation'))
+            rp.aggregates = set(body['aggregates'])
+            self._bump(rp)
+        else:
+            rp.aggregates = set(body)
+        return 200, self._provider_aggregates(request, rp)
+
+    # Allocations
+
+    def _consumer_allocations(self, consumer):
+        allocs = self.allocations.get(consumer)
+        if allocs is None:
+            return {}
+        return {rp_uuid: {'generation': self.providers[rp_uuid].generation,
+                          'resources': dict(resources)}
+                for rp_uuid, resources in allocs['resources'].items()}
+
+    def _get_allocations(self, request, consumer):
+        body = {'allocations': self._consumer_allocations(consumer)}
+        allocs = self.allocations.get(consumer)
+        if allocs is not None and _microversion(request) >= (1, 12):
+            body.update(project_id=allocs['project_id'],
+                        user_id=allocs['user_id'])
+        return 200, body
+
+    def _get_provider_allocations(self, request, rp_uuid):
+        rp = self._provider(rp_uuid)
+        return 200, {
+            'resource_provider_generation': rp.generation,
+            'allocations': {
+                consumer: {'resources': dict(
+                    self.allocations[consumer]['resources'][rp_uuid])}
+                for consumer in rp.consumers}}
+
+    def _release(self, consumer):
+        allocs = self.allocations.pop(consumer, None)
+        if allocs is None:
+            return
+        for rp_uuid, resources in allocs['resources'].items():
+            rp = self.providers[rp_uuid]
+            rp.used.subtract(resources)
+            rp.consumers.discard(consumer)
+            self._bump(rp)
+
+    def set_allocations(self, allocations):
+        """Replace the allocations of consumers at once, or not at all.
+
+        :param allocations: Dict, keyed by consumer, of dicts of the
+                            project_id, the user_id and the resources, keyed
+                            by provider, of the consumer.
+        """
+        if self.conflict_rate and self._random.random() < self.conflict_rate:
+            raise _conflict(_CONCURRENT_UPDATE, 'placement.concurrent_update')
+        # The amounts the consumers would use once their current
+        # allocations are released.
+        released = collections.defaultdict(collections.Counter)
+        for consumer in allocations:
+            for rp_uuid, resources in self.allocations.get(
+                    consumer, {}).get('resources', {}).items():
+                released[rp_uuid].update(resources)
+        requested = collections.defaultdict(collections.Counter)
+        for consumer, allocs in allocations.items():
+            for rp_uuid, resources in allocs['resources'].items():
+                rp = self._provider(rp_uuid)
+                for rc, amount in resources.items():
+                    if rc not in rp.inventories:
+                        raise _HTTPError(
+                            400, 'Unable to allocate inventory: Inventory '
+                                 'for %s on resource provider %s not found'
+                                 % (rc, rp_uuid))
+                    if not rp.can_allocate(
+                            rc, amount, requested[rp_uuid][rc] -
+                            released[rp_uuid][rc]):
+                        raise _conflict(
+                            'Unable to allocate inventory: Unable to create '
+                            'allocation for %s on resource provider %s. The '
+                            'requested amount would exceed the capacity.'
+                            % (rc, rp_uuid))
+                    requested[rp_uuid][rc] += amount
+        for consumer, allocs in allocations.items():
+            self._release(consumer)
+            if not allocs['resources']:
+                continue
+            self.allocations[consumer] = allocs
+            for rp_uuid, resources in allocs['resources'].items():
+                rp = self.providers[rp_uuid]
+                rp.used.update(resources)
+                rp.consumers.add(consumer)
+                self._bump(rp)
+
+    @staticmethod
+    def _allocations_body(body, version):
+        if version < (1, 12):
+            resources = {alloc['resource_provider']['uuid']:
+                         alloc['resources']
+                         for alloc in body['allocations']}
+        else:
+            resources = {rp_uuid: alloc['resources']
+                         for rp_uuid, alloc in body['allocations'].items()}
+        return {'project_id': body.get('project_id'),
+                'user_id': body.get('user_id'),
+                'resources': resources}
+
+    def _put_allocations(self, request, consumer):
+        self.set_allocations({consumer: self._allocations_body(
+            self._json(request), _microversion(request))})
+        return 204, None
+
+    def _post_allocations(self, request):
+        self.set_allocations({
+            consumer: self._allocations_body(body, (1, 12))
+            for consumer, body in self._json(request).items()})
+        return 204, None
+
+    def _delete_allocations(self, request, consumer):
+        if consumer not in self.allocations:
+            raise _HTTPError(404, 'No allocations for consumer %s'
+                                  % consumer)
+        self._release(consumer)
+        return 204, None
+
+    # Allocation candidates
+
+    def _groups(self, params):
+        groups = collections.OrderedDict()
+        for key, value in params.items():
+            match = re.match(r'(resources|required|member_of)(\d*)$', key)
+            if not match:
+                continue
+            group = groups.setdefault(match.group(2), {
+                'resources': {}, 'required': set(), 'forbidden': set(),
+                'member_of': None})
+            if match.group(1) == 'resources':
+                group['resources'] = _resources(value)
+            elif match.group(1) == 'required':
+                for trait in value.split(','):
+                    if trait.startswith('!'):
+                        group['forbidden'].add(trait[1:])
+                    else:
+                        group['required'].add(trait)
+            else:
+                group['member_of'] = _in_list(value)
+        for suffix, group in groups.items():
+            if not group['resources']:
+                raise _HTTPError(400, 'All request groups must specify '
+                                      'resources. Group %s does not.'
+                                      % suffix)
+        numbered = [suffix for suffix in groups if suffix]
+        if len(numbered) > 1 and 'group_policy' not in params:
+            raise _HTTPError(400, 'The "group_policy" parameter is required '
+                                  'when specifying more than one '
+                                  '"resources{N}" parameter.')
+        return groups
+
+    def _matches(self, rp, group):
+        return (group['required'] <= rp.traits and
+                not group['forbidden'] & rp.traits and
+                (group['member_of'] is None or
+                 bool(group['member_of'] & rp.aggregates)))
+
+    def _group_options(self, suffix, group):
+        """Return the ways to satisfy a group, per root provider.
+
+        An option is a list of (provider UUID, resource class, amount).
+        """
+        options = collections.defaultdict(list)
+        if suffix:
+            # A numbered group is satisfied by a single provider.
+            candidates = set.intersection(*[self._by_rc[rc]
+                                            for rc in group['resources']])
+            for rp_uuid in sorted(candidates):
+                rp = self.providers[rp_uuid]
+                if self._matches(rp, group) and all(
+                        rp.can_allocate(rc, amount)
+                        for rc, amount in group['resources'].items()):
+                    options[rp.root_uuid].append(
+                        [(rp_uuid, rc, amount)
+                         for rc, amount in group['resources'].items()])
+            return options
+        # The unnumbered group may be spread over the providers of a tree.
+        per_rc = []
+        for rc, amount in group['resources'].items():
+            by_root = collections.defaultdict(list)
+            for rp_uuid in sorted(self._by_rc[rc]):
+                rp = self.providers[rp_uuid]
+                if self._matches(rp, group) and rp.can_allocate(rc, amount):
+                    by_root[rp.root_uuid].append((rp_uuid, rc, amount))
+            per_rc.append(by_root)
+        for root in set.intersection(*[set(by_root) for by_root in per_rc]):
+            options[root] = [list(combination) for combination in
+                             itertools.product(*[by_root[root]
+                                                 for by_root in per_rc])]
+        return options
+
+    def _allocation_candidates(self, request):
+        params = request.GET
+        groups = self._groups(params)
+        if not groups:
+            raise _HTTPError(400, "'resources' is a required parameter")
+        isolate = params.get('group_policy') == 'isolate'
+        limit = int(params['limit']) if 'limit' in params else None
+        options = [self._group_options(suffix, group)
+                   for suffix, group in groups.items()]
+        numbered = [i for i, suffix in enumerate(groups) if suffix]
+        roots = set.intersection(*[set(group_options)
+                                   for group_options in options])
+        requests = []
+        summaries = {}
+        for root in sorted(roots):
+            for combination in itertools.product(*[group_options[root]
+                                                   for group_options in
+                                                   options]):
+                if isolate and len(set(
+                        combination[i][0][0] for i in numbered)) < len(
+                        numbered):
+                    continue
+                allocations = collections.defaultdict(collections.Counter)
+                for option in combination:
+                    for rp_uuid, rc, amount in option:
+                        allocations[rp_uuid][rc] += amount
+                # Providers used by several groups need the sum.
+                if not all(self.providers[rp_uuid].can_allocate(rc, amount)
+                           for rp_uuid, resources in allocations.items()
+                           for rc, amount in resources.items()):
+                    continue
+                requests.append({'allocations': {
+                    rp_uuid: {'resources': dict(resources)}
+                    for rp_uuid, resources in allocations.items()}})
+                for rp_uuid in allocations:
+                    summaries[rp_uuid] = self._summary(self.providers[rp_uuid])
+                if limit is not None and len(requests) >= limit:
+                    break
+            if limit is not None and len(requests) >= limit:
+                break
+        return 200, {'allocation_requests': requests,
+                     'provider_summaries': summaries}
+
+    @staticmethod
+    def _summary(rp):
+        return {'resources': {rc: {'capacity': rp.capacity(rc),
+                                   'used': rp.used[rc]}
+                              for rc in rp.inventories},
+                'traits': sorted(rp.traits)}
+
+
+class ResourceRequest(object):
+    """The resources of SchedulerReportClient.get_allocation_candidates.
+
+    :param resources: Dict, keyed by resource class, of amounts.
+    :param required: Iterable of the required traits.
+    :param limit: The maximum number of allocation requests returned.
+    """
+
+    def __init__(self, resources, required=(), limit=None):
+        self.resources = resources
+        self.required = required
+        self.limit = limit
+
+    def to_querystring(self):
+        qparams = [('resources', ','.join(
+            '%s:%d' % (rc, amount)
+            for rc, amount in sorted(self.resources.items())))]
+        if self.required:
+            qparams.append(('required', ','.join(sorted(self.required))))
+        if self.limit is not None:
+            qparams.append(('limit', self.limit))
+        return parse.urlencode(qparams)
+
+    def __str__(self):
+        return self.to_querystring()
+
+
+class PlacementFixture(fixtures.Fixture):
+    """Serve a FakePlacement on a local port.
+
+    The idle connections are closed after keepalive seconds, like the web
+    servers in front of placement do. The other keyword arguments are the
+    ones of FakePlacement.
+    """
+
+    def __init__(self, keepalive=5, **kwargs):
+        super(PlacementFixture, self).__init__()
+        self._keepalive = keepalive
+        self._kwargs = kwargs
+
+    def _setUp(self):
+        self.placement = FakePlacement(**self._kwargs)
+        sock = eventlet.listen(('127.0.0.1', 0))
+        self.endpoint = 'http://127.0.0.1:%d' % sock.getsockname()[1]
+        server = eventlet.spawn(wsgi.server, sock, self.placement,
+                                log=LOG, log_output=False,
+                                keepalive=self._keepalive)
+        self.addCleanup(server.kill)
+
+    def adapter(self):
+        """Return a keystoneauth Adapter of the fake placement."""
+        session = connection.mount(ks_session.Session())
+        return ks_adapter.Adapter(session, service_type='placement',
+                                  endpoint_override=self.endpoint,
+                                  raise_exc=False)
+
+    def client(self):
+        """Return a SchedulerReportClient of the fake placement."""
+        return report.SchedulerReportClient(adapter=self.adapter())
@@ -0,0 +1,37 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from eventlet import queue
+
+
+def fake_pci_event(bdf, action='add'):
+    return {'ACTION': action,
+            'DEVPATH': '/devices/pci0000:00/%s' % bdf,
+            'SUBSYSTEM': 'pci',
+            'PCI_SLOT_NAME': bdf}
+
+
+class FakeEventSource(object):
+    """A uevent source fed by the tests instead of the kernel."""
+
+    def __init__(self):
+        self.events = queue.Queue()
+        self.closed = False
+
+    def push(self, event):
+        self.events.put(event)
+
+    def receive(self):
+        return self.events.get()
+
+    def close(self):
+        self.closed = True
@@ -0,0 +1,201 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+
+import cryptography
+import fixtures
+import glanceclient.exc
+import mock
+from oslo_utils import units
+
+from cyborg.common import exception
+from cyborg import context
+from cyborg.image import glance
+from cyborg.tests import base
+from cyborg.tests.unit import fake_image
+
+IMAGE_UUID = 'c1a8ef05-8e3f-4bf5-98b5-1fd4a4e3d2b6'
+SCHEMA = {'name': 'image',
+          'properties': {'id': {}, 'status': {}, 'checksum': {}, 'size': {},
+                         'visibility': {}, 'direct_url': {}}}
+
+
+class FakeImage(dict):
+    """A glanceclient v2 image."""
+
+    schema = SCHEMA
+
+
+class TestGlanceImageServiceV2(base.TestCase):
+
+    def setUp(self):
+        super(TestGlanceImageServiceV2, self).setUp()
+        self.client = mock.Mock(spec=glance.GlanceClientWrapper)
+        self.service = glance.GlanceImageServiceV2(client=self.client)
+        self.context.is_admin = True
+
+    def test_show(self):
+        self.client.call.return_value = FakeImage(
+            id=IMAGE_UUID, status='active', checksum='sum', size=3,
+            visibility='private', direct_url='file:///images/1',
+            img_signature='sig')
+        image = self.service.show(self.context, IMAGE_UUID,
+                                  include_locations=True)
+        self.client.call.assert_called_once_with(self.context, 2, 'get',
+                                                 IMAGE_UUID)
+        self.assertEqual('sum', image['checksum'])
+        self.assertFalse(image['is_public'])
+        self.assertEqual({'img_signature': 'sig'}, image['properties'])
+        self.assertEqual([{'url': 'file:///images/1', 'metadata': {}}],
+                         image['locations'])
+
+    def test_show_not_found(self):
+        self.client.call.side_effect = glanceclient.exc.NotFound
+        self.assertRaises(exception.ImageNotFound, self.service.show,
+                          self.context, IMAGE_UUID)
+
+
+class FakeVerifier(object):
+
+    def __init__(self):
+        self.data = []
+
+    def update(self, data):
+        # The buffer of a memoryview may be reused after the call.
+        self.data.append(bytes(data))
+
+    def verify(self):
+        pass
+
+
+class TestDownload(base.TestCase):
+
+    def setUp(self):
+        super(TestDownload, self).setUp()
+        self.fixture = self.useFixture(fake_image.GlanceFixture())
+        self.glance = self.fixture.glance
+        self.data = os.urandom(5 * units.Mi + 10)
+        self.image_id = self.glance.create_image(self.data)['id']
+        self.context = context.RequestContext(auth_token='token',
+                                              is_admin=True)
+        self.service = self.fixture.image_service(self.context)
+        self.path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'image')
+
+    def _downloaded(self):
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def _file_requests(self):
+        return self.glance.requests[('GET', '/v2/images/{image_id}/file')]
+
+    def _image_requests(self):
+        return self.glance.requests[('GET', '/v2/images/{image_id}')]
+
+    def _corrupt(self, **hashes):
+        self.glance.images[self.image_id].update(
+            os_hash_value=None, checksum=None)
+        self.glance.images[self.image_id].update(hashes)
+
+    def test_download(self):
+        self.service.download(self.context, self.image_id,
+                              dst_path=self.path)
+        self.assertEqual(self.data, self._downloaded())
+        self.assertEqual(1, self._file_requests())
+        self.assertEqual(1, self._image_requests())
+
+    def test_download_chunks(self):
+        chunks = self.service.download(self.context, self.image_id)
+        self.assertEqual(self.data, b''.join(chunks))
+
+    def test_download_hash_mismatch(self):
+        self._corrupt(os_hash_algo='sha512', os_hash_value='0' * 128)
+        self.assertRaises(exception.ImageChecksumMismatch,
+                          self.service.download, self.context,
+                          self.image_id, dst_path=self.path)
+        self.assertEqual(b'', self._downloaded())
+
+    def test_download_checksum_mismatch(self):
+        self._corrupt(checksum='0' * 32)
+        chunks = self.service.download(self.context, self.image_id)
+        self.assertRaises(exception.ImageChecksumMismatch, b''.join, chunks)
+
+    def test_download_ranges_hash_mismatch(self):
+        self.config(parallel_download_workers=4,
+                    parallel_download_range_size=1, group='glance')
+        self._corrupt(os_hash_algo='sha512', os_hash_value='0' * 128)
+        self.assertRaises(exception.ImageChecksumMismatch,
+                          self.service.download, self.context,
+                          self.image_id, dst_path=self.path)
+        self.assertEqual(b'', self._downloaded())
+
+    def test_download_ranges(self):
+        self.config(parallel_download_workers=4,
+                    parallel_download_range_size=1, group='glance')
+        self.service.download(self.context, self.image_id,
+                              dst_path=self.path)
+        self.assertEqual(self.data, self._downloaded())
+        self.assertEqual(6, self._file_requests())
+
+    @mock.patch.object(glance.tpool, 'execute')
+    def test_download_ranges_not_verified(self, mock_execute):
+        self.config(parallel_download_workers=4,
+                    parallel_download_range_size=1, group='glance')
+        self._corrupt()
+        self.service.download(self.context, self.image_id,
+                              dst_path=self.path)
+        self.assertEqual(self.data, self._downloaded())
+        # Without a hash nor a signature, the ranges are not read back.
+        mock_execute.assert_not_called()
+
+    def test_download_ranges_small_image(self):
+        self.config(parallel_download_workers=4,
+                    parallel_download_range_size=8, group='glance')
+        self.service.download(self.context, self.image_id,
+                              dst_path=self.path)
+        self.assertEqual(self.data, self._downloaded())
+        self.assertEqual(1, self._file_requests())
+
+    def test_download_ranges_not_supported(self):
+        self.config(parallel_download_workers=4,
+                    parallel_download_range_size=1, group='glance')
+        self.glance.ranges = False
+        self.service.download(self.context, self.image_id,
+                              dst_path=self.path)
+        self.assertEqual(self.data, self._downloaded())
+
+    @mock.patch('cursive.signature_utils.get_verifier')
+    def test_download_ranges_verified_in_order(self, mock_get_verifier):
+        self.config(verify_glance_signatures=True, group='glance')
+        self.config(parallel_download_workers=4,
+                    parallel_download_range_size=1, group='glance')
+        verifier = mock_get_verifier.return_value = FakeVerifier()
+        # The first range is the slowest.
+        self.glance.bandwidth = 50 * units.Mi
+        self.service.download(self.context, self.image_id,
+                              dst_path=self.path)
+        self.assertEqual(self.data, b''.join(verifier.data))
+        self.assertEqual(self.data, self._downloaded())
+        self.assertEqual(1, self._image_requests())
+
+    @mock.patch('cursive.signature_utils.get_verifier')
+    def test_download_ranges_invalid_signature(self, mock_get_verifier):
+        self.config(verify_glance_signatures=True, group='glance')
+        self.config(parallel_download_workers=4,
+                    parallel_download_range_size=1, group='glance')
+        mock_get_verifier.return_value.verify.side_effect = (
+            cryptography.exceptions.InvalidSignature)
+        self.assertRaises(cryptography.exceptions.InvalidSignature,
+                          self.service.download, self.context,
+                          self.image_id, dst_path=self.path)
+        self.assertEqual(b'', self._downloaded())
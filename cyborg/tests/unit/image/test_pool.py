@@ -0,0 +1,150 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import socket
+
+import fixtures
+import mock
+
+from cyborg.common import exception
+from cyborg import context
+from cyborg.image import glance
+from cyborg.image import pool
+from cyborg.tests import base
+from cyborg.tests.unit import fake_image
+
+
+class TestClientPool(base.TestCase):
+
+    def setUp(self):
+        super(TestClientPool, self).setUp()
+        self.pool = pool.ClientPool(size=2, ttl=60)
+        self.clients = iter(range(100))
+
+    def _get(self, key):
+        with self.pool.get(key, lambda: next(self.clients)) as client:
+            return client
+
+    def test_reused(self):
+        self.assertEqual(0, self._get('a'))
+        self.assertEqual(0, self._get('a'))
+        self.assertEqual(1, self._get('b'))
+        self.assertEqual((2, 1), (self.pool.created, self.pool.reused))
+
+    def test_lent_to_one_caller(self):
+        with self.pool.get('a', lambda: next(self.clients)) as client:
+            self.assertEqual(0, client)
+            self.assertEqual(1, self._get('a'))
+        self.assertIn(self._get('a'), (0, 1))
+
+    def test_least_recently_used_evicted(self):
+        self._get('a')
+        self._get('b')
+        self._get('a')
+        self._get('c')
+        self.assertEqual(0, self._get('a'))
+        self.assertEqual(3, self._get('b'))
+
+    @mock.patch('time.time')
+    def test_expired(self, mock_time):
+        mock_time.return_value = 1000
+        self._get('a')
+        mock_time.return_value = 1061
+        self.assertEqual(1, self._get('a'))
+
+    def test_not_reused_after_error(self):
+        def fail():
+            with self.pool.get('a', lambda: next(self.clients)):
+                raise ValueError()
+
+        self.assertRaises(ValueError, fail)
+        self.assertEqual(1, self._get('a'))
+
+    def test_disabled(self):
+        self.pool.size = 0
+        self._get('a')
+        self.assertEqual(1, self._get('a'))
+
+
+class TestEndpointRotation(base.TestCase):
+
+    def setUp(self):
+        super(TestEndpointRotation, self).setUp()
+        self.useFixture(fixtures.MockPatchObject(pool, '_COOLDOWNS', {}))
+        self.rotation = pool.EndpointRotation(['a', 'b', 'c'], cooldown=30)
+
+    def test_round_robin(self):
+        self.assertEqual(['a', 'b', 'c', 'a'],
+                         [next(self.rotation) for _ in range(4)])
+
+    def test_failed_skipped(self):
+        self.rotation.failed('b')
+        self.assertEqual(['a', 'c', 'a'],
+                         [next(self.rotation) for _ in range(3)])
+        self.assertTrue(self.rotation.available())
+        self.rotation.succeeded('b')
+        self.assertEqual('b', next(self.rotation))
+
+    @mock.patch('time.time')
+    def test_all_failed(self, mock_time):
+        mock_time.return_value = 1000
+        self.rotation.failed('b')
+        mock_time.return_value = 1010
+        self.rotation.failed('a')
+        self.rotation.failed('c')
+        self.assertFalse(self.rotation.available())
+        self.assertEqual('b', next(self.rotation))
+        mock_time.return_value = 1031
+        self.assertEqual('b', next(self.rotation))
+        self.assertTrue(self.rotation.available())
+
+
+class TestGlanceClientWrapper(base.TestCase):
+
+    def setUp(self):
+        super(TestGlanceClientWrapper, self).setUp()
+        self.useFixture(fixtures.MockPatchObject(pool, '_COOLDOWNS', {}))
+        patcher = mock.patch.object(glance, '_CLIENTS', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.fixture = self.useFixture(fake_image.GlanceFixture())
+        self.image_id = self.fixture.glance.create_image(b'data')['id']
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        self.dead = 'http://127.0.0.1:%d' % sock.getsockname()[1]
+        sock.close()
+        self.config(api_servers=[self.dead, self.fixture.endpoint],
+                    num_retries=1, group='glance')
+        self.context = context.RequestContext(auth_token='token',
+                                              is_admin=True)
+        self.service = glance.GlanceImageServiceV2()
+
+    @mock.patch('time.sleep')
+    def test_failed_server_skipped(self, mock_sleep):
+        for _ in range(3):
+            self.assertEqual(self.image_id, self.service.show(
+                self.context, self.image_id)['id'])
+        mock_sleep.assert_not_called()
+        self.assertIn(self.dead, pool._COOLDOWNS)
+        # One client per API server, the one of the dead server is dropped.
+        clients = glance._client_pool()
+        self.assertLessEqual(clients.created, 3)
+        self.assertGreaterEqual(clients.reused, 1)
+        self.assertEqual(
+            1, self.fixture.glance.requests[('GET', '/v2/schemas/image')])
+
+    @mock.patch('time.sleep')
+    def test_all_servers_failed(self, mock_sleep):
+        self.config(api_servers=[self.dead], group='glance')
+        self.assertRaises(exception.GlanceConnectionFailed,
+                          self.service.show, self.context, self.image_id)
+        mock_sleep.assert_called_once_with(1)
@@ -240,6 +240,32 @@ class _TestDeployableObject(DbTestCase):
         self.assertEqual(len(dpl_get_list), 1)
         self.assertEqual(dpl_get_list[0].uuid, dpl2.uuid)
 
+    def test_list_loads_attributes_in_batch(self):
+        db_device = self.fake_device
+        device = objects.Device(context=self.context,
+                                **db_device)
+        device.create(self.context)
+        dpl = objects.Deployable(context=self.context,
+                                 **self.fake_deployable)
+        dpl.device_id = device.id
+        dpl.create(self.context)
+        dpl.add_attribute(self.context, 'attr_key', 'attr_val')
+        dpl2 = objects.Deployable(context=self.context,
+                                  **self.fake_deployable2)
+        dpl2.device_id = device.id
+        dpl2.create(self.context)
+
+        with mock.patch.object(
+                self.dbapi, 'attribute_get_by_deployable_ids',
+                wraps=self.dbapi.attribute_get_by_deployable_ids) as get:
+            dpl_list = objects.Deployable.list(self.context)
+            self.assertEqual(1, get.call_count)
+        attrs = dict((obj_dpl.uuid, [(attr.key, attr.value)
+                                     for attr in obj_dpl.attributes_list])
+                     for obj_dpl in dpl_list)
+        self.assertEqual({dpl.uuid: [('attr_key', 'attr_val')],
+                          dpl2.uuid: []}, attrs)
+
 
 class TestDeployableObject(test_objects._LocalTest,
                            _TestDeployableObject):
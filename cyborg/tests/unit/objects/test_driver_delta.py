@@ -0,0 +1,71 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from cyborg.objects.driver_objects import driver_attach_handle
+from cyborg.objects.driver_objects import driver_delta
+from cyborg.tests import base
+from cyborg.tests.unit import fake_driver_device
+
+
+class TestMakeDelta(base.TestCase):
+
+    def _ops(self, old_list, new_list):
+        delta = driver_delta.make_delta(old_list, new_list, 'fp0', 'fp1')
+        self.assertEqual(driver_delta.DELTA_VERSION, delta['version'])
+        self.assertEqual('fp0', delta['base'])
+        self.assertEqual('fp1', delta['fingerprint'])
+        return delta['ops']
+
+    def test_unchanged(self):
+        self.assertEqual([], self._ops(
+            [fake_driver_device.fake_driver_device()],
+            [fake_driver_device.fake_driver_device()]))
+
+    def test_added_and_removed_devices(self):
+        added = fake_driver_device.fake_driver_device('0000:82:00.0')
+        ops = self._ops([fake_driver_device.fake_driver_device()], [added])
+        self.assertEqual(
+            [{'op': 'remove', 'type': 'devices', 'key': ['0000:81:00.0']},
+             {'op': 'add', 'type': 'devices', 'key': ['0000:82:00.0'],
+              'object': added}],
+            ops)
+
+    def test_modified_elements(self):
+        new = fake_driver_device.fake_driver_device(model='new')
+        dep = new.deployable_list[0]
+        dep.attribute_list[0].value = 'CUSTOM_NEW_RC'
+        dep.attach_handle_list[1].in_use = True
+        ops = self._ops([fake_driver_device.fake_driver_device()], [new])
+        dep_key = ['0000:81:00.0', '0000:81:00.0_pf']
+        self.assertEqual(
+            [{'op': 'modify', 'type': 'devices', 'key': ['0000:81:00.0'],
+              'values': {'model': 'new'}},
+             {'op': 'modify', 'type': 'attributes', 'key': dep_key + ['rc'],
+              'values': {'value': 'CUSTOM_NEW_RC'}},
+             {'op': 'modify', 'type': 'attach_handles',
+              'key': dep_key + ['0000:81:00.2'], 'values': {'in_use': True}}],
+            ops)
+
+    def test_added_and_removed_children(self):
+        new = fake_driver_device.fake_driver_device()
+        dep = new.deployable_list[0]
+        ah = driver_attach_handle.DriverAttachHandle(
+            attach_type='PCI', attach_info='0000:81:00.3', in_use=False)
+        dep.attach_handle_list = dep.attach_handle_list[:1] + [ah]
+        ops = self._ops([fake_driver_device.fake_driver_device()], [new])
+        dep_key = ['0000:81:00.0', '0000:81:00.0_pf']
+        self.assertEqual(
+            [{'op': 'remove', 'type': 'attach_handles',
+              'key': dep_key + ['0000:81:00.2']},
+             {'op': 'add', 'type': 'attach_handles',
+              'key': dep_key + ['0000:81:00.3'], 'object': ah}],
+            ops)
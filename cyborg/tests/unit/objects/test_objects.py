@@ -34,6 +34,7 @@ from cyborg import objects
 from cyborg.objects import base
 from cyborg.objects import fields
 from cyborg import tests as test
+from cyborg.tests.unit import fake_driver_device
 
 
 LOG = log.getLogger(__name__)
@@ -162,6 +163,22 @@ class TestObjToPrimitive(test.base.TestCase):
                          base.obj_to_primitive(obj))
 
 
+class TestObjFingerprint(test.base.TestCase):
+
+    def test_obj_fingerprint_order_independent(self):
+        dev1 = fake_driver_device.fake_driver_device('0000:81:00.0')
+        dev2 = fake_driver_device.fake_driver_device('0000:82:00.0')
+        fingerprint = base.obj_fingerprint([dev1, dev2])
+        dev1.deployable_list[0].attach_handle_list.reverse()
+        self.assertEqual(fingerprint, base.obj_fingerprint([dev2, dev1]))
+
+    def test_obj_fingerprint_content_sensitive(self):
+        dev = fake_driver_device.fake_driver_device()
+        fingerprint = base.obj_fingerprint([dev])
+        dev.deployable_list[0].attach_handle_list[0].in_use = True
+        self.assertNotEqual(fingerprint, base.obj_fingerprint([dev]))
+
+
 def compare_obj(test, obj, db_obj, subs=None, allow_missing=None,
                 comparators=None):
     """Compare a CyborgObject and a dict-like database object.
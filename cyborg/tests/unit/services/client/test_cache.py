@@ -0,0 +1,106 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+
+import mock
+import requests
+
+from cyborg.services.client import cache
+from cyborg.tests import base
+
+TRAITS_URL = '/resource_providers/rp1/traits'
+
+
+def fake_response(status_code, body=None, headers=None):
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp.headers.update(headers or {})
+    resp._content = json.dumps(body).encode('utf-8') if body else b''
+    return resp
+
+
+def traits_response(generation, traits=(), headers=None):
+    return fake_response(200, {'resource_provider_generation': generation,
+                               'traits': list(traits)}, headers)
+
+
+class TestResponseCache(base.TestCase):
+
+    def setUp(self):
+        super(TestResponseCache, self).setUp()
+        self.cache = cache.ResponseCache(size=2, ttl=60)
+
+    def test_provider_uuid(self):
+        self.assertEqual('rp1', cache.provider_uuid(TRAITS_URL))
+        self.assertEqual('rp1', cache.provider_uuid('/resource_providers/rp1'))
+        self.assertIsNone(cache.provider_uuid('/resource_providers?in_tree=x'))
+        self.assertIsNone(cache.provider_uuid(
+            '/resource_providers/rp1/allocations'))
+
+    def test_lookup_by_generation(self):
+        resp = traits_response(3)
+        self.assertIs(resp, self.cache.store(TRAITS_URL, '1.6', resp))
+        self.assertEqual((resp, {}), self.cache.lookup(TRAITS_URL, '1.6', 3))
+        self.assertEqual((None, {}), self.cache.lookup(TRAITS_URL, '1.6', 4))
+        self.assertEqual((None, {}),
+                         self.cache.lookup(TRAITS_URL, '1.6', None))
+        self.assertEqual((None, {}), self.cache.lookup(TRAITS_URL, '1.7', 3))
+        self.assertEqual((1, 3), (self.cache.hits, self.cache.misses))
+
+    def test_ttl(self):
+        self.cache.store(TRAITS_URL, '1.6', traits_response(3))
+        with mock.patch('time.time', return_value=10 ** 10):
+            self.assertIsNone(self.cache.lookup(TRAITS_URL, '1.6', 3)[0])
+
+    def test_not_cached(self):
+        self.cache.store(TRAITS_URL, '1.6', fake_response(404))
+        self.cache.store('/resource_providers?in_tree=rp1', None,
+                         fake_response(200, {'resource_providers': []}))
+        # No generation in the response.
+        self.cache.store('/resource_providers/rp1/aggregates', '1.1',
+                         fake_response(200, {'aggregates': []}))
+        self.assertEqual(0, len(self.cache._entries))
+
+    def test_lru(self):
+        self.cache.store('/resource_providers/rp1', None,
+                         fake_response(200, {'uuid': 'rp1', 'generation': 1}))
+        self.cache.store(TRAITS_URL, '1.6', traits_response(1))
+        self.cache.lookup('/resource_providers/rp1', None, 1)
+        self.cache.store('/resource_providers/rp2/traits', '1.6',
+                         traits_response(1))
+        self.assertIsNotNone(
+            self.cache.lookup('/resource_providers/rp1', None, 1)[0])
+        self.assertIsNone(self.cache.lookup(TRAITS_URL, '1.6', 1)[0])
+
+    def test_invalidate(self):
+        self.cache.store(TRAITS_URL, '1.6', traits_response(1))
+        self.cache.store('/resource_providers/rp2/traits', '1.6',
+                         traits_response(1))
+        self.cache.invalidate('rp1')
+        self.assertIsNone(self.cache.lookup(TRAITS_URL, '1.6', 1)[0])
+        self.assertIsNotNone(self.cache.lookup(
+            '/resource_providers/rp2/traits', '1.6', 1)[0])
+
+    def test_conditional(self):
+        resp = traits_response(1, headers={'ETag': '"abc"'})
+        self.cache.store(TRAITS_URL, '1.6', resp)
+        self.assertEqual((None, {'If-None-Match': '"abc"'}),
+                         self.cache.lookup(TRAITS_URL, '1.6', 2))
+        self.assertIs(resp, self.cache.store(TRAITS_URL, '1.6',
+                                             fake_response(304)))
+        self.assertEqual(1, self.cache.revalidations)
+
+    def test_disabled(self):
+        self.cache = cache.ResponseCache(size=0, ttl=60)
+        self.cache.store(TRAITS_URL, '1.6', traits_response(1))
+        self.assertIsNone(self.cache.lookup(TRAITS_URL, '1.6', 1)[0])
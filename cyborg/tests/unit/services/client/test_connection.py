@@ -0,0 +1,138 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import socket
+
+import eventlet
+from eventlet import wsgi
+from keystoneauth1 import session as ks_session
+from oslo_log import log as logging
+import requests
+
+from cyborg.services.client import connection
+from cyborg.services.client import metrics
+from cyborg.tests import base
+
+RP_UUID = '4e8e5957-649f-477b-9e5b-f1f75b21c03c'
+
+
+def _app(environ, start_response):
+    status = ('500 Internal Server Error'
+              if environ['PATH_INFO'].endswith('/error') else '200 OK')
+    start_response(status, [('Content-Type', 'application/json'),
+                            ('Content-Length', '2')])
+    return [b'{}']
+
+
+class TestMetrics(base.TestCase):
+
+    def test_endpoint(self):
+        self.assertEqual(
+            'GET /placement/resource_providers/{uuid}/inventories/{name}',
+            metrics.endpoint(
+                'get', 'http://placement:8778/placement/resource_providers/'
+                       '%s/inventories/CUSTOM_FPGA?x=1' % RP_UUID))
+        self.assertEqual('POST /allocations',
+                         metrics.endpoint('POST', '/allocations'))
+
+    def test_histogram(self):
+        histogram = metrics.Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        self.assertEqual({'count': 4, 'sum': 2.65,
+                          'buckets': {'0.1': 2, '1.0': 3, '+Inf': 4}},
+                         histogram.to_dict())
+
+    def test_stats(self):
+        placement_metrics = metrics.PlacementMetrics()
+        url = 'https://placement/resource_providers/%s' % RP_UUID
+        placement_metrics.connection_opened('placement', 443)
+        placement_metrics.observe('GET', url, 0.01, 200)
+        placement_metrics.observe('GET', url, 0.02, 404)
+        placement_metrics.observe('GET', url, 0.5, 503)
+        placement_metrics.observe('GET', url, 1.0)
+        stats = placement_metrics.stats()
+        endpoint = stats['endpoints']['GET /resource_providers/{uuid}']
+        self.assertEqual(4, endpoint['count'])
+        self.assertEqual(2, endpoint['errors'])
+        self.assertEqual({'placement:443': {'requests': 4, 'opened': 1,
+                                            'reused': 3}},
+                         stats['connections'])
+        placement_metrics.reset()
+        self.assertEqual({'endpoints': {}, 'connections': {}},
+                         placement_metrics.stats())
+
+
+class TestPlacementHTTPAdapter(base.TestCase):
+
+    def setUp(self):
+        super(TestPlacementHTTPAdapter, self).setUp()
+        sock = eventlet.listen(('127.0.0.1', 0))
+        self.port = sock.getsockname()[1]
+        server = eventlet.spawn(wsgi.server, sock, _app,
+                                log=logging.getLogger(__name__))
+        self.addCleanup(server.kill)
+        self.url = 'http://127.0.0.1:%d' % self.port
+        self.metrics = metrics.PlacementMetrics()
+        self.session = requests.Session()
+        self.addCleanup(self.session.close)
+
+    def _mount(self):
+        adapter = connection.PlacementHTTPAdapter(metrics=self.metrics)
+        self.session.mount('http://', adapter)
+        return adapter
+
+    def test_connections_reused(self):
+        self._mount()
+        for _ in range(5):
+            self.session.get('%s/resource_providers/%s' % (self.url,
+                                                           RP_UUID))
+        self.session.get(self.url + '/error')
+        stats = self.metrics.stats()
+        self.assertEqual(
+            {'127.0.0.1:%d' % self.port:
+             {'requests': 6, 'opened': 1, 'reused': 5}},
+            stats['connections'])
+        self.assertEqual(
+            5, stats['endpoints']['GET /resource_providers/{uuid}']['count'])
+        self.assertEqual(1, stats['endpoints']['GET /error']['errors'])
+
+    def test_failed_request(self):
+        self._mount()
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        self.assertRaises(requests.ConnectionError, self.session.get,
+                          'http://127.0.0.1:%d/traits' % port)
+        endpoint = self.metrics.stats()['endpoints']['GET /traits']
+        self.assertEqual((1, 1), (endpoint['count'], endpoint['errors']))
+
+    def test_pool_config(self):
+        self.config(pool_maxsize=32, pool_block=True, tcp_keepidle=30,
+                    group='placement')
+        adapter = self._mount()
+        pool = adapter.poolmanager.connection_from_url(self.url)
+        self.assertEqual(32, pool.pool.maxsize)
+        self.assertTrue(pool.block)
+        options = adapter.poolmanager.connection_pool_kw['socket_options']
+        self.assertIn((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1), options)
+        if hasattr(socket, 'TCP_KEEPIDLE'):
+            self.assertIn((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30),
+                          options)
+
+    def test_mount(self):
+        session = connection.mount(ks_session.Session())
+        self.assertIsInstance(session.session.get_adapter(self.url),
+                              connection.PlacementHTTPAdapter)
+        self.assertIsInstance(session.session.get_adapter('https://x'),
+                              connection.PlacementHTTPAdapter)
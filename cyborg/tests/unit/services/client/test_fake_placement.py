@@ -0,0 +1,183 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+import mock
+
+from cyborg.common import exception
+from cyborg.services.client import report
+from cyborg.tests import base
+from cyborg.tests.unit import fake_placement
+from cyborg.tests.unit.services.client import test_report
+
+INVENTORY = {'CUSTOM_FPGA': {'total': 1}}
+
+
+def _tree(pfs=2, vfs=2):
+    tree = test_report._tree(pfs=pfs, vfs=vfs)
+    for uuid in tree.get_provider_uuids():
+        if '_vf' in uuid:
+            tree.update_inventory(uuid, INVENTORY)
+            tree.update_traits(uuid, ['CUSTOM_FPGA_INTEL'])
+    tree.update_aggregates('host', ['agg1'])
+    return tree
+
+
+class TestFakePlacement(base.TestCase):
+
+    def setUp(self):
+        super(TestFakePlacement, self).setUp()
+        self.fixture = self.useFixture(fake_placement.PlacementFixture())
+        self.placement = self.fixture.placement
+        self.client = self.fixture.client()
+
+    def _writes(self):
+        return sum(count for (method, _route), count
+                   in self.placement.requests.items() if method != 'GET')
+
+    def test_update_from_provider_tree(self):
+        self.client.update_from_provider_tree(self.context, _tree())
+        self.assertEqual(7, len(self.placement.providers))
+        vf = self.placement.providers['pf1_vf0']
+        self.assertEqual('pf1', vf.parent_uuid)
+        self.assertEqual('host', vf.root_uuid)
+        self.assertEqual(1, vf.inventories['CUSTOM_FPGA']['max_unit'])
+        self.assertEqual({'CUSTOM_FPGA_INTEL'}, vf.traits)
+        self.assertEqual({'agg1'}, self.placement.providers['host'].aggregates)
+        self.assertIn('CUSTOM_FPGA', self.placement.resource_classes)
+
+        # Nothing changed, nothing is written.
+        writes = self._writes()
+        self.client.update_from_provider_tree(self.context, _tree())
+        self.assertEqual(writes, self._writes())
+
+        self.client.update_from_provider_tree(self.context, _tree(vfs=1))
+        self.assertEqual(5, len(self.placement.providers))
+        self.assertNotIn('pf1_vf1', self.placement.providers)
+
+    def test_generation_conflict(self):
+        self.client.update_from_provider_tree(self.context, _tree())
+        # Another service changes the provider.
+        self.placement.providers['pf0_vf0'].generation += 1
+        tree = _tree()
+        tree.update_inventory('pf0_vf0', {'CUSTOM_FPGA': {'total': 2}})
+        self.assertRaises(exception.ResourceProviderSyncFailed,
+                          self.client.update_from_provider_tree,
+                          self.context, tree)
+        # The provider is refreshed from placement on the next sync.
+        self.client.update_from_provider_tree(self.context, tree)
+        self.assertEqual(2, self.placement.providers['pf0_vf0']
+                         .inventories['CUSTOM_FPGA']['total'])
+
+    def test_allocation_candidates_and_claims(self):
+        self.client.update_from_provider_tree(self.context, _tree())
+        requests, summaries, _version = (
+            self.client.get_allocation_candidates(
+                self.context, fake_placement.ResourceRequest(
+                    {'CUSTOM_FPGA': 1})))
+        self.assertEqual(4, len(requests))
+        self.assertEqual({'capacity': 1, 'used': 0},
+                         summaries['pf0_vf0']['resources']['CUSTOM_FPGA'])
+
+        self.assertTrue(self.client.claim_resources(
+            self.context, 'consumer1', requests[0], 'project', 'user',
+            allocation_request_version='1.12'))
+        self.assertEqual({'pf0_vf0': {'CUSTOM_FPGA': 1}},
+                         {rp: alloc['resources'] for rp, alloc in
+                          self.client.get_allocations_for_consumer(
+                              self.context, 'consumer1').items()})
+        requests, _summaries, _version = (
+            self.client.get_allocation_candidates(
+                self.context, fake_placement.ResourceRequest(
+                    {'CUSTOM_FPGA': 1})))
+        self.assertEqual(3, len(requests))
+        # The VF is used, it can not be claimed again.
+        self.assertFalse(self.client.claim_resources(
+            self.context, 'consumer2',
+            {'allocations': {'pf0_vf0': {'resources': {'CUSTOM_FPGA': 1}}}},
+            'project', 'user', allocation_request_version='1.12'))
+
+    def test_allocation_candidates_for_groups(self):
+        self.client.update_from_provider_tree(self.context, _tree())
+        groups = [{'resources': {'CUSTOM_FPGA': 1},
+                   'required': ['CUSTOM_FPGA_INTEL'],
+                   'member_of': []}] * 2
+        requests, _summaries, _version = (
+            self.client.get_allocation_candidates_for_groups(
+                self.context, groups, group_policy='isolate', limit=5))
+        self.assertEqual(5, len(requests))
+        for request in requests:
+            self.assertEqual(2, len(request['allocations']))
+        requests, _summaries, _version = (
+            self.client.get_allocation_candidates_for_groups(
+                self.context, [{'resources': {'CUSTOM_FPGA': 1},
+                                'required': ['!CUSTOM_FPGA_INTEL']}]))
+        self.assertEqual([], requests)
+
+    def test_set_allocations_atomic(self):
+        self.client.update_from_provider_tree(self.context, _tree())
+        allocations = {'consumer1': {'pf0_vf0': {'CUSTOM_FPGA': 1}},
+                       'consumer2': {'pf0_vf0': {'CUSTOM_FPGA': 1}}}
+        self.assertFalse(self.client.set_allocations(
+            self.context, allocations, 'project', 'user'))
+        self.assertEqual({}, self.placement.allocations)
+        allocations['consumer2'] = {'pf0_vf1': {'CUSTOM_FPGA': 1}}
+        self.assertTrue(self.client.set_allocations(
+            self.context, allocations, 'project', 'user'))
+        self.assertEqual(2, len(self.placement.allocations))
+        # A provider with allocations can not be deleted.
+        self.assertRaises(exception.ResourceProviderSyncFailed,
+                          self.client.update_from_provider_tree,
+                          self.context, _tree(vfs=1))
+
+    @mock.patch.object(report.time, 'sleep')
+    def test_conflict_rate(self, mock_sleep):
+        self.client.update_from_provider_tree(self.context, _tree())
+        self.placement.conflict_rate = 1
+        self.assertFalse(self.client.claim_resources(
+            self.context, 'consumer1',
+            {'allocations': {'pf0_vf0': {'resources': {'CUSTOM_FPGA': 1}}}},
+            'project', 'user', allocation_request_version='1.12'))
+        # Retried on the concurrent update.
+        self.assertEqual(
+            4, self.placement.requests[('PUT', '/allocations/{consumer}')])
+
+    @mock.patch.object(report.time, 'sleep')
+    def test_update_inventories_conflicts(self, mock_sleep):
+        tree = _tree(pfs=3, vfs=4)
+        self.client.update_from_provider_tree(self.context, tree)
+        uuids = tree.get_provider_uuids()
+        for seed in range(5):
+            inventories = {uuid: {'CUSTOM_FPGA': {'total': 2 + seed}}
+                           for uuid in uuids}
+            self.placement.conflict_rate = 0.5
+            self.placement._random.seed(seed)
+            results = self.client.update_inventories(self.context,
+                                                     inventories)
+            self.assertEqual(set(uuids), set(results))
+            # The conflicted providers are back in the cache.
+            for uuid in uuids:
+                self.assertTrue(self.client._provider_tree.exists(uuid))
+            self.placement.conflict_rate = 0
+            self.assertTrue(all(self.client.update_inventories(
+                self.context, inventories).values()))
+            for uuid in uuids:
+                self.assertEqual(
+                    2 + seed, self.placement.providers[uuid]
+                    .inventories['CUSTOM_FPGA']['total'])
+
+    def test_latency(self):
+        self.placement.latency = 0.05
+        start = time.time()
+        self.client.get('/resource_providers')
+        self.assertGreaterEqual(time.time() - start, 0.05)
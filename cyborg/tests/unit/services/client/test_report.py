@@ -0,0 +1,261 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+import mock
+
+from cyborg.agent import provider_tree
+from cyborg.common import exception
+from cyborg.services.client import report
+from cyborg.tests import base
+from cyborg.tests.unit.services.client import test_cache
+
+
+def _tree(pfs=2, vfs=4):
+    """Return a tree of a host with PF providers having VF children."""
+    tree = provider_tree.ProviderTree()
+    tree.new_root('host', 'host')
+    for pf in range(pfs):
+        pf_uuid = 'pf%d' % pf
+        tree.new_child(pf_uuid, 'host', uuid=pf_uuid)
+        for vf in range(vfs):
+            vf_uuid = '%s_vf%d' % (pf_uuid, vf)
+            tree.new_child(vf_uuid, pf_uuid, uuid=vf_uuid)
+    return tree
+
+
+class TestUpdateFromProviderTree(base.TestCase):
+
+    def setUp(self):
+        super(TestUpdateFromProviderTree, self).setUp()
+        self.client = report.SchedulerReportClient(adapter=mock.Mock())
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+        self.failing = set()
+        for name in ('_delete_provider', '_set_inventory_for_provider'):
+            patcher = mock.patch.object(
+                self.client, name, side_effect=self._placement_call(name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(
+            self.client, '_ensure_resource_provider',
+            side_effect=self._placement_call('_ensure_resource_provider',
+                                             self._ensure))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for name in ('set_aggregates_for_provider',
+                     'set_traits_for_provider'):
+            patcher = mock.patch.object(self.client, name)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _ensure(self, context, uuid, name=None, parent_provider_uuid=None):
+        if parent_provider_uuid is None:
+            self.client._provider_tree.new_root(name, uuid)
+        else:
+            self.client._provider_tree.new_child(
+                name, parent_provider_uuid, uuid=uuid)
+
+    def _placement_call(self, name, func=None):
+        def call(context_or_uuid, *args, **kwargs):
+            uuid = args[0] if name != '_delete_provider' else context_or_uuid
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            # Yield like a HTTP request would.
+            eventlet.sleep(0.001)
+            self.running -= 1
+            self.calls.append((name, uuid))
+            if (name, uuid) in self.failing:
+                raise exception.ResourceProviderUpdateConflict(
+                    uuid=uuid, generation=0, error='conflict')
+            if func is not None:
+                func(context_or_uuid, *args, **kwargs)
+        return call
+
+    def _order(self, name):
+        return [uuid for call, uuid in self.calls if call == name]
+
+    def test_parents_before_children(self):
+        self.client.update_from_provider_tree(self.context, _tree())
+        created = self._order('_ensure_resource_provider')
+        self.assertEqual(11, len(created))
+        for vf in range(4):
+            self.assertLess(created.index('pf0'),
+                            created.index('pf0_vf%d' % vf))
+        self.assertEqual('host', created[0])
+        # Inventories are flushed bottom-up.
+        flushed = self._order('_set_inventory_for_provider')
+        self.assertEqual('host', flushed[-1])
+        self.assertLess(flushed.index('pf1_vf3'), flushed.index('pf1'))
+        self.assertGreater(self.max_running, 1)
+        self.assertLessEqual(self.max_running, 8)
+
+    def test_sync_workers(self):
+        self.config(sync_workers=1, group='placement')
+        self.client.update_from_provider_tree(self.context, _tree())
+        self.assertEqual(1, self.max_running)
+        self.assertEqual(11, len(self._order('_set_inventory_for_provider')))
+
+    def test_deletions_children_first(self):
+        self.client.update_from_provider_tree(self.context, _tree())
+        self.calls = []
+        self.client.update_from_provider_tree(self.context, _tree(pfs=1))
+        deleted = self._order('_delete_provider')
+        self.assertEqual(5, len(deleted))
+        self.assertEqual('pf1', deleted[-1])
+
+    def test_error_isolation(self):
+        self.failing.add(('_set_inventory_for_provider', 'pf0_vf1'))
+        self.assertRaises(exception.ResourceProviderSyncFailed,
+                          self.client.update_from_provider_tree,
+                          self.context, _tree())
+        # The other providers were still flushed.
+        self.assertEqual(11, len(self._order('_set_inventory_for_provider')))
+        self.assertFalse(self.client._provider_tree.exists('pf0_vf1'))
+        self.assertTrue(self.client._provider_tree.exists('pf0_vf2'))
+
+    def test_unexpected_error(self):
+        self.client._set_inventory_for_provider.side_effect = ValueError
+        self.assertRaises(ValueError, self.client.update_from_provider_tree,
+                          self.context, _tree())
+
+
+class TestResponseCache(base.TestCase):
+
+    def setUp(self):
+        super(TestResponseCache, self).setUp()
+        self.adapter = mock.Mock()
+        self.client = report.SchedulerReportClient(adapter=self.adapter)
+        self.client._provider_tree.new_root('rp1', 'rp1', generation=1)
+        self.adapter.get.return_value = test_cache.traits_response(
+            1, ['CUSTOM_FPGA'])
+
+    def test_get_cached_by_generation(self):
+        for _i in range(3):
+            self.assertEqual(set(['CUSTOM_FPGA']),
+                             self.client._get_provider_traits(
+                                 self.context, 'rp1'))
+        self.assertEqual(1, self.adapter.get.call_count)
+        # The cached response is not used for another generation.
+        self.client._provider_tree.update_traits('rp1', [], generation=2)
+        self.client._get_provider_traits(self.context, 'rp1')
+        self.assertEqual(2, self.adapter.get.call_count)
+
+    def test_not_cached_calls(self):
+        self.adapter.get.return_value = test_cache.fake_response(
+            200, {'resource_providers': []})
+        self.client._get_providers_in_tree(self.context, 'rp1')
+        self.client._get_providers_in_tree(self.context, 'rp1')
+        self.assertEqual(2, self.adapter.get.call_count)
+
+    def test_invalidated_on_write(self):
+        self.client._get_provider_traits(self.context, 'rp1')
+        self.adapter.put.return_value = test_cache.fake_response(
+            409, {'errors': []})
+        self.assertRaises(exception.ResourceProviderUpdateConflict,
+                          self.client.set_traits_for_provider,
+                          self.context, 'rp1', ['CUSTOM_FPGA'])
+        self.assertEqual(2, self.adapter.get.call_count)
+        self.client._get_provider_traits(self.context, 'rp1')
+        self.assertEqual(3, self.adapter.get.call_count)
+
+
+class TestBulkOperations(base.TestCase):
+
+    def setUp(self):
+        super(TestBulkOperations, self).setUp()
+        self.adapter = mock.Mock()
+        self.client = report.SchedulerReportClient(adapter=self.adapter)
+        self.client._provider_tree = _tree(pfs=1, vfs=3)
+        patcher = mock.patch('time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @mock.patch.object(report.SchedulerReportClient,
+                       '_update_inventory_attempt')
+    def test_update_inventories_selective_retry(self, mock_attempt):
+        failing = {'pf0_vf1': 1}
+
+        def attempt(context, rp_uuid, inv_data, conflicts):
+            if failing.get(rp_uuid):
+                failing[rp_uuid] -= 1
+                return False
+            return True
+        mock_attempt.side_effect = attempt
+        inventories = {'pf0_vf%d' % vf: {'FPGA': {'total': 1}}
+                       for vf in range(3)}
+        inventories['unknown'] = {'FPGA': {'total': 1}}
+        results = self.client.update_inventories(self.context, inventories)
+        self.assertEqual({'pf0_vf0': True, 'pf0_vf1': True, 'pf0_vf2': True,
+                          'unknown': False}, results)
+        # Only the provider which failed was attempted again.
+        self.assertEqual(['pf0_vf0', 'pf0_vf1', 'pf0_vf1', 'pf0_vf2'],
+                         sorted(call[0][1]
+                                for call in mock_attempt.call_args_list))
+        self.assertEqual(1, self.sleep.call_count)
+
+    def test_ensure_traits_errors(self):
+        self.adapter.get.return_value = test_cache.fake_response(
+            200, {'traits': []})
+        self.adapter.put.return_value = test_cache.fake_response(
+            400, {'error': 'bad trait'})
+        exc = self.assertRaises(exception.TraitCreationFailed,
+                                self.client._ensure_traits, self.context,
+                                ['CUSTOM_X'])
+        self.assertIn('Failed to create trait CUSTOM_X: ', str(exc))
+        self.assertIn('bad trait', str(exc))
+        self.adapter.get.return_value = test_cache.fake_response(
+            503, {'error': 'down'})
+        exc = self.assertRaises(exception.TraitRetrievalFailed,
+                                self.client._ensure_traits, self.context,
+                                ['CUSTOM_Y'])
+        self.assertIn('Failed to retrieve traits', str(exc))
+
+    def test_set_allocations(self):
+        self.adapter.post.side_effect = [
+            test_cache.fake_response(409, {'errors': [
+                {'detail': 'resource provider concurrently updated'}]}),
+            test_cache.fake_response(204)]
+        allocations = {
+            'consumer1': {'pf0_vf0': {'FPGA': 1}, 'pf0_vf1': {'FPGA': 1}},
+            'consumer2': {},
+        }
+        self.assertTrue(self.client.set_allocations(
+            self.context, allocations, 'project', 'user'))
+        self.assertEqual(2, self.adapter.post.call_count)
+        payload = self.adapter.post.call_args[1]['json']
+        self.assertEqual({'pf0_vf0': {'resources': {'FPGA': 1}},
+                          'pf0_vf1': {'resources': {'FPGA': 1}}},
+                         payload['consumer1']['allocations'])
+        self.assertEqual({}, payload['consumer2']['allocations'])
+        self.assertEqual('project', payload['consumer2']['project_id'])
+
+    def test_get_allocation_candidates_for_groups(self):
+        self.adapter.get.return_value = test_cache.fake_response(
+            200, {'allocation_requests': [], 'provider_summaries': {}})
+        self.assertEqual(([], {}, report.GRANULAR_AC_VERSION),
+                         self.client.get_allocation_candidates_for_groups(
+                             self.context,
+                             [{'resources': {'FPGA': 1},
+                               'required': ['CUSTOM_FPGA_INTEL']},
+                              {'resources': {'FPGA': 1},
+                               'member_of': ['agg2', 'agg1']}],
+                             limit=10))
+        self.assertEqual(1, self.adapter.get.call_count)
+        url = self.adapter.get.call_args[0][0]
+        self.assertEqual('/allocation_candidates', url.split('?')[0])
+        self.assertEqual(
+            ['group_policy=isolate', 'limit=10', 'member_of2=in:agg1,agg2',
+             'required1=CUSTOM_FPGA_INTEL', 'resources1=FPGA:1',
+             'resources2=FPGA:1'],
+            sorted(report.parse.unquote(url.split('?')[1]).split('&')))
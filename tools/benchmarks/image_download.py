@@ -0,0 +1,88 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark GlanceImageServiceV2.download against an in-process fake glance.
+
+Downloads an image to a file with the given numbers of parallel byte range
+workers, the fake glance sending the data of each response at most at the
+given bandwidth, like a single TCP stream over a long link does. The time
+taken and the throughput of each download are reported.
+
+Usage: python tools/benchmarks/image_download.py [--size 256]
+           [--bandwidth 100] [--workers 1,2,4,8] [--range-size 16]
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from oslo_utils import units
+
+from cyborg.conf import CONF
+from cyborg import context as cyborg_context
+from cyborg.tests.unit import fake_image
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=256,
+                        help='size of the image in MiB')
+    parser.add_argument('--bandwidth', type=float, default=100,
+                        help='MiB/s sent by glance in each response, '
+                             'unlimited if 0')
+    parser.add_argument('--latency', type=float, default=0.01,
+                        help='seconds added by glance to each request')
+    parser.add_argument('--workers', default='1,2,4,8',
+                        help='comma-separated numbers of parallel workers')
+    parser.add_argument('--range-size', type=int, default=16,
+                        help='size of the byte ranges in MiB')
+    args = parser.parse_args()
+
+    fixture = fake_image.GlanceFixture(
+        latency=args.latency, bandwidth=args.bandwidth * units.Mi)
+    fixture.setUp()
+    tmpdir = tempfile.mkdtemp()
+    try:
+        image_id = fixture.glance.create_image(
+            os.urandom(args.size * units.Mi))['id']
+        context = cyborg_context.RequestContext(auth_token='token',
+                                                is_admin=True)
+        service = fixture.image_service(context)
+        CONF.set_override('parallel_download_range_size', args.range_size,
+                          group='glance')
+        print('%d MiB image, %s MiB/s per response' % (
+            args.size, args.bandwidth or 'unlimited'))
+        print('%-8s %10s %10s %8s' % ('workers', 'time (s)', 'MiB/s',
+                                      'requests'))
+        for workers in [int(n) for n in args.workers.split(',')]:
+            CONF.set_override('parallel_download_workers', workers,
+                              group='glance')
+            fixture.glance.requests.clear()
+            path = os.path.join(tmpdir, 'image%d' % workers)
+            start = time.time()
+            service.download(context, image_id, dst_path=path)
+            elapsed = time.time() - start
+            print('%-8d %10.2f %10.1f %8d' % (
+                workers, elapsed, args.size / elapsed,
+                sum(fixture.glance.requests.values())))
+            os.unlink(path)
+    finally:
+        shutil.rmtree(tmpdir)
+        fixture.cleanUp()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark the provider lookups of ProviderTree.
+
+Builds trees of a host with PF providers of 16 VFs each, then runs what a
+sync of the tree does for each provider: data, update_inventory,
+update_traits and in_aggregates. The indexed ProviderTree is compared to
+a tree finding the providers by a depth-first search, as it used to.
+
+Usage: python tools/benchmarks/provider_tree.py [--sizes 10,100,1000,10000]
+"""
+
+from __future__ import print_function
+
+import argparse
+import time
+
+from cyborg.agent import provider_tree
+from cyborg.common.i18n import _
+
+VFS_PER_PF = 16
+INVENTORY = {'FPGA': {'total': 1, 'reserved': 0, 'min_unit': 1,
+                      'max_unit': 1, 'step_size': 1,
+                      'allocation_ratio': 1.0}}
+
+
+def _dfs_find(provider, search):
+    if provider.name == search or provider.uuid == search:
+        return provider
+    for child in provider.children.values():
+        found = _dfs_find(child, search)
+        if found:
+            return found
+    return None
+
+
+class DFSProviderTree(provider_tree.ProviderTree):
+    """ProviderTree searching the providers like before the indexes."""
+
+    def _find_with_lock(self, name_or_uuid):
+        for root in self.roots:
+            found = _dfs_find(root, name_or_uuid)
+            if found:
+                return found
+        raise ValueError(_("No such provider %s") % name_or_uuid)
+
+
+def build(tree_cls, size):
+    tree = tree_cls()
+    tree.new_root('host', 'host')
+    pf = None
+    for i in range(1, size):
+        if pf is None or i % (VFS_PER_PF + 1) == 1:
+            pf = tree.new_child('pf%d' % i, 'host', uuid='pf%d' % i)
+        else:
+            tree.new_child('vf%d' % i, pf, uuid='vf%d' % i)
+    return tree
+
+
+def sync(tree):
+    for uuid in tree.get_provider_uuids():
+        tree.data(uuid)
+        tree.update_inventory(uuid, INVENTORY, generation=1)
+        tree.update_traits(uuid, ['CUSTOM_FPGA'])
+        tree.in_aggregates(uuid, [])
+
+
+def _timed(func, *args):
+    start = time.time()
+    result = func(*args)
+    return result, time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10,100,1000,10000',
+                        help='comma-separated numbers of providers')
+    parser.add_argument('--max-dfs-size', type=int, default=10000,
+                        help='largest tree also timed with the depth-first '
+                             'search, which is quadratic')
+    args = parser.parse_args()
+
+    print('%8s %12s %12s %12s %12s %8s' % (
+        'size', 'build (s)', 'sync (s)', 'dfs build', 'dfs sync',
+        'speedup'))
+    for size in [int(size) for size in args.sizes.split(',')]:
+        tree, build_time = _timed(build, provider_tree.ProviderTree, size)
+        _, sync_time = _timed(sync, tree)
+        if size <= args.max_dfs_size:
+            dfs_tree, dfs_build_time = _timed(build, DFSProviderTree, size)
+            _, dfs_sync_time = _timed(sync, dfs_tree)
+            speedup = '%7.1fx' % ((dfs_build_time + dfs_sync_time) /
+                                  (build_time + sync_time))
+            dfs = '%12.4f %12.4f' % (dfs_build_time, dfs_sync_time)
+        else:
+            speedup = '%8s' % '-'
+            dfs = '%12s %12s' % ('-', '-')
+        print('%8d %12.4f %12.4f %s %s' % (
+            size, build_time, sync_time, dfs, speedup))
+
+
+if __name__ == '__main__':
+    main()
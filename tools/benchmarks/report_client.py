@@ -0,0 +1,199 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark SchedulerReportClient against an in-process fake placement.
+
+Builds hosts of a root provider with PF providers of VF providers having a
+FPGA inventory, and times, with the given concurrency:
+
+- sync: the update_from_provider_tree of every host by its own client,
+  like the agents do when they start;
+- resync: the same again, when nothing changed;
+- candidates: get_allocation_candidates of one FPGA;
+- claims: claim_resources of a different VF per consumer.
+
+The throughput and the median and 99th percentile latencies of each
+operation are reported, and with --endpoints the placement requests they
+made.
+
+Usage: python tools/benchmarks/report_client.py [--sizes 1000,10000,50000]
+           [--latency 0.002] [--concurrency 16] [--requests 500]
+"""
+
+from __future__ import print_function
+
+import argparse
+import math
+import time
+
+import eventlet
+from oslo_utils import uuidutils
+
+from cyborg.agent import provider_tree
+from cyborg.common import exception
+from cyborg import context as cyborg_context
+from cyborg.services.client import metrics
+from cyborg.tests.unit import fake_placement
+
+PFS_PER_HOST = 3
+VFS_PER_PF = 4
+PROVIDERS_PER_HOST = 1 + PFS_PER_HOST * (1 + VFS_PER_PF)
+INVENTORY = {'CUSTOM_FPGA': {'total': 1}}
+
+
+def host_tree(host):
+    """Return the provider tree of a host and the UUIDs of its VFs."""
+    tree = provider_tree.ProviderTree()
+    host_uuid = tree.new_root(host, uuidutils.generate_uuid())
+    vfs = []
+    for pf in range(PFS_PER_HOST):
+        pf_name = '%s_pf%d' % (host, pf)
+        pf_uuid = tree.new_child(pf_name, host_uuid,
+                                 uuid=uuidutils.generate_uuid())
+        for vf in range(VFS_PER_PF):
+            vf_uuid = tree.new_child('%s_vf%d' % (pf_name, vf), pf_uuid,
+                                     uuid=uuidutils.generate_uuid())
+            tree.update_inventory(vf_uuid, INVENTORY)
+            tree.update_traits(vf_uuid, ['CUSTOM_FPGA_INTEL'])
+            vfs.append(vf_uuid)
+    return tree, vfs
+
+
+def percentile(latencies, percent):
+    if not latencies:
+        return 0
+    latencies = sorted(latencies)
+    return latencies[int(math.ceil(percent / 100.0 * len(latencies))) - 1]
+
+
+def run(func, args_list, concurrency):
+    """Call func with each args of args_list, return the latencies."""
+    latencies = []
+    failures = [0]
+
+    def timed(args):
+        start = time.time()
+        try:
+            if func(*args) is False:
+                failures[0] += 1
+        except exception.CyborgException:
+            failures[0] += 1
+        latencies.append(time.time() - start)
+
+    pool = eventlet.GreenPool(concurrency)
+    start = time.time()
+    for args in args_list:
+        pool.spawn_n(timed, args)
+    pool.waitall()
+    return time.time() - start, latencies, failures[0]
+
+
+def report(name, ops, elapsed, latencies, failures):
+    print('%-12s %8d %10.2f %10.1f %10.1f %10.1f %8d' % (
+        name, ops, elapsed, ops / elapsed if elapsed else 0,
+        percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000,
+        failures))
+
+
+def report_endpoints():
+    stats = metrics.METRICS.stats()
+    for name, endpoint in sorted(stats['endpoints'].items(),
+                                 key=lambda item: -item[1]['count']):
+        print('    %-58s %8d %8.2f ms' % (
+            name, endpoint['count'],
+            endpoint['sum'] / endpoint['count'] * 1000))
+    for host, connections in sorted(stats['connections'].items()):
+        print('    %s: %d requests, %d connections opened' % (
+            host, connections['requests'], connections['opened']))
+    metrics.METRICS.reset()
+
+
+def benchmark(size, args):
+    fixture = fake_placement.PlacementFixture(
+        latency=args.latency, jitter=args.jitter,
+        conflict_rate=args.conflict_rate, seed=0)
+    fixture.setUp()
+    try:
+        context = cyborg_context.get_admin_context()
+        hosts = ['host%d' % i for i in range(max(size // PROVIDERS_PER_HOST,
+                                                 1))]
+        print('%d providers, %d hosts' % (len(hosts) * PROVIDERS_PER_HOST,
+                                          len(hosts)))
+        print('%-12s %8s %10s %10s %10s %10s %8s' % (
+            'operation', 'ops', 'total (s)', 'ops/s', 'p50 (ms)', 'p99 (ms)',
+            'failed'))
+        clients = {host: fixture.client() for host in hosts}
+        trees = {}
+        vfs = []
+        for host in hosts:
+            trees[host], host_vfs = host_tree(host)
+            vfs.extend(host_vfs)
+
+        def sync(host):
+            return clients[host].update_from_provider_tree(context,
+                                                           trees[host])
+
+        for phase in ('sync', 'resync'):
+            result = run(sync, [(host,) for host in hosts], args.concurrency)
+            report(phase, len(hosts), *result)
+            if args.endpoints:
+                report_endpoints()
+
+        scheduler = fixture.client()
+        resources = fake_placement.ResourceRequest(
+            {'CUSTOM_FPGA': 1}, required=['CUSTOM_FPGA_INTEL'], limit=10)
+        result = run(scheduler.get_allocation_candidates,
+                     [(context, resources)] * args.requests,
+                     args.concurrency)
+        report('candidates', args.requests, *result)
+        if args.endpoints:
+            report_endpoints()
+
+        claims = [(context, uuidutils.generate_uuid(),
+                   {'allocations': {vf: {'resources': {'CUSTOM_FPGA': 1}}}},
+                   'project', 'user', '1.12')
+                  for vf in vfs[:args.requests]]
+        result = run(scheduler.claim_resources, claims, args.concurrency)
+        report('claims', len(claims), *result)
+        if args.endpoints:
+            report_endpoints()
+    finally:
+        fixture.cleanUp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,50000',
+                        help='comma-separated numbers of providers')
+    parser.add_argument('--latency', type=float, default=0.002,
+                        help='seconds added by placement to each request')
+    parser.add_argument('--jitter', type=float, default=0,
+                        help='maximum seconds randomly added to the latency')
+    parser.add_argument('--conflict-rate', type=float, default=0,
+                        help='fraction of the writes failing with a '
+                             'generation conflict')
+    parser.add_argument('--concurrency', type=int, default=16,
+                        help='number of operations run concurrently')
+    parser.add_argument('--requests', type=int, default=500,
+                        help='number of allocation candidates requests and '
+                             'of claims')
+    parser.add_argument('--endpoints', action='store_true',
+                        help='report the placement requests of each phase')
+    args = parser.parse_args()
+
+    for size in [int(size) for size in args.sizes.split(',')]:
+        metrics.METRICS.reset()
+        benchmark(size, args)
+
+
+if __name__ == '__main__':
+    main()